@@ -57,6 +57,27 @@ CONF_MAX_INVERTER_OUTPUT_KW = "max_inverter_output_kw"
 CONF_SENSOR_RANGES        = "sensor_ranges"   # optional; keys: soc, power_w
 CONF_SUNSET_CUTOFF_MINUTES = "sunset_cutoff_minutes"
 CONF_REGISTER_MAPPINGS    = "register_mappings"   # optional; dict: entity_id → register constant name
+CONF_FORECAST_TTL_SECONDS = "forecast_ttl_seconds"
+CONF_FORECAST_TIMEOUT_SECONDS = "forecast_timeout_seconds"
+CONF_FAST_REACTION_MS     = "fast_reaction_ms"   # 0 = disabled; event-driven re-evaluation budget
+CONF_STRATEGY_INTERVAL_SECONDS = "strategy_interval_seconds"
+CONF_ADAPTIVE_INTERVAL    = "adaptive_interval"
+CONF_ADAPTIVE_SLOW_INTERVAL_SECONDS = "adaptive_slow_interval_seconds"
+CONF_ADAPTIVE_NIGHT_INTERVAL_SECONDS = "adaptive_night_interval_seconds"
+CONF_ADAPTIVE_BAND_KW     = "adaptive_band_kw"
+CONF_ADAPTIVE_WAKE_GRID_W = "adaptive_wake_grid_w"
+CONF_INPUT_FILTERS        = "input_filters"      # optional; role → {type: ewma|mean|median, ...}
+CONF_NOWCAST_WINDOW_MINUTES  = "nowcast_window_minutes"   # 0 = disabled
+CONF_NOWCAST_HORIZON_MINUTES = "nowcast_horizon_minutes"  # 0 = trend logged only
+CONF_PHASE_SPLIT          = "phase_split"        # optional; [L1, L2, L3] shares of the total
+CONF_POWER_FACTOR         = "power_factor"       # synthesised per-phase PF (0, 1]
+CONF_PUBLISH_POLICIES     = "publish_policies"   # optional; entity → {deadband_w, heartbeat_s}
+CONF_DECISION_TRACE_SIZE  = "decision_trace_size"  # evaluations kept for export_decision_trace
+CONF_METRICS_PORT         = "metrics_port"       # 0 = disabled; localhost-only /metrics endpoint
+CONF_TICK_PROFILING       = "tick_profiling"     # per-phase tick timing as sensor attributes
+CONF_TICK_BUDGET_MS       = "tick_budget_ms"     # warn when one evaluation tick takes longer
+CONF_WARM_RESTART_MAX_AGE = "warm_restart_max_age_seconds"  # 0 = cold start always
+CONF_MODBUS_SERVER_MODE   = "modbus_server_mode"  # loop | thread | process
 
 # ── Defaults ──────────────────────────────────────────────────────────────────
 DEFAULTS: dict = {
@@ -71,6 +92,35 @@ DEFAULTS: dict = {
     "max_inverter_output_kw": 10.0,
     "solar_remaining_threshold_kwh": 2.0,
     "sunset_cutoff_minutes": 0,         # 0 = disabled; e.g. 60 = stop charging 60 min before sunset
+    "forecast_ttl_seconds": 600,        # forecast cache lifetime; refreshed in background when stale
+    "forecast_timeout_seconds": 10,     # max wait for weather.get_forecasts in the background refresh
+    "fast_reaction_ms": 0,              # 0 = disabled; e.g. 500 = re-evaluate ≤500 ms after a power change
+    "strategy_interval_seconds": 60,    # SOC floor / forecast adjustment re-run interval
+    "adaptive_interval": False,         # True = adaptive evaluation rate + night idle
+    "adaptive_slow_interval_seconds": 60,    # far from threshold
+    "adaptive_night_interval_seconds": 600,  # sunset → sunrise while INACTIVE
+    "adaptive_band_kw": 1.0,            # |surplus - threshold| ≤ band → evaluate every tick
+    "adaptive_wake_grid_w": 300,        # grid import ≥ this wakes the engine immediately
+    "nowcast_window_minutes": 10,       # PV trend fitted over this many minutes (0 = off)
+    "nowcast_horizon_minutes": 0,       # >0 = surplus uses PV expected this far ahead if lower
+    "phase_split": [1.0, 1.0, 1.0],     # L1/L2/L3 shares of the reported total (normalised)
+    "power_factor": 1.0,                # PF of the synthesised phase registers
+    "decision_trace_size": 1440,        # last evaluations kept in memory (6 h at 15 s)
+    "metrics_port": 0,                  # e.g. 9630 = serve http://127.0.0.1:9630/metrics
+    "tick_profiling": False,            # True = tick_profile attributes on the main sensor
+    "tick_budget_ms": 50,               # over-budget ticks are logged (profiling or metrics on)
+    "warm_restart_max_age_seconds": 300,  # resume engine state saved at most this long ago
+    "modbus_server_mode": "loop",       # thread / process = serve the wallbox off the HA loop
+    # input_filters: per-role smoothing of power inputs before they enter the cache
+    # e.g. input_filters: { pv_production: { type: median, window: 5 } }
+    "input_filters": {},
+    # publish_policies: when output entities write HA state (recorder row + event);
+    # deadband_w 0 = every change, heartbeat_s = longest silence (0 = no heartbeat)
+    "publish_policies": {
+        "power":            {"deadband_w": 0.0,  "heartbeat_s": 300},
+        "raw_surplus":      {"deadband_w": 50.0, "heartbeat_s": 300},
+        "reported_surplus": {"deadband_w": 0.0,  "heartbeat_s": 300},
+    },
     # sensor_ranges: plausible value bounds for cache validation (Story 4.4)
     # Override in YAML with sensor_ranges: { soc: [0, 100], power_w: [-30000, 30000] }
     "sensor_ranges": {
@@ -132,6 +182,51 @@ SENSOR_RANGES_SCHEMA = vol.Schema(
     }
 )
 
+INPUT_FILTER_SCHEMA = vol.Any(
+    vol.Schema({
+        vol.Required("type"): "ewma",
+        vol.Optional("alpha"): vol.All(
+            vol.Coerce(float), vol.Range(min=0, max=1, min_included=False)
+        ),
+    }),
+    vol.Schema({
+        vol.Required("type"): vol.In(["mean", "median"]),
+        vol.Optional("window"): vol.All(int, vol.Range(min=1, max=1000)),
+    }),
+)
+INPUT_FILTERS_SCHEMA = vol.Schema(
+    {
+        vol.Optional("power_to_grid"):   INPUT_FILTER_SCHEMA,
+        vol.Optional("pv_production"):   INPUT_FILTER_SCHEMA,
+        vol.Optional("power_to_user"):   INPUT_FILTER_SCHEMA,
+        vol.Optional("power_from_grid"): INPUT_FILTER_SCHEMA,
+    }
+)
+
+PUBLISH_POLICY_SCHEMA = vol.Schema({
+    vol.Optional("deadband_w"):  vol.All(vol.Coerce(float), vol.Range(min=0)),
+    vol.Optional("heartbeat_s"): vol.All(int, vol.Range(min=0, max=86400)),
+})
+PUBLISH_POLICIES_SCHEMA = vol.Schema(
+    {
+        vol.Optional("power"):            PUBLISH_POLICY_SCHEMA,
+        vol.Optional("raw_surplus"):      PUBLISH_POLICY_SCHEMA,
+        vol.Optional("reported_surplus"): PUBLISH_POLICY_SCHEMA,
+    }
+)
+
+def _validate_phase_split(shares: list) -> list:
+    """Reject an all-zero split — the total has to go somewhere."""
+    if sum(shares) <= 0:
+        raise vol.Invalid(f"phase_split needs at least one positive share, got {shares}")
+    return shares
+
+PHASE_SPLIT_SCHEMA = vol.All(
+    [vol.All(vol.Coerce(float), vol.Range(min=0))],
+    vol.Length(min=3, max=3),
+    _validate_phase_split,
+)
+
 COMPONENT_SCHEMA = vol.Schema(
     {
         vol.Required(CONF_ENTITIES):              ENTITIES_SCHEMA,
@@ -150,6 +245,29 @@ COMPONENT_SCHEMA = vol.Schema(
         vol.Optional(CONF_SUNSET_CUTOFF_MINUTES):  vol.All(int, vol.Range(min=0, max=240)),
         vol.Optional(CONF_SENSOR_RANGES):          SENSOR_RANGES_SCHEMA,
         vol.Optional(CONF_REGISTER_MAPPINGS):        {cv.entity_id: str},
+        vol.Optional(CONF_FORECAST_TTL_SECONDS):     vol.All(int, vol.Range(min=1)),
+        vol.Optional(CONF_FORECAST_TIMEOUT_SECONDS): vol.All(vol.Coerce(float), vol.Range(min=0.1)),
+        vol.Optional(CONF_FAST_REACTION_MS):         vol.All(int, vol.Range(min=0, max=10000)),
+        vol.Optional(CONF_STRATEGY_INTERVAL_SECONDS): vol.All(int, vol.Range(min=1, max=3600)),
+        vol.Optional(CONF_ADAPTIVE_INTERVAL):        bool,
+        vol.Optional(CONF_ADAPTIVE_SLOW_INTERVAL_SECONDS): vol.All(int, vol.Range(min=1, max=3600)),
+        vol.Optional(CONF_ADAPTIVE_NIGHT_INTERVAL_SECONDS): vol.All(int, vol.Range(min=1, max=7200)),
+        vol.Optional(CONF_ADAPTIVE_BAND_KW):         vol.All(vol.Coerce(float), vol.Range(min=0)),
+        vol.Optional(CONF_ADAPTIVE_WAKE_GRID_W):     vol.All(vol.Coerce(float), vol.Range(min=0)),
+        vol.Optional(CONF_INPUT_FILTERS):            INPUT_FILTERS_SCHEMA,
+        vol.Optional(CONF_NOWCAST_WINDOW_MINUTES):   vol.All(int, vol.Range(min=0, max=60)),
+        vol.Optional(CONF_NOWCAST_HORIZON_MINUTES):  vol.All(int, vol.Range(min=0, max=30)),
+        vol.Optional(CONF_PHASE_SPLIT):              PHASE_SPLIT_SCHEMA,
+        vol.Optional(CONF_PUBLISH_POLICIES):         PUBLISH_POLICIES_SCHEMA,
+        vol.Optional(CONF_DECISION_TRACE_SIZE):      vol.All(int, vol.Range(min=1, max=100000)),
+        vol.Optional(CONF_METRICS_PORT):             vol.All(int, vol.Range(min=0, max=65535)),
+        vol.Optional(CONF_TICK_PROFILING):           bool,
+        vol.Optional(CONF_TICK_BUDGET_MS):           vol.All(vol.Coerce(float), vol.Range(min=1)),
+        vol.Optional(CONF_WARM_RESTART_MAX_AGE):     vol.All(int, vol.Range(min=0, max=86400)),
+        vol.Optional(CONF_MODBUS_SERVER_MODE):       vol.In(["loop", "thread", "process"]),
+        vol.Optional(CONF_POWER_FACTOR):             vol.All(
+            vol.Coerce(float), vol.Range(min=0, max=1, min_included=False)
+        ),
     },
     extra=vol.ALLOW_EXTRA,
 )
@@ -172,6 +290,13 @@ async def async_setup(hass, config):
         "hold_time_minutes", "soc_hard_floor", "stale_threshold_seconds",
         "max_discharge_kw", "battery_capacity_kwh", "max_inverter_output_kw",
         "solar_remaining_threshold_kwh", "sunset_cutoff_minutes",
+        "forecast_ttl_seconds", "forecast_timeout_seconds", "fast_reaction_ms",
+        "strategy_interval_seconds", "adaptive_interval",
+        "adaptive_slow_interval_seconds", "adaptive_night_interval_seconds",
+        "adaptive_band_kw", "adaptive_wake_grid_w",
+        "nowcast_window_minutes", "nowcast_horizon_minutes", "power_factor",
+        "decision_trace_size", "metrics_port", "tick_profiling", "tick_budget_ms",
+        "warm_restart_max_age_seconds", "modbus_server_mode",
     }
     cfg: dict = {}
     for key in _SCALAR_KEYS:
@@ -186,6 +311,9 @@ async def async_setup(hass, config):
     # -- time_strategy: user list overrides default entirely --
     cfg[CONF_TIME_STRATEGY] = raw_cfg.get(CONF_TIME_STRATEGY, DEFAULTS["time_strategy"])
 
+    # -- phase_split: three shares, normalised by the meter model --
+    cfg[CONF_PHASE_SPLIT] = list(raw_cfg.get(CONF_PHASE_SPLIT, DEFAULTS["phase_split"]))
+
     # -- sensor_ranges: optional; validate sub-keys present; fall back per missing key --
     raw_ranges = raw_cfg.get(CONF_SENSOR_RANGES, {})
     default_ranges = DEFAULTS["sensor_ranges"]
@@ -205,6 +333,16 @@ async def async_setup(hass, config):
             sensor_ranges[sub_key] = default_ranges[sub_key]
     cfg[CONF_SENSOR_RANGES] = sensor_ranges
 
+    # -- input_filters: per-role dict, passed through as given --
+    cfg[CONF_INPUT_FILTERS] = raw_cfg.get(CONF_INPUT_FILTERS, DEFAULTS["input_filters"])
+
+    # -- publish_policies: per-entity merge, user keys override defaults --
+    raw_policies = raw_cfg.get(CONF_PUBLISH_POLICIES, {})
+    cfg[CONF_PUBLISH_POLICIES] = {
+        name: {**default, **raw_policies.get(name, {})}
+        for name, default in DEFAULTS["publish_policies"].items()
+    }
+
     # -- Entities: required / optional validation --
     entities_cfg: dict = raw_cfg.get(CONF_ENTITIES, {})
 
@@ -0,0 +1,125 @@
+"""
+Decision trace for sdm630_simulator.
+
+Keeps the last evaluations as packed binary records so they can be exported
+after an incident (``sdm630_simulator.export_decision_trace``) without
+DEBUG logging.  Each record is 45 bytes; decoding and the CSV/JSON export
+run only on demand.  HA-free: the sensor appends one record per written
+result.
+"""
+from __future__ import annotations
+
+import csv
+import io
+import json
+import re
+import struct
+from datetime import datetime, timezone
+
+if __package__:
+    from .surplus_engine import BATCH_STATES, CACHE_KEYS, STATE_CODE_FAILSAFE, EvaluationResult
+else:
+    from surplus_engine import (  # type: ignore[no-redef]
+        BATCH_STATES, CACHE_KEYS, STATE_CODE_FAILSAFE, EvaluationResult,
+    )
+
+# Decision trace record: timestamp, inputs (CACHE_KEYS order), SOC floor,
+# real surplus, battery buffer, reported kW, state / reason codes, forecast flag
+_TRACE_RECORD = struct.Struct("<d5fh3fBBB")
+_TRACE_STATE_CODE = {state: code for code, state in enumerate(BATCH_STATES)}
+# Per-tick numbers in reasons ("stale for 61s", "near_sunset(42min)") are
+# folded so the reason table stays small; entity ids keep their digits.
+_TRACE_NUMBER = re.compile(r"(?<![\w.])-?\d+(?:\.\d+)?")
+_TRACE_MAX_REASONS = 255
+# Raw reason → code cache, so each distinct string is folded once; cleared
+# when full (stale-for-Ns reasons are unbounded over a long outage).
+_TRACE_MAX_RAW_REASONS = 1024
+TRACE_FIELDS = (
+    "timestamp", *CACHE_KEYS, "soc_floor", "real_surplus_kw", "buffer_used_kw",
+    "reported_kw", "charging_state", "reason", "forecast_available",
+)
+
+
+class DecisionTrace:
+    """Fixed-capacity ring of packed evaluation records (one per tick).
+
+    ``append`` packs into a preallocated ``bytearray`` — no per-tick
+    allocation or string formatting; reasons are stored as codes into an
+    interned table (like ``replay.ReplayResult``).  Records are decoded only on
+    export, so the last hours are available after an incident without
+    DEBUG logging.
+    """
+
+    def __init__(self, capacity: int) -> None:
+        if capacity < 1:
+            raise ValueError(f"capacity must be >= 1, got {capacity}")
+        self.capacity = capacity
+        self._buf = bytearray(_TRACE_RECORD.size * capacity)
+        self._next = 0          # ring write position
+        self._count = 0
+        self._reasons: list[str] = []
+        self._reason_codes: dict[str, int] = {}   # folded text → code
+        self._raw_codes: dict[str, int] = {}      # reason as produced → code
+
+    def __len__(self) -> int:
+        return self._count
+
+    def append(self, timestamp: float, inputs, result: EvaluationResult) -> None:
+        """Record one evaluation; ``inputs`` are the cached values in ``CACHE_KEYS`` order."""
+        _TRACE_RECORD.pack_into(
+            self._buf, self._next * _TRACE_RECORD.size,
+            timestamp, inputs[0], inputs[1], inputs[2], inputs[3], inputs[4],
+            result.soc_floor_active, result.real_surplus_kw, result.buffer_used_kw,
+            result.reported_kw, _TRACE_STATE_CODE.get(result.charging_state, STATE_CODE_FAILSAFE),
+            self._reason_code(result.reason), result.forecast_available,
+        )
+        self._next = (self._next + 1) % self.capacity
+        if self._count < self.capacity:
+            self._count += 1
+
+    def _reason_code(self, reason: str) -> int:
+        code = self._raw_codes.get(reason)
+        if code is not None:
+            return code
+        text = _TRACE_NUMBER.sub("#", reason)
+        code = self._reason_codes.get(text)
+        if code is None:
+            if len(self._reasons) >= _TRACE_MAX_REASONS:
+                code = _TRACE_MAX_REASONS       # table full: "<other>"
+            else:
+                code = self._reason_codes[text] = len(self._reasons)
+                self._reasons.append(text)
+        if len(self._raw_codes) >= _TRACE_MAX_RAW_REASONS:
+            self._raw_codes.clear()
+        self._raw_codes[reason] = code
+        return code
+
+    def records(self, last: int | None = None) -> list[dict]:
+        """Decode the newest ``last`` records (all if None), oldest first."""
+        n = self._count if last is None else max(0, min(last, self._count))
+        size = _TRACE_RECORD.size
+        rows = []
+        for i in range(self._count - n, self._count):
+            pos = (self._next - self._count + i) % self.capacity
+            ts, *inputs, floor, real, buffer, reported, state, reason, forecast = (
+                _TRACE_RECORD.unpack_from(self._buf, pos * size)
+            )
+            rows.append(dict(zip(TRACE_FIELDS, (
+                datetime.fromtimestamp(ts, timezone.utc).isoformat(),
+                *(round(v, 3) for v in inputs),
+                floor, round(real, 3), round(buffer, 3), round(reported, 3),
+                BATCH_STATES[state],
+                self._reasons[reason] if reason < len(self._reasons) else "<other>",
+                bool(forecast),
+            ))))
+        return rows
+
+    def to_csv(self, last: int | None = None) -> str:
+        out = io.StringIO()
+        writer = csv.DictWriter(out, fieldnames=TRACE_FIELDS)
+        writer.writeheader()
+        writer.writerows(self.records(last))
+        return out.getvalue()
+
+    def to_json(self, last: int | None = None) -> str:
+        return json.dumps(self.records(last))
@@ -0,0 +1,441 @@
+"""
+Meter model for sdm630_simulator.
+
+Derives the SDM630 registers that follow from the reported power — phase
+powers, currents, VA/VAr/PF and the energy counters — so the simulated
+meter is self-consistent for clients that read more than ``TOTAL_POWER``.
+HA-free and independent of pymodbus: the sensor writes the returned
+address → value mapping in one batch.
+"""
+from __future__ import annotations
+
+import cmath
+import math
+from array import array
+
+if __package__:
+    from . import sdm630_input_registers as ir
+    from .sdm630_holding_registers import DEMAND_PERIOD, SDM630HoldingRegisters
+else:
+    import sdm630_input_registers as ir  # type: ignore[no-redef]
+    from sdm630_holding_registers import DEMAND_PERIOD, SDM630HoldingRegisters  # type: ignore[no-redef]
+
+# Energy counter registers, in accumulator order (kWh / kVArh / kVAh / Ah).
+ENERGY_REGISTERS: tuple[int, ...] = (
+    ir.TOTAL_IMPORT_KWH, ir.TOTAL_EXPORT_KWH, ir.TOTAL_IMPORT_KVARH, ir.TOTAL_EXPORT_KVARH,
+    ir.TOTAL_VAH, ir.TOTAL_AH, ir.TOTAL_KWH, ir.TOTAL_KVARH,
+    ir.PHASE_1_IMPORT_KWH, ir.PHASE_2_IMPORT_KWH, ir.PHASE_3_IMPORT_KWH,
+    ir.PHASE_1_EXPORT_KWH, ir.PHASE_2_EXPORT_KWH, ir.PHASE_3_EXPORT_KWH,
+    ir.PHASE_1_TOTAL_KWH, ir.PHASE_2_TOTAL_KWH, ir.PHASE_3_TOTAL_KWH,
+    ir.PHASE_1_IMPORT_KVARH, ir.PHASE_2_IMPORT_KVARH, ir.PHASE_3_IMPORT_KVARH,
+    ir.PHASE_1_EXPORT_KVARH, ir.PHASE_2_EXPORT_KVARH, ir.PHASE_3_EXPORT_KVARH,
+    ir.PHASE_1_TOTAL_KVARH, ir.PHASE_2_TOTAL_KVARH, ir.PHASE_3_TOTAL_KVARH,
+)
+
+# Live inputs of the phase synthesis (fed through register_mappings).
+PHASE_VOLTAGE_REGISTERS: tuple[int, ...] = (
+    ir.PHASE_1_VOLTAGE, ir.PHASE_2_VOLTAGE, ir.PHASE_3_VOLTAGE,
+)
+
+# Synthesised registers: per-phase rows, then system values.
+_PHASE_ROWS: tuple[tuple[int, int, int], ...] = (
+    (ir.PHASE_1_POWER, ir.PHASE_2_POWER, ir.PHASE_3_POWER),
+    (ir.PHASE_1_VA, ir.PHASE_2_VA, ir.PHASE_3_VA),
+    (ir.PHASE_1_VAR, ir.PHASE_2_VAR, ir.PHASE_3_VAR),
+    (ir.PHASE_1_PF, ir.PHASE_2_PF, ir.PHASE_3_PF),
+    (ir.PHASE_1_ANGLE, ir.PHASE_2_ANGLE, ir.PHASE_3_ANGLE),
+    (ir.PHASE_1_CURRENT, ir.PHASE_2_CURRENT, ir.PHASE_3_CURRENT),
+    (ir.LINE_1_TO_2_VOLTAGE, ir.LINE_2_TO_3_VOLTAGE, ir.LINE_3_TO_1_VOLTAGE),
+)
+_SYSTEM_REGISTERS: tuple[int, ...] = (
+    ir.TOTAL_VA, ir.TOTAL_VAR, ir.TOTAL_PF, ir.TOTAL_ANGLE,
+    ir.AVG_LN_VOLTAGE, ir.AVG_LL_VOLTAGE,
+    ir.AVG_LINE_CURRENT, ir.SUM_LINE_CURRENT, ir.NEUTRAL_CURRENT,
+)
+PHASE_REGISTERS: tuple[int, ...] = (
+    tuple(a for row in _PHASE_ROWS for a in row) + _SYSTEM_REGISTERS
+)
+
+# Demand channels: sliding-window average registers and their peaks.
+DEMAND_REGISTERS: tuple[int, ...] = (
+    ir.TOTAL_POWER_DEMAND, ir.TOTAL_VA_DEMAND,
+    ir.PHASE_1_CURRENT_DEMAND, ir.PHASE_2_CURRENT_DEMAND, ir.PHASE_3_CURRENT_DEMAND,
+    ir.NEUTRAL_CURRENT_DEMAND,
+)
+MAX_DEMAND_REGISTERS: tuple[int, ...] = (
+    ir.MAX_TOTAL_POWER_DEMAND, ir.MAX_TOTAL_VA_DEMAND,
+    ir.MAX_PHASE_1_CURRENT_DEMAND, ir.MAX_PHASE_2_CURRENT_DEMAND, ir.MAX_PHASE_3_CURRENT_DEMAND,
+    ir.MAX_NEUTRAL_CURRENT_DEMAND,
+)
+
+ENERGY_STATE_VERSION: int = 1
+NOMINAL_VOLTAGE_V: float = 230.0
+_S_PER_H: float = 3600.0
+# Unit phasors 0°, −120°, +120° for the neutral current
+_PHASORS: tuple[complex, ...] = tuple(cmath.exp(-2j * math.pi * k / 3) for k in range(3))
+
+
+class EnergyAccumulator:
+    """Integrates per-phase meter power into the SDM630 energy counters.
+
+    Register values hold between writes, so each ``update`` integrates the
+    *previous* sample over the elapsed time (left Riemann sum) — the same
+    energy a client integrating the registers would see.  Counters are kept
+    as doubles; the float32 rounding on the wire is monotonic, so encoded
+    counters never step backwards.  Gaps longer than ``max_gap_s`` (clock
+    jumps, suspended host) are clamped rather than integrated in full.
+
+    Power inputs follow the meter convention: positive = import.
+    """
+
+    def __init__(self, initial: dict[int, float], max_gap_s: float = 300.0) -> None:
+        self._initial = array("d", (float(initial.get(a, 0.0)) for a in ENERGY_REGISTERS))
+        self._counters = array("d", self._initial)
+        self._max_gap_s = max_gap_s
+        self._last_t: float | None = None
+        self._last: tuple | None = None     # (p_kw, q_kvar, s_kva, i_a) per phase
+
+    def values(self) -> dict[int, float]:
+        """Current counters, register address → value."""
+        return dict(zip(ENERGY_REGISTERS, self._counters))
+
+    def update(self, t: float, p_kw, q_kvar, s_kva, i_a) -> None:
+        """Close the interval since the last update and hold the new sample.
+
+        ``t`` is epoch seconds; the other arguments are 3-element per-phase
+        sequences.
+        """
+        if self._last is not None and self._last_t is not None:
+            dt = t - self._last_t
+            if dt > 0:
+                self._integrate(min(dt, self._max_gap_s) / _S_PER_H)
+        self._last_t = t
+        self._last = (tuple(p_kw), tuple(q_kvar), tuple(s_kva), tuple(i_a))
+
+    def _integrate(self, hours: float) -> None:
+        c = self._counters
+        p, q, s, i = self._last
+        p_tot = p[0] + p[1] + p[2]
+        q_tot = q[0] + q[1] + q[2]
+        if p_tot >= 0.0:
+            c[0] += p_tot * hours
+        else:
+            c[1] -= p_tot * hours
+        if q_tot >= 0.0:
+            c[2] += q_tot * hours
+        else:
+            c[3] -= q_tot * hours
+        c[4] += (s[0] + s[1] + s[2]) * hours
+        c[5] += (i[0] + i[1] + i[2]) * hours
+        c[6] += abs(p_tot) * hours
+        c[7] += abs(q_tot) * hours
+        for k in range(3):
+            pe = p[k] * hours
+            qe = q[k] * hours
+            if pe >= 0.0:
+                c[8 + k] += pe
+            else:
+                c[11 + k] -= pe
+            c[14 + k] += abs(pe)
+            if qe >= 0.0:
+                c[17 + k] += qe
+            else:
+                c[20 + k] -= qe
+            c[23 + k] += abs(qe)
+
+    # -- Persistence ---------------------------------------------------------
+
+    def to_dict(self) -> dict:
+        """JSON-serialisable state (register address keys as strings)."""
+        return {
+            "version": ENERGY_STATE_VERSION,
+            "counters": {str(a): v for a, v in zip(ENERGY_REGISTERS, self._counters)},
+        }
+
+    def restore(self, data: dict) -> None:
+        """Load counters saved by ``to_dict``.
+
+        Each counter resumes from the larger of the saved and initial value,
+        so a stale or partial file can never move a counter backwards.
+        """
+        if data.get("version") != ENERGY_STATE_VERSION:
+            return
+        saved = data.get("counters", {})
+        for idx, address in enumerate(ENERGY_REGISTERS):
+            try:
+                value = float(saved[str(address)])
+            except (KeyError, TypeError, ValueError):
+                continue
+            self._counters[idx] = max(self._initial[idx], value)
+
+
+class PhaseSynthesizer:
+    """Splits the reported total into a consistent three-phase register set.
+
+    Per phase k with share ``split[k]``, live voltage ``V[k]`` and power
+    factor ``pf``::
+
+        P[k] = total · split[k]        S[k] = |P[k]| / pf
+        Q[k] = sign(P[k]) · √(S² − P²) I[k] = S[k] / V[k]
+
+    so ``P = V · I · PF`` holds per phase with PF = P/S (signed like P).
+    Power registers use the scale and sign of ``TOTAL_POWER`` — the phases
+    sum to it exactly — while currents are real amps from the kW value.
+
+    For a given sign of the total every register is affine in ``|total|``,
+    so ``_derive`` runs only when a voltage changes and tabulates
+    slope/offset per sign; each tick is then one multiply-add per register.
+    Plain floats, like ``PvNowcaster``: on three-element vectors NumPy calls
+    would cost more than the arithmetic they replace.
+    """
+
+    def __init__(
+        self,
+        phase_split=(1.0, 1.0, 1.0),
+        power_factor: float = 1.0,
+        voltages=(NOMINAL_VOLTAGE_V,) * 3,
+    ) -> None:
+        split = [float(x) for x in phase_split]
+        if len(split) != 3 or any(x < 0 for x in split) or sum(split) <= 0:
+            raise ValueError(f"phase_split needs three non-negative shares, got {phase_split!r}")
+        if not 0.0 < power_factor <= 1.0:
+            raise ValueError(f"power_factor must be in (0, 1], got {power_factor!r}")
+        total = sum(split)
+        self._split = [x / total for x in split]
+        self._pf = float(power_factor)
+        self._q_per_p = math.sqrt(1.0 - self._pf * self._pf) / self._pf
+        self._angle = math.degrees(math.acos(self._pf))
+        self._v = [float(v) for v in voltages]
+        self._addresses: list[int] = list(PHASE_REGISTERS)
+        self._slope: list[list[float]] = [[], [], []]    # by sign: 0, +1, −1
+        self._offset: list[list[float]] = [[], [], []]
+        self._tabulate()
+
+    def set_input(self, address: int, value: float) -> bool:
+        """Update a live phase voltage; ``False`` if ``address`` is not one."""
+        try:
+            k = PHASE_VOLTAGE_REGISTERS.index(address)
+        except ValueError:
+            return False
+        if self._v[k] != value:
+            self._v[k] = float(value)
+            self._tabulate()
+        return True
+
+    def synthesize(self, total_kw: float):
+        """Return ``(registers, (p_kw, q_kvar, s_kva, i_a))`` for ``total_kw``.
+
+        ``registers`` maps address → value; the per-phase tuple keeps the
+        register sign convention (the caller converts to import-positive).
+        """
+        sign = (total_kw > 0.0) - (total_kw < 0.0)
+        magnitude = abs(total_kw)
+        values = [m * magnitude + c for m, c in zip(self._slope[sign], self._offset[sign])]
+        return dict(zip(self._addresses, values)), (
+            values[0:3], values[6:9], values[3:6], values[15:18],
+        )
+
+    def _tabulate(self) -> None:
+        for sign in (1, -1):
+            one, two = self._derive(float(sign)), self._derive(2.0 * sign)
+            slope = [b - a for a, b in zip(one, two)]
+            self._slope[sign] = slope
+            self._offset[sign] = [a - m for a, m in zip(one, slope)]
+        self._offset[0] = self._derive(0.0)
+        self._slope[0] = [0.0] * len(self._offset[0])
+
+    def _derive(self, total_kw: float) -> list[float]:
+        """All synthesised registers for ``total_kw``, in ``PHASE_REGISTERS`` order."""
+        v = [x if x > 0.0 else NOMINAL_VOLTAGE_V for x in self._v]
+        p = [total_kw * x for x in self._split]
+        s = [abs(x) / self._pf for x in p]
+        q = [x * self._q_per_p for x in p]
+        i = [sk * 1000.0 / vk for sk, vk in zip(s, v)]
+        pf = [pk / sk if sk > 0.0 else 1.0 for pk, sk in zip(p, s)]
+        v_ll = [math.sqrt(a * a + b * b + a * b) for a, b in zip(v, v[1:] + v[:1])]
+        s_tot = sum(s)
+        pf_tot = total_kw / s_tot if s_tot > 0.0 else 1.0
+        system = [
+            s_tot, sum(q), pf_tot, self._angle,
+            sum(v) / 3, sum(v_ll) / 3,
+            sum(i) / 3, sum(i), abs(sum(ik * r for ik, r in zip(i, _PHASORS))),
+        ]
+        return p + s + q + pf + [self._angle] * 3 + i + v_ll + system
+
+
+class DemandWindow:
+    """Sliding-window average (demand) and its peak for several channels.
+
+    Time is cut into fixed ``slot_s`` slots on the epoch grid; each slot
+    holds the integral of the held register values over that slot, so
+    irregular ticks (fast reaction, adaptive rate) weigh by duration.  A
+    ring of ``ceil(period_s / slot_s)`` slots plus a running sum gives the
+    demand in O(1) per sample; the sum is re-added from the slots once per
+    ring wrap so float drift cannot build up.  Until a full period has
+    passed the missing slots count as zero, like a freshly reset meter, so
+    start-up never inflates the peak.  ``set_period`` re-sizes the ring once,
+    keeping the most recent slots.  Slots, ``demand`` and ``peak`` are plain
+    lists updated in place.
+    """
+
+    def __init__(self, channels: int, period_s: float, slot_s: float) -> None:
+        if slot_s <= 0:
+            raise ValueError(f"slot_s must be positive, got {slot_s!r}")
+        self._channels = channels
+        self._slot_s = float(slot_s)
+        self._slots: list[list[float]] = [[0.0] * channels]
+        self._sum = [0.0] * channels
+        self._pos = 0                       # ring index of the current slot
+        self._slot: int | None = None       # epoch slot number at _pos
+        self._last_t: float | None = None
+        self._last = [0.0] * channels
+        self.demand = [0.0] * channels
+        self.peak = [-math.inf] * channels
+        self.period_s = 0.0
+        self.set_period(period_s)
+
+    def set_period(self, period_s: float) -> bool:
+        """Re-size the window; ``False`` (unchanged) for a non-positive period."""
+        if not period_s > 0 or period_s == self.period_s:
+            return False
+        n = max(1, math.ceil(period_s / self._slot_s))
+        old = self._slots
+        keep = min(n, len(old))
+        # Oldest → newest, then the newest ``keep`` slots at the end of the new ring
+        ordered = old[self._pos + 1:] + old[:self._pos + 1]
+        self._slots = [[0.0] * self._channels for _ in range(n - keep)] + ordered[len(old) - keep:]
+        self._pos = n - 1
+        self._sum = self._column_sums()
+        self.period_s = float(period_s)
+        self._refresh()
+        return True
+
+    def update(self, t: float, values) -> None:
+        """Close the interval since the last update and hold ``values``."""
+        if self._last_t is not None and t > self._last_t:
+            self._integrate(max(self._last_t, t - self.period_s), t)
+        elif self._slot is None:
+            self._slot = int(t // self._slot_s)
+        self._last_t = t
+        self._last[:] = values
+        self._refresh()
+
+    def _column_sums(self) -> list[float]:
+        return [math.fsum(column) for column in zip(*self._slots)]
+
+    def _refresh(self) -> None:
+        window = len(self._slots) * self._slot_s
+        demand, peak = self.demand, self.peak
+        for c, total in enumerate(self._sum):
+            value = total / window
+            demand[c] = value
+            if value > peak[c]:
+                peak[c] = value
+
+    def _integrate(self, start: float, end: float) -> None:
+        w = self._slot_s
+        while start < end:
+            slot = int(start // w)
+            if slot != self._slot:
+                self._advance(slot)
+            stop = min(end, (slot + 1) * w)
+            row, total = self._slots[self._pos], self._sum
+            for c, value in enumerate(self._last):
+                energy = value * (stop - start)
+                row[c] += energy
+                total[c] += energy
+            start = stop
+
+    def _advance(self, slot: int) -> None:
+        n = len(self._slots)
+        steps = slot - self._slot if self._slot is not None else n
+        if steps >= n or steps < 0:
+            self._slots = [[0.0] * self._channels for _ in range(n)]
+            self._sum = [0.0] * self._channels
+            self._pos = 0
+        else:
+            for _ in range(steps):
+                self._pos += 1
+                if self._pos == n:
+                    self._pos = 0
+                    self._sum = self._column_sums()
+                row, total = self._slots[self._pos], self._sum
+                for c in range(self._channels):
+                    total[c] -= row[c]
+                    row[c] = 0.0
+        self._slot = slot
+
+
+class MeterModel:
+    """Per-tick derivation of the meter registers from the reported power.
+
+    The reported value is the surplus the wallbox reads from ``TOTAL_POWER``;
+    its ``negative_to_grid`` flag decides whether it counts as export or
+    import for the energy counters.
+    """
+
+    def __init__(self, config: dict) -> None:
+        registers = ir.SDM630InputRegisters()
+        total = registers.get_by_address(ir.TOTAL_POWER)
+        # Reported surplus flows to the grid: import-positive meter power is its negative.
+        self._meter_sign: float = -1.0 if total.negative_to_grid else 1.0
+        self.phases = PhaseSynthesizer(
+            config.get("phase_split", (1.0, 1.0, 1.0)),
+            config.get("power_factor", 1.0),
+            [registers.get_by_address(a).default_value for a in PHASE_VOLTAGE_REGISTERS],
+        )
+        self.energy = EnergyAccumulator(
+            {a: registers.get_by_address(a).default_value for a in ENERGY_REGISTERS}
+        )
+        period_min = SDM630HoldingRegisters().get_by_address(DEMAND_PERIOD).default_value
+        self.demand = DemandWindow(
+            len(DEMAND_REGISTERS), period_min * 60.0, config.get("evaluation_interval", 15),
+        )
+
+    def set_demand_period(self, minutes: float) -> bool:
+        """Apply the Demand Period holding register; cheap no-op when unchanged."""
+        return self.demand.set_period(minutes * 60.0)
+
+    def set_input(self, address: int, value: float) -> bool:
+        """Forward a live register value (phase voltage) to the synthesis."""
+        return self.phases.set_input(address, value)
+
+    def update(self, t: float, reported_kw: float) -> dict[int, float]:
+        """Advance to epoch seconds ``t``; return derived registers (address → value)."""
+        registers, (p, q, s, i) = self.phases.synthesize(reported_kw)
+        sign = self._meter_sign
+        self.energy.update(t, [sign * x for x in p], [sign * x for x in q], s, i)
+        self.demand.update(t, (reported_kw, registers[ir.TOTAL_VA], *i, registers[ir.NEUTRAL_CURRENT]))
+        registers.update(self.energy.values())
+        registers.update(zip(DEMAND_REGISTERS, self.demand.demand))
+        registers.update(zip(MAX_DEMAND_REGISTERS, self.demand.peak))
+        return registers
+
+    # -- Persistence ---------------------------------------------------------
+
+    def to_dict(self) -> dict:
+        """Energy counters plus the demand peaks, JSON-serialisable."""
+        data = self.energy.to_dict()
+        data["peak"] = {
+            str(a): v for a, v in zip(MAX_DEMAND_REGISTERS, self.demand.peak) if v > -math.inf
+        }
+        return data
+
+    def restore(self, data: dict) -> None:
+        """Load state saved by ``to_dict``.
+
+        Each peak resumes from the larger of the saved and current value;
+        files without peaks restore the energy counters only.
+        """
+        self.energy.restore(data)
+        if data.get("version") != ENERGY_STATE_VERSION:
+            return
+        saved = data.get("peak") or {}
+        peak = self.demand.peak
+        for idx, address in enumerate(MAX_DEMAND_REGISTERS):
+            try:
+                value = float(saved[str(address)])
+            except (KeyError, TypeError, ValueError):
+                continue
+            if math.isfinite(value) and value > peak[idx]:
+                peak[idx] = value
@@ -0,0 +1,416 @@
+"""
+Metrics registry and localhost exporter for sdm630_simulator.
+
+Counters and histograms are plain Python containers without locks.  The
+rule is one writer per series: the event-loop thread, or for the Modbus read
+counter and response-latency histogram the thread running the pymodbus
+server (the Modbus I/O thread with ``modbus_server_mode: thread``).  Updates
+are plain dict/array writes; a scrape runs on the event loop and reads a
+copy of each metric's series, so a concurrent write cannot break the
+iteration.  Values derived from other components —
+forecast hit rate, skipped state writes — are read at scrape time through
+callback gauges instead of being mirrored on every cycle.
+
+The exporter is a minimal ``asyncio.start_server`` handler speaking just
+enough HTTP/1.0 to answer ``GET /metrics`` in the Prometheus text format.
+Stdlib only, no HA imports.
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import math
+import time
+from array import array
+from bisect import bisect_left
+from typing import Callable
+
+_LOGGER = logging.getLogger(__name__)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Bucket upper bounds in seconds (+Inf is implicit).
+PHASE_BUCKETS_S: tuple[float, ...] = (
+    0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1,
+)
+RESPONSE_BUCKETS_S: tuple[float, ...] = (
+    0.001, 0.0025, 0.005, 0.01, 0.02, 0.05, 0.1, 0.25, 0.5, 1.0,
+)
+
+# Evaluation tick phases in execution order (SDM630SimSensor._evaluation_tick);
+# forecast / calculation / hysteresis are reported by SurplusEngine.on_phase.
+TICK_PHASES: tuple[str, ...] = (
+    "staleness", "validity", "range", "sun", "snapshot",
+    "forecast", "calculation", "hysteresis", "writes",
+)
+
+_REQUEST_TIMEOUT_S: float = 5.0
+_MAX_REQUEST_BYTES: int = 8192
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if value == -math.inf:
+        return "-Inf"
+    if isinstance(value, int) or float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _format_labels(names: tuple[str, ...], values: tuple) -> str:
+    if not names:
+        return ""
+    pairs = ",".join(
+        '{}="{}"'.format(n, str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"))
+        for n, v in zip(names, values)
+    )
+    return "{" + pairs + "}"
+
+
+class Counter:
+    """Monotonic counter, optionally keyed by a tuple of label values."""
+
+    kind = "counter"
+    __slots__ = ("name", "help", "labels", "values")
+
+    def __init__(self, name: str, help: str, labels: tuple[str, ...] = ()) -> None:
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self.values: dict[tuple, float] = {}
+
+    def inc(self, key: tuple = (), n: float = 1) -> None:
+        """Add ``n`` to the series ``key`` (label values in ``labels`` order)."""
+        values = self.values
+        values[key] = values.get(key, 0) + n
+
+    def get(self, key: tuple = ()) -> float:
+        return self.values.get(key, 0)
+
+    def reset(self) -> None:
+        self.values.clear()
+
+    def samples(self):
+        for key, value in list(self.values.items()):      # a copy: see module docstring
+            yield self.name, _format_labels(self.labels, key), value
+
+
+class Histogram:
+    """Fixed-bucket histogram; ``observe`` is one bisect and three writes."""
+
+    kind = "histogram"
+    __slots__ = ("name", "help", "labels", "buckets", "series")
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        buckets: tuple[float, ...],
+        labels: tuple[str, ...] = (),
+    ) -> None:
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self.buckets = tuple(sorted(buckets))
+        # key → [per-bucket counts (last = +Inf overflow), sum, count]
+        self.series: dict[tuple, list] = {}
+
+    def observe(self, value: float, key: tuple = ()) -> None:
+        s = self.series.get(key)
+        if s is None:
+            s = self.series[key] = [array("Q", bytes(8 * (len(self.buckets) + 1))), 0.0, 0]
+        s[0][bisect_left(self.buckets, value)] += 1
+        s[1] += value
+        s[2] += 1
+
+    def count(self, key: tuple = ()) -> int:
+        s = self.series.get(key)
+        return 0 if s is None else s[2]
+
+    def total(self, key: tuple = ()) -> float:
+        s = self.series.get(key)
+        return 0.0 if s is None else s[1]
+
+    def quantile(self, q: float, key: tuple = ()) -> float | None:
+        """Upper bucket bound containing the ``q`` quantile (None when empty)."""
+        s = self.series.get(key)
+        if s is None or not s[2]:
+            return None
+        rank = q * s[2]
+        seen = 0
+        for bound, n in zip((*self.buckets, math.inf), s[0]):
+            seen += n
+            if seen >= rank:
+                return bound
+        return math.inf
+
+    def reset(self) -> None:
+        self.series.clear()
+
+    def samples(self):
+        le_names = (*self.labels, "le")
+        for key, s in list(self.series.items()):          # a copy: see module docstring
+            counts, total, count = s[0][:], s[1], s[2]
+            cumulative = 0
+            for bound, n in zip((*self.buckets, math.inf), counts):
+                cumulative += n
+                yield (f"{self.name}_bucket",
+                       _format_labels(le_names, (*key, _format_value(bound))), cumulative)
+            yield f"{self.name}_sum", _format_labels(self.labels, key), total
+            yield f"{self.name}_count", _format_labels(self.labels, key), count
+
+
+class CallbackGauge:
+    """Gauge read at scrape time from ``fn``.
+
+    ``fn`` returns a number, ``None`` (series omitted) or a mapping of
+    label-value tuples to numbers.
+    """
+
+    kind = "gauge"
+    __slots__ = ("name", "help", "labels", "fn")
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        fn: Callable[[], object],
+        labels: tuple[str, ...] = (),
+    ) -> None:
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self.fn = fn
+
+    def samples(self):
+        value = self.fn()
+        if value is None:
+            return
+        if not isinstance(value, dict):
+            value = {(): value}
+        for key, v in value.items():
+            if v is not None:
+                yield self.name, _format_labels(self.labels, key), v
+
+
+class CallbackCounter(CallbackGauge):
+    """Counter owned by another component, read at scrape time."""
+
+    kind = "counter"
+
+
+class MetricsRegistry:
+    """Named metrics rendered together; registering a name again replaces it."""
+
+    def __init__(self) -> None:
+        self._metrics: dict[str, object] = {}
+
+    def register(self, metric):
+        self._metrics[metric.name] = metric
+        return metric
+
+    def unregister(self, name: str) -> None:
+        self._metrics.pop(name, None)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._metrics
+
+    def render(self) -> str:
+        """Prometheus text exposition (format 0.0.4) of all metrics."""
+        lines: list[str] = []
+        for metric in self._metrics.values():
+            try:
+                samples = list(metric.samples())
+            except Exception:  # noqa: BLE001 – one broken collector must not break the scrape
+                _LOGGER.debug("metric %s collection failed", metric.name, exc_info=True)
+                continue
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(f"{name}{labels} {_format_value(v)}" for name, labels, v in samples)
+        lines.append("")
+        return "\n".join(lines)
+
+
+# Process-wide registry with the hot-path metrics the simulator updates.
+REGISTRY = MetricsRegistry()
+
+MODBUS_READS = REGISTRY.register(Counter(
+    "sdm630_modbus_reads_total",
+    "Modbus register reads served, by table and address window.",
+    ("table", "address", "count"),
+))
+MODBUS_RESPONSE_SECONDS = REGISTRY.register(Histogram(
+    "sdm630_modbus_response_seconds",
+    "Time from the first request byte to the response write.",
+    RESPONSE_BUCKETS_S,
+))
+ECHO_BYTES_SUPPRESSED = REGISTRY.register(Counter(
+    "sdm630_echo_bytes_suppressed_total",
+    "RS485 TX echo bytes discarded inside the echo window.",
+))
+EVALUATION_PHASE_SECONDS = REGISTRY.register(Histogram(
+    "sdm630_evaluation_phase_seconds",
+    "Duration of each evaluation tick phase.",
+    PHASE_BUCKETS_S,
+    ("phase",),
+))
+FAILSAFE_ENTRIES = REGISTRY.register(Counter(
+    "sdm630_failsafe_entries_total",
+    "Transitions into FAILSAFE, by reason category.",
+    ("reason",),
+))
+
+
+def observe_phase_ns(phase: str, elapsed_ns: int) -> None:
+    """``SurplusEngine.on_phase`` hook feeding ``EVALUATION_PHASE_SECONDS``."""
+    EVALUATION_PHASE_SECONDS.observe(elapsed_ns / 1e9, (phase,))
+
+
+class TickProfiler:
+    """Per-phase ``perf_counter_ns`` timing of evaluation ticks.
+
+    ``start`` opens a tick, ``mark(phase)`` closes the lap since the previous
+    mark, ``record`` takes a duration measured elsewhere (the engine hook)
+    and ``finish`` closes the tick and compares it with the budget.  Each
+    phase feeds a histogram; ``sink`` (e.g. ``observe_phase_ns``) receives
+    the same ``(phase, ns)`` pairs.
+    """
+
+    __slots__ = (
+        "histogram", "budget_ns", "sink", "laps", "phase_max_ns",
+        "ticks", "over_budget", "last_ns", "max_ns",
+        "_phases", "_index", "_zeros", "_tick_start", "_lap_start",
+    )
+
+    def __init__(
+        self,
+        budget_ms: float,
+        sink: Callable[[str, int], None] | None = None,
+        phases: tuple[str, ...] = TICK_PHASES,
+    ) -> None:
+        n = len(phases)
+        self.histogram = Histogram(
+            "sdm630_tick_phase_seconds", "Evaluation tick phase duration.",
+            PHASE_BUCKETS_S, ("phase",),
+        )
+        self.budget_ns = int(budget_ms * 1_000_000)
+        self.sink = sink
+        self.laps = array("q", bytes(8 * n))          # current tick, per phase
+        self.phase_max_ns = array("q", bytes(8 * n))
+        self.ticks = 0
+        self.over_budget = 0
+        self.last_ns = 0
+        self.max_ns = 0
+        self._phases = phases
+        self._index = {p: i for i, p in enumerate(phases)}
+        self._zeros = array("q", bytes(8 * n))
+        self._tick_start = 0
+        self._lap_start = 0
+
+    def start(self) -> None:
+        self.laps[:] = self._zeros
+        self._tick_start = self._lap_start = time.perf_counter_ns()
+
+    def mark(self, phase: str) -> None:
+        now = time.perf_counter_ns()
+        self.record(phase, now - self._lap_start)
+        self._lap_start = now
+
+    def skip(self) -> None:
+        """Restart the lap without recording (time already reported via ``record``)."""
+        self._lap_start = time.perf_counter_ns()
+
+    def record(self, phase: str, elapsed_ns: int) -> None:
+        i = self._index[phase]
+        self.laps[i] += elapsed_ns
+        if elapsed_ns > self.phase_max_ns[i]:
+            self.phase_max_ns[i] = elapsed_ns
+        self.histogram.observe(elapsed_ns / 1e9, (phase,))
+        if self.sink is not None:
+            self.sink(phase, elapsed_ns)
+
+    def finish(self) -> bool:
+        """Close the tick; True when it took longer than the budget."""
+        total = time.perf_counter_ns() - self._tick_start
+        self.last_ns = total
+        if total > self.max_ns:
+            self.max_ns = total
+        self.ticks += 1
+        if total > self.budget_ns:
+            self.over_budget += 1
+            return True
+        return False
+
+    def breakdown(self) -> str:
+        """Phases of the last tick, e.g. ``staleness=0.01ms validity=0.00ms ...``."""
+        return " ".join(
+            f"{p}={ns / 1e6:.2f}ms" for p, ns in zip(self._phases, self.laps) if ns
+        )
+
+    def summary(self) -> dict:
+        """Per-phase count, mean, p95 bucket bound and max in ms (ran phases only)."""
+        hist = self.histogram
+        out = {}
+        for i, phase in enumerate(self._phases):
+            key = (phase,)
+            count = hist.count(key)
+            if not count:
+                continue
+            out[phase] = {
+                "count": count,
+                "mean_ms": round(hist.total(key) * 1000 / count, 3),
+                "p95_ms": round(hist.quantile(0.95, key) * 1000, 3),
+                "max_ms": round(self.phase_max_ns[i] / 1e6, 3),
+            }
+        return out
+
+
+async def _handle_http(reader: asyncio.StreamReader, writer: asyncio.StreamWriter,
+                       registry: MetricsRegistry) -> None:
+    try:
+        head = await asyncio.wait_for(reader.readuntil(b"\r\n\r\n"), _REQUEST_TIMEOUT_S)
+    except (asyncio.TimeoutError, asyncio.IncompleteReadError, asyncio.LimitOverrunError,
+            ConnectionError):
+        writer.close()
+        return
+    parts = head.split(b"\r\n", 1)[0].split()
+    if len(parts) < 2 or parts[0] not in (b"GET", b"HEAD"):
+        status, body, ctype = "405 Method Not Allowed", b"", "text/plain"
+    elif parts[1].split(b"?", 1)[0] != b"/metrics":
+        status, body, ctype = "404 Not Found", b"", "text/plain"
+    else:
+        status, body, ctype = "200 OK", registry.render().encode(), CONTENT_TYPE
+    header = (
+        f"HTTP/1.0 {status}\r\nContent-Type: {ctype}\r\n"
+        f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n"
+    ).encode()
+    try:
+        writer.write(header if parts[:1] == [b"HEAD"] else header + body)
+        await writer.drain()
+    except ConnectionError:
+        pass
+    finally:
+        writer.close()
+
+
+async def start_metrics_server(
+    port: int, host: str = "127.0.0.1", registry: MetricsRegistry = REGISTRY
+) -> asyncio.AbstractServer:
+    """Listen on ``host:port`` and answer ``GET /metrics`` from ``registry``."""
+    server = await asyncio.start_server(
+        lambda r, w: _handle_http(r, w, registry), host, port, limit=_MAX_REQUEST_BYTES,
+    )
+    _LOGGER.info("SDM630 metrics endpoint on http://%s:%d/metrics", host, port)
+    return server
+
+
+async def serve_metrics(port: int, host: str = "127.0.0.1") -> None:
+    """Run the exporter until cancelled; a busy port is logged, not raised."""
+    try:
+        server = await start_metrics_server(port, host)
+    except OSError as exc:
+        _LOGGER.warning("SDM630 metrics endpoint not started on port %d: %s", port, exc)
+        return
+    async with server:
+        await server.serve_forever()
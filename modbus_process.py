@@ -0,0 +1,305 @@
+"""
+Modbus server in a child process, serving from a shared-memory register image.
+
+With ``modbus_server_mode: process`` HA's event loop never answers the
+wallbox itself.  It writes register values into a ``SharedRegisterImage``;
+a spawned child process runs the serial server and answers every poll from
+that image, so a slow integration, a recorder flush or any other blocking
+call in HA cannot delay a Modbus response.
+
+Each table is guarded by a generation counter (a seqlock).  Its single
+writer makes the generation odd while it writes and even again when done;
+a reader copies the words and retries until it saw the same even
+generation before and after the copy, so no read mixes two updates.  HA
+writes the input table and the child writes the holding table (wallbox
+writes, e.g. the demand period); the child also counts polls, which HA
+turns into poll callbacks with ``ModbusProcess.dispatch_polls``.
+
+The child runs this file as a script.  Its imports then resolve standalone
+(the ``__package__`` check below), so the server process loads the register
+modules, modbus_server and pymodbus, but neither the component package
+(``__init__``: voluptuous, HA config validation) nor anything from HA.
+"""
+import asyncio
+import importlib
+import logging
+import os
+import struct
+import subprocess
+import sys
+import time
+from multiprocessing import resource_tracker, shared_memory
+from typing import Callable
+
+if __package__ is None or __package__ == '':
+    # Running standalone, use absolute imports
+    from registers import SDM630Registers, register_image
+    from sdm630_input_registers import SDM630InputRegisters
+    from sdm630_holding_registers import SDM630HoldingRegisters
+else:
+    # Running as a package (Home Assistant component), use relative imports
+    from .registers import SDM630Registers, register_image
+    from .sdm630_input_registers import SDM630InputRegisters
+    from .sdm630_holding_registers import SDM630HoldingRegisters
+
+_LOGGER = logging.getLogger(__name__)
+
+# Image layout: a header of uint64 slots, then the input and holding tables
+# as 16-bit words indexed by PDU address (highest register: 381/382).
+TABLE_WORDS = 512
+_INPUT_GENERATION, _HOLDING_GENERATION, _POLLS = range(3)
+_HEADER_BYTES = 64
+_TABLE_BYTES = 2 * TABLE_WORDS
+IMAGE_BYTES = _HEADER_BYTES + 2 * _TABLE_BYTES
+
+# A reader that keeps seeing a write in progress for this long assumes the
+# writer is gone and returns what it has rather than stall the bus.
+_READ_TIMEOUT_S = 0.05
+
+# What the server process runs: "<module>:<async function>", called with the
+# attached image (serve_shared_image opens the serial port).
+SERVE = "modbus_server:serve_shared_image"
+# Delays before restarting a server process that exited, by consecutive
+# exits; a process that ran for _STABLE_S before exiting starts over.
+_RESTART_DELAYS_S = (1, 10, 60, 300)
+_STABLE_S = 600
+
+
+class SeqlockTable:
+    """One register table in the image, with its generation counter.
+
+    Only one process may write a table.  The order of the stores is all the
+    protocol relies on; CPython issues them in program order, and a torn read
+    is retried rather than returned.
+    """
+
+    __slots__ = ("_header", "_slot", "words")
+
+    def __init__(self, header: memoryview, slot: int, words: memoryview) -> None:
+        self._header = header
+        self._slot = slot
+        self.words = words
+
+    @property
+    def generation(self) -> int:
+        return self._header[self._slot]
+
+    def write(self, updates: dict[int, int]) -> None:
+        """Store ``{address: word}`` as one update (writer side)."""
+        header, slot, words = self._header, self._slot, self.words
+        generation = (header[slot] + 1) & ~1    # even, also after a writer died mid-write
+        header[slot] = generation + 1           # odd: write in progress
+        for address, word in updates.items():
+            words[address] = word
+        header[slot] = generation + 2
+
+    def read(self, address: int, count: int) -> list[int]:
+        """Return ``count`` words from ``address``, all from the same update."""
+        header, slot = self._header, self._slot
+        words = self.words[address:address + count]
+        deadline = None
+        while True:
+            generation = header[slot]
+            if not generation & 1:
+                values = words.tolist()
+                if header[slot] == generation:
+                    return values
+            if deadline is None:
+                deadline = time.monotonic() + _READ_TIMEOUT_S
+            elif time.monotonic() > deadline:
+                _LOGGER.warning("register image write never finished; serving it as is")
+                return words.tolist()
+            time.sleep(0)                       # let the writer finish
+
+
+class SharedRegisterImage:
+    """Shared-memory block with the input and holding tables and a poll counter.
+
+    ``SharedRegisterImage()`` creates a new block; ``SharedRegisterImage(name)``
+    attaches to an existing one (the child process side).
+    """
+
+    def __init__(self, name: str | None = None) -> None:
+        if name is None:
+            self._shm = shared_memory.SharedMemory(create=True, size=IMAGE_BYTES)
+        else:
+            self._shm = shared_memory.SharedMemory(name=name)
+        buf = self._shm.buf
+        self._header = buf[:_HEADER_BYTES].cast("Q")
+        start = _HEADER_BYTES
+        self._views = [self._header]
+        for attr, slot in (("input", _INPUT_GENERATION), ("holding", _HOLDING_GENERATION)):
+            words = buf[start:start + _TABLE_BYTES].cast("H")
+            self._views.append(words)
+            setattr(self, attr, SeqlockTable(self._header, slot, words))
+            start += _TABLE_BYTES
+
+    @property
+    def name(self) -> str:
+        return self._shm.name
+
+    @property
+    def polls(self) -> int:
+        return self._header[_POLLS]
+
+    def count_poll(self) -> None:
+        """Count one wallbox read (child side; the child is the only writer)."""
+        self._header[_POLLS] += 1
+
+    def close(self) -> None:
+        for view in self._views:
+            view.release()
+        self._views.clear()
+        self._shm.close()
+
+    def unlink(self) -> None:
+        self._shm.unlink()
+
+
+class SharedImageBlock:
+    """HA-side stand-in for ``SDM630DataBlock`` backed by one shared table.
+
+    Offers the calls sensor.py makes on a data block: ``set_float``,
+    ``set_floats``, ``get_float`` and ``set_poll_callback``.
+    """
+
+    def __init__(self, table: SeqlockTable, registers: SDM630Registers) -> None:
+        self.registers = registers
+        self._table = table
+        self._by_address = {r.get_address(): r for r in registers.get_all()}
+        self._poll_callback: Callable | None = None
+        table.write(register_image(registers.get_all()))
+
+    def set_poll_callback(self, cb: Callable) -> None:
+        """Register a callback run (on the HA loop) by ``dispatch_polls``."""
+        self._poll_callback = cb
+
+    def set_float(self, address, value):
+        """Set a float value from our code (not from Modbus client)"""
+        self.set_floats({address: value})
+
+    def set_floats(self, values: dict[int, float]) -> None:
+        """Set several float registers as one image update."""
+        addresses = sorted(a for a in values if a in self._by_address)  # unknown: ignored
+        for address in addresses:
+            self._by_address[address].set_value(float(values[address]))
+        n = len(addresses)
+        words = struct.unpack(f'>{2 * n}H', struct.pack(f'>{n}f', *(values[a] for a in addresses)))
+        updates = {}
+        for i, address in enumerate(addresses):
+            updates[address] = words[2 * i]
+            updates[address + 1] = words[2 * i + 1]
+        self._table.write(updates)
+
+    def get_float(self, address):
+        """Get a float value from the image (includes writes by the wallbox)."""
+        return struct.unpack('>f', struct.pack('>HH', *self._table.read(address, 2)))[0]
+
+
+def _child_main(argv: list[str]) -> None:
+    """Server process entry: ``modbus_process.py <image> <module>:<function> [args]``.
+
+    Attaches to the image and runs ``function(*args, image)`` until it
+    returns or the process is terminated.
+    """
+    name, serve, *args = argv
+    module, _, function = serve.partition(":")
+    logging.basicConfig(
+        level=logging.INFO, format="%(asctime)s %(levelname)s (sdm630 modbus) %(message)s",
+    )
+    image = SharedRegisterImage(name)
+    # HA created the block and unlinks it; without this, this process's
+    # resource tracker would unlink it as soon as the process exits.
+    resource_tracker.unregister(image._shm._name, "shared_memory")
+    try:
+        asyncio.run(getattr(importlib.import_module(module), function)(*args, image))
+    finally:
+        image.close()
+
+
+class ModbusProcess:
+    """Owns the register image and the child process that serves it.
+
+    ``serve`` names the ``async`` function the child runs (see ``SERVE``);
+    ``args`` are strings passed before the image.  ``input_data_block`` and
+    ``holding_data_block`` replace the in-process data blocks on the HA side.
+    """
+
+    def __init__(self, serve: str = SERVE, args: tuple[str, ...] = ()) -> None:
+        self.image = SharedRegisterImage()
+        self.input_data_block = SharedImageBlock(self.image.input, SDM630InputRegisters())
+        self.holding_data_block = SharedImageBlock(self.image.holding, SDM630HoldingRegisters())
+        self._command = [sys.executable, os.path.abspath(__file__), self.image.name, serve, *args]
+        self._process: subprocess.Popen | None = None
+        self._started = 0.0
+        self._exits = 0
+        self._restart_at: float | None = None
+        self._polls = 0
+
+    @property
+    def alive(self) -> bool:
+        return self._process is not None and self._process.poll() is None
+
+    def start(self) -> None:
+        """Start the server process (blocking; HA runs it in the executor)."""
+        self._process = subprocess.Popen(self._command, stdin=subprocess.DEVNULL)
+        self._started = time.monotonic()
+        _LOGGER.info("SDM630 Modbus server process started (pid %d)", self._process.pid)
+
+    def dispatch_polls(self, *_) -> None:
+        """Run the poll callback once if the child answered reads since the last call.
+
+        Also notices a child that has exited: the exit is logged and a
+        restart scheduled (see ``restart_due``).
+        """
+        if self._process is not None and not self.alive:
+            self._exited()
+        polls = self.image.polls
+        if polls == self._polls:
+            return
+        self._polls = polls
+        cb = self.input_data_block._poll_callback
+        if cb is not None:
+            try:
+                cb()
+            except Exception:  # noqa: BLE001
+                _LOGGER.warning("SDM630 poll callback failed", exc_info=True)
+
+    def _exited(self) -> None:
+        now = time.monotonic()
+        if now - self._started >= _STABLE_S:
+            self._exits = 0
+        delay = _RESTART_DELAYS_S[min(self._exits, len(_RESTART_DELAYS_S) - 1)]
+        self._exits += 1
+        _LOGGER.warning(
+            "SDM630 Modbus server process exited (code %s); restarting in %d s "
+            "— the wallbox gets no answers until then",
+            self._process.returncode, delay,
+        )
+        self._process = None
+        self._restart_at = now + delay
+
+    def restart_due(self) -> bool:
+        """True once the restart delay of an exited child has passed; call ``start``."""
+        if self._restart_at is None or time.monotonic() < self._restart_at:
+            return False
+        self._restart_at = None
+        return True
+
+    def stop(self, timeout: float = 5.0) -> None:
+        """Stop the child and free the image (blocking)."""
+        self._restart_at = None
+        if self._process is not None:
+            self._process.terminate()
+            try:
+                self._process.wait(timeout)
+            except subprocess.TimeoutExpired:
+                self._process.kill()
+                self._process.wait()
+            self._process = None
+        self.image.close()
+        self.image.unlink()
+
+
+if __name__ == "__main__":
+    _child_main(sys.argv[1:])
@@ -7,19 +7,25 @@ from pymodbus.datastore import ModbusServerContext, ModbusSparseDataBlock, Modbu
 from pymodbus import ModbusDeviceIdentification
 import struct
 import logging
-from typing import Callable
+import time
+from functools import cache
+from typing import Callable, NamedTuple
 
 # Determine if we're running as a package (Home Assistant component) or standalone
 if __package__ is None or __package__ == '':
     # Running standalone, use absolute imports
-    from registers import SDM630Registers, SDM630Register
+    from registers import SDM630Registers, SDM630Register, register_image
     from sdm630_input_registers import SDM630InputRegisters
     from sdm630_holding_registers import SDM630HoldingRegisters
+    from metrics import ECHO_BYTES_SUPPRESSED, MODBUS_READS, MODBUS_RESPONSE_SECONDS
+    from modbus_thread import SnapshotTable
 else:
     # Running as a package (Home Assistant component), use relative imports
-    from .registers import SDM630Registers, SDM630Register
+    from .registers import SDM630Registers, SDM630Register, register_image
     from .sdm630_input_registers import SDM630InputRegisters
     from .sdm630_holding_registers import SDM630HoldingRegisters
+    from .metrics import ECHO_BYTES_SUPPRESSED, MODBUS_READS, MODBUS_RESPONSE_SECONDS
+    from .modbus_thread import SnapshotTable
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -28,12 +34,14 @@ def float_to_regs(value):
     b = struct.pack('>f', value)
     return [int.from_bytes(b[:2], 'big'), int.from_bytes(b[2:], 'big')]
 
+
 class SDM630DataBlock(ModbusSparseDataBlock):
-    def __init__(self, registers : SDM630Registers):
-        super().__init__()
+    def __init__(self, registers : SDM630Registers, table: str = ""):
+        super().__init__(register_image(registers.get_all()))
         self.registers = registers
+        self.table = table  # metrics label ("input" / "holding")
+        self._by_address = {r.get_address(): r for r in registers.get_all()}
         self._poll_callback: Callable | None = None
-        self._float_map_to_regs()
 
     def set_poll_callback(self, cb: Callable) -> None:
         """Register a callback invoked on every Modbus read (getValues)."""
@@ -41,7 +49,10 @@ class SDM630DataBlock(ModbusSparseDataBlock):
 
     def getValues(self, address, count=1):
         """Override to fire poll callback and log every Modbus read request."""
-        values = super().getValues(address, count)
+        values = self._read(address, count)
+        reads = MODBUS_READS.values               # inlined Counter.inc: hot path
+        key = (self.table, address, count)
+        reads[key] = reads.get(key, 0) + 1
         _LOGGER.debug(
             "Modbus READ  addr=0x%04X(%d) count=%d  → %s",
             address, address, count,
@@ -54,12 +65,8 @@ class SDM630DataBlock(ModbusSparseDataBlock):
                 _LOGGER.warning("SDM630DataBlock poll callback failed", exc_info=True)
         return values
 
-    def _float_map_to_regs(self):
-        for register in self.registers.get_all():
-            reg_value = float_to_regs(register.get_value())
-            reg_address = register.get_address()
-            super().setValues(reg_address, reg_value[0])
-            super().setValues(reg_address + 1, reg_value[1])
+    def _read(self, address, count):
+        return super().getValues(address, count)
 
     def setValues(self, address, value):
         """Override the setValues method from ModbusSparseDataBlock to handle writes from Modbus clients"""
@@ -79,44 +86,246 @@ class SDM630DataBlock(ModbusSparseDataBlock):
 
     def set_float(self, address, value):
         """Set a float value from our code (not from Modbus client)"""
-        self.registers.set_float(address, value)
-        self._float_map_to_regs()
+        self.set_floats({address: value})
+
+    def set_floats(self, values: dict[int, float]) -> None:
+        """Set several float registers from our code in one batch.
+
+        All values are encoded with a single ``struct.pack`` and written with
+        one ``setValues`` call per run of adjacent registers.
+        """
+        addresses = sorted(a for a in values if a in self._by_address)  # unknown: ignored
+        for address in addresses:
+            self._by_address[address].set_value(float(values[address]))
+        n = len(addresses)
+        words = struct.unpack(f'>{2 * n}H', struct.pack(f'>{n}f', *(values[a] for a in addresses)))
+        self._write(addresses, words)
+
+    def _write(self, addresses, words):
+        n = len(addresses)
+        start = 0
+        for i in range(1, n + 1):
+            if i == n or addresses[i] != addresses[i - 1] + 2:
+                super().setValues(addresses[start], list(words[2 * start:2 * i]))
+                start = i
 
     def get_float(self, address):  
         """Get a float value from the register address."""
         return self.registers.get_float(address)
 
-# Use imported SDM630InputRegisters and SDM630HoldingRegisters for register management
-holding_registers = SDM630HoldingRegisters()
+
+class SharedImageDataBlock(SDM630DataBlock):
+    """SDM630DataBlock that answers reads from a register table shared with HA.
+
+    ``shared`` has ``read(address, count)`` and ``write({address: word})``:
+    a ``modbus_process.SeqlockTable`` in the server process of
+    ``modbus_server_mode: process``.  Wallbox writes are mirrored into the
+    table so HA sees them.
+    """
+
+    def __init__(self, registers: SDM630Registers, table: str, shared):
+        super().__init__(registers, table)
+        self.shared = shared
+
+    def _read(self, address, count):
+        return self.shared.read(address, count)
+
+    def setValues(self, address, value):
+        super().setValues(address, value)
+        values = value if isinstance(value, list) else [value]
+        self.shared.write({address + i: word for i, word in enumerate(values)})
+
+
+class SnapshotDataBlock(SharedImageDataBlock):
+    """Data block for a server on its own I/O thread (``modbus_server_mode: thread``).
+
+    HA and the server thread use the same block; both read and write through
+    a ``modbus_thread.SnapshotTable``, so no update is seen half-applied and
+    neither side takes a lock.
+    """
+
+    def __init__(self, registers: SDM630Registers, table: str = ""):
+        super().__init__(registers, table, SnapshotTable(register_image(registers.get_all())))
+
+    def _write(self, addresses, words):
+        updates = {}
+        for i, address in enumerate(addresses):
+            updates[address] = words[2 * i]
+            updates[address + 1] = words[2 * i + 1]
+        self.shared.write(updates)
 
 # Set up callback for holding register writes
 def on_holding_register_write(register: SDM630Register, old_value: float, new_value: float):
     _LOGGER.warning(f"Holding register write - Address: {register.address}, Description: {register.description}")
     _LOGGER.warning(f"Old value: {old_value}, New value: {new_value}")
 
-holding_registers.set_write_callback(on_holding_register_write)
-
-holding_data_block = SDM630DataBlock(holding_registers)
-input_data_block = SDM630DataBlock(SDM630InputRegisters())
-
-# Create Modbus server context for input and holding registers
-device_context = ModbusDeviceContext(
-    di = ModbusSparseDataBlock({}),
-    co = ModbusSparseDataBlock({}),
-    hr = holding_data_block,
-    ir = input_data_block
-)
-
-context = ModbusServerContext(devices={2: device_context}, single=False)
-
-# Device identification
-identity = ModbusDeviceIdentification()
-identity.VendorName = 'Eastron'
-identity.ProductCode = 'SDM630'
-identity.VendorUrl = 'https://www.eastrongroup.com/'
-identity.ProductName = 'SDM630 Modbus Simulator'
-identity.ModelName = 'SDM630'
-identity.MajorMinorRevision = '1.0'
+
+class ModbusServer(NamedTuple):
+    context: ModbusServerContext
+    identity: ModbusDeviceIdentification
+    input_data_block: SDM630DataBlock
+    holding_data_block: SDM630DataBlock
+
+
+def _server(input_data_block: SDM630DataBlock, holding_data_block: SDM630DataBlock) -> ModbusServer:
+    # Create Modbus server context for input and holding registers
+    device_context = ModbusDeviceContext(
+        di = ModbusSparseDataBlock({}),
+        co = ModbusSparseDataBlock({}),
+        hr = holding_data_block,
+        ir = input_data_block
+    )
+
+    context = ModbusServerContext(devices={2: device_context}, single=False)
+
+    # Device identification
+    identity = ModbusDeviceIdentification()
+    identity.VendorName = 'Eastron'
+    identity.ProductCode = 'SDM630'
+    identity.VendorUrl = 'https://www.eastrongroup.com/'
+    identity.ProductName = 'SDM630 Modbus Simulator'
+    identity.ModelName = 'SDM630'
+    identity.MajorMinorRevision = '1.0'
+
+    return ModbusServer(context, identity, input_data_block, holding_data_block)
+
+
+@cache
+def build_server() -> ModbusServer:
+    """Build the data blocks, server context and device identity.
+
+    Done on first call (platform setup), not at import, and only once:
+    a platform reload keeps serving the same register image.
+    """
+    holding_registers = SDM630HoldingRegisters()
+    holding_registers.set_write_callback(on_holding_register_write)
+    return _server(
+        SDM630DataBlock(SDM630InputRegisters(), "input"),
+        SDM630DataBlock(holding_registers, "holding"),
+    )
+
+
+def build_snapshot_server() -> ModbusServer:
+    """Build the server for a dedicated I/O thread (``modbus_server_mode: thread``)."""
+    holding_registers = SDM630HoldingRegisters()
+    holding_registers.set_write_callback(on_holding_register_write)
+    return _server(
+        SnapshotDataBlock(SDM630InputRegisters(), "input"),
+        SnapshotDataBlock(holding_registers, "holding"),
+    )
+
+
+def build_shared_server(image) -> ModbusServer:
+    """Build the server for the child process, reading from ``image``.
+
+    ``image`` is the attached ``modbus_process.SharedRegisterImage``; HA
+    keeps the input table current, the wallbox writes the holding table.
+    """
+    holding_registers = SDM630HoldingRegisters()
+    holding_registers.set_write_callback(on_holding_register_write)
+    input_data_block = SharedImageDataBlock(SDM630InputRegisters(), "input", image.input)
+    input_data_block.set_poll_callback(image.count_poll)
+    return _server(
+        input_data_block,
+        SharedImageDataBlock(holding_registers, "holding", image.holding),
+    )
+
+
+# ── RS485 Echo-Window: seconds to suppress RX after each TX on server ─────────
+# At 9600 baud 8E1 the longest SDM630 frame is ~8 bytes ≈ 9 ms.
+# USB round-trip on CH348L adds up to ~15 ms.  30 ms covers both safely.
+# The THOR Wallbox (Modbus master) will not send a new request within this
+# window — it waits for our response first.
+_ECHO_WINDOW_S: float = 0.030
+# Received chunks further apart than this start a new request for the
+# response-latency metric (a request we never answered is not carried over).
+_REQUEST_GAP_S: float = 0.050
+
+_orig_send = None
+_orig_datagram_received = None
+
+
+def _patched_send(self, data: bytes, addr=None) -> None:
+    if self.is_server:
+        now = time.monotonic()
+        self._echo_deadline: float = now + _ECHO_WINDOW_S  # type: ignore[attr-defined]
+        started = getattr(self, "_request_started", None)
+        if started is not None:
+            MODBUS_RESPONSE_SECONDS.observe(now - started)
+            self._request_started = None  # type: ignore[attr-defined]
+    _orig_send(self, data, addr)
+
+
+def _patched_datagram_received(self, data: bytes, addr) -> None:
+    if self.is_server:
+        now = time.monotonic()
+        if now < getattr(self, "_echo_deadline", 0.0):
+            _LOGGER.debug("echo suppressed (%d bytes)", len(data))
+            ECHO_BYTES_SUPPRESSED.inc(n=len(data))
+            return
+        if (getattr(self, "_request_started", None) is None
+                or now - self._rx_last > _REQUEST_GAP_S):  # type: ignore[attr-defined]
+            self._request_started: float | None = now  # type: ignore[attr-defined]
+        self._rx_last: float = now  # type: ignore[attr-defined]
+    _orig_datagram_received(self, data, addr)
+
+
+def apply_echo_patch() -> None:
+    """Monkey-patch ModbusProtocol to suppress TX echo on RS485 server connections.
+
+    The Waveshare CH348L adapter loops TX bytes back to RX.  The pymodbus
+    ``handle_local_echo`` implementation uses ``startswith``-matching which
+    fails when the echo arrives in fragmented USB packets.
+
+    This patch uses a deadline-based approach: after every ``send()`` on a
+    server connection all inbound data is discarded for ``_ECHO_WINDOW_S``
+    seconds.  The ``is_server`` guard ensures Modbus client connections
+    (e.g. Growatt integration) are completely unaffected.
+
+    Must run before start_modbus_server() creates any protocol instance.
+    The patch is idempotent — calling it twice is harmless.
+    """
+    global _orig_send, _orig_datagram_received
+    from pymodbus.transport import ModbusProtocol
+    if ModbusProtocol.send is _patched_send:
+        return  # already patched
+    _orig_send = ModbusProtocol.send
+    _orig_datagram_received = ModbusProtocol.datagram_received
+    ModbusProtocol.send = _patched_send  # type: ignore[method-assign]
+    ModbusProtocol.datagram_received = _patched_datagram_received  # type: ignore[method-assign]
+    _LOGGER.info(
+        "ModbusProtocol echo-suppression patch applied (window=%.0f ms)",
+        _ECHO_WINDOW_S * 1000,
+    )
+
+
+async def start_modbus_server(server: ModbusServer) -> None:
+    """Start the Modbus RTU serial server for ``server`` (one of the build_* results)."""
+    from pymodbus.server import StartAsyncSerialServer
+    from pymodbus.framer import FramerType
+    try:
+        _LOGGER.info("Starting SDM630 Modbus Serial Simulator...")
+        await StartAsyncSerialServer(
+            context=server.context,
+            identity=server.identity,
+            port="/dev/ttyACM2",
+            framer=FramerType.RTU,
+            stopbits=1,
+            bytesize=8,
+            parity="E",
+            baudrate=9600,
+            handle_local_echo=False,
+            ignore_missing_slaves=True,
+        )
+    except Exception as e:
+        _LOGGER.error("Failed to start Modbus server: %s", str(e))
+
+
+async def serve_shared_image(image) -> None:
+    """Server process side of ``modbus_server_mode: process`` (see modbus_process)."""
+    apply_echo_patch()
+    await start_modbus_server(build_shared_server(image))
+
 
 #if __name__ == "__main__":
 #    _LOGGER.info("Starting SDM630 Modbus TCP Simulator...")
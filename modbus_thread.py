@@ -0,0 +1,102 @@
+"""
+Modbus server on a dedicated I/O thread with its own asyncio loop.
+
+With ``modbus_server_mode: thread`` the serial server does not share HA's
+event loop, so its turnaround stays the same while HA is busy, without the
+IPC of the server process (modbus_process.py).  Both sides exchange data
+without locks:
+
+- Register words live in a ``SnapshotTable``.  A writer copies the current
+  snapshot, applies its update and publishes the copy with one reference
+  assignment; readers only ever see complete snapshots.
+- Polls seen on the server thread reach HA through a ``PollForwarder``,
+  which schedules the callback with ``call_soon_threadsafe`` at most once
+  until the HA loop has run it.
+"""
+import asyncio
+import logging
+import threading
+from concurrent.futures import Future
+from typing import Callable, Coroutine
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class SnapshotTable:
+    """Register words published as immutable snapshots (copy on write).
+
+    Each table has a single writer: HA for input registers, the server
+    thread (wallbox writes) for holding registers.
+    """
+
+    __slots__ = ("_words",)
+
+    def __init__(self, image: dict[int, int]) -> None:
+        self._words = dict(image)
+
+    def write(self, updates: dict[int, int]) -> None:
+        """Publish ``{address: word}`` as one update (writer side)."""
+        words = dict(self._words)
+        words.update(updates)
+        self._words = words                     # the handoff: one reference store
+
+    def read(self, address: int, count: int) -> list[int]:
+        """Return ``count`` words from ``address``, all from the same snapshot."""
+        words = self._words
+        return [words[a] for a in range(address, address + count)]
+
+
+class PollForwarder:
+    """Poll callback for the server thread that runs ``callback`` on ``loop``.
+
+    Any number of polls before the loop gets to it cause one call; the flag
+    is cleared before the call, so a poll during it schedules the next one.
+    """
+
+    __slots__ = ("_loop", "_callback", "_pending")
+
+    def __init__(self, loop: asyncio.AbstractEventLoop, callback: Callable[[], None]) -> None:
+        self._loop = loop
+        self._callback = callback
+        self._pending = False
+
+    def __call__(self) -> None:
+        if self._pending:
+            return
+        self._pending = True
+        self._loop.call_soon_threadsafe(self._run)
+
+    def _run(self) -> None:
+        self._pending = False
+        self._callback()
+
+
+class ModbusThread:
+    """Daemon thread running its own event loop for the Modbus server."""
+
+    def __init__(self, name: str = "sdm630-modbus") -> None:
+        self.loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+
+    def _run(self) -> None:
+        asyncio.set_event_loop(self.loop)
+        try:
+            self.loop.run_forever()
+        finally:
+            tasks = asyncio.all_tasks(self.loop)
+            for task in tasks:
+                task.cancel()
+            self.loop.run_until_complete(asyncio.gather(*tasks, return_exceptions=True))
+            self.loop.close()
+
+    def start(self, coro: Coroutine) -> Future:
+        """Start the thread and run ``coro`` on its loop."""
+        self._thread.start()
+        _LOGGER.info("SDM630 Modbus I/O thread started")
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    def stop(self, timeout: float = 5.0) -> None:
+        """Stop the loop and wait for the thread (blocking)."""
+        if self._thread.is_alive():
+            self.loop.call_soon_threadsafe(self.loop.stop)
+            self._thread.join(timeout)
@@ -1,6 +1,7 @@
 """
 Common register object for SDM630 Modbus simulator
 """
+import struct
 from dataclasses import dataclass
 
 @dataclass
@@ -65,4 +66,20 @@ class SDM630Registers:
             if reg.address == address:
                 return reg.get_value()
             
-        raise ValueError(f"Register with address '{address}' not found.")
\ No newline at end of file
+        raise ValueError(f"Register with address '{address}' not found.")
+
+
+def register_image(registers: list[SDM630Register]) -> dict[int, int]:
+    """Return the ``{address: word}`` image of all float registers.
+
+    All values are encoded with one ``struct.pack``; the result seeds the
+    sparse block in a single constructor call.
+    """
+    n = len(registers)
+    words = struct.unpack(f'>{2 * n}H', struct.pack(f'>{n}f', *(r.get_value() for r in registers)))
+    image = {}
+    for i, register in enumerate(registers):
+        address = register.get_address()
+        image[address] = words[2 * i]
+        image[address + 1] = words[2 * i + 1]
+    return image
@@ -0,0 +1,484 @@
+"""Historical replay — drive SurplusEngine from a Home Assistant recorder database.
+
+Streams the state history of the configured ``entities`` out of a recorder
+SQLite file (``home-assistant_v2.db``) in bounded chunks, rebuilds
+``SensorSnapshot``s on a virtual clock (one tick per ``evaluation_interval``)
+and records what the engine would have reported.
+
+HA-free: stdlib ``sqlite3`` only, no HA runtime.  Requires the recorder schema
+with ``states_meta`` / ``last_updated_ts`` (HA 2023.4+).
+
+Standalone:
+    python replay.py home-assistant_v2.db --config sdm630.json --out replay.csv
+"""
+from __future__ import annotations
+
+import argparse
+import csv
+import json
+import sqlite3
+import sys
+from array import array
+from collections.abc import Iterable, Iterator
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+
+if __package__:
+    from . import DEFAULTS
+    from .surplus_engine import (
+        BATCH_STATES,
+        CACHE_KEY_POWER_FROM_GRID,
+        CACHE_KEY_POWER_TO_GRID,
+        CACHE_KEY_POWER_TO_USER,
+        CACHE_KEY_PV_PRODUCTION,
+        CACHE_KEY_SOC,
+        SOC_HARD_FLOOR,
+        EvaluationResult,
+        ForecastData,
+        SensorSnapshot,
+        SurplusEngine,
+        build_input_filters,
+    )
+else:
+    DEFAULTS: dict = {}  # standalone: config is used as given
+    from surplus_engine import (  # type: ignore[no-redef]
+        BATCH_STATES,
+        CACHE_KEY_POWER_FROM_GRID,
+        CACHE_KEY_POWER_TO_GRID,
+        CACHE_KEY_POWER_TO_USER,
+        CACHE_KEY_PV_PRODUCTION,
+        CACHE_KEY_SOC,
+        SOC_HARD_FLOOR,
+        EvaluationResult,
+        ForecastData,
+        SensorSnapshot,
+        SurplusEngine,
+        build_input_filters,
+    )
+
+SUN_ENTITY = "sun.sun"
+DEFAULT_CHUNK_SIZE = 10_000
+
+# Entity role → SensorSnapshot field (same mapping as the live sensor cache)
+_POWER_ROLES: dict[str, str] = {
+    "soc": CACHE_KEY_SOC,
+    "power_to_grid": CACHE_KEY_POWER_TO_GRID,
+    "pv_production": CACHE_KEY_PV_PRODUCTION,
+    "power_to_user": CACHE_KEY_POWER_TO_USER,
+    "power_from_grid": CACHE_KEY_POWER_FROM_GRID,
+}
+# Required for evaluation — order matches SDM630SimSensor._check_cache_validity
+_REQUIRED_KEYS = (
+    CACHE_KEY_SOC, CACHE_KEY_POWER_TO_GRID, CACHE_KEY_PV_PRODUCTION, CACHE_KEY_POWER_TO_USER,
+)
+# Range-checked keys — same as SDM630SimSensor._validate_cache
+_RANGE_CHECKS = (
+    (CACHE_KEY_SOC, "soc"),
+    (CACHE_KEY_POWER_TO_GRID, "power_w"),
+    (CACHE_KEY_PV_PRODUCTION, "power_w"),
+    (CACHE_KEY_POWER_TO_USER, "power_w"),
+)
+
+
+@dataclass(frozen=True)
+class StateRow:
+    """One recorder state change."""
+
+    timestamp: float        # last_updated, epoch seconds (UTC)
+    entity_id: str
+    state: str
+    attributes: dict | None  # only loaded for entities that need them
+
+
+# ---------------------------------------------------------------------------
+# Recorder access
+# ---------------------------------------------------------------------------
+
+def iter_recorder_states(
+    db_path: str,
+    entity_ids: Iterable[str],
+    start: datetime | None = None,
+    end: datetime | None = None,
+    *,
+    attribute_entities: Iterable[str] = (),
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+) -> Iterator[StateRow]:
+    """Yield state changes of ``entity_ids`` in time order, ``chunk_size`` rows per query.
+
+    Uses keyset pagination on (last_updated_ts, state_id), so each query is
+    an index range scan and memory stays bounded regardless of history length.
+    The database is opened read-only.
+    """
+    conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+    try:
+        entity_ids = list(dict.fromkeys(entity_ids))
+        marks = ",".join("?" * len(entity_ids))
+        meta = dict(conn.execute(
+            f"SELECT metadata_id, entity_id FROM states_meta WHERE entity_id IN ({marks})",
+            entity_ids,
+        ).fetchall())
+        if not meta:
+            return
+        attr_set = set(attribute_entities)
+        wants_attrs = {mid for mid, eid in meta.items() if eid in attr_set}
+        meta_ids = list(meta)
+
+        def _row(metadata_id, ts, state, shared_attrs) -> StateRow:
+            attrs = None
+            if metadata_id in wants_attrs and shared_attrs:
+                attrs = json.loads(shared_attrs)
+            return StateRow(ts, meta[metadata_id], state, attrs)
+
+        select = (
+            "SELECT s.state_id, s.last_updated_ts, s.metadata_id, s.state, a.shared_attrs "
+            "FROM states s LEFT JOIN state_attributes a ON s.attributes_id = a.attributes_id "
+        )
+        last_ts = start.timestamp() if start is not None else float("-inf")
+        end_ts = end.timestamp() if end is not None else float("inf")
+
+        # Initial state: the last change of each entity before the window
+        if start is not None:
+            initial = []
+            for metadata_id in meta_ids:
+                hit = conn.execute(
+                    select + "WHERE s.metadata_id = ? AND s.last_updated_ts < ? "
+                    "ORDER BY s.last_updated_ts DESC LIMIT 1",
+                    (metadata_id, last_ts),
+                ).fetchone()
+                if hit is not None:
+                    initial.append(hit)
+            for _sid, ts, metadata_id, state, shared_attrs in sorted(initial, key=lambda r: r[1]):
+                yield _row(metadata_id, ts, state, shared_attrs)
+
+        marks = ",".join("?" * len(meta_ids))
+        query = (
+            select
+            + f"WHERE s.metadata_id IN ({marks}) "
+            "AND (s.last_updated_ts > ? OR (s.last_updated_ts = ? AND s.state_id > ?)) "
+            "AND s.last_updated_ts < ? "
+            "ORDER BY s.last_updated_ts, s.state_id LIMIT ?"
+        )
+        last_id = -1
+        while True:
+            rows = conn.execute(
+                query, (*meta_ids, last_ts, last_ts, last_id, end_ts, chunk_size)
+            ).fetchall()
+            for _sid, ts, metadata_id, state, shared_attrs in rows:
+                yield _row(metadata_id, ts, state, shared_attrs)
+            if len(rows) < chunk_size:
+                return
+            last_id, last_ts = rows[-1][0], rows[-1][1]
+    finally:
+        conn.close()
+
+
+# ---------------------------------------------------------------------------
+# Result table
+# ---------------------------------------------------------------------------
+
+@dataclass
+class ReplayResult:
+    """Compact column store of replayed ticks.
+
+    ``state`` holds indices into ``BATCH_STATES``; ``reason`` indices into
+    ``reasons`` (each distinct reason string is stored once).
+    """
+
+    timestamp: array = field(default_factory=lambda: array("d"))
+    reported_kw: array = field(default_factory=lambda: array("d"))
+    buffer_used_kw: array = field(default_factory=lambda: array("d"))
+    state: array = field(default_factory=lambda: array("b"))
+    reason: array = field(default_factory=lambda: array("I"))
+    reasons: list[str] = field(default_factory=list)
+    _reason_index: dict[str, int] = field(default_factory=dict, repr=False)
+
+    def __len__(self) -> int:
+        return len(self.timestamp)
+
+    def append(self, ts: float, result: EvaluationResult) -> None:
+        idx = self._reason_index.get(result.reason)
+        if idx is None:
+            idx = self._reason_index[result.reason] = len(self.reasons)
+            self.reasons.append(result.reason)
+        self.timestamp.append(ts)
+        self.reported_kw.append(result.reported_kw)
+        self.buffer_used_kw.append(result.buffer_used_kw)
+        self.state.append(BATCH_STATES.index(result.charging_state))
+        self.reason.append(idx)
+
+    def rows(self) -> Iterator[tuple[datetime, float, float, str, str]]:
+        """Yield (timestamp, reported_kw, buffer_used_kw, state, reason) per tick."""
+        for i in range(len(self.timestamp)):
+            yield (
+                datetime.fromtimestamp(self.timestamp[i], timezone.utc),
+                self.reported_kw[i],
+                self.buffer_used_kw[i],
+                BATCH_STATES[self.state[i]],
+                self.reasons[self.reason[i]],
+            )
+
+    def write_csv(self, fp) -> None:
+        writer = csv.writer(fp)
+        writer.writerow(("timestamp", "reported_kw", "buffer_used_kw", "state", "reason"))
+        for ts, kw, buf, state, reason in self.rows():
+            writer.writerow((ts.isoformat(), f"{kw:.3f}", f"{buf:.3f}", state, reason))
+
+
+# ---------------------------------------------------------------------------
+# Replay driver
+# ---------------------------------------------------------------------------
+
+def _parse_dt(value) -> datetime | None:
+    if not value or value in ("unavailable", "unknown"):
+        return None
+    try:
+        parsed = datetime.fromisoformat(value)
+    except (TypeError, ValueError):
+        return None
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+
+class Replay:
+    """Replays recorder history through a fresh ``SurplusEngine``.
+
+    Per tick it mirrors ``SDM630SimSensor._evaluation_tick``: missing,
+    unavailable or non-numeric inputs and out-of-range values force
+    FAILSAFE, recovery resumes the filter, otherwise the engine runs on the
+    latest known values (after the configured ``input_filters``).  Staleness
+    is not replayed — the live sensor refreshes cache timestamps from the
+    state machine, which the recorder does not capture.  The forecast is
+    rebuilt from the recorded ``forecast_solar`` state and the weather
+    entity's current ``cloud_coverage`` attribute (the hourly forecast is
+    not recorded).
+    """
+
+    def __init__(self, config: dict) -> None:
+        self.config = config
+        self.engine = SurplusEngine(config)
+        self._interval = float(config.get("evaluation_interval", 15))
+        self._ranges = config.get("sensor_ranges", DEFAULTS.get("sensor_ranges", {}))
+        entities = config.get("entities", {})
+        self._entity_to_key = {
+            entities[role]: key for role, key in _POWER_ROLES.items() if entities.get(role)
+        }
+        self._key_to_entity = {key: eid for eid, key in self._entity_to_key.items()}
+        self._filters = {
+            _POWER_ROLES[role]: flt for role, flt in build_input_filters(config).items()
+        }
+        self._weather_entity = entities.get("weather")
+        self._solar_entity = entities.get("forecast_solar")
+        self._sunset_entity = entities.get("sunset")
+
+        self._values: dict[str, float] = {}
+        self._invalid: dict[str, str] = {}
+        self._sun_setting: datetime | None = None
+        self._sun_rising: datetime | None = None
+        self._sunset_override: datetime | None = None
+        self._cloud: float | None = None
+        self._solar: float | None = None
+        self._forecast = self._build_forecast()
+        self._failsafe_reason: str | None = None
+
+    @property
+    def entity_ids(self) -> list[str]:
+        """Every recorder entity the replay reads."""
+        extra = [self._weather_entity, self._solar_entity, self._sunset_entity, SUN_ENTITY]
+        return list(self._entity_to_key) + [e for e in extra if e]
+
+    def run(
+        self,
+        db_path: str,
+        start: datetime | None = None,
+        end: datetime | None = None,
+        *,
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+    ) -> ReplayResult:
+        """Replay ``db_path`` between ``start`` and ``end`` into a ReplayResult."""
+        rows = iter_recorder_states(
+            db_path, self.entity_ids, start, end,
+            attribute_entities=[e for e in (SUN_ENTITY, self._weather_entity) if e],
+            chunk_size=chunk_size,
+        )
+        table = ReplayResult()
+        for ts, result in self.iter_ticks(rows, start, end):
+            table.append(ts, result)
+        return table
+
+    def iter_ticks(
+        self,
+        rows: Iterable[StateRow],
+        start: datetime | None = None,
+        end: datetime | None = None,
+    ) -> Iterator[tuple[float, EvaluationResult]]:
+        """Merge time-ordered ``rows`` with the virtual clock; yield (tick_ts, result)."""
+        for tick, snapshot, reason in self.iter_snapshots(rows, start, end):
+            yield tick, self._evaluate(snapshot, reason)
+
+    def iter_snapshots(
+        self,
+        rows: Iterable[StateRow],
+        start: datetime | None = None,
+        end: datetime | None = None,
+    ) -> Iterator[tuple[float, SensorSnapshot | None, str]]:
+        """Yield (tick_ts, snapshot, failsafe_reason) on the virtual clock.
+
+        Ticks start at ``start`` (default: first row) and continue every
+        ``evaluation_interval`` up to ``end`` (default: the first tick that
+        sees the last row).  Each tick sees every row with ``timestamp <= tick``.
+        ``snapshot`` is None when an input check fails; ``reason`` says why.
+        """
+        rows = iter(rows)
+        pending = next(rows, None)
+        if pending is None:
+            return
+        tick = start.timestamp() if start is not None else pending.timestamp
+        end_ts = end.timestamp() if end is not None else None
+        interval = self._interval
+
+        while end_ts is None or tick <= end_ts:
+            while pending is not None and pending.timestamp <= tick:
+                self._apply(pending)
+                pending = next(rows, None)
+            reason = self._check_inputs()
+            yield tick, (None if reason else self._snapshot(tick)), reason
+            if pending is None and end_ts is None:
+                return
+            tick += interval
+
+    # -- per-row / per-tick --------------------------------------------------
+
+    def _apply(self, row: StateRow) -> None:
+        entity_id, state = row.entity_id, row.state
+        key = self._entity_to_key.get(entity_id)
+        if key is not None:
+            flt = self._filters.get(key)
+            if state in ("unavailable", "unknown"):
+                self._invalid[key] = f" = {state}"
+                if flt is not None:
+                    flt.reset()
+                return
+            try:
+                value = float(state)
+            except (TypeError, ValueError):
+                self._invalid[key] = ": non-numeric value"
+                if flt is not None:
+                    flt.reset()
+                return
+            self._values[key] = value if flt is None else flt.update(value)
+            self._invalid.pop(key, None)
+            return
+        if entity_id == SUN_ENTITY:
+            attrs = row.attributes or {}
+            available = state not in ("unavailable", "unknown")
+            self._sun_setting = _parse_dt(attrs.get("next_setting")) if available else None
+            self._sun_rising = _parse_dt(attrs.get("next_rising")) if available else None
+        if entity_id == self._sunset_entity:
+            self._sunset_override = _parse_dt(state)
+        if entity_id == self._solar_entity:
+            try:
+                self._solar = float(state)
+            except (TypeError, ValueError):
+                self._solar = None
+            self._forecast = self._build_forecast()
+        if entity_id == self._weather_entity:
+            cloud = (row.attributes or {}).get("cloud_coverage")
+            self._cloud = float(cloud) if isinstance(cloud, (int, float)) else None
+            self._forecast = self._build_forecast()
+
+    def _build_forecast(self) -> ForecastData:
+        """Same availability rules as ForecastConsumer._fetch_forecast."""
+        return ForecastData(
+            forecast_available=self._cloud is not None or self._solar is not None,
+            cloud_coverage_avg=self._cloud if self._cloud is not None else 50.0,
+            solar_forecast_kwh_remaining=self._solar,
+        )
+
+    def _check_inputs(self) -> str:
+        """Return a FAILSAFE reason, or "" when all inputs are usable."""
+        for key in _REQUIRED_KEYS:
+            entity_id = self._key_to_entity.get(key, key)
+            if key in self._invalid:
+                return f"{entity_id}{self._invalid[key]}"
+            if key not in self._values:
+                return f"{entity_id}: no data received"
+        for key, range_key in _RANGE_CHECKS:
+            rng = self._ranges.get(range_key)
+            if rng is None:
+                continue
+            min_val, max_val = rng
+            value = self._values[key]
+            if not (min_val <= value <= max_val):
+                entity_id = self._key_to_entity.get(key, key)
+                return f"{entity_id}: value {value} out of range [{min_val}, {max_val}]"
+        return ""
+
+    def _snapshot(self, tick: float) -> SensorSnapshot:
+        values = self._values
+        return SensorSnapshot(
+            soc_percent=values[CACHE_KEY_SOC],
+            power_to_grid_w=values[CACHE_KEY_POWER_TO_GRID],
+            pv_production_w=values[CACHE_KEY_PV_PRODUCTION],
+            power_to_user_w=values[CACHE_KEY_POWER_TO_USER],
+            power_from_grid_w=values.get(CACHE_KEY_POWER_FROM_GRID, 0.0),
+            timestamp=datetime.fromtimestamp(tick, timezone.utc),
+            sunset_time=self._sunset_override or self._sun_setting,
+            sunrise_time=self._sun_rising,
+            forecast=self._forecast,
+        )
+
+    def _evaluate(self, snapshot: SensorSnapshot | None, reason: str) -> EvaluationResult:
+        engine = self.engine
+        if snapshot is None:
+            engine.hysteresis_filter.force_failsafe(reason)
+            self._failsafe_reason = reason
+            return EvaluationResult(
+                reported_kw=0.0,
+                real_surplus_kw=0.0,
+                buffer_used_kw=0.0,
+                soc_percent=self._values.get(CACHE_KEY_SOC, 0.0),
+                soc_floor_active=SOC_HARD_FLOOR,
+                charging_state="FAILSAFE",
+                reason=reason,
+                forecast_available=False,
+            )
+        if self._failsafe_reason is not None:
+            engine.hysteresis_filter.resume()
+            self._failsafe_reason = None
+        return engine.evaluate_tactical(snapshot)
+
+
+# ---------------------------------------------------------------------------
+# Standalone entry point
+# ---------------------------------------------------------------------------
+
+def _parse_cli_dt(value: str) -> datetime:
+    parsed = datetime.fromisoformat(value)
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Replay HA recorder history through the surplus engine.")
+    parser.add_argument("db", help="Path to home-assistant_v2.db")
+    parser.add_argument("--config", required=True, help="JSON file with the sdm630_simulator config")
+    parser.add_argument("--start", type=_parse_cli_dt, help="ISO start time (UTC if naive)")
+    parser.add_argument("--end", type=_parse_cli_dt, help="ISO end time (UTC if naive)")
+    parser.add_argument("--out", help="CSV output file (default: stdout)")
+    args = parser.parse_args(argv)
+
+    with open(args.config, encoding="utf-8") as fp:
+        config = json.load(fp)
+    # JSON object keys are strings; seasonal_targets are looked up by month int
+    if "seasonal_targets" in config:
+        config["seasonal_targets"] = {int(k): v for k, v in config["seasonal_targets"].items()}
+
+    table = Replay(config).run(args.db, args.start, args.end)
+    if args.out:
+        with open(args.out, "w", newline="", encoding="utf-8") as fp:
+            table.write_csv(fp)
+    else:
+        table.write_csv(sys.stdout)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
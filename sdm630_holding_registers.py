@@ -11,6 +11,9 @@ else:
     # Running as a package (Home Assistant component), use relative imports
     from .registers import SDM630Register, SDM630Registers
 
+# Constants for holding register addresses (1-based PDU addresses)
+DEMAND_PERIOD = 3        # 0x0003  param 2
+
 @dataclass
 class SDM630HoldingRegisters(SDM630Registers):
     registers: list[SDM630Register]
@@ -33,7 +36,7 @@ class SDM630HoldingRegisters(SDM630Registers):
 
     def _init_registers(self):
         # All holding registers from SDM630 MODBUS Protocol (1-based PDU addresses)
-        self.registers.append(SDM630Register(3,  2, "Demand Period", "Minutes", 60.0))          # 0x0003
+        self.registers.append(SDM630Register(DEMAND_PERIOD, 2, "Demand Period", "Minutes", 60.0))          # 0x0003
         self.registers.append(SDM630Register(11, 6, "System Type", "Type", 3))                  # 0x000B
         self.registers.append(SDM630Register(13, 7, "Pulse1 Width", "Milliseconds", 5.0))       # 0x000D
         self.registers.append(SDM630Register(15, 8, "Password Lock", "Boolean", 0.0))           # 0x000F
@@ -56,6 +56,37 @@ TOTAL_VA_DEMAND = 101         # 0x0065  param 51
 MAX_TOTAL_VA_DEMAND = 103     # 0x0067  param 52
 NEUTRAL_CURRENT_DEMAND = 105  # 0x0069  param 53
 MAX_NEUTRAL_CURRENT_DEMAND = 107  # 0x006B  param 54
+LINE_1_TO_2_VOLTAGE = 201     # 0x00C9  param 101
+LINE_2_TO_3_VOLTAGE = 203     # 0x00CB  param 102
+LINE_3_TO_1_VOLTAGE = 205     # 0x00CD  param 103
+AVG_LL_VOLTAGE = 207          # 0x00CF  param 104
+NEUTRAL_CURRENT = 225         # 0x00E1  param 113
+PHASE_1_CURRENT_DEMAND = 259  # 0x0103  param 130
+PHASE_2_CURRENT_DEMAND = 261  # 0x0105  param 131
+PHASE_3_CURRENT_DEMAND = 263  # 0x0107  param 132
+MAX_PHASE_1_CURRENT_DEMAND = 265  # 0x0109  param 133
+MAX_PHASE_2_CURRENT_DEMAND = 267  # 0x010B  param 134
+MAX_PHASE_3_CURRENT_DEMAND = 269  # 0x010D  param 135
+TOTAL_KWH = 343               # 0x0157  param 172
+TOTAL_KVARH = 345             # 0x0159  param 173
+PHASE_1_IMPORT_KWH = 347      # 0x015B  param 174
+PHASE_2_IMPORT_KWH = 349      # 0x015D  param 175
+PHASE_3_IMPORT_KWH = 351      # 0x015F  param 176
+PHASE_1_EXPORT_KWH = 353      # 0x0161  param 177
+PHASE_2_EXPORT_KWH = 355      # 0x0163  param 178
+PHASE_3_EXPORT_KWH = 357      # 0x0165  param 179
+PHASE_1_TOTAL_KWH = 359       # 0x0167  param 180
+PHASE_2_TOTAL_KWH = 361       # 0x0169  param 181
+PHASE_3_TOTAL_KWH = 363       # 0x016B  param 182
+PHASE_1_IMPORT_KVARH = 365    # 0x016D  param 183
+PHASE_2_IMPORT_KVARH = 367    # 0x016F  param 184
+PHASE_3_IMPORT_KVARH = 369    # 0x0171  param 185
+PHASE_1_EXPORT_KVARH = 371    # 0x0173  param 186
+PHASE_2_EXPORT_KVARH = 373    # 0x0175  param 187
+PHASE_3_EXPORT_KVARH = 375    # 0x0177  param 188
+PHASE_1_TOTAL_KVARH = 377     # 0x0179  param 189
+PHASE_2_TOTAL_KVARH = 379     # 0x017B  param 190
+PHASE_3_TOTAL_KVARH = 381     # 0x017D  param 191
 
 @dataclass
 class SDM630InputRegisters(SDM630Registers):
@@ -110,11 +141,11 @@ class SDM630InputRegisters(SDM630Registers):
         self.registers.append(SDM630Register(MAX_TOTAL_VA_DEMAND, 52, "Maximum total system VA demand", "VA", 360.0))
         self.registers.append(SDM630Register(NEUTRAL_CURRENT_DEMAND, 53, "Neutral current demand", "Amps", 1.0))
         self.registers.append(SDM630Register(MAX_NEUTRAL_CURRENT_DEMAND, 54, "Maximum neutral current demand", "Amps", 1.2))
-        self.registers.append(SDM630Register(201, 101, "Line 1 to Line 2 volts", "Volts", 400.0))         # 0x00C9
-        self.registers.append(SDM630Register(203, 102, "Line 2 to Line 3 volts", "Volts", 400.0))         # 0x00CB
-        self.registers.append(SDM630Register(205, 103, "Line 3 to Line 1 volts", "Volts", 400.0))         # 0x00CD
-        self.registers.append(SDM630Register(207, 104, "Average line to line volts", "Volts", 400.0))      # 0x00CF
-        self.registers.append(SDM630Register(225, 113, "Neutral current", "Amps", 0.2))                   # 0x00E1
+        self.registers.append(SDM630Register(LINE_1_TO_2_VOLTAGE, 101, "Line 1 to Line 2 volts", "Volts", 400.0))         # 0x00C9
+        self.registers.append(SDM630Register(LINE_2_TO_3_VOLTAGE, 102, "Line 2 to Line 3 volts", "Volts", 400.0))         # 0x00CB
+        self.registers.append(SDM630Register(LINE_3_TO_1_VOLTAGE, 103, "Line 3 to Line 1 volts", "Volts", 400.0))         # 0x00CD
+        self.registers.append(SDM630Register(AVG_LL_VOLTAGE, 104, "Average line to line volts", "Volts", 400.0))      # 0x00CF
+        self.registers.append(SDM630Register(NEUTRAL_CURRENT, 113, "Neutral current", "Amps", 0.2))                   # 0x00E1
         self.registers.append(SDM630Register(235, 118, "Phase 1 L/N volts THD", "%", 0.2))                # 0x00EB
         self.registers.append(SDM630Register(237, 119, "Phase 2 L/N volts THD", "%", 0.3))                # 0x00ED
         self.registers.append(SDM630Register(239, 120, "Phase 3 L/N volts THD", "%", 0.4))                # 0x00EF
@@ -123,36 +154,36 @@ class SDM630InputRegisters(SDM630Registers):
         self.registers.append(SDM630Register(245, 123, "Phase 3 Current THD", "%", 0.3))                  # 0x00F5
         self.registers.append(SDM630Register(249, 125, "Average line to neutral volts THD", "%", 0.2))    # 0x00F9
         self.registers.append(SDM630Register(251, 126, "Average line current THD", "%", 0.4))             # 0x00FB
-        self.registers.append(SDM630Register(259, 130, "Phase 1 current demand", "Amps", 0.0))            # 0x0103
-        self.registers.append(SDM630Register(261, 131, "Phase 2 current demand", "Amps", 3.0))            # 0x0105
-        self.registers.append(SDM630Register(263, 132, "Phase 3 current demand", "Amps", 1.0))            # 0x0107
-        self.registers.append(SDM630Register(265, 133, "Maximum phase 1 current demand", "Amps", 13.0))   # 0x0109
-        self.registers.append(SDM630Register(267, 134, "Maximum phase 2 current demand", "Amps", 13.0))   # 0x010B
-        self.registers.append(SDM630Register(269, 135, "Maximum phase 3 current demand", "Amps", 13.0))   # 0x010D
+        self.registers.append(SDM630Register(PHASE_1_CURRENT_DEMAND, 130, "Phase 1 current demand", "Amps", 0.0))            # 0x0103
+        self.registers.append(SDM630Register(PHASE_2_CURRENT_DEMAND, 131, "Phase 2 current demand", "Amps", 3.0))            # 0x0105
+        self.registers.append(SDM630Register(PHASE_3_CURRENT_DEMAND, 132, "Phase 3 current demand", "Amps", 1.0))            # 0x0107
+        self.registers.append(SDM630Register(MAX_PHASE_1_CURRENT_DEMAND, 133, "Maximum phase 1 current demand", "Amps", 13.0))   # 0x0109
+        self.registers.append(SDM630Register(MAX_PHASE_2_CURRENT_DEMAND, 134, "Maximum phase 2 current demand", "Amps", 13.0))   # 0x010B
+        self.registers.append(SDM630Register(MAX_PHASE_3_CURRENT_DEMAND, 135, "Maximum phase 3 current demand", "Amps", 13.0))   # 0x010D
         self.registers.append(SDM630Register(335, 168, "Line 1 to line 2 volts THD", "%", 0.5))           # 0x014F
         self.registers.append(SDM630Register(337, 169, "Line 2 to line 3 volts THD", "%", 0.3))           # 0x0151
         self.registers.append(SDM630Register(339, 170, "Line 3 to line 1 volts THD", "%", 0.4))           # 0x0153
         self.registers.append(SDM630Register(341, 171, "Average line to line volts THD", "%", 0.3))       # 0x0155
-        self.registers.append(SDM630Register(343, 172, "Total kwh(3)", "kWh", 1348.8))                    # 0x0157
-        self.registers.append(SDM630Register(345, 173, "Total kvarh(3)", "kvarh", 125.0))                 # 0x0159
-        self.registers.append(SDM630Register(347, 174, "L1 import kwh", "kWh", 420.0))                    # 0x015B
-        self.registers.append(SDM630Register(349, 175, "L2 import kwh", "kWh", 370.0))                    # 0x015D
-        self.registers.append(SDM630Register(351, 176, "L3 import kWh", "kWh", 580.0))                    # 0x015F
-        self.registers.append(SDM630Register(353, 177, "L1 export kWh", "kWh", 1500.0))                   # 0x0161
-        self.registers.append(SDM630Register(355, 178, "L2 export kwh", "kWh", 1400.0))                   # 0x0163
-        self.registers.append(SDM630Register(357, 179, "L3 export kWh", "kWh", 1300.0))                   # 0x0165
-        self.registers.append(SDM630Register(359, 180, "L1 total kwh(3)", "kWh", 420.0))                  # 0x0167
-        self.registers.append(SDM630Register(361, 181, "L2 total kWh(3)", "kWh", 370.0))                  # 0x0169
-        self.registers.append(SDM630Register(363, 182, "L3 total kwh(3)", "kWh", 580.0))                  # 0x016B
-        self.registers.append(SDM630Register(365, 183, "L1 import kvarh", "kvarh", 10.0))                 # 0x016D
-        self.registers.append(SDM630Register(367, 184, "L2 import kvarh", "kvarh", 13.0))                 # 0x016F
-        self.registers.append(SDM630Register(369, 185, "L3 import kvarh", "kvarh", 17.0))                 # 0x0171
-        self.registers.append(SDM630Register(371, 186, "L1 export kvarh", "kvarh", 12.0))                 # 0x0173
-        self.registers.append(SDM630Register(373, 187, "L2 export kvarh", "kvarh", 16.0))                 # 0x0175
-        self.registers.append(SDM630Register(375, 188, "L3 export kvarh", "kvarh", 19.0))                 # 0x0177
-        self.registers.append(SDM630Register(377, 189, "L1 total kvarh (3)", "kvarh", 25.0))              # 0x0179
-        self.registers.append(SDM630Register(379, 190, "L2 total kvarh (3)", "kvarh", 27.0))              # 0x017B
-        self.registers.append(SDM630Register(381, 191, "L3 total kvarh (3)", "kvarh", 30.0))              # 0x017D
+        self.registers.append(SDM630Register(TOTAL_KWH, 172, "Total kwh(3)", "kWh", 1348.8))              # 0x0157
+        self.registers.append(SDM630Register(TOTAL_KVARH, 173, "Total kvarh(3)", "kvarh", 125.0))         # 0x0159
+        self.registers.append(SDM630Register(PHASE_1_IMPORT_KWH, 174, "L1 import kwh", "kWh", 420.0))     # 0x015B
+        self.registers.append(SDM630Register(PHASE_2_IMPORT_KWH, 175, "L2 import kwh", "kWh", 370.0))     # 0x015D
+        self.registers.append(SDM630Register(PHASE_3_IMPORT_KWH, 176, "L3 import kWh", "kWh", 580.0))     # 0x015F
+        self.registers.append(SDM630Register(PHASE_1_EXPORT_KWH, 177, "L1 export kWh", "kWh", 1500.0))    # 0x0161
+        self.registers.append(SDM630Register(PHASE_2_EXPORT_KWH, 178, "L2 export kwh", "kWh", 1400.0))    # 0x0163
+        self.registers.append(SDM630Register(PHASE_3_EXPORT_KWH, 179, "L3 export kWh", "kWh", 1300.0))    # 0x0165
+        self.registers.append(SDM630Register(PHASE_1_TOTAL_KWH, 180, "L1 total kwh(3)", "kWh", 420.0))    # 0x0167
+        self.registers.append(SDM630Register(PHASE_2_TOTAL_KWH, 181, "L2 total kWh(3)", "kWh", 370.0))    # 0x0169
+        self.registers.append(SDM630Register(PHASE_3_TOTAL_KWH, 182, "L3 total kwh(3)", "kWh", 580.0))    # 0x016B
+        self.registers.append(SDM630Register(PHASE_1_IMPORT_KVARH, 183, "L1 import kvarh", "kvarh", 10.0)) # 0x016D
+        self.registers.append(SDM630Register(PHASE_2_IMPORT_KVARH, 184, "L2 import kvarh", "kvarh", 13.0)) # 0x016F
+        self.registers.append(SDM630Register(PHASE_3_IMPORT_KVARH, 185, "L3 import kvarh", "kvarh", 17.0)) # 0x0171
+        self.registers.append(SDM630Register(PHASE_1_EXPORT_KVARH, 186, "L1 export kvarh", "kvarh", 12.0)) # 0x0173
+        self.registers.append(SDM630Register(PHASE_2_EXPORT_KVARH, 187, "L2 export kvarh", "kvarh", 16.0)) # 0x0175
+        self.registers.append(SDM630Register(PHASE_3_EXPORT_KVARH, 188, "L3 export kvarh", "kvarh", 19.0)) # 0x0177
+        self.registers.append(SDM630Register(PHASE_1_TOTAL_KVARH, 189, "L1 total kvarh (3)", "kvarh", 25.0)) # 0x0179
+        self.registers.append(SDM630Register(PHASE_2_TOTAL_KVARH, 190, "L2 total kvarh (3)", "kvarh", 27.0)) # 0x017B
+        self.registers.append(SDM630Register(PHASE_3_TOTAL_KVARH, 191, "L3 total kvarh (3)", "kvarh", 30.0)) # 0x017D
         
         super().__init__(self.registers)
         
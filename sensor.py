@@ -1,5 +1,8 @@
 import logging
+import math
+import os
 from datetime import datetime, timedelta
+import voluptuous as vol
 from homeassistant.components.binary_sensor import (
     BinarySensorDeviceClass,
     BinarySensorEntity,
@@ -15,17 +18,24 @@ from homeassistant.helpers.event import (
     async_track_state_change_event,
     async_track_time_interval,
 )
+try:  # unchanged re-writes fire state_reported (newer HA only)
+    from homeassistant.helpers.event import async_track_state_report_event
+except ImportError:
+    async_track_state_report_event = None
 from homeassistant.util import dt as dt_util
 import time as _time
-from pymodbus.server import StartAsyncSerialServer
-from pymodbus.framer import FramerType
-from pymodbus.transport import ModbusProtocol
-from .modbus_server import (
-    context,
-    identity,
-    input_data_block,
-)
 from .sdm630_input_registers import TOTAL_POWER
+from .sdm630_holding_registers import DEMAND_PERIOD
+from .meter import ENERGY_STATE_VERSION, MeterModel
+from .metrics import (
+    FAILSAFE_ENTRIES,
+    REGISTRY as METRICS,
+    CallbackCounter,
+    CallbackGauge,
+    TickProfiler,
+    observe_phase_ns,
+    serve_metrics,
+)
 from . import sdm630_input_registers as _input_regs
 from . import CONF_ENTITIES, CONF_REGISTER_MAPPINGS, DEFAULTS, DOMAIN
 
@@ -36,6 +46,7 @@ REGISTER_NAME_TO_ADDRESS: dict[str, int] = {
     if k == k.upper() and isinstance(v, int)
 }
 from .surplus_engine import (
+    AdaptiveScheduler,
     SurplusEngine,
     SensorSnapshot,
     EvaluationResult,
@@ -44,8 +55,14 @@ from .surplus_engine import (
     CACHE_KEY_PV_PRODUCTION,
     CACHE_KEY_POWER_TO_USER,
     CACHE_KEY_POWER_FROM_GRID,
+    CACHE_KEYS,
+    CACHE_SLOT,
     SOC_HARD_FLOOR,
+    ENGINE_STATE_VERSION,
+    SensorCache,
+    build_input_filters,
 )
+from .decision_trace import DecisionTrace
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -62,77 +79,133 @@ ENTITY_ROLE_TO_CACHE_KEY = {
     "power_from_grid": CACHE_KEY_POWER_FROM_GRID,
 }
 
-WALLBOX_POLL_WARNING_THRESHOLD: int = 300  # seconds
-
-# ── RS485 Echo-Window: seconds to suppress RX after each TX on server ─────────
-# At 9600 baud 8E1 the longest SDM630 frame is ~8 bytes ≈ 9 ms.
-# USB round-trip on CH348L adds up to ~15 ms.  30 ms covers both safely.
-# The THOR Wallbox (Modbus master) will not send a new request within this
-# window — it waits for our response first.
-_ECHO_WINDOW_S: float = 0.030
-
-_orig_send = ModbusProtocol.send
-_orig_datagram_received = ModbusProtocol.datagram_received
-
+# Sensor-cache slot groups.
+SLOT_SOC = CACHE_SLOT[CACHE_KEY_SOC]
+STALENESS_SLOTS = tuple(  # Story 4.2 — critical sensors only
+    CACHE_SLOT[key]
+    for key in (CACHE_KEY_SOC, CACHE_KEY_PV_PRODUCTION, CACHE_KEY_POWER_TO_USER)
+)
+STALE_DEADLINE_SLACK_S = 0.001  # fire just past the deadline (staleness is strict >)
+REQUIRED_SLOTS = tuple(   # Story 4.1
+    CACHE_SLOT[key]
+    for key in (CACHE_KEY_SOC, CACHE_KEY_POWER_TO_GRID,
+                CACHE_KEY_PV_PRODUCTION, CACHE_KEY_POWER_TO_USER)
+)
+RANGE_CHECKS = (          # Story 4.4 — (slot, sensor_ranges key)
+    (CACHE_SLOT[CACHE_KEY_SOC],           "soc"),
+    (CACHE_SLOT[CACHE_KEY_POWER_TO_GRID], "power_w"),
+    (CACHE_SLOT[CACHE_KEY_PV_PRODUCTION], "power_w"),
+    (CACHE_SLOT[CACHE_KEY_POWER_TO_USER], "power_w"),
+)
 
-def _patched_send(self: ModbusProtocol, data: bytes, addr=None) -> None:
-    if self.is_server:
-        self._echo_deadline: float = _time.monotonic() + _ECHO_WINDOW_S  # type: ignore[attr-defined]
-    _orig_send(self, data, addr)
+# Cache keys whose state changes trigger a debounced fast re-evaluation when
+# fast_reaction_ms > 0.  SOC moves slowly and stays on the periodic tick.
+FAST_REACTION_KEYS = frozenset({
+    CACHE_KEY_POWER_FROM_GRID,
+    CACHE_KEY_PV_PRODUCTION,
+    CACHE_KEY_POWER_TO_USER,
+})
 
+WALLBOX_POLL_WARNING_THRESHOLD: int = 300  # seconds
+# modbus_server_mode "process": how often polls seen by the server process
+# are forwarded to the wallbox poll sensors (coalesced) and the process is
+# checked for an exit.
+POLL_DISPATCH_INTERVAL = timedelta(seconds=1)
+
+# Energy counters are written to .storage at most this often (and on shutdown).
+ENERGY_SAVE_INTERVAL = timedelta(minutes=5)
+# Warm-restart snapshot (hysteresis, last output, cache, counters) save cadence.
+WARM_STATE_SAVE_INTERVAL = timedelta(minutes=1)
+
+SERVICE_EXPORT_DECISION_TRACE = "export_decision_trace"
+EXPORT_DECISION_TRACE_SCHEMA = vol.Schema({
+    vol.Optional("count"):                 vol.All(vol.Coerce(int), vol.Range(min=1)),
+    vol.Optional("format", default="csv"): vol.In(("csv", "json")),
+    vol.Optional("filename"):              vol.All(str, vol.Length(min=1)),
+})
+
+# Output entities with their own publish_policies entry.
+PUBLISHED_ENTITIES = ("power", "raw_surplus", "reported_surplus")
+
+
+class PublishPolicy:
+    """Decides when an output entity writes its state to HA.
+
+    Every write is a recorder row and a ``state_changed`` event, so a value
+    is published only if it moved more than ``deadband_w`` away from the
+    last published one, or ``heartbeat_s`` passed since then.  Deadband 0
+    is change-only; heartbeat 0 disables the heartbeat, so an unchanged
+    value is published once and then held.  A negative deadband publishes
+    every evaluation.
+    """
 
-def _patched_datagram_received(self: ModbusProtocol, data: bytes, addr) -> None:
-    if self.is_server and _time.monotonic() < getattr(self, "_echo_deadline", 0.0):
-        _LOGGER.debug("echo suppressed (%d bytes)", len(data))
-        return
-    _orig_datagram_received(self, data, addr)
+    __slots__ = ("deadband_w", "heartbeat_s", "published", "skipped", "_last_w", "_last_ts")
+
+    def __init__(self, deadband_w: float = 0.0, heartbeat_s: float = 0.0) -> None:
+        self.deadband_w = deadband_w
+        self.heartbeat_s = heartbeat_s
+        self.published = 0
+        self.skipped = 0
+        self._last_w = 0.0
+        self._last_ts = -math.inf       # first value is always published
+
+    def should_publish(self, value_w: float, now: float) -> bool:
+        """Count and decide; ``now`` is monotonic seconds."""
+        since = now - self._last_ts
+        if (
+            abs(value_w - self._last_w) > self.deadband_w
+            or since == math.inf
+            or (self.heartbeat_s and since >= self.heartbeat_s)
+        ):
+            self._last_w = value_w
+            self._last_ts = now
+            self.published += 1
+            return True
+        self.skipped += 1
+        return False
 
 
-def _apply_modbus_echo_patch() -> None:
-    """Monkey-patch ModbusProtocol to suppress TX echo on RS485 server connections.
+def build_publish_policies(config: dict) -> dict[str, PublishPolicy]:
+    """One policy per output entity; entries missing from the config publish every tick."""
+    specs = config.get("publish_policies") or {}
+    return {
+        name: PublishPolicy(**specs[name]) if name in specs else PublishPolicy(deadband_w=-math.inf)
+        for name in PUBLISHED_ENTITIES
+    }
 
-    The Waveshare CH348L adapter loops TX bytes back to RX.  The pymodbus
-    ``handle_local_echo`` implementation uses ``startswith``-matching which
-    fails when the echo arrives in fragmented USB packets.
 
-    This patch uses a deadline-based approach: after every ``send()`` on a
-    server connection all inbound data is discarded for ``_ECHO_WINDOW_S``
-    seconds.  The ``is_server`` guard ensures Modbus client connections
-    (e.g. Growatt integration) are completely unaffected.
+# pymodbus and the register image are loaded by _load_modbus_server() during
+# platform setup; HA imports every configured platform at boot and should
+# not pay for them there.
+input_data_block = None
+holding_data_block = None
 
-    The patch is idempotent — calling it twice is harmless.
-    """
-    if ModbusProtocol.send is _patched_send:
-        return  # already patched
-    ModbusProtocol.send = _patched_send  # type: ignore[method-assign]
-    ModbusProtocol.datagram_received = _patched_datagram_received  # type: ignore[method-assign]
-    _LOGGER.info(
-        "ModbusProtocol echo-suppression patch applied (window=%.0f ms)",
-        _ECHO_WINDOW_S * 1000,
-    )
 
-async def start_modbus_server() -> None:
-    """Start the Modbus RTU serial server.
+def _load_modbus_server(mode: str = "loop"):
+    """Build the Modbus datastore for ``mode`` and bind the module's data blocks.
 
-    Echo suppression is handled by the ModbusProtocol monkey-patch applied
-    in async_setup_platform (_apply_modbus_echo_patch).
+    ``loop`` serves from in-process data blocks on the HA event loop;
+    ``thread`` from snapshot blocks on a dedicated I/O thread; ``process``
+    returns a ModbusProcess whose blocks write a shared image.
     """
-    try:
-        _LOGGER.info("Starting SDM630 Modbus Serial Simulator...")
-        await StartAsyncSerialServer(
-            context=context,
-            identity=identity,
-            port="/dev/ttyACM2",
-            framer=FramerType.RTU,
-            stopbits=1,
-            bytesize=8,
-            parity="E",
-            baudrate=9600,
-            handle_local_echo=False,
-            ignore_missing_slaves=True,
-        )
-    except Exception as e:
-        _LOGGER.error("Failed to start Modbus server: %s", str(e))
+    global input_data_block, holding_data_block
+    if mode == "process":
+        from .modbus_process import ModbusProcess
+        server = ModbusProcess()   # the server process applies the echo patch itself
+    else:
+        from .modbus_server import apply_echo_patch
+        # Suppress TX echo on RS485 server connections; must happen before
+        # start_modbus_server() creates any protocol instance.
+        apply_echo_patch()
+        if mode == "thread":
+            from .modbus_server import build_snapshot_server
+            server = build_snapshot_server()
+        else:
+            from .modbus_server import build_server
+            server = build_server()
+    input_data_block = server.input_data_block
+    holding_data_block = server.holding_data_block
+    return server
 
 
 class _SimulatorOnlyFilter(logging.Filter):
@@ -164,6 +237,119 @@ class _SimulatorOnlyFilter(logging.Filter):
         return True
 
 
+def _no_mark(phase: str) -> None:
+    """Phase marker used when tick profiling is off."""
+
+
+def _register_trace_service(hass, trace: DecisionTrace) -> None:
+    """Register ``sdm630_simulator.export_decision_trace``.
+
+    Writes the newest ``count`` records (default: all) as CSV or JSON to
+    ``filename`` in the HA config directory and returns path and count
+    when the caller asks for a response.  HA validates the call against
+    ``EXPORT_DECISION_TRACE_SCHEMA`` before the handler runs.
+    """
+
+    async def _export(call) -> dict:
+        fmt = call.data.get("format", "csv")
+        last = call.data.get("count")
+        name = os.path.basename(call.data.get("filename") or f"{DOMAIN}_decision_trace.{fmt}")
+        path = hass.config.path(name)
+        text = trace.to_json(last) if fmt == "json" else trace.to_csv(last)
+        await hass.async_add_executor_job(_write_text, path, text)
+        records = len(trace) if last is None else min(last, len(trace))
+        _LOGGER.info("SDM630 decision trace: %d records written to %s", records, path)
+        return {"path": path, "records": records}
+
+    try:
+        from homeassistant.core import SupportsResponse
+        extra = {"supports_response": SupportsResponse.OPTIONAL}
+    except ImportError:  # older HA: no service responses
+        extra = {}
+    hass.services.async_register(
+        DOMAIN, SERVICE_EXPORT_DECISION_TRACE, _export,
+        schema=EXPORT_DECISION_TRACE_SCHEMA, **extra,
+    )
+
+
+async def _async_warm_start(hass, config: dict, now: datetime) -> tuple:
+    """Open the warm-restart store; return ``(store, state)``.
+
+    ``state`` is None unless a snapshot exists that was saved at most
+    ``warm_restart_max_age_seconds`` before ``now``; its last output is then
+    written to TOTAL_POWER right away, so the register is correct before the
+    Modbus server answers its first poll.  Both are None when warm restart
+    is disabled (max age 0) or HA storage is unavailable.
+    """
+    max_age = config.get("warm_restart_max_age_seconds", 300)
+    if max_age <= 0:
+        return None, None
+    try:
+        from homeassistant.helpers.storage import Store
+    except ImportError:
+        _LOGGER.debug("Warm restart skipped (standalone mode)")
+        return None, None
+    store = Store(hass, ENGINE_STATE_VERSION, f"{DOMAIN}.warm_state")
+    data = await store.async_load()
+    if not data:
+        return store, None
+    try:
+        age = now.timestamp() - float(data["saved_at"])
+        reported_kw = float(data["reported_kw"])
+    except (KeyError, TypeError, ValueError):
+        _LOGGER.warning("SDM630 warm restart: unreadable snapshot ignored")
+        return store, None
+    if not 0 <= age <= max_age:
+        _LOGGER.info("SDM630 warm restart: snapshot is %.0fs old — cold start", age)
+        return store, None
+    _LOGGER.info(
+        "SDM630 warm restart: resuming state saved %.0fs ago (%.2f kW)", age, reported_kw,
+    )
+    input_data_block.set_float(TOTAL_POWER, reported_kw)
+    return store, data
+
+
+def _write_text(path: str, text: str) -> None:
+    with open(path, "w", encoding="utf-8", newline="") as fp:
+        fp.write(text)
+
+
+async def _async_start_modbus_process(hass, server) -> None:
+    """Spawn the server process, forward its polls, restart it and stop it with HA."""
+    from homeassistant.const import EVENT_HOMEASSISTANT_STOP
+
+    await hass.async_add_executor_job(server.start)
+
+    @callback
+    def _check(now) -> None:
+        server.dispatch_polls()
+        if server.restart_due():
+            hass.async_add_executor_job(server.start)
+
+    cancel_polls = async_track_time_interval(hass, _check, POLL_DISPATCH_INTERVAL)
+
+    async def _stop(event) -> None:
+        cancel_polls()
+        await hass.async_add_executor_job(server.stop)
+
+    hass.bus.async_listen_once(EVENT_HOMEASSISTANT_STOP, _stop)
+
+
+async def _async_start_modbus_thread(hass, server) -> None:
+    """Run the serial server on its own loop and thread; stop it with HA."""
+    from homeassistant.const import EVENT_HOMEASSISTANT_STOP
+    from .modbus_server import start_modbus_server
+    from .modbus_thread import ModbusThread
+
+    thread = ModbusThread()
+    thread.start(start_modbus_server(server))
+
+    async def _stop(event) -> None:
+        await hass.async_add_executor_job(thread.stop)
+
+    hass.bus.async_listen_once(EVENT_HOMEASSISTANT_STOP, _stop)
+
+
 async def async_setup_platform(hass, config, async_add_entities, discovery_info=None):
     """Set up the SDM630 simulated sensor."""
     # The component config (with entities, thresholds etc.) is stored in
@@ -175,22 +361,38 @@ async def async_setup_platform(hass, config, async_add_entities, discovery_info=
     # flooding logs with Growatt (unit=0x1) frame traffic.
     logging.getLogger("pymodbus.logging").addFilter(_SimulatorOnlyFilter())
 
-    # Patch ModbusProtocol to suppress TX echo on RS485 server connections.
-    # Must be called before start_modbus_server() creates any protocol instance.
-    _apply_modbus_echo_patch()
+    modbus_mode = component_cfg.get("modbus_server_mode", "loop")
+    server = _load_modbus_server(modbus_mode)
 
     name = component_cfg.get(CONF_NAME, DEFAULT_NAME)
-    hass.loop.create_task(start_modbus_server())
+    # Warm restart: the register holds the last output before the first poll.
+    warm_store, warm_state = await _async_warm_start(hass, component_cfg, dt_util.utcnow())
+    if modbus_mode == "process":
+        await _async_start_modbus_process(hass, server)
+    elif modbus_mode == "thread":
+        await _async_start_modbus_thread(hass, server)
+    else:
+        from .modbus_server import start_modbus_server
+        hass.loop.create_task(start_modbus_server(server))
+    metrics_port = component_cfg.get("metrics_port", 0)
+    if metrics_port:
+        hass.loop.create_task(serve_metrics(metrics_port))
 
     raw_surplus_sensor = SDM630RawSurplusSensor()
     reported_surplus_sensor = SDM630ReportedSurplusSensor()
     poll_warning_sensor = SDM630WallboxPollWarningSensor()
     wallbox_last_poll_sensor = SDM630WallboxLastPollSensor()
     wallbox_last_poll_sensor.set_warning_sensor(poll_warning_sensor)
-    input_data_block.set_poll_callback(wallbox_last_poll_sensor.on_poll)
+    on_poll = wallbox_last_poll_sensor.on_poll
+    if modbus_mode == "thread":     # reads arrive on the I/O thread
+        from .modbus_thread import PollForwarder
+        on_poll = PollForwarder(hass.loop, on_poll)
+    input_data_block.set_poll_callback(on_poll)
 
     sensor = SDM630SimSensor(name, hass, component_cfg)
     sensor.set_surplus_sensors(raw_surplus_sensor, reported_surplus_sensor)
+    sensor.set_warm_state(warm_store, warm_state)
+    _register_trace_service(hass, sensor.decision_trace)
 
     async_add_entities([
         sensor,
@@ -343,8 +545,11 @@ class SDM630WallboxPollWarningSensor(BinarySensorEntity):
 
 
 class SDM630SimSensor(SensorEntity):
-    def __init__(self, name, hass, config):
-        """Initialize the sensor."""
+    def __init__(self, name, hass, config, clock=None):
+        """Initialize the sensor.
+
+        ``clock`` replaces ``dt_util.utcnow`` (virtual time for headless runs).
+        """
         self._attr_name = name
         self._attr_native_value = None
         self._attr_native_unit_of_measurement = "Watt"
@@ -352,16 +557,96 @@ class SDM630SimSensor(SensorEntity):
         self._attr_should_poll = False
         self.hass = hass
         self._config = config
-        self._sensor_cache: dict[str, tuple[float, datetime | None, bool]] = {}
+        self._stale_threshold_s: float = config.get("stale_threshold_seconds", 60)
+        self._sensor_cache = SensorCache(STALENESS_SLOTS, self._stale_threshold_s)
+        self._stale_timer = None                # asyncio.TimerHandle | None
+        self._state_reports: bool = False       # liveness from state_reported events
         self._engine: SurplusEngine | None = None
         self._first_tick: bool = True
         self._entity_to_cache_key: dict[str, str] = {}
         self._cache_key_to_entity: dict[str, str] = {}
         self._failsafe_reason_logged: str | None = None
-        self._invalidation_reasons: dict[str, str] = {}
         self._raw_surplus_sensor: SDM630RawSurplusSensor | None = None
         self._reported_surplus_sensor: SDM630ReportedSurplusSensor | None = None
         self._entity_to_register: dict[str, int] = {}
+        self._clock = clock
+        # Per-role smoothing applied before values enter the cache (input_filters)
+        self._input_filters: dict = {
+            ENTITY_ROLE_TO_CACHE_KEY[role]: flt
+            for role, flt in build_input_filters(config).items()
+        }
+        # Event-driven fast-reaction path (0 = disabled, periodic tick only)
+        self._fast_reaction_s: float = config.get("fast_reaction_ms", 0) / 1000.0
+        self._fast_eval_handle = None           # asyncio.TimerHandle | None
+        self._fast_trigger_ts: float = 0.0      # perf_counter() of first coalesced event
+        self._sun_times: tuple[datetime | None, datetime | None] = (None, None)
+        self._snapshot: SensorSnapshot | None = None  # refilled in place every tick
+        self.fast_evaluations: int = 0
+        self.last_fast_latency_ms: float | None = None
+        self.max_fast_latency_ms: float = 0.0
+        # Adaptive evaluation interval (None = fixed interval, evaluate every tick)
+        self._scheduler: AdaptiveScheduler | None = (
+            AdaptiveScheduler(config) if config.get("adaptive_interval", False) else None
+        )
+        self._wake_grid_w: float = config.get("adaptive_wake_grid_w", 300)
+        self._next_eval_due: datetime | None = None
+        self._adaptive_mode: str = "fast"
+        self.adaptive_skipped_ticks: int = 0
+        # Derived meter registers (energy counters), persisted across restarts
+        self._meter = MeterModel(config)
+        self._energy_store = None               # homeassistant.helpers.storage.Store | None
+        self._energy_save_due: datetime | None = None
+        # Warm restart (see set_warm_state): store, snapshot to resume, save cadence
+        self._warm_store = None                 # homeassistant.helpers.storage.Store | None
+        self._warm_state: dict | None = None
+        self._warm_save_due: datetime | None = None
+        self._last_reported_kw: float = 0.0
+        # Change-only / deadband / heartbeat state writes (publish_policies)
+        self._publish = build_publish_policies(config)
+        # Last evaluations as packed records, exported on demand
+        self.decision_trace = DecisionTrace(config.get("decision_trace_size", 1440))
+        # Scrape-time metrics and engine phase timing (metrics_port 0 = off)
+        self._metrics_enabled: bool = config.get("metrics_port", 0) > 0
+        # Per-phase tick timing: attributes with tick_profiling, metrics sink with metrics_port
+        self._tick_profiling: bool = config.get("tick_profiling", False)
+        self._profiler: TickProfiler | None = (
+            TickProfiler(
+                config.get("tick_budget_ms", 50),
+                sink=observe_phase_ns if self._metrics_enabled else None,
+            )
+            if self._tick_profiling or self._metrics_enabled else None
+        )
+
+    @property
+    def extra_state_attributes(self) -> dict | None:
+        """Expose engine diagnostics (forecast cache, fast-reaction counters)."""
+        if self._engine is None:
+            return None
+        attrs = dict(self._engine.forecast_stats)
+        if self._fast_reaction_s > 0:
+            attrs["fast_evaluations"] = self.fast_evaluations
+            attrs["fast_last_latency_ms"] = self.last_fast_latency_ms
+            attrs["fast_max_latency_ms"] = self.max_fast_latency_ms
+        if self._scheduler is not None:
+            attrs["adaptive_mode"] = self._adaptive_mode
+            attrs["adaptive_skipped_ticks"] = self.adaptive_skipped_ticks
+        attrs["published_states"] = {n: p.published for n, p in self._publish.items()}
+        attrs["skipped_states"] = {n: p.skipped for n, p in self._publish.items()}
+        prof = self._profiler
+        if self._tick_profiling and prof is not None:
+            attrs["tick_last_ms"] = round(prof.last_ns / 1e6, 3)
+            attrs["tick_max_ms"] = round(prof.max_ns / 1e6, 3)
+            attrs["tick_over_budget"] = prof.over_budget
+            attrs["tick_profile"] = prof.summary()
+        return attrs
+
+    def _utcnow(self) -> datetime:
+        """Current UTC time from the injected clock, else from HA."""
+        return self._clock() if self._clock is not None else dt_util.utcnow()
+
+    def _monotonic(self) -> float:
+        """Sensor-cache time base: ``time.monotonic()``, or the injected clock."""
+        return self._clock().timestamp() if self._clock is not None else _time.monotonic()
 
     def set_surplus_sensors(
         self,
@@ -372,11 +657,24 @@ class SDM630SimSensor(SensorEntity):
         self._raw_surplus_sensor = raw_sensor
         self._reported_surplus_sensor = reported_sensor
 
+    def set_warm_state(self, store, state: dict | None) -> None:
+        """Attach the warm-restart store and the snapshot to resume (None = cold start)."""
+        self._warm_store = store
+        self._warm_state = state
+
     async def async_added_to_hass(self) -> None:
         """Run when entity about to be added to hass."""
         await super().async_added_to_hass()
 
-        self._engine = SurplusEngine(self._config)
+        self._engine = SurplusEngine(
+            self._config,
+            monotonic=None if self._clock is None else lambda: self._clock().timestamp(),
+        )
+        await self._async_restore_energy()
+        if self._profiler is not None:
+            self._engine.on_phase = self._profiler.record
+        if self._metrics_enabled:
+            self._register_metrics()
 
         entities_cfg = self._config.get(CONF_ENTITIES, {})
         self._entity_to_cache_key: dict[str, str] = {
@@ -395,20 +693,36 @@ class SDM630SimSensor(SensorEntity):
                     self.hass, numeric_entity_ids, self._handle_state_change
                 )
             )
+            if async_track_state_report_event is not None:
+                self.async_on_remove(
+                    async_track_state_report_event(
+                        self.hass, numeric_entity_ids, self._handle_state_report
+                    )
+                )
+                self._state_reports = True
+
+        # Warm restart: resume hysteresis, last output and readings; the live
+        # states seeded below take precedence over restored readings.
+        if self._warm_state is not None:
+            self._restore_warm_state(self._warm_state)
+            self._warm_state = None
 
         # Seed cache with current state of all tracked entities so that
         # sensors which already have a value at startup don't stay empty
         # until their next state_changed event.
+        now = self._monotonic()
         for entity_id, cache_key in self._entity_to_cache_key.items():
             state = self.hass.states.get(entity_id)
             if state is None or state.state in (STATE_UNAVAILABLE, STATE_UNKNOWN):
                 continue
             try:
-                self._sensor_cache[cache_key] = (
-                    float(state.state), state.last_updated, True
+                self._sensor_cache.set(
+                    CACHE_SLOT[cache_key], self._filtered(cache_key, float(state.state)), now
                 )
             except (ValueError, TypeError):
                 pass
+        self._arm_stale_timer()
+        self.async_on_remove(self._cancel_stale_timer)
 
         # Register mappings: subscribe entities and seed initial values.
         register_mappings: dict = self._config.get(CONF_REGISTER_MAPPINGS, {})
@@ -436,14 +750,60 @@ class SDM630SimSensor(SensorEntity):
                 if state is None or state.state in (STATE_UNAVAILABLE, STATE_UNKNOWN):
                     continue
                 try:
-                    input_data_block.set_float(address, float(state.state))
+                    value = float(state.state)
                 except (ValueError, TypeError):
-                    pass
+                    continue
+                input_data_block.set_float(address, value)
+                self._meter.set_input(address, value)
 
         interval = timedelta(seconds=self._config.get("evaluation_interval", 15))
         self.async_on_remove(
             async_track_time_interval(self.hass, self._evaluation_tick, interval)
         )
+        if self._fast_reaction_s > 0:
+            self.async_on_remove(self._cancel_fast_evaluation)
+
+    def _register_metrics(self) -> None:
+        """Expose scrape-time gauges for this sensor (tick phases arrive via the profiler)."""
+        engine = self._engine
+        assert engine is not None
+
+        def _lookups() -> dict:
+            stats = engine.forecast_stats
+            return {("hit",): stats["forecast_cache_hits"],
+                    ("miss",): stats["forecast_cache_misses"]}
+
+        def _hit_ratio() -> float | None:
+            hits, misses = _lookups().values()
+            return hits / (hits + misses) if hits + misses else None
+
+        metrics = (
+            CallbackGauge(
+                "sdm630_forecast_cache_hit_ratio",
+                "Share of forecast cache lookups served from the cache.",
+                _hit_ratio,
+            ),
+            CallbackCounter(
+                "sdm630_forecast_cache_lookups_total",
+                "Forecast cache lookups, by result.",
+                _lookups,
+                ("result",),
+            ),
+            CallbackCounter(
+                "sdm630_state_writes_skipped_total",
+                "HA state writes withheld by the publish policy, by entity.",
+                lambda: {(n,): p.skipped for n, p in self._publish.items()},
+                ("entity",),
+            ),
+        )
+        for metric in metrics:
+            METRICS.register(metric)
+
+        def _unregister() -> None:
+            for metric in metrics:
+                METRICS.unregister(metric.name)
+
+        self.async_on_remove(_unregister)
 
     @callback
     def _handle_state_change(self, event) -> None:
@@ -455,25 +815,122 @@ class SDM630SimSensor(SensorEntity):
         cache_key = self._entity_to_cache_key.get(entity_id)
         if cache_key is None:
             return
+        slot = CACHE_SLOT[cache_key]
         if new_state.state in (STATE_UNAVAILABLE, STATE_UNKNOWN):
-            last_val = self._sensor_cache.get(cache_key, (0.0, None, True))[0]
-            self._sensor_cache[cache_key] = (last_val, dt_util.utcnow(), False)
-            self._invalidation_reasons[cache_key] = f" = {new_state.state}"
+            self._sensor_cache.invalidate(slot, self._monotonic(), f" = {new_state.state}")
+            self._reset_filter(cache_key)
+            self._arm_stale_timer()
             return
         try:
-            self._sensor_cache[cache_key] = (
-                float(new_state.state), new_state.last_updated, True
-            )
-            self._invalidation_reasons.pop(cache_key, None)
+            value = self._filtered(cache_key, float(new_state.state))
+            self._sensor_cache.set(slot, value, self._monotonic())
+            self._arm_stale_timer()
+            if self._fast_reaction_s > 0 and cache_key in FAST_REACTION_KEYS:
+                self._schedule_fast_evaluation()
+            if (
+                cache_key == CACHE_KEY_POWER_FROM_GRID
+                and self._scheduler is not None
+                and value >= self._wake_grid_w
+            ):
+                self._wake_evaluation()
         except (ValueError, TypeError):
-            last_val = self._sensor_cache.get(cache_key, (0.0, None, True))[0]
-            self._sensor_cache[cache_key] = (last_val, dt_util.utcnow(), False)
-            self._invalidation_reasons[cache_key] = ": non-numeric value"
+            self._sensor_cache.invalidate(slot, self._monotonic(), ": non-numeric value")
+            self._reset_filter(cache_key)
+            self._arm_stale_timer()
             _LOGGER.debug(
                 "Cache invalidated for %s: non-numeric value '%s'",
                 entity_id, new_state.state,
             )
 
+    @callback
+    def _handle_state_report(self, event) -> None:
+        """Unchanged value re-written by its integration — the entity is alive.
+
+        HA fires ``state_reported`` instead of ``state_changed`` when a
+        value repeats; it refreshes the last-seen stamp only (the input
+        filters and fast reaction see changes, as before).
+        """
+        new_state = event.data.get("new_state")
+        if new_state is None:
+            return
+        cache_key = self._entity_to_cache_key.get(new_state.entity_id)
+        if cache_key is None:
+            return
+        self._sensor_cache.touch(CACHE_SLOT[cache_key], self._monotonic())
+        self._arm_stale_timer()
+
+    def _filtered(self, cache_key: str, value: float) -> float:
+        """Feed ``value`` through the role's input filter, if one is configured."""
+        flt = self._input_filters.get(cache_key)
+        return value if flt is None else flt.update(value)
+
+    def _reset_filter(self, cache_key: str) -> None:
+        """Drop filter history — samples from before an outage are not averaged in."""
+        flt = self._input_filters.get(cache_key)
+        if flt is not None:
+            flt.reset()
+
+    def _wake_evaluation(self) -> None:
+        """Grid-import spike: end any slow/night wait and evaluate now."""
+        if self._next_eval_due is None or self._first_tick:
+            return  # already due on the next tick
+        self._next_eval_due = None
+        self._adaptive_mode = "fast"
+        _LOGGER.debug("SDM630 adaptive: grid import spike — waking evaluation")
+        self.hass.loop.create_task(self._evaluation_tick(self._utcnow()))
+
+    def _schedule_fast_evaluation(self) -> None:
+        """Arm the debounce timer unless one is already pending.
+
+        The timer is not re-armed by later events, so a burst of updates
+        coalesces into one evaluation no later than ``fast_reaction_ms``
+        after its first event.
+        """
+        if self._fast_eval_handle is not None:
+            return
+        self._fast_trigger_ts = _time.perf_counter()
+        self._fast_eval_handle = self.hass.loop.call_later(
+            self._fast_reaction_s, self._fast_evaluation
+        )
+
+    def _cancel_fast_evaluation(self) -> None:
+        """Cancel a pending fast evaluation (entity removal)."""
+        if self._fast_eval_handle is not None:
+            self._fast_eval_handle.cancel()
+            self._fast_eval_handle = None
+
+    @callback
+    def _fast_evaluation(self) -> None:
+        """Debounced re-evaluation after a power change (fast-reaction mode).
+
+        Reuses forecast and sun times from the last periodic tick and runs
+        only the surplus calculation and hysteresis.  If a safety check
+        fails, a full tick is scheduled instead — it owns FAILSAFE handling.
+        """
+        self._fast_eval_handle = None
+        engine = self._engine
+        if engine is None or self._first_tick or self._failsafe_reason_logged is not None:
+            return  # no periodic tick yet, or FAILSAFE recovery pending
+
+        cache_valid, _reason = self._check_cache_validity()
+        if not cache_valid or self._validate_cache():
+            self.hass.loop.create_task(self._evaluation_tick(self._utcnow()))
+            return
+
+        sunset_time, sunrise_time = self._sun_times
+        snapshot = self._build_snapshot(self._utcnow(), sunset_time, sunrise_time)
+        result = engine.evaluate_fast(snapshot)
+        self._write_result(result)
+
+        latency_ms = (_time.perf_counter() - self._fast_trigger_ts) * 1000.0
+        self.fast_evaluations += 1
+        self.last_fast_latency_ms = round(latency_ms, 1)
+        self.max_fast_latency_ms = max(self.max_fast_latency_ms, self.last_fast_latency_ms)
+        _LOGGER.debug(
+            "SDM630 fast eval: reported=%.2fkW state=%s latency=%.1fms",
+            result.reported_kw, result.charging_state, latency_ms,
+        )
+
     @callback
     def _handle_register_mapping_change(self, event) -> None:
         """Write a mapped entity's new value directly to its Modbus register."""
@@ -484,77 +941,129 @@ class SDM630SimSensor(SensorEntity):
         if address is None:
             return
         try:
-            input_data_block.set_float(address, float(new_state.state))
+            value = float(new_state.state)
+            input_data_block.set_float(address, value)
+            self._meter.set_input(address, value)  # live phase voltage → phase synthesis
         except (ValueError, TypeError):
             _LOGGER.debug(
                 "register_mappings: non-numeric value %r from %s — skipped",
                 new_state.state, new_state.entity_id,
             )
 
-    def _refresh_cache_timestamps(self) -> None:
-        """Refresh cache timestamps from HA state registry.
+    def _arm_stale_timer(self) -> None:
+        """Wake up when the earliest staleness deadline passes.
 
-        Home Assistant may not fire state_changed events when an entity's
-        value stays unchanged between integration polls.  This causes the
-        cached timestamp to go stale even though the sensor is still alive.
-        If HA still reports the entity as available (not unavailable/unknown),
-        the sensor is considered alive and the staleness timer is reset to now.
+        One loop timer for all sensors, armed only while none is pending;
+        ``call_at`` takes loop time, which is ``time.monotonic()`` — the
+        cache time base.
         """
-        now = dt_util.utcnow()
-        for entity_id, cache_key in self._entity_to_cache_key.items():
-            entry = self._sensor_cache.get(cache_key)
-            if entry is None:
-                continue
-            state = self.hass.states.get(entity_id)
-            if state is None or state.state in (STATE_UNAVAILABLE, STATE_UNKNOWN):
-                continue
-            value, _cached_ts, is_valid = entry
-            if is_valid:
-                self._sensor_cache[cache_key] = (value, now, is_valid)
+        if self._stale_timer is not None:
+            return
+        deadline = self._sensor_cache.next_deadline
+        if deadline != math.inf:
+            self._stale_timer = self.hass.loop.call_at(
+                deadline + STALE_DEADLINE_SLACK_S, self._stale_deadline
+            )
+
+    def _cancel_stale_timer(self) -> None:
+        """Cancel the pending staleness deadline (entity removal)."""
+        if self._stale_timer is not None:
+            self._stale_timer.cancel()
+            self._stale_timer = None
+
+    @callback
+    def _stale_deadline(self) -> None:
+        """A staleness deadline passed — fail safe now, not at the next tick."""
+        self._stale_timer = None
+        if self._expire_stale(self._monotonic()) and self._engine is not None:
+            self.hass.loop.create_task(self._evaluation_tick(self._utcnow()))
+        self._arm_stale_timer()
+
+    def _expire_stale(self, now: float) -> bool:
+        """Expire passed deadlines; True if a critical sensor went stale.
+
+        With ``state_reported`` events every write reaches the cache, so an
+        expired deadline means the integration really went silent.
+        """
+        cache = self._sensor_cache
+        went_stale = False
+        for slot in cache.expire(now):
+            if not self._state_reports:
+                self._confirm_liveness(slot, now)
+            went_stale = went_stale or bool(cache.stale[slot])
+        return went_stale
+
+    def _confirm_liveness(self, slot: int, now: float) -> None:
+        """Compatibility fallback for HA without ``state_reported`` events.
+
+        Home Assistant does not fire state_changed events when an entity's
+        value stays unchanged between integration polls.  The state's
+        ``last_reported`` gives the true last-seen time where HA has it;
+        older versions only tell us the entity is available, which then
+        counts as alive.  Consulted once per threshold period of silence,
+        never on the regular tick.
+        """
+        state = self.hass.states.get(self._cache_key_to_entity.get(CACHE_KEYS[slot], ""))
+        if state is None or state.state in (STATE_UNAVAILABLE, STATE_UNKNOWN):
+            return
+        last_reported = getattr(state, "last_reported", None)
+        if last_reported is None:
+            self._sensor_cache.touch(slot, now)
+            return
+        seen = now - (self._utcnow() - last_reported).total_seconds()
+        if now - seen <= self._stale_threshold_s:
+            self._sensor_cache.touch(slot, seen)
 
     def _check_staleness(self) -> str:
         """Check critical sensor cache entries for staleness (Story 4.2).
 
         Returns a non-empty reason string and triggers FAILSAFE if any critical
-        sensor's last_updated timestamp exceeds stale_threshold_seconds.
+        sensor's cache stamp is older than stale_threshold_seconds.
         Returns empty string if all critical sensors are fresh.
-        Sensors absent from _cache_key_to_entity or with None timestamps are
-        silently skipped (startup grace — AC4, AC5).
+        Slots without a stamp are never armed (startup grace — AC4);
+        unconfigured sensors never receive one (AC5).  A healthy tick is a
+        single deadline comparison.
         """
         engine = self._engine
         assert engine is not None
-        threshold: int = self._config.get("stale_threshold_seconds", 60)
-        now = dt_util.utcnow()
-        critical_keys = (CACHE_KEY_SOC, CACHE_KEY_PV_PRODUCTION, CACHE_KEY_POWER_TO_USER)
-
-        for cache_key in critical_keys:
-            entity_id = self._cache_key_to_entity.get(cache_key)
-            if entity_id is None:
-                continue  # not configured — AC5
-
-            entry = self._sensor_cache.get(cache_key)
-            if entry is None:
-                continue  # not in cache yet — startup grace
-
-            _value, last_changed, _is_valid = entry
-            if last_changed is None:
-                continue  # explicit startup grace sentinel — AC4
-
-            elapsed = (now - last_changed).total_seconds()
-            if elapsed > threshold:  # strict > — AC3
-                reason = f"{entity_id} stale for {int(elapsed)}s"
-                _LOGGER.warning(
-                    "SDM630 FAIL-SAFE: %s stale for %ds. Reporting 0 kW.",
-                    entity_id,
-                    int(elapsed),
-                )
-                engine.hysteresis_filter.force_failsafe(reason)
-                return reason
-
-        return ""
+        cache = self._sensor_cache
+        now = self._monotonic()
+        if cache.next_deadline < now:   # tick ran ahead of the deadline timer
+            self._expire_stale(now)
+            self._arm_stale_timer()
+        if not cache.stale_count:
+            return ""
+        slot = cache.first_stale(STALENESS_SLOTS)
+
+        entity_id = self._cache_key_to_entity.get(CACHE_KEYS[slot], CACHE_KEYS[slot])
+        elapsed = now - cache.stamps[slot]
+        reason = f"{entity_id} stale for {int(elapsed)}s"
+        _LOGGER.warning(
+            "SDM630 FAIL-SAFE: %s stale for %ds. Reporting 0 kW.",
+            entity_id,
+            int(elapsed),
+        )
+        engine.hysteresis_filter.force_failsafe(reason)
+        return reason
 
     async def _evaluation_tick(self, now) -> None:
         """Called by async_track_time_interval at each evaluation cycle."""
+        prof = self._profiler
+        if prof is None:
+            await self._run_tick(now, _no_mark)
+            return
+        prof.start()
+        try:
+            await self._run_tick(now, prof.mark)
+        finally:
+            if prof.finish():
+                _LOGGER.warning(
+                    "SDM630 evaluation tick took %.1f ms (budget %.0f ms): %s",
+                    prof.last_ns / 1e6, prof.budget_ns / 1e6, prof.breakdown(),
+                )
+
+    async def _run_tick(self, now, mark) -> None:
+        """One evaluation cycle; ``mark(phase)`` closes each timed phase."""
         engine = self._engine
         assert engine is not None
         if self._first_tick:
@@ -566,36 +1075,29 @@ class SDM630SimSensor(SensorEntity):
             )
             self._first_tick = False
 
-        # Refresh cache timestamps from HA state registry so that sensors
-        # whose value is unchanged (no state_changed event) are not falsely
-        # reported as stale.
-        self._refresh_cache_timestamps()
-
         # Story 4.2: staleness detection (force_failsafe called internally if stale)
         stale_reason = self._check_staleness()
+        mark("staleness")
 
         # Story 4.1: sensor-unavailability fail-safe guard (skip if already stale)
         if stale_reason:
-            failsafe_reason = stale_reason
+            failsafe_reason, category = stale_reason, "stale"
         else:
             cache_valid, validity_reason = self._check_cache_validity()
             if not cache_valid:
                 engine.hysteresis_filter.force_failsafe(validity_reason)
-                failsafe_reason = validity_reason
+                failsafe_reason, category = validity_reason, "unavailable"
             else:
                 failsafe_reason = ""
+            mark("validity")
 
         if failsafe_reason:
-            if self._failsafe_reason_logged != failsafe_reason:
-                _LOGGER.warning("SDM630 FAIL-SAFE: %s. Reporting 0 kW.", failsafe_reason)
-                self._failsafe_reason_logged = failsafe_reason
-            else:
-                _LOGGER.debug("SDM630 FAIL-SAFE (ongoing): %s", failsafe_reason)
+            self._log_failsafe(failsafe_reason, category)
             result = EvaluationResult(
                 reported_kw=0.0,
                 real_surplus_kw=0.0,
                 buffer_used_kw=0.0,
-                soc_percent=self._sensor_cache.get(CACHE_KEY_SOC, (0.0,))[0],
+                soc_percent=self._sensor_cache.values[SLOT_SOC],
                 soc_floor_active=SOC_HARD_FLOOR,
                 charging_state="FAILSAFE",
                 reason=failsafe_reason,
@@ -609,28 +1111,27 @@ class SDM630SimSensor(SensorEntity):
                 result.reason, result.forecast_available,
             )
             self._write_result(result)
+            mark("writes")
             return
 
         # Story 4.4: value range validation (runs only when unavailability/staleness checks pass)
         range_fail = self._validate_cache()
+        mark("range")
         if range_fail:
             engine.hysteresis_filter.force_failsafe(range_fail)
-            if self._failsafe_reason_logged != range_fail:
-                _LOGGER.warning("SDM630 FAIL-SAFE: %s. Reporting 0 kW.", range_fail)
-                self._failsafe_reason_logged = range_fail
-            else:
-                _LOGGER.debug("SDM630 FAIL-SAFE (ongoing): %s", range_fail)
+            self._log_failsafe(range_fail, "out_of_range")
             result = EvaluationResult(
                 reported_kw=0.0,
                 real_surplus_kw=0.0,
                 buffer_used_kw=0.0,
-                soc_percent=self._sensor_cache.get(CACHE_KEY_SOC, (0.0,))[0],
+                soc_percent=self._sensor_cache.values[SLOT_SOC],
                 soc_floor_active=SOC_HARD_FLOOR,
                 charging_state="FAILSAFE",
                 reason=range_fail,
                 forecast_available=False,
             )
             self._write_result(result)
+            mark("writes")
             return
 
         # Recovery: staleness, validity, and range checks all passed
@@ -638,7 +1139,71 @@ class SDM630SimSensor(SensorEntity):
             engine.hysteresis_filter.resume()
             _LOGGER.info("SDM630 recovered from FAILSAFE. Resuming normal evaluation.")
             self._failsafe_reason_logged = None
+            self._next_eval_due = None
+
+        # Adaptive scheduling: safety checks above run on every tick; the
+        # evaluation itself only when the scheduler says it is due.
+        if self._next_eval_due is not None and now < self._next_eval_due:
+            self.adaptive_skipped_ticks += 1
+            return
+
+        # Sun times only feed the strategic stage — re-read them when it is due.
+        if engine.strategy_due(now):
+            self._sun_times = self._read_sun_times()
+        mark("sun")
+        sunset_time, sunrise_time = self._sun_times
+        snapshot = self._build_snapshot(now, sunset_time, sunrise_time)
+        mark("snapshot")
+
+        # Night idle: no forecast fetching while nothing can change.
+        was_night_idle = self._adaptive_mode == "night"
+        result = await engine.evaluate_cycle(
+            snapshot, hass=None if was_night_idle else self.hass
+        )
+        if self._profiler is not None:
+            self._profiler.skip()  # engine phases were reported through on_phase
+        if self._scheduler is not None:
+            delay_s, self._adaptive_mode = self._scheduler.next_interval(
+                result, snapshot, engine.hysteresis_filter.hold_until
+            )
+            self._next_eval_due = now + timedelta(seconds=delay_s)
+
+        # Story 1.4: structured decision log
+        _LOGGER.debug(
+            "SDM630 Eval: surplus=%.2fkW buffer=%.2fkW SOC=%d%% floor=%d%% "
+            "state=%s reported=%.2fkW reason=%s forecast=%s",
+            result.real_surplus_kw, result.buffer_used_kw, result.soc_percent,
+            result.soc_floor_active, result.charging_state, result.reported_kw,
+            result.reason, result.forecast_available,
+        )
+        if result.pv_trend_w_per_min is not None:
+            _LOGGER.debug(
+                "SDM630 Nowcast: pv=%.0fW trend=%+.0fW/min nowcast=%.0fW",
+                snapshot.pv_production_w, result.pv_trend_w_per_min, result.pv_nowcast_w,
+            )
+        if result.charging_state == "FAILSAFE":
+            _LOGGER.warning("SDM630 FAIL-SAFE: %s. Reporting 0 kW.", result.reason)
 
+        # Night idle: keep the register current but stop HA state writes
+        # once the idle result has been published.
+        self._write_result(
+            result,
+            publish=not (was_night_idle and self._adaptive_mode == "night"),
+        )
+        mark("writes")
+
+    def _log_failsafe(self, reason: str, category: str) -> None:
+        """Warn once per FAILSAFE reason; count entries into FAILSAFE by category."""
+        if self._failsafe_reason_logged == reason:
+            _LOGGER.debug("SDM630 FAIL-SAFE (ongoing): %s", reason)
+            return
+        _LOGGER.warning("SDM630 FAIL-SAFE: %s. Reporting 0 kW.", reason)
+        if self._failsafe_reason_logged is None:
+            FAILSAFE_ENTRIES.inc((category,))
+        self._failsafe_reason_logged = reason
+
+    def _read_sun_times(self) -> tuple[datetime | None, datetime | None]:
+        """Return (sunset, sunrise) from sun.sun, with optional sunset entity override."""
         sunset_time = None
         sunrise_time = None
         # sun.sun provides both times; always read it for sunrise + sunset fallback
@@ -665,32 +1230,34 @@ class SDM630SimSensor(SensorEntity):
             else:
                 _LOGGER.debug("sunset entity %s unavailable — keeping sun.sun value", sunset_entity)
 
-        snapshot = SensorSnapshot(
-            soc_percent       = self._sensor_cache.get(CACHE_KEY_SOC, (0.0, None, False))[0],
-            power_to_grid_w   = self._sensor_cache.get(CACHE_KEY_POWER_TO_GRID, (0.0, None, False))[0],
-            pv_production_w   = self._sensor_cache.get(CACHE_KEY_PV_PRODUCTION, (0.0, None, False))[0],
-            power_to_user_w   = self._sensor_cache.get(CACHE_KEY_POWER_TO_USER, (0.0, None, False))[0],
-            power_from_grid_w = self._sensor_cache.get(CACHE_KEY_POWER_FROM_GRID, (0.0, None, False))[0],
+        return sunset_time, sunrise_time
+
+    def _build_snapshot(
+        self,
+        now: datetime,
+        sunset_time: datetime | None,
+        sunrise_time: datetime | None,
+    ) -> SensorSnapshot:
+        """Refill the reused SensorSnapshot from the current sensor cache.
+
+        One instance lives for the lifetime of the sensor; the engine consumes
+        it synchronously and keeps no reference past the evaluation.
+        """
+        snapshot = self._snapshot
+        if snapshot is None:
+            snapshot = self._snapshot = SensorSnapshot(0.0, 0.0, 0.0, 0.0, now, None, None)
+        values = self._sensor_cache.values
+        return snapshot.reset(
+            soc_percent       = values[SLOT_SOC],
+            power_to_grid_w   = values[CACHE_SLOT[CACHE_KEY_POWER_TO_GRID]],
+            pv_production_w   = values[CACHE_SLOT[CACHE_KEY_PV_PRODUCTION]],
+            power_to_user_w   = values[CACHE_SLOT[CACHE_KEY_POWER_TO_USER]],
+            power_from_grid_w = values[CACHE_SLOT[CACHE_KEY_POWER_FROM_GRID]],
             timestamp         = now,
             sunset_time       = sunset_time,
             sunrise_time      = sunrise_time,
         )
 
-        result = await engine.evaluate_cycle(snapshot, hass=self.hass)
-
-        # Story 1.4: structured decision log
-        _LOGGER.debug(
-            "SDM630 Eval: surplus=%.2fkW buffer=%.2fkW SOC=%d%% floor=%d%% "
-            "state=%s reported=%.2fkW reason=%s forecast=%s",
-            result.real_surplus_kw, result.buffer_used_kw, result.soc_percent,
-            result.soc_floor_active, result.charging_state, result.reported_kw,
-            result.reason, result.forecast_available,
-        )
-        if result.charging_state == "FAILSAFE":
-            _LOGGER.warning("SDM630 FAIL-SAFE: %s. Reporting 0 kW.", result.reason)
-
-        self._write_result(result)
-
     def _validate_cache(self) -> "str | None":
         """Validate cache values are within plausible ranges (Story 4.4).
 
@@ -699,22 +1266,17 @@ class SDM630SimSensor(SensorEntity):
         (valid=False) — Story 4.1 handles those independently (AC7).
         """
         ranges = self._config.get("sensor_ranges", DEFAULTS["sensor_ranges"])
-        checks = [
-            (CACHE_KEY_SOC,           "soc"),
-            (CACHE_KEY_POWER_TO_GRID, "power_w"),
-            (CACHE_KEY_PV_PRODUCTION, "power_w"),
-            (CACHE_KEY_POWER_TO_USER, "power_w"),
-        ]
-        for cache_key, range_key in checks:
-            entry = self._sensor_cache.get(cache_key)
-            if entry is None or not entry[2]:  # missing or valid=False: defer to Story 4.1
+        cache = self._sensor_cache
+        for slot, range_key in RANGE_CHECKS:
+            if not cache.valid[slot]:  # missing or invalid: defer to Story 4.1
                 continue
             rng = ranges.get(range_key)
             if rng is None:
                 continue
             min_val, max_val = rng
-            value = entry[0]
+            value = cache.values[slot]
             if not (min_val <= value <= max_val):
+                cache_key = CACHE_KEYS[slot]
                 entity_id = self._cache_key_to_entity.get(cache_key, cache_key)
                 return (
                     f"{entity_id}: value {value} out of range [{min_val}, {max_val}]"
@@ -723,43 +1285,161 @@ class SDM630SimSensor(SensorEntity):
 
     def _check_cache_validity(self) -> tuple[bool, str]:
         """Return (is_valid, reason). FAILSAFE reason set if any required entry is missing or invalid."""
-        required_keys = [
-            CACHE_KEY_SOC,
-            CACHE_KEY_POWER_TO_GRID,
-            CACHE_KEY_PV_PRODUCTION,
-            CACHE_KEY_POWER_TO_USER,
-        ]
-        for cache_key in required_keys:
-            entry = self._sensor_cache.get(cache_key)
-            entity_id = self._cache_key_to_entity.get(cache_key, cache_key)
-            if entry is None:
-                return False, f"{entity_id}: no data received"
-            if not entry[2]:
-                reason_detail = self._invalidation_reasons.get(cache_key, " = unavailable")
-                return False, f"{entity_id}{reason_detail}"
-        return True, ""
-
-    def _write_result(self, result: EvaluationResult) -> None:
-        """Write evaluation result to Modbus register and HA state."""
-        input_data_block.set_float(TOTAL_POWER, result.reported_kw)
-        self._attr_native_value = result.reported_kw
-        self.async_write_ha_state()
-        self._update_surplus_sensors(result)
+        cache = self._sensor_cache
+        slot = cache.first_invalid(REQUIRED_SLOTS)
+        if slot < 0:
+            return True, ""
+        cache_key = CACHE_KEYS[slot]
+        entity_id = self._cache_key_to_entity.get(cache_key, cache_key)
+        if not cache.has_data(slot):
+            return False, f"{entity_id}: no data received"
+        return False, f"{entity_id}{cache.reasons[slot] or ' = unavailable'}"
+
+    def _write_result(self, result: EvaluationResult, publish: bool = True) -> None:
+        """Write evaluation result to Modbus register and HA state.
+
+        ``publish=False`` updates only the Modbus register (night idle).
+        """
+        now = self._utcnow()
+        self._write_registers(result.reported_kw, now)
+        self.decision_trace.append(now.timestamp(), self._sensor_cache.values, result)
+        self._schedule_energy_save(now)
+        self._schedule_warm_save(now)
+        if not publish:
+            return
+        mono = self._monotonic()
+        if self._publish["power"].should_publish(result.reported_kw * 1000, mono):
+            self._attr_native_value = result.reported_kw
+            self.async_write_ha_state()
+        self._update_surplus_sensors(result, mono)
+
+    def _write_registers(self, reported_kw: float, now: datetime) -> None:
+        """Write TOTAL_POWER and the meter registers derived from it."""
+        input_data_block.set_float(TOTAL_POWER, reported_kw)
+        self._last_reported_kw = reported_kw
+        # Demand Period is client-writable; re-sizing is a no-op unless it changed
+        self._meter.set_demand_period(holding_data_block.get_float(DEMAND_PERIOD))
+        derived = self._meter.update(now.timestamp(), reported_kw)
+        for address in self._entity_to_register.values():
+            derived.pop(address, None)          # mapped live values win over synthesis
+        input_data_block.set_floats(derived)
+
+    def _warm_state_dict(self) -> dict:
+        """Warm-restart snapshot; cache stamps are converted to epoch seconds."""
+        engine = self._engine
+        assert engine is not None
+        cache = self._sensor_cache
+        wall = self._utcnow().timestamp()
+        mono = self._monotonic()
+        return {
+            "saved_at": wall,
+            "reported_kw": self._last_reported_kw,
+            "engine": engine.to_dict(),
+            "cache": {
+                CACHE_KEYS[slot]: [cache.values[slot], wall - (mono - cache.stamps[slot])]
+                for slot in range(len(CACHE_KEYS))
+                if cache.valid[slot] and not math.isnan(cache.stamps[slot])
+            },
+            "counters": {
+                "fast_evaluations": self.fast_evaluations,
+                "adaptive_skipped_ticks": self.adaptive_skipped_ticks,
+                "published_states": {n: p.published for n, p in self._publish.items()},
+                "skipped_states": {n: p.skipped for n, p in self._publish.items()},
+            },
+        }
+
+    def _restore_warm_state(self, data: dict) -> None:
+        """Resume from a snapshot accepted by ``_async_warm_start``.
 
-    def _update_surplus_sensors(self, result: EvaluationResult) -> None:
-        """Push surplus values to dashboard sensors — non-blocking, fail-silent."""
+        Restored readings younger than ``warm_restart_max_age_seconds`` count
+        as fresh from now on, so the usual staleness timeout applies if their
+        source does not report again.
+        """
+        engine = self._engine
+        assert engine is not None
+        engine.restore(data.get("engine") or {})
+        max_age = self._config.get("warm_restart_max_age_seconds", 300)
+        now = self._utcnow()
+        mono = self._monotonic()
+        configured = set(self._entity_to_cache_key.values())
+        for key, entry in (data.get("cache") or {}).items():
+            try:
+                value, stamp = float(entry[0]), float(entry[1])
+            except (TypeError, ValueError, IndexError):
+                continue
+            if key in configured and now.timestamp() - stamp <= max_age:
+                self._sensor_cache.set(CACHE_SLOT[key], value, mono)
+        counters = data.get("counters") or {}
+        self.fast_evaluations = int(counters.get("fast_evaluations", 0))
+        self.adaptive_skipped_ticks = int(counters.get("adaptive_skipped_ticks", 0))
+        published = counters.get("published_states") or {}
+        skipped = counters.get("skipped_states") or {}
+        for name, policy in self._publish.items():
+            policy.published = int(published.get(name, 0))
+            policy.skipped = int(skipped.get(name, 0))
+        reported_kw = float(data["reported_kw"])
+        self._attr_native_value = reported_kw
+        self._write_registers(reported_kw, now)
+
+    def _schedule_warm_save(self, now: datetime) -> None:
+        """Keep one delayed snapshot save pending — Store flushes it on shutdown.
+
+        Store writes the whole snapshot to a temporary file and renames it
+        into place, so a crash mid-write leaves the previous snapshot intact.
+        """
+        if self._warm_store is None:
+            return
+        if self._warm_save_due is not None and now < self._warm_save_due:
+            return
+        self._warm_store.async_delay_save(
+            self._warm_state_dict, WARM_STATE_SAVE_INTERVAL.total_seconds()
+        )
+        self._warm_save_due = now + WARM_STATE_SAVE_INTERVAL
+
+    async def _async_restore_energy(self) -> None:
+        """Resume the energy counters and demand peaks from .storage."""
+        try:
+            from homeassistant.helpers.storage import Store
+        except ImportError:
+            _LOGGER.debug("Energy counter persistence skipped (standalone mode)")
+            return
+        self._energy_store = Store(self.hass, ENERGY_STATE_VERSION, f"{DOMAIN}.energy")
+        data = await self._energy_store.async_load()
+        if data:
+            self._meter.restore(data)
+
+    def _schedule_energy_save(self, now: datetime) -> None:
+        """Keep one delayed save pending — Store flushes it on shutdown too."""
+        if self._energy_store is None:
+            return
+        if self._energy_save_due is not None and now < self._energy_save_due:
+            return
+        self._energy_store.async_delay_save(
+            self._meter.to_dict, ENERGY_SAVE_INTERVAL.total_seconds()
+        )
+        self._energy_save_due = now + ENERGY_SAVE_INTERVAL
+
+    def _update_surplus_sensors(self, result: EvaluationResult, now: float) -> None:
+        """Push surplus values to dashboard sensors — non-blocking, fail-silent.
+
+        Each sensor is written only when its publish policy says so.
+        """
+        raw_w = result.real_surplus_kw * 1000
+        reported_w = result.reported_kw * 1000
         try:
-            if self._raw_surplus_sensor is not None:
-                self._raw_surplus_sensor.update_value(result.real_surplus_kw * 1000)
-            if self._reported_surplus_sensor is not None:
-                self._reported_surplus_sensor.update_value(result.reported_kw * 1000)
+            if (self._raw_surplus_sensor is not None
+                    and self._publish["raw_surplus"].should_publish(raw_w, now)):
+                self._raw_surplus_sensor.update_value(raw_w)
+            if (self._reported_surplus_sensor is not None
+                    and self._publish["reported_surplus"].should_publish(reported_w, now)):
+                self._reported_surplus_sensor.update_value(reported_w)
         except Exception:
             _LOGGER.warning("Failed to update surplus sensors", exc_info=True)
             return
         _LOGGER.debug(
             "SDM630 surplus sensors updated: raw=%.1fW reported=%.1fW",
-            result.real_surplus_kw * 1000,
-            result.reported_kw * 1000,
+            raw_w,
+            reported_w,
         )
 
 
@@ -6,11 +6,17 @@ hysteresis filtering, and forecast consumption.
 """
 from __future__ import annotations
 
+import asyncio
+import heapq
 import logging
 import math  # noqa: F401 – available for Story 2 logic
 import re
+import time
+from array import array
 from dataclasses import dataclass
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
+from enum import StrEnum
+from typing import Callable
 
 if __package__:
     from . import DEFAULTS  # access to defaults dict
@@ -19,6 +25,23 @@ _LOGGER = logging.getLogger(__name__)
 
 SOC_HARD_FLOOR: int = 50
 
+# Forecast cache: back-off after a failed refresh, and the age (in TTLs) after
+# which cached data is considered too old to serve at all.
+_FORECAST_RETRY_SECONDS: float = 60.0
+_FORECAST_MAX_STALE_FACTOR: int = 4
+
+# Batch API: charging_state codes (index into BATCH_STATES)
+BATCH_STATES: tuple[str, ...] = ("INACTIVE", "ACTIVE", "FAILSAFE")
+STATE_CODE_INACTIVE: int = 0
+STATE_CODE_ACTIVE: int = 1
+STATE_CODE_FAILSAFE: int = 2
+
+# Warm-restart snapshot format (SurplusEngine.to_dict / restore)
+ENGINE_STATE_VERSION: int = 1
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+_US_PER_S: int = 1_000_000
+
 # Cache key constants — map entity roles in sensor cache (used by sensor.py)
 CACHE_KEY_SOC               = "soc_percent"
 CACHE_KEY_POWER_TO_GRID     = "power_to_grid_w"
@@ -27,23 +50,55 @@ CACHE_KEY_POWER_TO_USER     = "power_to_user_w"
 CACHE_KEY_POWER_FROM_GRID   = "power_from_grid_w"
 CACHE_KEY_BATTERY_DISCHARGE = "battery_discharge_w"
 
+# SensorCache slot order — one slot per numeric input role
+CACHE_KEYS = (
+    CACHE_KEY_SOC,
+    CACHE_KEY_POWER_TO_GRID,
+    CACHE_KEY_PV_PRODUCTION,
+    CACHE_KEY_POWER_TO_USER,
+    CACHE_KEY_POWER_FROM_GRID,
+)
+CACHE_SLOT = {key: slot for slot, key in enumerate(CACHE_KEYS)}
+
+
+class Reason(StrEnum):
+    """Fixed decision reasons — interned singletons that compare equal to their text.
+
+    Composite reasons (``<code>|<forecast_tag>``) are formatted once per
+    strategy run, and ``near_sunset(<N>min)`` once per minute; nothing is
+    formatted per tick unless it is logged.
+    """
+
+    WALLBOX_INCLUDED = "wallbox_included_in_load"
+    SURPLUS_BELOW_THRESHOLD = "surplus_below_threshold"
+    NEAR_SUNSET = "near_sunset"
+    HARD_FLOOR = "SOC below hard floor"
+    FAILSAFE_ACTIVE = "failsafe_active"
+    HYSTERESIS_HOLD = "hysteresis_hold_or_inactive"
+
 
 # ---------------------------------------------------------------------------
 # Dataclasses
 # ---------------------------------------------------------------------------
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class ForecastData:
-    """Solar/weather forecast stub — fully implemented in Epic 3."""
+    """Solar/weather forecast — immutable, so the "no forecast" default is shared."""
 
     forecast_available: bool = False
     cloud_coverage_avg: float = 50.0
     solar_forecast_kwh_remaining: float | None = None
 
 
-@dataclass
+_NO_FORECAST = ForecastData()
+
+
+@dataclass(slots=True)
 class SensorSnapshot:
-    """Point-in-time reading of all relevant HA sensors."""
+    """Point-in-time reading of all relevant HA sensors.
+
+    The sensor refills one instance in place every tick (see ``reset``).
+    """
 
     soc_percent: float
     power_to_grid_w: float
@@ -54,9 +109,34 @@ class SensorSnapshot:
     sunrise_time: datetime | None
     power_from_grid_w: float = 0.0
     forecast: ForecastData | None = None
-
-
-@dataclass
+    pv_nowcast_w: float | None = None     # PV expected at the nowcast horizon (None = unused)
+
+    def reset(
+        self,
+        soc_percent: float,
+        power_to_grid_w: float,
+        pv_production_w: float,
+        power_to_user_w: float,
+        power_from_grid_w: float,
+        timestamp: datetime,
+        sunset_time: datetime | None,
+        sunrise_time: datetime | None,
+    ) -> "SensorSnapshot":
+        """Refill in place for a new tick; per-cycle outputs are cleared."""
+        self.soc_percent = soc_percent
+        self.power_to_grid_w = power_to_grid_w
+        self.pv_production_w = pv_production_w
+        self.power_to_user_w = power_to_user_w
+        self.power_from_grid_w = power_from_grid_w
+        self.timestamp = timestamp
+        self.sunset_time = sunset_time
+        self.sunrise_time = sunrise_time
+        self.forecast = None
+        self.pv_nowcast_w = None
+        return self
+
+
+@dataclass(slots=True)
 class EvaluationResult:
     """Output of a single surplus evaluation cycle."""
 
@@ -68,6 +148,78 @@ class EvaluationResult:
     charging_state: str        # "ACTIVE" | "INACTIVE" | "FAILSAFE"
     reason: str                # human-readable one-liner for log
     forecast_available: bool
+    pv_nowcast_w: float | None = None        # PV nowcast at the horizon (None = not enough samples)
+    pv_trend_w_per_min: float | None = None  # fitted PV ramp rate
+
+
+@dataclass(slots=True)
+class BatchResult:
+    """Column-wise output of ``SurplusCalculator.calculate_surplus_batch``.
+
+    All fields are NumPy arrays of equal length; ``charging_state`` holds
+    indices into ``BATCH_STATES``.
+    """
+
+    reported_kw: "np.ndarray"
+    real_surplus_kw: "np.ndarray"
+    buffer_used_kw: "np.ndarray"
+    buffer_kw_max: "np.ndarray"              # battery buffer limit at the row's SOC and floor
+    soc_floor_active: "np.ndarray"
+    charging_state: "np.ndarray"
+
+
+@dataclass(frozen=True, slots=True)
+class StrategicState:
+    """Cached output of the slow strategic stage (SOC floor + forecast)."""
+
+    soc_floor: int
+    forecast_tag: str
+    forecast_available: bool
+    reason_active: str         # pre-formatted reason strings for the fast stage
+    reason_inactive: str
+
+
+# ---------------------------------------------------------------------------
+# Batch helpers (NumPy imported lazily — only the batch API needs it)
+# ---------------------------------------------------------------------------
+
+def _to_epoch_us(values, n: int | None = None):
+    """Convert timestamps to (int64 µs since epoch, valid mask) arrays.
+
+    Accepts ``datetime64`` arrays, float/int epoch seconds (NaN = missing),
+    or sequences of ``datetime``/``None``.  Naive datetimes are taken as UTC,
+    matching the UTC ``now`` HA passes to the evaluation tick.
+    """
+    import numpy as np
+
+    if values is None:
+        return np.zeros(n or 0, dtype=np.int64), np.zeros(n or 0, dtype=bool)
+    arr = np.asarray(values)
+    if arr.dtype.kind == "M":
+        valid = ~np.isnat(arr)
+        us = arr.astype("datetime64[us]").astype(np.int64)
+        return np.where(valid, us, 0), valid
+    if arr.dtype.kind in "fiu":
+        f = arr.astype(np.float64)
+        valid = ~np.isnan(f)
+        us = np.round(np.where(valid, f, 0.0) * _US_PER_S).astype(np.int64)
+        return us, valid
+    one_us = timedelta(microseconds=1)
+    us = np.zeros(len(arr), dtype=np.int64)
+    valid = np.zeros(len(arr), dtype=bool)
+    for i, v in enumerate(arr):
+        if v is None:
+            continue
+        if v.tzinfo is None:
+            v = v.replace(tzinfo=timezone.utc)
+        us[i] = (v - _EPOCH) // one_us
+        valid[i] = True
+    return us, valid
+
+
+def _from_epoch_us(us: int) -> datetime:
+    """Inverse of ``_to_epoch_us`` for a single value (aware UTC datetime)."""
+    return _EPOCH + timedelta(microseconds=us)
 
 
 # ---------------------------------------------------------------------------
@@ -80,6 +232,18 @@ class SurplusCalculator:
     def __init__(self, config: dict) -> None:
         self.config = config
         self._hard_floor_warned: bool = False  # one-time warning guard (AC4 Story 4.3)
+        # Tactical-stage parameters, resolved once (config is immutable after setup)
+        self._battery_capacity_kwh: float = config.get("battery_capacity_kwh", 10.0)
+        self._max_discharge_kw: float     = config.get("max_discharge_kw", 10.0)
+        self._hold_time_hours: float      = max(config.get("hold_time_minutes", 10), 1) / 60.0  # guard /0
+        self._wallbox_threshold_kw: float = config.get("wallbox_threshold_kw", 4.2)
+        self._max_inverter_kw: float      = config.get("max_inverter_output_kw", 10.0)
+        self._sunset_cutoff_minutes: int  = config.get("sunset_cutoff_minutes", 0)
+        # Composite reasons, formatted once per forecast tag (a handful of values)
+        self._reason_pairs: dict[str, tuple[str, str]] = {}
+        # near_sunset reason is re-formatted only when the minute or tag changes
+        self._sunset_reason_key: tuple[int, str] | None = None
+        self._sunset_reason: str = Reason.NEAR_SUNSET
 
     def get_soc_floor(self, snapshot: SensorSnapshot) -> int:
         """Return current SOC floor based on time-window strategy. (Story 2.1)"""
@@ -210,73 +374,115 @@ class SurplusCalculator:
 
         return base_floor, "forecast_neutral"
 
+    def compute_strategy(self, snapshot: SensorSnapshot) -> StrategicState:
+        """Slow strategic stage: SOC floor, seasonal target and forecast adjustment.
+
+        Pure CPU, but involves time-token parsing and dict merges — the
+        engine caches the result and re-runs it only when due or on change.
+        """
+        base_floor = self.get_soc_floor(snapshot)
+        soc_floor, forecast_tag = self._apply_forecast_adjustment(snapshot, base_floor)
+        forecast_available = (
+            snapshot.forecast.forecast_available if snapshot.forecast else False
+        )
+        reasons = self._reason_pairs.get(forecast_tag)
+        if reasons is None:
+            reasons = self._reason_pairs[forecast_tag] = (
+                f"{Reason.WALLBOX_INCLUDED}|{forecast_tag}",
+                f"{Reason.SURPLUS_BELOW_THRESHOLD}|{forecast_tag}",
+            )
+        return StrategicState(
+            soc_floor=soc_floor,
+            forecast_tag=forecast_tag,
+            forecast_available=forecast_available,
+            reason_active=reasons[0],
+            reason_inactive=reasons[1],
+        )
+
     def calculate_surplus(self, snapshot: SensorSnapshot) -> EvaluationResult:
         """Calculate net surplus adjusted for battery buffer. (Story 2.2)"""
         # AC3 (Story 4.3): hard-floor FAILSAFE — must be first check, before any computation
         if snapshot.soc_percent < SOC_HARD_FLOOR:
-            _LOGGER.warning(
-                "SDM630 FAIL-SAFE: SOC %.1f%% below hard floor %d%%. Reporting 0 kW.",
-                snapshot.soc_percent, SOC_HARD_FLOOR,
-            )
-            return EvaluationResult(
-                reported_kw=0.0,
-                real_surplus_kw=0.0,
-                buffer_used_kw=0.0,
-                soc_percent=snapshot.soc_percent,
-                soc_floor_active=SOC_HARD_FLOOR,
-                charging_state="FAILSAFE",
-                reason="SOC below hard floor",
-                forecast_available=False,
-            )
+            return self._hard_floor_result(snapshot)
+        return self.calculate_tactical(snapshot, self.compute_strategy(snapshot))
 
-        base_floor = self.get_soc_floor(snapshot)
-        soc_floor, forecast_tag = self._apply_forecast_adjustment(snapshot, base_floor)
+    def _hard_floor_result(self, snapshot: SensorSnapshot) -> EvaluationResult:
+        _LOGGER.warning(
+            "SDM630 FAIL-SAFE: SOC %.1f%% below hard floor %d%%. Reporting 0 kW.",
+            snapshot.soc_percent, SOC_HARD_FLOOR,
+        )
+        return EvaluationResult(
+            reported_kw=0.0,
+            real_surplus_kw=0.0,
+            buffer_used_kw=0.0,
+            soc_percent=snapshot.soc_percent,
+            soc_floor_active=SOC_HARD_FLOOR,
+            charging_state="FAILSAFE",
+            reason=Reason.HARD_FLOOR,
+            forecast_available=False,
+        )
 
+    def calculate_tactical(
+        self, snapshot: SensorSnapshot, strategy: StrategicState
+    ) -> EvaluationResult:
+        """Fast tactical stage: surplus arithmetic against a cached strategy.
+
+        No I/O and no config lookups — safe to run at 1 Hz or faster.
+        """
+        if snapshot.soc_percent < SOC_HARD_FLOOR:
+            return self._hard_floor_result(snapshot)
+
+        soc_floor = strategy.soc_floor
+        # Nowcast only ever lowers PV: a falling trend ends charging before the
+        # drop, a rising one never starts it early.
+        pv_w = snapshot.pv_production_w
+        if snapshot.pv_nowcast_w is not None and snapshot.pv_nowcast_w < pv_w:
+            pv_w = snapshot.pv_nowcast_w
         real_surplus_kw = (
-            snapshot.pv_production_w
+            pv_w
             - snapshot.power_to_user_w
             - snapshot.power_from_grid_w
         ) / 1000.0
 
-        battery_capacity_kwh = self.config.get("battery_capacity_kwh", 10.0)
-        max_discharge_kw     = self.config.get("max_discharge_kw", 10.0)
-        hold_time_minutes    = max(self.config.get("hold_time_minutes", 10), 1)  # guard /0
-        wallbox_threshold_kw = self.config.get("wallbox_threshold_kw", 4.2)
+        wallbox_threshold_kw = self._wallbox_threshold_kw
 
         # AC2 invariant (Story 4.3): soc_percent == soc_floor → soc_headroom == 0 → buffer_used_kw == 0 (by construction)
         # AC1 invariant (Story 4.3): soc_percent == 51, soc_floor == 50 → headroom 1% → buffer_energy_kwh == 0.1 kWh
         #   → buffer_kw_max ≈ 0.6 kW (10-min hold) — hard floor protected implicitly by headroom formula
         soc_headroom      = max(0.0, snapshot.soc_percent - soc_floor)
-        buffer_energy_kwh = soc_headroom * battery_capacity_kwh / 100.0
-        buffer_kw_max     = min(max_discharge_kw,
-                                buffer_energy_kwh / (hold_time_minutes / 60.0))
+        buffer_energy_kwh = soc_headroom * self._battery_capacity_kwh / 100.0
+        buffer_kw_max     = min(self._max_discharge_kw,
+                                buffer_energy_kwh / self._hold_time_hours)
         buffer_used_kw    = min(buffer_kw_max,
                                 max(0.0, wallbox_threshold_kw - real_surplus_kw))
         augmented_kw      = real_surplus_kw + buffer_used_kw
 
         # Cap at inverter maximum output (house load + wallbox <= inverter max)
-        max_inverter_kw = self.config.get("max_inverter_output_kw", 10.0)
+        max_inverter_kw = self._max_inverter_kw
         if augmented_kw > max_inverter_kw:
-            _LOGGER.debug(
-                "SDM630 Eval: capping surplus %.2fkW to inverter max %.2fkW",
-                augmented_kw, max_inverter_kw,
-            )
+            if _LOGGER.isEnabledFor(logging.DEBUG):
+                _LOGGER.debug(
+                    "SDM630 Eval: capping surplus %.2fkW to inverter max %.2fkW",
+                    augmented_kw, max_inverter_kw,
+                )
             augmented_kw = max_inverter_kw
 
-        forecast_available = (
-            snapshot.forecast.forecast_available if snapshot.forecast else False
-        )
+        forecast_available = strategy.forecast_available
 
         # Sunset cutoff: stop charging when within configured minutes of next sunset.
         # Prevents the hysteresis hold-timer from refreshing active state as PV ramps down.
         # Only triggers when 0 < minutes_to_sunset <= cutoff (daytime; not night/tomorrow).
-        sunset_cutoff_minutes = self.config.get("sunset_cutoff_minutes", 0)
+        sunset_cutoff_minutes = self._sunset_cutoff_minutes
         if sunset_cutoff_minutes > 0 and snapshot.sunset_time is not None:
             minutes_to_sunset = (
                 snapshot.sunset_time - snapshot.timestamp
             ).total_seconds() / 60
             if 0 < minutes_to_sunset <= sunset_cutoff_minutes:
-                reason = f"near_sunset({int(minutes_to_sunset)}min)|{forecast_tag}"
+                key = (int(minutes_to_sunset), strategy.forecast_tag)
+                if key != self._sunset_reason_key:
+                    self._sunset_reason_key = key
+                    self._sunset_reason = f"{Reason.NEAR_SUNSET}({key[0]}min)|{key[1]}"
+                reason = self._sunset_reason
                 _LOGGER.info(
                     "SDM630: %.0f min to sunset — stopping surplus charging "
                     "(cutoff=%d min).",
@@ -295,15 +501,16 @@ class SurplusCalculator:
                 )
 
         if augmented_kw >= wallbox_threshold_kw:
-            reason = f"wallbox_included_in_load|{forecast_tag}"
-            _LOGGER.debug(
-                "SDM630 Eval: surplus=%.2fkW buffer=%.2fkW SOC=%d%% floor=%d%% "
-                "state=%s reported=%.2fkW grid_import=%.2fkW reason=%s forecast=%s",
-                real_surplus_kw, buffer_used_kw, snapshot.soc_percent,
-                soc_floor, "ACTIVE", augmented_kw,
-                snapshot.power_from_grid_w / 1000.0,
-                reason, forecast_available,
-            )
+            reason = strategy.reason_active
+            if _LOGGER.isEnabledFor(logging.DEBUG):
+                _LOGGER.debug(
+                    "SDM630 Eval: surplus=%.2fkW buffer=%.2fkW SOC=%d%% floor=%d%% "
+                    "state=%s reported=%.2fkW grid_import=%.2fkW reason=%s forecast=%s",
+                    real_surplus_kw, buffer_used_kw, snapshot.soc_percent,
+                    soc_floor, "ACTIVE", augmented_kw,
+                    snapshot.power_from_grid_w / 1000.0,
+                    reason, forecast_available,
+                )
             return EvaluationResult(
                 reported_kw       = augmented_kw,
                 real_surplus_kw   = real_surplus_kw,
@@ -315,15 +522,16 @@ class SurplusCalculator:
                 forecast_available = forecast_available,
             )
 
-        reason = f"surplus_below_threshold|{forecast_tag}"
-        _LOGGER.debug(
-            "SDM630 Eval: surplus=%.2fkW buffer=%.2fkW SOC=%d%% floor=%d%% "
-            "state=%s reported=%.2fkW grid_import=%.2fkW reason=%s forecast=%s",
-            real_surplus_kw, 0.0, snapshot.soc_percent,
-            soc_floor, "INACTIVE", 0.0,
-            snapshot.power_from_grid_w / 1000.0,
-            reason, forecast_available,
-        )
+        reason = strategy.reason_inactive
+        if _LOGGER.isEnabledFor(logging.DEBUG):
+            _LOGGER.debug(
+                "SDM630 Eval: surplus=%.2fkW buffer=%.2fkW SOC=%d%% floor=%d%% "
+                "state=%s reported=%.2fkW grid_import=%.2fkW reason=%s forecast=%s",
+                real_surplus_kw, 0.0, snapshot.soc_percent,
+                soc_floor, "INACTIVE", 0.0,
+                snapshot.power_from_grid_w / 1000.0,
+                reason, forecast_available,
+            )
         return EvaluationResult(
             reported_kw       = 0.0,
             real_surplus_kw   = real_surplus_kw,
@@ -335,6 +543,190 @@ class SurplusCalculator:
             forecast_available = forecast_available,
         )
 
+    # -- Batch API ----------------------------------------------------------
+
+    def calculate_surplus_batch(
+        self,
+        timestamps,
+        soc_percent,
+        pv_production_w,
+        power_to_user_w,
+        power_from_grid_w=None,
+        *,
+        sunset_times=None,
+        sunrise_times=None,
+        forecast_available=None,
+        cloud_coverage_avg=None,
+        solar_forecast_kwh_remaining=None,
+    ) -> BatchResult:
+        """Vectorised ``calculate_surplus`` over NumPy columns.
+
+        Row ``i`` gives the same reported/buffer/floor/state as
+        ``calculate_surplus`` on the equivalent snapshot: hard floor,
+        time-strategy and seasonal floor, forecast adjustment, inverter cap
+        and sunset cutoff.  Missing times are NaN/NaT/None; a missing
+        ``solar_forecast_kwh_remaining`` is NaN.  Feed ``reported_kw`` to
+        ``HysteresisFilter.run_batch`` for the filtered signal.
+        """
+        import numpy as np
+
+        ts, _ = _to_epoch_us(timestamps)
+        n = len(ts)
+        soc = np.asarray(soc_percent, dtype=np.float64)
+        pv = np.asarray(pv_production_w, dtype=np.float64)
+        user = np.asarray(power_to_user_w, dtype=np.float64)
+        grid = (
+            np.zeros(n) if power_from_grid_w is None
+            else np.asarray(power_from_grid_w, dtype=np.float64)
+        )
+        sunset, has_sunset = _to_epoch_us(sunset_times, n)
+        sunrise, has_sunrise = _to_epoch_us(sunrise_times, n)
+
+        floor = self._soc_floor_batch(np, ts, sunset, has_sunset, sunrise, has_sunrise)
+        floor = self._forecast_adjustment_batch(
+            np, ts, floor, forecast_available, cloud_coverage_avg,
+            solar_forecast_kwh_remaining,
+        )
+
+        # Tactical arithmetic — same operation order as calculate_tactical
+        real_surplus_kw = (pv - user - grid) / 1000.0
+        threshold = self._wallbox_threshold_kw
+        soc_headroom = np.maximum(0.0, soc - floor)
+        buffer_energy_kwh = soc_headroom * self._battery_capacity_kwh / 100.0
+        buffer_kw_max = np.minimum(
+            self._max_discharge_kw, buffer_energy_kwh / self._hold_time_hours
+        )
+        buffer_used_kw = np.minimum(
+            buffer_kw_max, np.maximum(0.0, threshold - real_surplus_kw)
+        )
+        augmented_kw = np.minimum(real_surplus_kw + buffer_used_kw, self._max_inverter_kw)
+
+        active = augmented_kw >= threshold
+        if self._sunset_cutoff_minutes > 0:
+            minutes_to_sunset = (sunset - ts) / _US_PER_S / 60
+            near_sunset = (
+                has_sunset
+                & (minutes_to_sunset > 0)
+                & (minutes_to_sunset <= self._sunset_cutoff_minutes)
+            )
+            active &= ~near_sunset
+
+        hard_floor = soc < SOC_HARD_FLOOR
+        state = np.where(active, STATE_CODE_ACTIVE, STATE_CODE_INACTIVE).astype(np.int8)
+        state[hard_floor] = STATE_CODE_FAILSAFE
+        floor[hard_floor] = SOC_HARD_FLOOR
+        real_surplus_kw[hard_floor] = 0.0
+        buffer_kw_max[hard_floor] = 0.0
+        return BatchResult(
+            reported_kw=np.where(active & ~hard_floor, augmented_kw, 0.0),
+            real_surplus_kw=real_surplus_kw,
+            buffer_used_kw=np.where(active & ~hard_floor, buffer_used_kw, 0.0),
+            buffer_kw_max=buffer_kw_max,
+            soc_floor_active=floor,
+            charging_state=state,
+        )
+
+    def _seasonal_lookup(self, np):
+        """13-slot month → clamped seasonal floor table (index 0 unused)."""
+        if __package__:
+            from . import DEFAULTS as _DEFAULTS
+        else:
+            _DEFAULTS = {}
+        seasonal_targets = {
+            **_DEFAULTS.get("seasonal_targets", {}),
+            **self.config.get("seasonal_targets", {}),
+        }
+        return np.array(
+            [SOC_HARD_FLOOR]
+            + [int(seasonal_targets.get(m, SOC_HARD_FLOOR)) for m in range(1, 13)],
+            dtype=np.int64,
+        )
+
+    def _soc_floor_batch(self, np, ts, sunset, has_sunset, sunrise, has_sunrise):
+        """Vectorised ``get_soc_floor`` — first matching rule wins per row."""
+        if __package__:
+            from . import DEFAULTS as _DEFAULTS
+        else:
+            _DEFAULTS = {}
+        time_strategy = self.config.get("time_strategy", _DEFAULTS.get("time_strategy", []))
+        n = len(ts)
+        floor = np.full(n, -1, dtype=np.int64)
+        months = ts.astype("datetime64[us]").astype("datetime64[M]").astype(np.int64) % 12 + 1
+        day_start = ts - ts % (86400 * _US_PER_S)
+
+        for rule in time_strategy:
+            pending = floor < 0
+            if "before" in rule:
+                token = rule["before"]
+                m = re.match(r"^(sunrise|sunset)([+-])(\d+(?:\.\d+)?)h$", token)
+                if m:
+                    base, has_base = (
+                        (sunrise, has_sunrise) if m.group(1) == "sunrise"
+                        else (sunset, has_sunset)
+                    )
+                    delta = timedelta(hours=float(m.group(3))) // timedelta(microseconds=1)
+                    boundary = base + delta if m.group(2) == "+" else base - delta
+                    hit = pending & has_base & (ts < boundary)
+                else:
+                    try:
+                        t = datetime.strptime(token, "%H:%M").time()
+                    except ValueError:
+                        _LOGGER.warning("SDM630: Cannot parse time token '%s'", token)
+                        continue
+                    boundary = day_start + (t.hour * 3600 + t.minute * 60) * _US_PER_S
+                    hit = pending & (ts < boundary)
+                floor[hit] = self._clamp_floor(int(rule["soc_floor"]))
+            elif rule.get("default"):
+                seasonal = self._seasonal_lookup(np)[months]
+                if (seasonal[pending] < SOC_HARD_FLOOR).any():
+                    self._clamp_floor(int(seasonal[pending].min()))  # one-time warning
+                floor[pending] = np.maximum(seasonal[pending], SOC_HARD_FLOOR)
+                break
+
+        floor[floor < 0] = SOC_HARD_FLOOR  # defensive fallback, as in get_soc_floor
+        return floor
+
+    def _clamp_floor(self, floor: int) -> int:
+        """Clamp a configured floor to SOC_HARD_FLOOR, warning once."""
+        if floor < SOC_HARD_FLOOR:
+            if not self._hard_floor_warned:
+                _LOGGER.warning(
+                    "Configured soc_floor %d%% below SOC_HARD_FLOOR 50%%. Clamping.",
+                    floor,
+                )
+                self._hard_floor_warned = True
+            return SOC_HARD_FLOOR
+        return floor
+
+    def _forecast_adjustment_batch(
+        self, np, ts, floor, forecast_available, cloud_coverage_avg, solar_remaining
+    ):
+        """Vectorised ``_apply_forecast_adjustment`` (floor only)."""
+        n = len(ts)
+        if forecast_available is None:
+            return floor
+        available = np.asarray(forecast_available, dtype=bool)
+        cloud = (
+            np.full(n, 50.0) if cloud_coverage_avg is None
+            else np.asarray(cloud_coverage_avg, dtype=np.float64)
+        )
+        cloud = np.where(np.isnan(cloud), 50.0, cloud)
+        solar = (
+            np.full(n, np.nan) if solar_remaining is None
+            else np.asarray(solar_remaining, dtype=np.float64)
+        )
+        has_solar = ~np.isnan(solar)
+        hour = (ts // (3600 * _US_PER_S)) % 24
+        threshold_kwh = self.config.get("solar_remaining_threshold_kwh", 2.0)
+        months = ts.astype("datetime64[us]").astype("datetime64[M]").astype(np.int64) % 12 + 1
+        seasonal_floor = np.maximum(self._seasonal_lookup(np)[months], SOC_HARD_FLOOR)
+
+        solar_ok = ~has_solar | (solar >= threshold_kwh)
+        sunny = available & (cloud < 20) & (hour < 15) & solar_ok
+        solar_low = available & ~sunny & has_solar & (solar < threshold_kwh) & (hour >= 12)
+        poor = available & ~sunny & ~solar_low & (cloud > 70) & (hour >= 13)
+        return np.where(solar_low | poor, np.maximum(floor, seasonal_floor), floor)
+
 
 # ---------------------------------------------------------------------------
 # HA-aware classes
@@ -351,12 +743,18 @@ class HysteresisFilter:
         self._hold_until: datetime | None = None
         self._last_reported_kw: float = 0.0
         self._hold_time_minutes: int = config.get("hold_time_minutes", 10)
+        self._hold_delta: timedelta = timedelta(minutes=self._hold_time_minutes)
         self._wallbox_threshold_kw: float = config.get("wallbox_threshold_kw", 4.2)
 
     @property
     def state(self) -> str:
         return self._state
 
+    @property
+    def hold_until(self) -> datetime | None:
+        """End of the current ACTIVE hold period (None when not holding)."""
+        return self._hold_until
+
     def update(self, reported_kw: float, now: datetime) -> float:
         """Apply hysteresis and return filtered surplus kW. (Story 2.3)"""
         if self._state == "FAILSAFE":
@@ -365,7 +763,7 @@ class HysteresisFilter:
         if self._state == "INACTIVE":
             if reported_kw >= self._wallbox_threshold_kw:
                 self._state = "ACTIVE"
-                self._hold_until = now + timedelta(minutes=self._hold_time_minutes)
+                self._hold_until = now + self._hold_delta
                 self._last_reported_kw = reported_kw
                 return reported_kw
             return 0.0
@@ -373,7 +771,7 @@ class HysteresisFilter:
         # ACTIVE branch
         if reported_kw >= self._wallbox_threshold_kw:
             # Renew hold
-            self._hold_until = now + timedelta(minutes=self._hold_time_minutes)
+            self._hold_until = now + self._hold_delta
             self._last_reported_kw = reported_kw
             return reported_kw
 
@@ -387,6 +785,79 @@ class HysteresisFilter:
         self._hold_until = None
         return 0.0
 
+    def run_batch(self, reported_kw, timestamps):
+        """Apply ``update`` to each row in order; returns (final_kw, state_codes).
+
+        Inherently sequential, but runs on plain floats/ints to stay fast.
+        Continues from — and leaves — the filter's current state, so long
+        series can be processed in chunks.  ``state_codes`` index into
+        ``BATCH_STATES``.
+        """
+        import numpy as np
+
+        kw_in = np.asarray(reported_kw, dtype=np.float64).tolist()
+        ts, _ = _to_epoch_us(timestamps)
+        n = len(kw_in)
+        out_kw = [0.0] * n
+        out_state = [STATE_CODE_INACTIVE] * n
+
+        threshold = self._wallbox_threshold_kw
+        hold_us = self._hold_delta // timedelta(microseconds=1)
+        state = BATCH_STATES.index(self._state)
+        hold_until = (
+            None if self._hold_until is None
+            else _to_epoch_us([self._hold_until])[0][0].item()
+        )
+        last_kw = self._last_reported_kw
+
+        if state == STATE_CODE_FAILSAFE:
+            out_state = [STATE_CODE_FAILSAFE] * n
+        else:
+            for i, (kw, now) in enumerate(zip(kw_in, ts.tolist())):
+                if kw >= threshold:
+                    state = STATE_CODE_ACTIVE
+                    hold_until = now + hold_us
+                    last_kw = kw
+                    out_kw[i] = kw
+                elif state == STATE_CODE_ACTIVE:
+                    # inclusive boundary, as in update()
+                    if hold_until is not None and now <= hold_until:
+                        out_kw[i] = last_kw
+                    else:
+                        state = STATE_CODE_INACTIVE
+                        hold_until = None
+                out_state[i] = state
+
+        self._state = BATCH_STATES[state]
+        self._hold_until = None if hold_until is None else _from_epoch_us(hold_until)
+        self._last_reported_kw = last_kw
+        return np.array(out_kw, dtype=np.float64), np.array(out_state, dtype=np.int8)
+
+    def to_dict(self) -> dict:
+        """JSON-serialisable state (hold end as epoch seconds)."""
+        return {
+            "state": self._state,
+            "hold_until": None if self._hold_until is None else self._hold_until.timestamp(),
+            "last_reported_kw": self._last_reported_kw,
+        }
+
+    def restore(self, data: dict) -> None:
+        """Resume an ACTIVE hold saved by ``to_dict``.
+
+        INACTIVE is the initial state anyway; FAILSAFE is not carried over —
+        the sensor checks re-derive it from the live inputs.
+        """
+        if data.get("state") != "ACTIVE":
+            return
+        try:
+            hold_until = datetime.fromtimestamp(float(data["hold_until"]), timezone.utc)
+            last_kw = float(data["last_reported_kw"])
+        except (KeyError, TypeError, ValueError):
+            return
+        self._state = "ACTIVE"
+        self._hold_until = hold_until
+        self._last_reported_kw = last_kw
+
     def force_failsafe(self, reason: str) -> None:
         """Immediately enter FAILSAFE state. (Story 2.3 / Story 4.x)"""
         _LOGGER.warning("SDM630 HysteresisFilter → FAILSAFE: %s", reason)
@@ -399,107 +870,802 @@ class HysteresisFilter:
         self._state = "INACTIVE"
 
 
-class ForecastConsumer:
-    """Fetches and caches solar/weather forecasts from HA. (Story 3.1)"""
+class AdaptiveScheduler:
+    """Chooses the delay until the next full evaluation from the last result.
+
+    HA-free.  Modes: ``fast`` (``evaluation_interval``) near the wallbox
+    threshold, around hold expiry and in FAILSAFE; ``slow`` when the surplus
+    is far from the threshold; ``night`` between sunset and sunrise while
+    INACTIVE.
+    """
 
     def __init__(self, config: dict) -> None:
+        self._fast_s: float = config.get("evaluation_interval", 15)
+        self._slow_s: float = config.get("adaptive_slow_interval_seconds", 60)
+        self._night_s: float = config.get("adaptive_night_interval_seconds", 600)
+        self._band_kw: float = config.get("adaptive_band_kw", 1.0)
+        self._threshold_kw: float = config.get("wallbox_threshold_kw", 4.2)
+
+    @staticmethod
+    def is_night(snapshot: SensorSnapshot) -> bool:
+        """True between sunset and sunrise — the next rising comes before the next setting."""
+        return (
+            snapshot.sunset_time is not None
+            and snapshot.sunrise_time is not None
+            and snapshot.sunrise_time < snapshot.sunset_time
+        )
+
+    def next_interval(
+        self,
+        result: EvaluationResult,
+        snapshot: SensorSnapshot,
+        hold_until: datetime | None,
+    ) -> tuple[float, str]:
+        """Return (seconds until next evaluation, mode name)."""
+        state = result.charging_state
+        if state == "FAILSAFE":
+            return self._fast_s, "fast"
+        if state == "INACTIVE" and self.is_night(snapshot):
+            return self._night_s, "night"
+        if abs(result.real_surplus_kw - self._threshold_kw) <= self._band_kw:
+            return self._fast_s, "fast"
+        if state == "ACTIVE" and hold_until is not None:
+            remaining = (hold_until - snapshot.timestamp).total_seconds()
+            if remaining <= self._slow_s:
+                return self._fast_s, "fast"
+        return self._slow_s, "slow"
+
+
+class EwmaFilter:
+    """Exponentially weighted moving average — O(1) per sample.
+
+    ``alpha`` is the weight of the newest sample (1.0 = pass-through).
+    """
+
+    def __init__(self, alpha: float) -> None:
+        if not 0.0 < alpha <= 1.0:
+            raise ValueError(f"ewma alpha must be in (0, 1], got {alpha}")
+        self._alpha = alpha
+        self._value: float | None = None
+
+    @property
+    def value(self) -> float | None:
+        return self._value
+
+    def update(self, sample: float) -> float:
+        if self._value is None:
+            self._value = sample
+        else:
+            self._value += self._alpha * (sample - self._value)
+        return self._value
+
+    def reset(self) -> None:
+        self._value = None
+
+
+class WindowMeanFilter:
+    """Mean of the last ``window`` samples — ring buffer plus running sum, O(1).
+
+    The sum is recomputed once per ring wrap so float drift cannot accumulate.
+    """
+
+    def __init__(self, window: int) -> None:
+        if window < 1:
+            raise ValueError(f"mean window must be >= 1, got {window}")
+        self._ring: list[float] = [0.0] * window
+        self._pos = 0
+        self._count = 0
+        self._sum = 0.0
+
+    @property
+    def value(self) -> float | None:
+        return self._sum / self._count if self._count else None
+
+    def update(self, sample: float) -> float:
+        ring = self._ring
+        if self._count == len(ring):
+            self._sum -= ring[self._pos]
+        else:
+            self._count += 1
+        ring[self._pos] = sample
+        self._sum += sample
+        self._pos += 1
+        if self._pos == len(ring):
+            self._pos = 0
+            self._sum = sum(ring)
+        return self._sum / self._count
+
+    def reset(self) -> None:
+        self._pos = 0
+        self._count = 0
+        self._sum = 0.0
+
+
+class SlidingMedianFilter:
+    """Median of the last ``window`` samples — two heaps with lazy deletion.
+
+    ``_low`` is a max-heap (negated) holding the smaller half, ``_high`` a
+    min-heap holding the larger half; ``_low`` keeps the extra element for odd
+    counts.  An evicted sample is only marked in its heap's pending map and
+    popped once it surfaces at the top, so each update is O(log window).
+    The heaps are rebuilt from the ring when dead entries pile up.
+    """
+
+    def __init__(self, window: int) -> None:
+        if window < 1:
+            raise ValueError(f"median window must be >= 1, got {window}")
+        self._ring: list[float] = [0.0] * window
+        self.reset()
+
+    @property
+    def value(self) -> float | None:
+        if not self._count:
+            return None
+        if self._low_size > self._high_size:
+            return -self._low[0]
+        return (self._high[0] - self._low[0]) / 2.0
+
+    def update(self, sample: float) -> float:
+        if self._count == len(self._ring):
+            self._discard(self._ring[self._pos])
+        else:
+            self._count += 1
+        self._ring[self._pos] = sample
+        self._pos = (self._pos + 1) % len(self._ring)
+
+        if self._low_size:
+            to_low = sample <= -self._low[0]
+        else:
+            to_low = not self._high_size or sample <= self._high[0]
+        if to_low:
+            heapq.heappush(self._low, -sample)
+            self._low_size += 1
+        else:
+            heapq.heappush(self._high, sample)
+            self._high_size += 1
+        self._rebalance()
+        if len(self._low) + len(self._high) > 4 * len(self._ring):
+            self._rebuild()
+        return self.value
+
+    def reset(self) -> None:
+        self._pos = 0
+        self._count = 0
+        self._low: list[float] = []
+        self._high: list[float] = []
+        self._low_size = 0
+        self._high_size = 0
+        self._low_dead: dict[float, int] = {}
+        self._high_dead: dict[float, int] = {}
+
+    def _discard(self, sample: float) -> None:
+        # Valid low ≤ valid high, so anything ≤ the (valid) low top lives in _low.
+        if sample <= -self._low[0]:
+            self._low_dead[sample] = self._low_dead.get(sample, 0) + 1
+            self._low_size -= 1
+            self._prune(self._low, self._low_dead, -1.0)
+        else:
+            self._high_dead[sample] = self._high_dead.get(sample, 0) + 1
+            self._high_size -= 1
+            self._prune(self._high, self._high_dead, 1.0)
+
+    @staticmethod
+    def _prune(heap: list[float], dead: dict[float, int], sign: float) -> None:
+        while heap:
+            top = sign * heap[0]
+            pending = dead.get(top)
+            if not pending:
+                return
+            if pending == 1:
+                del dead[top]
+            else:
+                dead[top] = pending - 1
+            heapq.heappop(heap)
+
+    def _rebalance(self) -> None:
+        if self._low_size > self._high_size + 1:
+            heapq.heappush(self._high, -heapq.heappop(self._low))
+            self._low_size -= 1
+            self._high_size += 1
+            self._prune(self._low, self._low_dead, -1.0)
+        elif self._low_size < self._high_size:
+            heapq.heappush(self._low, -heapq.heappop(self._high))
+            self._low_size += 1
+            self._high_size -= 1
+            self._prune(self._high, self._high_dead, 1.0)
+
+    def _rebuild(self) -> None:
+        window = len(self._ring)
+        start = (self._pos - self._count) % window
+        live = sorted(self._ring[(start + i) % window] for i in range(self._count))
+        split = (len(live) + 1) // 2
+        self._low = [-v for v in live[:split]]
+        self._high = live[split:]
+        heapq.heapify(self._low)
+        heapq.heapify(self._high)
+        self._low_size, self._high_size = split, len(live) - split
+        self._low_dead.clear()
+        self._high_dead.clear()
+
+
+INPUT_FILTER_TYPES = {
+    "ewma": EwmaFilter,
+    "mean": WindowMeanFilter,
+    "median": SlidingMedianFilter,
+}
+
+# Roles that accept a filter — SOC moves slowly and is range-checked raw.
+FILTERABLE_ROLES = ("power_to_grid", "pv_production", "power_to_user", "power_from_grid")
+
+
+def build_input_filters(config: dict) -> dict:
+    """Create one filter per role from ``config['input_filters']``.
+
+    ``{"pv_production": {"type": "median", "window": 5}}`` →
+    ``{"pv_production": SlidingMedianFilter(5)}``.  Roles without an entry
+    are not filtered.
+    """
+    filters: dict = {}
+    for role, spec in (config.get("input_filters") or {}).items():
+        if role not in FILTERABLE_ROLES:
+            raise ValueError(f"input_filters: role {role!r} cannot be filtered")
+        kind = spec.get("type")
+        if kind == "ewma":
+            filters[role] = EwmaFilter(spec.get("alpha", 0.5))
+        elif kind in ("mean", "median"):
+            filters[role] = INPUT_FILTER_TYPES[kind](spec.get("window", 5))
+        else:
+            raise ValueError(f"input_filters.{role}: unknown filter type {kind!r}")
+    return filters
+
+
+class SensorCache:
+    """Latest reading per input role in fixed slots (``CACHE_KEYS`` order).
+
+    Values, ``time.monotonic()`` stamps and validity flags live in parallel
+    arrays allocated once; state changes are in-place writes.  A slot that
+    never received data has a NaN stamp and is never armed, so it cannot go
+    stale (startup grace); the same holds for a valid slot with a NaN stamp.
+
+    Staleness is deadline driven: each ``watched`` slot keeps at most one
+    ``(stamp + stale_after, slot)`` entry in a min-heap.  Writes only move
+    the stamp — the entry is re-armed lazily when it reaches the top of the
+    heap, so ``expire`` costs nothing until the earliest deadline passes.
+    """
+
+    __slots__ = (
+        "values", "stamps", "valid", "reasons", "stale", "stale_count",
+        "_stale_after", "_watched", "_armed", "_deadlines",
+    )
+
+    def __init__(self, watched: tuple[int, ...] = (), stale_after: float = math.inf) -> None:
+        n = len(CACHE_KEYS)
+        self.values = array("d", bytes(8 * n))
+        self.stamps = array("d", [math.nan] * n)
+        self.valid = array("b", bytes(n))
+        self.reasons: list[str] = [""] * n   # detail for invalid slots
+        self.stale = array("b", bytes(n))
+        self.stale_count = 0
+        self._stale_after = float(stale_after)
+        self._watched = array("b", [slot in watched for slot in range(n)])
+        self._armed = array("b", bytes(n))
+        self._deadlines: list[tuple[float, int]] = []   # min-heap
+
+    def set(self, slot: int, value: float, stamp: float) -> None:
+        """Store a valid reading."""
+        self.values[slot] = value
+        self.stamps[slot] = stamp
+        self.valid[slot] = 1
+        self.reasons[slot] = ""
+        self._rearm(slot, stamp)
+
+    def invalidate(self, slot: int, stamp: float, reason: str) -> None:
+        """Mark a slot invalid; its last value is kept."""
+        self.stamps[slot] = stamp
+        self.valid[slot] = 0
+        self.reasons[slot] = reason
+        self._rearm(slot, stamp)
+
+    def touch(self, slot: int, stamp: float) -> None:
+        """Refresh the stamp of a valid slot (entity alive, value unchanged)."""
+        if self.valid[slot]:
+            self.stamps[slot] = stamp
+            self._rearm(slot, stamp)
+
+    def _rearm(self, slot: int, stamp: float) -> None:
+        if self.stale[slot]:
+            self.stale[slot] = 0
+            self.stale_count -= 1
+        if self._watched[slot] and not self._armed[slot] and stamp == stamp:
+            self._armed[slot] = 1
+            heapq.heappush(self._deadlines, (stamp + self._stale_after, slot))
+
+    @property
+    def next_deadline(self) -> float:
+        """Earliest armed deadline (``inf`` when nothing is armed)."""
+        return self._deadlines[0][0] if self._deadlines else math.inf
+
+    def expire(self, now: float) -> list[int]:
+        """Flag slots not refreshed for more than ``stale_after`` s as stale.
+
+        Pops passed deadlines; a slot refreshed since it was armed goes back
+        on the heap with its current deadline.  Returns the newly stale slots.
+        """
+        heap = self._deadlines
+        expired: list[int] = []
+        while heap and heap[0][0] < now:   # strict: exactly at threshold is fresh
+            slot = heapq.heappop(heap)[1]
+            deadline = self.stamps[slot] + self._stale_after
+            if deadline < now:
+                self._armed[slot] = 0
+                self.stale[slot] = 1
+                self.stale_count += 1
+                expired.append(slot)
+            else:
+                heapq.heappush(heap, (deadline, slot))
+        return expired
+
+    def has_data(self, slot: int) -> bool:
+        return self.valid[slot] == 1 or self.stamps[slot] == self.stamps[slot]
+
+    def first_stale(self, slots: tuple[int, ...]) -> int:
+        """First of ``slots`` flagged stale by ``expire``, else -1."""
+        stale = self.stale
+        for slot in slots:
+            if stale[slot]:
+                return slot
+        return -1
+
+    def first_invalid(self, slots: tuple[int, ...]) -> int:
+        """First of ``slots`` without a valid reading, else -1."""
+        valid = self.valid
+        for slot in slots:
+            if not valid[slot]:
+                return slot
+        return -1
+
+
+class PvNowcaster:
+    """Short-term PV trend: rolling least-squares line over recent samples.
+
+    Samples live in a fixed-size ring (``array('d')``, allocated once) and
+    the regression sums are updated incrementally on insert and eviction,
+    so ``update`` and ``predict`` are O(1).  Samples older than ``window_s``
+    are evicted; samples closer than ``min_spacing_s`` to the previous one
+    are ignored so event-driven re-evaluations cannot crowd the window.
+    Sums are taken relative to ``_t0`` and recomputed from the ring each
+    time the write position wraps, which bounds float cancellation.
+    """
+
+    def __init__(self, window_s: float, min_spacing_s: float) -> None:
+        if window_s <= 0 or min_spacing_s <= 0:
+            raise ValueError("nowcast window and spacing must be positive")
+        capacity = int(window_s / min_spacing_s) + 2
+        self._window_s = window_s
+        self._min_spacing_s = min_spacing_s
+        self._t = array("d", bytes(8 * capacity))
+        self._y = array("d", bytes(8 * capacity))
+        self.reset()
+
+    def reset(self) -> None:
+        self._head = 0          # oldest sample
+        self._count = 0
+        self._t0 = 0.0
+        self._sx = self._sy = self._sxx = self._sxy = 0.0
+
+    @property
+    def samples(self) -> int:
+        return self._count
+
+    def update(self, t: float, pv_w: float) -> None:
+        """Add a sample at epoch seconds ``t``."""
+        cap = len(self._t)
+        if self._count:
+            last = (self._head + self._count - 1) % cap
+            if t - self._t[last] < self._min_spacing_s:
+                return
+        else:
+            self._t0 = t
+        while self._count and (self._count == cap or t - self._t[self._head] > self._window_s):
+            self._evict()
+        pos = (self._head + self._count) % cap
+        self._t[pos] = t
+        self._y[pos] = pv_w
+        self._count += 1
+        x = t - self._t0
+        self._sx += x
+        self._sy += pv_w
+        self._sxx += x * x
+        self._sxy += x * pv_w
+        if pos == cap - 1:
+            self._rebase()
+
+    def slope_w_per_s(self) -> float | None:
+        """Fitted ramp rate in W/s, or None with fewer than three samples."""
+        if self._count < 3:
+            return None
+        n = self._count
+        denom = n * self._sxx - self._sx * self._sx
+        if denom <= 1e-9:
+            return 0.0
+        return (n * self._sxy - self._sx * self._sy) / denom
+
+    def predict(self, t: float) -> float | None:
+        """Fitted PV at epoch seconds ``t`` (≥ 0 W), or None with too few samples."""
+        slope = self.slope_w_per_s()
+        if slope is None:
+            return None
+        intercept = (self._sy - slope * self._sx) / self._count
+        return max(0.0, intercept + slope * (t - self._t0))
+
+    def _evict(self) -> None:
+        x = self._t[self._head] - self._t0
+        y = self._y[self._head]
+        self._sx -= x
+        self._sy -= y
+        self._sxx -= x * x
+        self._sxy -= x * y
+        self._head = (self._head + 1) % len(self._t)
+        self._count -= 1
+
+    def _rebase(self) -> None:
+        cap = len(self._t)
+        self._t0 = self._t[self._head]
+        self._sx = self._sy = self._sxx = self._sxy = 0.0
+        for i in range(self._count):
+            pos = (self._head + i) % cap
+            x = self._t[pos] - self._t0
+            y = self._y[pos]
+            self._sx += x
+            self._sy += y
+            self._sxx += x * x
+            self._sxy += x * y
+
+
+class ForecastConsumer:
+    """Fetches and caches solar/weather forecasts from HA. (Story 3.1)
+
+    The evaluation tick reads the cache via ``get_cached_forecast`` which never
+    awaits the weather service: a stale or empty cache is served as-is while a
+    single background task refreshes it (stale-while-revalidate).
+    """
+
+    def __init__(self, config: dict, monotonic=time.monotonic) -> None:
         self.config = config
+        self._monotonic = monotonic                 # injectable for virtual-time runs
+        self._ttl_seconds: float = config.get("forecast_ttl_seconds", 600)
+        # A TTL below the tick interval would drop every refresh before the next tick.
+        self._max_stale_seconds: float = _FORECAST_MAX_STALE_FACTOR * max(
+            self._ttl_seconds, config.get("evaluation_interval", 15)
+        )
+        self._timeout_seconds: float = config.get("forecast_timeout_seconds", 10)
+        self._cached: ForecastData | None = None
+        self._fetched_at: float | None = None       # monotonic time of last good refresh
+        self._retry_at: float = 0.0                 # earliest monotonic time for next attempt
+        self._refresh_task: asyncio.Task | None = None
+        self.hits: int = 0
+        self.misses: int = 0
+        self.refreshes: int = 0
+        self.refresh_failures: int = 0
+        self.last_refresh_ms: float | None = None
+        self.max_refresh_ms: float = 0.0
+
+    @property
+    def stats(self) -> dict:
+        """Cache counters for diagnostics (exposed as sensor attributes)."""
+        age = (
+            None if self._fetched_at is None
+            else round(self._monotonic() - self._fetched_at, 1)
+        )
+        return {
+            "forecast_cache_hits": self.hits,
+            "forecast_cache_misses": self.misses,
+            "forecast_refreshes": self.refreshes,
+            "forecast_refresh_failures": self.refresh_failures,
+            "forecast_last_refresh_ms": self.last_refresh_ms,
+            "forecast_max_refresh_ms": self.max_refresh_ms,
+            "forecast_cache_age_s": age,
+        }
+
+    def get_cached_forecast(self, hass) -> ForecastData:
+        """Return the cached forecast immediately; refresh in background when stale.
+
+        Cache miss (empty or older than ``forecast_ttl_seconds``) schedules one
+        background refresh and still returns without waiting.  Data older than
+        ``_FORECAST_MAX_STALE_FACTOR`` × TTL (at least that many evaluation
+        intervals) is dropped in favour of the conservative ``ForecastData()``
+        defaults.
+        """
+        entities = self.config.get("entities", {})
+        if not entities.get("weather") and not entities.get("forecast_solar"):
+            return _NO_FORECAST  # AC4: nothing configured — no cache bookkeeping
+
+        now = self._monotonic()
+        age = None if self._fetched_at is None else now - self._fetched_at
+        if age is not None and age <= self._ttl_seconds:
+            self.hits += 1
+            return self._cached  # type: ignore[return-value]
+
+        self.misses += 1
+        self._schedule_refresh(hass, now)
+        if age is None or age > self._max_stale_seconds:
+            return _NO_FORECAST
+        return self._cached  # type: ignore[return-value]
+
+    def _schedule_refresh(self, hass, now: float) -> None:
+        """Start a background refresh unless one is running or retry is backing off."""
+        if self._refresh_task is not None and not self._refresh_task.done():
+            return
+        if now < self._retry_at:
+            return
+        self._refresh_task = asyncio.get_running_loop().create_task(
+            self._refresh(hass)
+        )
+
+    async def _refresh(self, hass) -> None:
+        """Fetch forecast with timeout and store it; keep old data on failure."""
+        started = time.perf_counter()
+        try:
+            data = await asyncio.wait_for(
+                self._fetch_forecast(hass), timeout=self._timeout_seconds
+            )
+        except Exception as exc:  # noqa: BLE001 – includes asyncio.TimeoutError
+            self.refresh_failures += 1
+            self._retry_at = self._monotonic() + _FORECAST_RETRY_SECONDS
+            _LOGGER.warning(
+                "Forecast refresh failed: %s. Keeping cached forecast.",
+                exc or type(exc).__name__,
+            )
+            return
+        elapsed_ms = (time.perf_counter() - started) * 1000.0
+        self.refreshes += 1
+        self.last_refresh_ms = round(elapsed_ms, 1)
+        self.max_refresh_ms = max(self.max_refresh_ms, self.last_refresh_ms)
+        self._cached = data
+        self._fetched_at = self._monotonic()
+        _LOGGER.debug(
+            "Forecast cache refreshed in %.1f ms: cloud=%.0f%% solar=%s",
+            elapsed_ms, data.cloud_coverage_avg, data.solar_forecast_kwh_remaining,
+        )
 
     async def get_forecast(self, hass) -> ForecastData:
         """Fetch forecast from HA weather/solar entities. (Story 3.1)"""
+        try:
+            return await self._fetch_forecast(hass)
+        except Exception as exc:  # noqa: BLE001
+            _LOGGER.warning(
+                "Forecast unavailable: %s. Using conservative defaults.", exc
+            )
+            return _NO_FORECAST
+
+    async def _fetch_forecast(self, hass) -> ForecastData:
+        """Query HA for forecast data — raises on weather service failure."""
         entities = self.config.get("entities", {})
         weather_entity = entities.get("weather")
         solar_entity = entities.get("forecast_solar")
 
         # AC4: neither weather nor solar configured → silent no-op
         if not weather_entity and not solar_entity:
-            return ForecastData()
+            return _NO_FORECAST
 
         cloud_coverage_avg: float = 50.0
         forecast_available: bool = False
         solar_forecast_kwh_remaining: float | None = None
 
-        try:
-            # Fetch weather forecast if configured
-            if weather_entity:
-                response = await hass.services.async_call(
-                    "weather",
-                    "get_forecasts",
-                    {"entity_id": weather_entity, "type": "hourly"},
-                    blocking=True,
-                    return_response=True,
-                )
-                raw_forecast = response[weather_entity]["forecast"][:6]
-                cloud_values = [
-                    e["cloud_coverage"] for e in raw_forecast if "cloud_coverage" in e
-                ]
-                cloud_coverage_avg = (
-                    sum(cloud_values) / len(cloud_values) if cloud_values else 50.0
-                )
-                forecast_available = True
-
-            # Fetch solar forecast if configured (AC5: independent of weather)
-            if solar_entity:
-                try:
-                    state = hass.states.get(solar_entity)
-                    if state and state.state not in ("unavailable", "unknown"):
-                        solar_forecast_kwh_remaining = float(state.state)
-                        forecast_available = True  # AC5: partial data is useful
-                except (ValueError, AttributeError):
-                    pass  # solar failure non-critical
-
-            return ForecastData(
-                forecast_available=forecast_available,
-                cloud_coverage_avg=cloud_coverage_avg,
-                solar_forecast_kwh_remaining=solar_forecast_kwh_remaining,
+        # Fetch weather forecast if configured
+        if weather_entity:
+            response = await hass.services.async_call(
+                "weather",
+                "get_forecasts",
+                {"entity_id": weather_entity, "type": "hourly"},
+                blocking=True,
+                return_response=True,
             )
-        except Exception as exc:  # noqa: BLE001
-            _LOGGER.warning(
-                "Forecast unavailable: %s. Using conservative defaults.", exc
+            raw_forecast = response[weather_entity]["forecast"][:6]
+            cloud_values = [
+                e["cloud_coverage"] for e in raw_forecast if "cloud_coverage" in e
+            ]
+            cloud_coverage_avg = (
+                sum(cloud_values) / len(cloud_values) if cloud_values else 50.0
             )
-            return ForecastData()
+            forecast_available = True
+
+        # Fetch solar forecast if configured (AC5: independent of weather)
+        if solar_entity:
+            try:
+                state = hass.states.get(solar_entity)
+                if state and state.state not in ("unavailable", "unknown"):
+                    solar_forecast_kwh_remaining = float(state.state)
+                    forecast_available = True  # AC5: partial data is useful
+            except (ValueError, AttributeError):
+                pass  # solar failure non-critical
+
+        return ForecastData(
+            forecast_available=forecast_available,
+            cloud_coverage_avg=cloud_coverage_avg,
+            solar_forecast_kwh_remaining=solar_forecast_kwh_remaining,
+        )
 
 
 class SurplusEngine:
-    """Orchestrator — coordinates all sub-components each evaluation cycle."""
+    """Orchestrator — coordinates all sub-components each evaluation cycle.
 
-    def __init__(self, config: dict) -> None:
+    Two tiers: the strategic stage (``SurplusCalculator.compute_strategy``)
+    is cached for ``strategy_interval_seconds`` or until its inputs change;
+    the tactical stage (surplus arithmetic + hysteresis) runs every call.
+    """
+
+    def __init__(self, config: dict, monotonic=None) -> None:
         self.config = config
         self._calculator = SurplusCalculator(config)
         self.hysteresis_filter = HysteresisFilter(config)
-        self._forecast_consumer = ForecastConsumer(config)
+        self._forecast_consumer = ForecastConsumer(config, monotonic or time.monotonic)
+        self._last_forecast: ForecastData | None = None
+        self._strategy_interval = timedelta(
+            seconds=config.get("strategy_interval_seconds", 60)
+        )
+        self._strategy: StrategicState | None = None
+        self._strategy_due: datetime | None = None
+        self._strategy_forecast: ForecastData | None = None
+        self._strategy_sun: tuple[datetime | None, datetime | None] = (None, None)
+        self.strategy_runs: int = 0
+        # PV nowcast (window 0 = disabled; horizon 0 = trend logged, not applied)
+        window_s = config.get("nowcast_window_minutes", 10) * 60
+        self.nowcaster: PvNowcaster | None = (
+            PvNowcaster(window_s, config.get("evaluation_interval", 15) / 2)
+            if window_s > 0 else None
+        )
+        self._nowcast_horizon_s: float = config.get("nowcast_horizon_minutes", 0) * 60
+        # Optional ``(phase, elapsed_ns)`` hook timing evaluate_cycle (None = untimed)
+        self.on_phase: Callable[[str, int], None] | None = None
+
+    @property
+    def forecast_stats(self) -> dict:
+        """Forecast cache hit/miss/refresh-latency counters."""
+        return self._forecast_consumer.stats
+
+    def to_dict(self) -> dict:
+        """JSON-serialisable warm-restart state: hysteresis and counters."""
+        fc = self._forecast_consumer
+        return {
+            "version": ENGINE_STATE_VERSION,
+            "hysteresis": self.hysteresis_filter.to_dict(),
+            "counters": {
+                "strategy_runs": self.strategy_runs,
+                "forecast_cache_hits": fc.hits,
+                "forecast_cache_misses": fc.misses,
+                "forecast_refreshes": fc.refreshes,
+                "forecast_refresh_failures": fc.refresh_failures,
+            },
+        }
+
+    def restore(self, data: dict) -> None:
+        """Load state saved by ``to_dict``; other versions are ignored."""
+        if data.get("version") != ENGINE_STATE_VERSION:
+            return
+        self.hysteresis_filter.restore(data.get("hysteresis") or {})
+        counters = data.get("counters") or {}
+        fc = self._forecast_consumer
+        self.strategy_runs = int(counters.get("strategy_runs", 0))
+        fc.hits = int(counters.get("forecast_cache_hits", 0))
+        fc.misses = int(counters.get("forecast_cache_misses", 0))
+        fc.refreshes = int(counters.get("forecast_refreshes", 0))
+        fc.refresh_failures = int(counters.get("forecast_refresh_failures", 0))
+
+    @property
+    def strategy(self) -> StrategicState | None:
+        """Last strategic-stage output (None before the first cycle)."""
+        return self._strategy
+
+    def strategy_due(self, now: datetime) -> bool:
+        """True when the strategic stage will re-run on the next cycle."""
+        return self._strategy_due is None or now >= self._strategy_due
+
+    def invalidate_strategy(self) -> None:
+        """Force the strategic stage to re-run on the next cycle."""
+        self._strategy_due = None
+
+    def _refresh_strategy(self, snapshot: SensorSnapshot) -> StrategicState:
+        """Return the cached strategy, recomputing it when due or inputs changed."""
+        sun = (snapshot.sunset_time, snapshot.sunrise_time)
+        if (
+            self._strategy is None
+            or self.strategy_due(snapshot.timestamp)
+            or snapshot.forecast != self._strategy_forecast
+            or sun != self._strategy_sun
+        ):
+            self._strategy = self._calculator.compute_strategy(snapshot)
+            self._strategy_due = snapshot.timestamp + self._strategy_interval
+            self._strategy_forecast = snapshot.forecast
+            self._strategy_sun = sun
+            self.strategy_runs += 1
+        return self._strategy
 
     async def evaluate_cycle(
         self, snapshot: SensorSnapshot, hass=None
     ) -> EvaluationResult:
         """Run one evaluation cycle and return result."""
-        # Fetch forecast if hass provided and not yet in snapshot (Story 3.1 / AC6)
+        # Read cached forecast if hass provided and not yet in snapshot (Story 3.1 / AC6).
+        # Never awaits the weather service — refresh runs in the background.
+        on_phase = self.on_phase
+        if on_phase is None:
+            if hass is not None and snapshot.forecast is None:
+                snapshot.forecast = self._forecast_consumer.get_cached_forecast(hass)
+            self._last_forecast = snapshot.forecast
+            return self.evaluate_tactical(snapshot)
+
+        # Timed path: same steps, one perf_counter_ns() per phase boundary.
+        t0 = time.perf_counter_ns()
         if hass is not None and snapshot.forecast is None:
-            snapshot.forecast = await self._forecast_consumer.get_forecast(hass)
+            snapshot.forecast = self._forecast_consumer.get_cached_forecast(hass)
+        self._last_forecast = snapshot.forecast
+        t1 = time.perf_counter_ns()
+        calc = self._calculate(snapshot)
+        t2 = time.perf_counter_ns()
+        result = self._apply_hysteresis(calc, snapshot.timestamp)
+        t3 = time.perf_counter_ns()
+        on_phase("forecast", t1 - t0)
+        on_phase("calculation", t2 - t1)
+        on_phase("hysteresis", t3 - t2)
+        return result
+
+    def evaluate_fast(self, snapshot: SensorSnapshot) -> EvaluationResult:
+        """Re-evaluate on fresh power readings between periodic cycles — no I/O.
+
+        Used by the event-driven fast-reaction path.  Reuses the forecast
+        from the last ``evaluate_cycle`` instead of reading the cache.
+        """
+        if snapshot.forecast is None:
+            snapshot.forecast = self._last_forecast
+        return self.evaluate_tactical(snapshot)
+
+    def evaluate_tactical(self, snapshot: SensorSnapshot) -> EvaluationResult:
+        """Strategic refresh (if due) + tactical calculation + hysteresis."""
+        return self._apply_hysteresis(self._calculate(snapshot), snapshot.timestamp)
+
+    def _calculate(self, snapshot: SensorSnapshot) -> EvaluationResult:
+        """Nowcast, strategic refresh (if due) and tactical calculation."""
+        # 0. PV nowcast — feeds the calculator only when a horizon is set
+        nowcaster = self.nowcaster
+        if nowcaster is not None:
+            t = snapshot.timestamp.timestamp()
+            nowcaster.update(t, snapshot.pv_production_w)
+            nowcast_w = nowcaster.predict(t + self._nowcast_horizon_s)
+            if self._nowcast_horizon_s > 0:
+                snapshot.pv_nowcast_w = nowcast_w
 
         # 1. Pure calculation (Stories 2.1 + 2.2)
-        calc = self._calculator.calculate_surplus(snapshot)
+        if snapshot.soc_percent < SOC_HARD_FLOOR:
+            calc = self._calculator.calculate_surplus(snapshot)
+        else:
+            calc = self._calculator.calculate_tactical(
+                snapshot, self._refresh_strategy(snapshot)
+            )
+        if nowcaster is not None:
+            slope = nowcaster.slope_w_per_s()
+            calc.pv_nowcast_w = nowcast_w
+            calc.pv_trend_w_per_min = None if slope is None else slope * 60.0
+        return calc
+
+    def _apply_hysteresis(
+        self, calc: EvaluationResult, now: datetime
+    ) -> EvaluationResult:
+        """Filter a calculator result through the hysteresis state machine.
 
+        ``calc`` is freshly built per cycle, so it is updated in place rather
+        than copied into a second EvaluationResult.
+        """
         # 2. Apply hysteresis filter (Story 2.3)
-        final_kw = self.hysteresis_filter.update(calc.reported_kw, snapshot.timestamp)
+        final_kw = self.hysteresis_filter.update(calc.reported_kw, now)
 
         # 3. Determine reason and charging state
         charging_state = self.hysteresis_filter.state
         if charging_state == "FAILSAFE":
-            reason = "failsafe_active"
+            calc.reason = Reason.FAILSAFE_ACTIVE
             final_kw = 0.0
-        elif final_kw > 0.0:
-            reason = calc.reason
-        else:
-            reason = "hysteresis_hold_or_inactive"
+        elif final_kw <= 0.0:
+            calc.reason = Reason.HYSTERESIS_HOLD
 
-        return EvaluationResult(
-            reported_kw=final_kw,
-            real_surplus_kw=calc.real_surplus_kw,
-            buffer_used_kw=calc.buffer_used_kw,
-            soc_percent=calc.soc_percent,
-            soc_floor_active=calc.soc_floor_active,
-            charging_state=charging_state,
-            reason=reason,
-            forecast_available=calc.forecast_available,
-        )
+        calc.reported_kw = final_kw
+        calc.charging_state = charging_state
+        return calc
@@ -0,0 +1,317 @@
+"""Parameter sweep — evaluate many engine configurations against one recorded input.
+
+Each configuration runs ``SurplusCalculator.calculate_surplus_batch`` and
+``HysteresisFilter.run_batch`` over the same input columns.  With more than
+one worker the columns live in a single ``multiprocessing.shared_memory``
+block that every pool worker maps read-only, so the dataset is not copied
+per worker or per task.
+
+The simulation is open-loop: SOC, PV and load are the recorded values, so
+the metrics estimate what each configuration would have reported and drawn,
+not how the battery would have evolved under it.
+
+HA-free; requires NumPy.
+
+Standalone:
+    python sweep.py home-assistant_v2.db --config sdm630.json --grid grid.json
+"""
+from __future__ import annotations
+
+import argparse
+import itertools
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from multiprocessing import shared_memory
+
+import numpy as np
+
+if __package__:
+    from .replay import Replay, iter_recorder_states, SUN_ENTITY
+    from .surplus_engine import (
+        STATE_CODE_ACTIVE,
+        HysteresisFilter,
+        SurplusCalculator,
+    )
+else:
+    from replay import Replay, iter_recorder_states, SUN_ENTITY  # type: ignore[no-redef]
+    from surplus_engine import (  # type: ignore[no-redef]
+        STATE_CODE_ACTIVE,
+        HysteresisFilter,
+        SurplusCalculator,
+    )
+
+# Parameters a sweep grid may vary
+SWEEP_KEYS: tuple[str, ...] = (
+    "wallbox_threshold_kw",
+    "hold_time_minutes",
+    "battery_capacity_kwh",
+    "time_strategy",
+    "sunset_cutoff_minutes",
+)
+
+# Row layout of the shared float64 input block.  Times are epoch µs stored
+# as float64 (exact below 2**53 µs, i.e. until year 2255); NaN = missing.
+_COLUMNS: tuple[str, ...] = (
+    "timestamps",
+    "soc_percent",
+    "pv_production_w",
+    "power_to_user_w",
+    "power_from_grid_w",
+    "sunset_times",
+    "sunrise_times",
+    "forecast_available",
+    "cloud_coverage_avg",
+    "solar_forecast_kwh_remaining",
+    "valid",
+)
+_TIME_COLUMNS = frozenset({"timestamps", "sunset_times", "sunrise_times"})
+
+
+@dataclass
+class SweepInputs:
+    """Recorded input columns on a fixed tick grid (``interval_s`` apart).
+
+    ``data`` is a (len(_COLUMNS), n) float64 array; ``valid`` rows are 0 where
+    an input check failed (the engine would have been in FAILSAFE).
+    """
+
+    data: np.ndarray
+    interval_s: float
+
+    def __len__(self) -> int:
+        return self.data.shape[1]
+
+    def column(self, name: str) -> np.ndarray:
+        return self.data[_COLUMNS.index(name)]
+
+    @classmethod
+    def from_columns(cls, interval_s: float, **columns) -> "SweepInputs":
+        """Build from NumPy columns named as in ``calculate_surplus_batch``."""
+        n = len(columns["timestamps"])
+        data = np.full((len(_COLUMNS), n), np.nan)
+        data[_COLUMNS.index("power_from_grid_w")] = 0.0
+        data[_COLUMNS.index("forecast_available")] = 0.0
+        data[_COLUMNS.index("cloud_coverage_avg")] = 50.0
+        data[_COLUMNS.index("valid")] = 1.0
+        for name, values in columns.items():
+            if values is None:
+                continue
+            arr = np.asarray(values)
+            if name in _TIME_COLUMNS:
+                us = arr.astype("datetime64[us]")
+                arr = np.where(np.isnat(us), np.nan, us.astype(np.int64).astype(np.float64))
+            data[_COLUMNS.index(name)] = arr
+        return cls(data, float(interval_s))
+
+    @classmethod
+    def from_recorder(
+        cls,
+        db_path: str,
+        config: dict,
+        start: datetime | None = None,
+        end: datetime | None = None,
+    ) -> "SweepInputs":
+        """Sample recorder history onto the ``evaluation_interval`` tick grid."""
+        replay = Replay(config)
+        rows = iter_recorder_states(
+            db_path, replay.entity_ids, start, end,
+            attribute_entities=[e for e in (SUN_ENTITY, config.get("entities", {}).get("weather")) if e],
+        )
+        out: list[tuple] = []
+        for tick, snap, _reason in replay.iter_snapshots(rows, start, end):
+            if snap is None:
+                out.append((tick * 1e6,) + (np.nan,) * 4 + (np.nan, np.nan, 0.0, 50.0, np.nan, 0.0))
+                continue
+            fc = snap.forecast
+            out.append((
+                tick * 1e6,
+                snap.soc_percent,
+                snap.pv_production_w,
+                snap.power_to_user_w,
+                snap.power_from_grid_w,
+                _epoch_us(snap.sunset_time),
+                _epoch_us(snap.sunrise_time),
+                float(fc.forecast_available),
+                fc.cloud_coverage_avg,
+                np.nan if fc.solar_forecast_kwh_remaining is None else fc.solar_forecast_kwh_remaining,
+                1.0,
+            ))
+        data = np.array(out, dtype=np.float64).T.copy() if out else np.zeros((len(_COLUMNS), 0))
+        return cls(data, float(config.get("evaluation_interval", 15)))
+
+
+@dataclass(frozen=True)
+class SweepResult:
+    """Per-configuration metrics (energies in kWh)."""
+
+    overrides: dict
+    charge_energy_kwh: float        # energy the wallbox was offered (reported kW × time)
+    battery_energy_kwh: float       # share of it drawn from the battery
+    grid_import_kwh: float          # share neither PV nor battery could cover
+    charge_cycles: int              # INACTIVE/FAILSAFE → ACTIVE transitions
+
+
+def _epoch_us(value: datetime | None) -> float:
+    if value is None:
+        return np.nan
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return round(value.timestamp() * 1_000_000)
+
+
+def expand_grid(grid: dict[str, list]) -> list[dict]:
+    """Cartesian product of ``{key: [values, ...]}`` → list of override dicts."""
+    unknown = set(grid) - set(SWEEP_KEYS)
+    if unknown:
+        raise ValueError(f"Unsupported sweep keys: {sorted(unknown)}")
+    keys = list(grid)
+    return [dict(zip(keys, combo)) for combo in itertools.product(*(grid[k] for k in keys))]
+
+
+# ---------------------------------------------------------------------------
+# Evaluation (runs in pool workers)
+# ---------------------------------------------------------------------------
+
+def evaluate_config(base_config: dict, overrides: dict, inputs: SweepInputs) -> SweepResult:
+    """Run one configuration over ``inputs`` and compute its metrics."""
+    config = {**base_config, **overrides}
+    cols = {name: inputs.column(name) for name in _COLUMNS}
+    times = {
+        name: np.where(np.isnan(cols[name]), np.iinfo(np.int64).min, cols[name])
+        .astype(np.int64).astype("datetime64[us]")
+        for name in _TIME_COLUMNS
+    }
+    valid = cols["valid"] > 0
+    soc = np.where(valid, cols["soc_percent"], 0.0)
+
+    calc = SurplusCalculator(config)
+    batch = calc.calculate_surplus_batch(
+        times["timestamps"],
+        soc,
+        np.where(valid, cols["pv_production_w"], 0.0),
+        np.where(valid, cols["power_to_user_w"], 0.0),
+        np.where(valid, cols["power_from_grid_w"], 0.0),
+        sunset_times=times["sunset_times"],
+        sunrise_times=times["sunrise_times"],
+        forecast_available=cols["forecast_available"] > 0,
+        cloud_coverage_avg=cols["cloud_coverage_avg"],
+        solar_forecast_kwh_remaining=cols["solar_forecast_kwh_remaining"],
+    )
+
+    # Hysteresis per valid segment.  FAILSAFE → resume leaves the filter
+    # INACTIVE with no hold, i.e. exactly a fresh filter.
+    hf = HysteresisFilter(config)
+    final_kw = np.zeros(len(inputs))
+    state = np.zeros(len(inputs), dtype=np.int8)
+    edges = np.flatnonzero(np.diff(valid.astype(np.int8))) + 1
+    for seg_start, seg_end in zip(np.r_[0, edges], np.r_[edges, len(inputs)]):
+        if not valid[seg_start]:
+            hf = HysteresisFilter(config)
+            continue
+        final_kw[seg_start:seg_end], state[seg_start:seg_end] = hf.run_batch(
+            batch.reported_kw[seg_start:seg_end], times["timestamps"][seg_start:seg_end]
+        )
+
+    # Energy split while charging: PV surplus first, then battery (up to the
+    # buffer limit the calculator allows), then grid.
+    hours = inputs.interval_s / 3600.0
+    surplus_kw = np.maximum(batch.real_surplus_kw, 0.0)
+    deficit_kw = np.maximum(final_kw - surplus_kw, 0.0)
+    battery_kw = np.minimum(deficit_kw, batch.buffer_kw_max)
+    active = state == STATE_CODE_ACTIVE
+    starts = int(np.count_nonzero(active[1:] & ~active[:-1]) + (1 if len(active) and active[0] else 0))
+
+    return SweepResult(
+        overrides=overrides,
+        charge_energy_kwh=float(final_kw.sum() * hours),
+        battery_energy_kwh=float(battery_kw.sum() * hours),
+        grid_import_kwh=float((deficit_kw - battery_kw).sum() * hours),
+        charge_cycles=starts,
+    )
+
+
+_worker: dict = {}
+
+
+def _attach(shm_name: str, shape: tuple[int, int], interval_s: float, base_config: dict) -> None:
+    """Pool initializer: map the shared input block once per worker."""
+    shm = shared_memory.SharedMemory(name=shm_name)
+    data = np.ndarray(shape, dtype=np.float64, buffer=shm.buf)
+    data.flags.writeable = False
+    _worker.update(shm=shm, inputs=SweepInputs(data, interval_s), base_config=base_config)
+
+
+def _run_in_worker(overrides: dict) -> SweepResult:
+    return evaluate_config(_worker["base_config"], overrides, _worker["inputs"])
+
+
+def run_sweep(
+    base_config: dict,
+    inputs: SweepInputs,
+    configs: list[dict] | dict[str, list],
+    *,
+    max_workers: int | None = None,
+) -> list[SweepResult]:
+    """Evaluate every override dict in ``configs`` (or a grid) against ``inputs``.
+
+    ``max_workers=1`` runs in-process; otherwise a process pool (default:
+    ``os.cpu_count()`` workers) shares ``inputs`` through shared memory.
+    Results are returned in ``configs`` order.
+    """
+    if isinstance(configs, dict):
+        configs = expand_grid(configs)
+    workers = max_workers or os.cpu_count() or 1
+    if workers <= 1 or len(configs) <= 1:
+        return [evaluate_config(base_config, o, inputs) for o in configs]
+
+    shm = shared_memory.SharedMemory(create=True, size=max(inputs.data.nbytes, 1))
+    try:
+        np.ndarray(inputs.data.shape, dtype=np.float64, buffer=shm.buf)[:] = inputs.data
+        with ProcessPoolExecutor(
+            max_workers=min(workers, len(configs)),
+            initializer=_attach,
+            initargs=(shm.name, inputs.data.shape, inputs.interval_s, base_config),
+        ) as pool:
+            chunksize = max(1, len(configs) // (workers * 4))
+            return list(pool.map(_run_in_worker, configs, chunksize=chunksize))
+    finally:
+        shm.close()
+        shm.unlink()
+
+
+# ---------------------------------------------------------------------------
+# Standalone entry point
+# ---------------------------------------------------------------------------
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Sweep engine parameters over recorder history.")
+    parser.add_argument("db", help="Path to home-assistant_v2.db")
+    parser.add_argument("--config", required=True, help="JSON file with the base config")
+    parser.add_argument("--grid", required=True, help="JSON file: {param: [values, ...]}")
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args(argv)
+
+    with open(args.config, encoding="utf-8") as fp:
+        config = json.load(fp)
+    if "seasonal_targets" in config:
+        config["seasonal_targets"] = {int(k): v for k, v in config["seasonal_targets"].items()}
+    with open(args.grid, encoding="utf-8") as fp:
+        grid = json.load(fp)
+
+    inputs = SweepInputs.from_recorder(args.db, config)
+    results = run_sweep(config, inputs, grid, max_workers=args.workers)
+    print("charge_kwh\tbattery_kwh\tgrid_kwh\tcycles\tconfig")
+    for r in sorted(results, key=lambda r: -r.charge_energy_kwh):
+        print(
+            f"{r.charge_energy_kwh:.2f}\t{r.battery_energy_kwh:.2f}\t"
+            f"{r.grid_import_kwh:.2f}\t{r.charge_cycles}\t{json.dumps(r.overrides)}"
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -4,7 +4,7 @@ import importlib.util
 import os
 import sys
 import types
-from unittest.mock import AsyncMock
+from unittest.mock import AsyncMock, MagicMock
 
 import pytest
 import voluptuous as vol
@@ -44,6 +44,37 @@ def _install_ha_stubs() -> None:
 _install_ha_stubs()
 
 
+# ---------------------------------------------------------------------------
+# sensor.py fixtures (test_sensor, test_range_validation, ...staleness)
+# ---------------------------------------------------------------------------
+
+def modbus_server_stub(pkg: str, input_data_block) -> types.ModuleType:
+    """Stand-in for ``{pkg}.modbus_server`` — the sensor loads without pymodbus.
+
+    ``build_server`` returns one server whose ``input_data_block`` is the
+    given mock; the echo patch and the server coroutine are mocks.
+    """
+    mod = types.ModuleType(f"{pkg}.modbus_server")
+    server = types.SimpleNamespace(
+        context=MagicMock(), identity=MagicMock(),
+        input_data_block=input_data_block, holding_data_block=MagicMock(),
+    )
+    mod.build_server = lambda: server
+    mod.apply_echo_patch = MagicMock()
+    mod.start_modbus_server = AsyncMock()
+    return mod
+
+
+def load_decision_trace(pkg: str):
+    """Load decision_trace.py against the installed surplus_engine stub."""
+    name = f"{pkg}.decision_trace"
+    spec = importlib.util.spec_from_file_location(name, os.path.join(ROOT, "decision_trace.py"))
+    mod = importlib.util.module_from_spec(spec)
+    sys.modules[name] = mod
+    spec.loader.exec_module(mod)
+    return mod
+
+
 @pytest.fixture(scope="session")
 def comp():
     """Return the sdm630_simulator __init__ module (loaded once per session)."""
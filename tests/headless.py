@@ -0,0 +1,404 @@
+"""Headless driver — runs SDM630SimSensor on a virtual clock without HA.
+
+Extends the conftest stubs (homeassistant.helpers) with the minimum sensor.py
+needs: entity base classes, a dict-backed state machine whose writes fire
+``state_changed`` into the subscribed handler (and whose integration polls
+fire ``state_reported``), and a loop facade whose ``call_later`` runs on
+virtual time.  Nothing sleeps — a day of 15-second
+ticks finishes in well under a second.
+
+    driver = HeadlessDriver(config, start=datetime(2026, 6, 15, tzinfo=timezone.utc))
+    driver.run(
+        [(0, "sensor.pv", "8000"), (3600, "sensor.pv", "unavailable")],
+        duration_s=86400,
+    )
+    driver.log   # [(timestamp, reported_kw, charging_state), ...]
+"""
+from __future__ import annotations
+
+import asyncio
+import heapq
+import importlib.util
+import itertools
+import os
+import sys
+import types
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Loaded under its own package name so it never collides with the
+# per-test ``sdm630_simulator`` stubs in test_sensor.py and friends.
+PKG = "sdm630_headless"
+
+
+# ---------------------------------------------------------------------------
+# Virtual time
+# ---------------------------------------------------------------------------
+
+class VirtualClock:
+    """Callable UTC clock advanced explicitly by the driver."""
+
+    def __init__(self, start: datetime) -> None:
+        self._now = start
+
+    def __call__(self) -> datetime:
+        return self._now
+
+    def advance_to(self, when: datetime) -> None:
+        if when > self._now:
+            self._now = when
+
+
+@dataclass
+class FakeState:
+    entity_id: str
+    state: str
+    attributes: dict = field(default_factory=dict)
+    last_updated: datetime | None = None
+    last_reported: datetime | None = None
+
+
+class FakeStates:
+    """``hass.states`` — get/async_set/async_remove on a plain dict."""
+
+    def __init__(self, hass: "FakeHass") -> None:
+        self._hass = hass
+        self._states: dict[str, FakeState] = {}
+
+    def get(self, entity_id: str) -> FakeState | None:
+        return self._states.get(entity_id)
+
+    def async_set(self, entity_id: str, state: str, attributes: dict | None = None) -> None:
+        now = self._hass.clock()
+        new = FakeState(entity_id, str(state), attributes or {}, now, now)
+        self._states[entity_id] = new
+        self._hass.fire_state_changed(new)
+
+    def async_report_all(self) -> None:
+        """Every integration re-writes its unchanged value (``state_reported``)."""
+        now = self._hass.clock()
+        for state in self._states.values():
+            state.last_reported = now
+            self._hass.fire_state_reported(state)
+
+    def async_remove(self, entity_id: str) -> None:
+        self._states.pop(entity_id, None)
+
+
+class FakeLoop:
+    """``hass.loop`` facade: ``call_later``/``call_at`` on virtual time; tasks
+    are queued and awaited by the driver before the next step.
+
+    Loop time for ``call_at`` is the virtual clock's epoch seconds — the
+    sensor's ``_monotonic`` base when it runs on an injected clock.
+    """
+
+    def __init__(self, hass: "FakeHass") -> None:
+        self._hass = hass
+        self._timers: list = []
+        self._seq = itertools.count()
+
+    def call_later(self, delay: float, callback, *args):
+        return self._schedule(self._hass.clock() + timedelta(seconds=delay), callback, args)
+
+    def call_at(self, when: float, callback, *args):
+        return self._schedule(datetime.fromtimestamp(when, timezone.utc), callback, args)
+
+    def _schedule(self, when: datetime, callback, args):
+        handle = _TimerHandle()
+        heapq.heappush(self._timers, (when, next(self._seq), handle, callback, args))
+        return handle
+
+    def create_task(self, coro):
+        self._hass.pending.append(coro)
+
+    def run_due(self, now: datetime) -> None:
+        """Fire timers due by ``now``, each at its own virtual time."""
+        while self._timers and self._timers[0][0] <= now:
+            when, _seq, handle, callback, args = heapq.heappop(self._timers)
+            if not handle.cancelled:
+                self._hass.clock.advance_to(when)
+                callback(*args)
+
+
+class _TimerHandle:
+    cancelled = False
+
+    def cancel(self) -> None:
+        self.cancelled = True
+
+
+class FakeHass:
+    """Just enough of ``HomeAssistant`` for SDM630SimSensor."""
+
+    def __init__(self, clock: VirtualClock) -> None:
+        self.clock = clock
+        self.states = FakeStates(self)
+        self.loop = FakeLoop(self)
+        self.services = types.SimpleNamespace(async_call=_no_service)
+        self.pending: list = []          # coroutines from loop.create_task
+        self.state_listeners: dict[str, list] = {}
+        self.report_listeners: dict[str, list] = {}
+        self.interval_listeners: list = []
+
+    def fire_state_changed(self, new_state: FakeState) -> None:
+        event = types.SimpleNamespace(data={"new_state": new_state})
+        for listener in self.state_listeners.get(new_state.entity_id, ()):
+            listener(event)
+
+    def fire_state_reported(self, state: FakeState) -> None:
+        event = types.SimpleNamespace(data={"entity_id": state.entity_id, "new_state": state})
+        for listener in self.report_listeners.get(state.entity_id, ()):
+            listener(event)
+
+
+async def _no_service(*_args, **_kwargs):
+    raise RuntimeError("no services in headless mode")
+
+
+# ---------------------------------------------------------------------------
+# Module stubs + sensor loading
+# ---------------------------------------------------------------------------
+
+class _Entity:
+    hass = None
+    _attr_name = None
+    _attr_native_value = None
+    _attr_unique_id = None
+    _attr_should_poll = True
+    _attr_is_on = False
+
+    async def async_added_to_hass(self):
+        pass
+
+    def async_on_remove(self, func):
+        pass
+
+    def async_write_ha_state(self):
+        pass
+
+
+class _RecordingDataBlock:
+    """Data block stand-in: keeps the last float per address."""
+
+    def __init__(self, values: dict[int, float] | None = None) -> None:
+        self.values: dict[int, float] = dict(values or {})
+
+    def set_float(self, address: int, value: float) -> None:
+        self.values[address] = value
+
+    def set_floats(self, values: dict[int, float]) -> None:
+        self.values.update(values)
+
+    def get_float(self, address: int) -> float:
+        return self.values[address]
+
+
+def _track_state_change_event(hass, entity_ids, action):
+    for entity_id in entity_ids:
+        hass.state_listeners.setdefault(entity_id, []).append(action)
+    return lambda: None
+
+
+def _track_state_report_event(hass, entity_ids, action):
+    for entity_id in entity_ids:
+        hass.report_listeners.setdefault(entity_id, []).append(action)
+    return lambda: None
+
+
+def _track_time_interval(hass, action, interval):
+    hass.interval_listeners.append((action, interval))
+    return lambda: None
+
+
+def _parse_datetime(value):
+    try:
+        return datetime.fromisoformat(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _module(name: str, **attrs) -> types.ModuleType:
+    mod = types.ModuleType(name)
+    mod.__dict__.update(attrs)
+    return mod
+
+
+def _load_submodule(name: str, filename: str):
+    spec = importlib.util.spec_from_file_location(
+        f"{PKG}.{name}", os.path.join(ROOT, filename)
+    )
+    mod = importlib.util.module_from_spec(spec)
+    sys.modules[spec.name] = mod
+    try:
+        spec.loader.exec_module(mod)
+    except BaseException:
+        sys.modules.pop(spec.name, None)
+        raise
+    return mod
+
+
+def load_sensor_module():
+    """Load the component (real ``__init__``, engine, registers) and sensor.py.
+
+    ``__init__`` runs against the conftest ``homeassistant.helpers`` stubs;
+    the remaining HA modules are stubbed only while sensor.py executes (it
+    binds its imports at load time), then restored.  pymodbus is not needed:
+    sensor.py imports it only during platform setup.
+    """
+    sensor_name = f"{PKG}.sensor"
+    if sensor_name in sys.modules:
+        return sys.modules[sensor_name]
+
+    pkg_spec = importlib.util.spec_from_file_location(
+        PKG, os.path.join(ROOT, "__init__.py"), submodule_search_locations=[ROOT],
+    )
+    pkg = importlib.util.module_from_spec(pkg_spec)
+    sys.modules[PKG] = pkg
+    pkg_spec.loader.exec_module(pkg)
+    _load_submodule("surplus_engine", "surplus_engine.py")
+    _load_submodule("decision_trace", "decision_trace.py")
+    _load_submodule("sdm630_input_registers", "sdm630_input_registers.py")
+    holding = _load_submodule("sdm630_holding_registers", "sdm630_holding_registers.py")
+    sys.modules[f"{PKG}.modbus_server"] = _module(
+        f"{PKG}.modbus_server",
+        apply_echo_patch=lambda: None,
+        build_server=lambda: types.SimpleNamespace(
+            context=None, identity=None,
+            input_data_block=_RecordingDataBlock(),
+            holding_data_block=_RecordingDataBlock({
+                r.address: r.default_value
+                for r in holding.SDM630HoldingRegisters().get_all()
+            }),
+        ),
+    )
+
+    stubs = {
+        "homeassistant.components": _module("homeassistant.components"),
+        "homeassistant.components.sensor": _module(
+            "homeassistant.components.sensor",
+            SensorEntity=_Entity, RestoreSensor=_Entity,
+            SensorDeviceClass=types.SimpleNamespace(POWER="power", TIMESTAMP="timestamp"),
+        ),
+        "homeassistant.components.binary_sensor": _module(
+            "homeassistant.components.binary_sensor",
+            BinarySensorEntity=_Entity,
+            BinarySensorDeviceClass=types.SimpleNamespace(PROBLEM="problem"),
+        ),
+        "homeassistant.const": _module(
+            "homeassistant.const",
+            CONF_NAME="name", STATE_UNAVAILABLE="unavailable", STATE_UNKNOWN="unknown",
+        ),
+        "homeassistant.core": _module("homeassistant.core", callback=lambda f: f),
+        "homeassistant.helpers.event": _module(
+            "homeassistant.helpers.event",
+            async_track_state_change_event=_track_state_change_event,
+            async_track_state_report_event=_track_state_report_event,
+            async_track_time_interval=_track_time_interval,
+        ),
+        "homeassistant.util.dt": _module(
+            "homeassistant.util.dt",
+            utcnow=lambda: datetime.now(timezone.utc), parse_datetime=_parse_datetime,
+        ),
+    }
+    stubs["homeassistant.util"] = _module("homeassistant.util", dt=stubs["homeassistant.util.dt"])
+
+    saved = {k: sys.modules.get(k) for k in stubs}
+    sys.modules.update(stubs)
+    try:
+        mod = _load_submodule("sensor", "sensor.py")
+        mod._load_modbus_server()       # recording blocks, bound once per session
+        return mod
+    finally:
+        for k, v in saved.items():
+            if v is None:
+                sys.modules.pop(k, None)
+            else:
+                sys.modules[k] = v
+
+
+# ---------------------------------------------------------------------------
+# Driver
+# ---------------------------------------------------------------------------
+
+class HeadlessDriver:
+    """Feeds a scripted trace into SDM630SimSensor and ticks it on virtual time.
+
+    Trace entries are ``(offset_s, entity_id, state)``; ``state=None`` removes
+    the entity from the state machine (the way a deleted/orphaned entity goes
+    stale).  Attributes can be given as a fourth element.  Between trace
+    entries the source integrations re-report their values every ``poll_s``
+    seconds; ``poll_s=None`` freezes them.
+    """
+
+    def __init__(self, config: dict, start: datetime, poll_s: float | None = 30.0) -> None:
+        self.mod = load_sensor_module()
+        self.start = start
+        self.clock = VirtualClock(start)
+        self.hass = FakeHass(self.clock)
+        self.config = config
+        self.sensor = self.mod.SDM630SimSensor("Headless", self.hass, config, clock=self.clock)
+        self.interval = timedelta(seconds=config.get("evaluation_interval", 15))
+        self.poll = None if poll_s is None else timedelta(seconds=poll_s)
+        self.log: list[tuple[datetime, float, str]] = []
+
+    @property
+    def engine(self):
+        return self.sensor._engine
+
+    @property
+    def register_kw(self) -> float | None:
+        """Last value written to the TOTAL_POWER input register."""
+        return self.mod.input_data_block.values.get(self.mod.TOTAL_POWER)
+
+    def set_state(self, entity_id: str, state, attributes: dict | None = None) -> None:
+        if state is None:
+            self.hass.states.async_remove(entity_id)
+        else:
+            self.hass.states.async_set(entity_id, state, attributes)
+
+    def run(self, trace, duration_s: float) -> list[tuple[datetime, float, str]]:
+        """Run ``trace`` for ``duration_s`` of virtual time; returns the tick log."""
+        return asyncio.run(self.run_async(trace, duration_s))
+
+    async def run_async(self, trace, duration_s: float) -> list[tuple[datetime, float, str]]:
+        if self.engine is None:
+            self.sensor.set_warm_state(
+                *await self.mod._async_warm_start(self.hass, self.config, self.clock())
+            )
+            await self.sensor.async_added_to_hass()
+        (tick_action, _interval), = self.hass.interval_listeners
+        events = sorted(trace, key=lambda e: e[0])
+        idx = 0
+        end = self.start + timedelta(seconds=duration_s)
+        tick = self.clock() + self.interval
+        next_poll = None if self.poll is None else self.clock() + self.poll
+        while tick <= end:
+            # State changes and timers due before this tick, in time order
+            while idx < len(events) and self.start + timedelta(seconds=events[idx][0]) <= tick:
+                offset, entity_id, state, *attrs = events[idx]
+                at = self.start + timedelta(seconds=offset)
+                self.hass.loop.run_due(at)
+                await self._drain()
+                self.clock.advance_to(at)
+                self.set_state(entity_id, state, attrs[0] if attrs else None)
+                await self._drain()
+                idx += 1
+            self.hass.loop.run_due(tick)
+            await self._drain()
+            self.clock.advance_to(tick)
+            if next_poll is not None and next_poll <= tick:
+                self.hass.states.async_report_all()
+                next_poll += self.poll
+            await tick_action(tick)
+            self.log.append((tick, self.sensor._attr_native_value, self.engine.hysteresis_filter.state))
+            tick += self.interval
+        self.hass.loop.run_due(end)   # timers after the last tick, within the run
+        await self._drain()
+        self.clock.advance_to(end)
+        return self.log
+
+    async def _drain(self) -> None:
+        while self.hass.pending:
+            await self.hass.pending.pop(0)
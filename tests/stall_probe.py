@@ -0,0 +1,69 @@
+"""Server stand-in and client for the loop-stall benchmarks.
+
+``serve_tcp`` answers a line protocol instead of Modbus RTU (no serial port,
+and no pymodbus needed), but reads registers exactly like the Modbus data
+blocks do: from a table with ``read(address, count)``, counting each
+request with ``count_poll()``.  test_modbus_process.py runs it in the
+server process (which imports this module by name from ``tests/``),
+test_modbus_thread.py on the I/O thread; both also run it on the stalled
+loop for comparison.
+"""
+import asyncio
+import socket
+import time
+
+
+async def serve_tcp(port: int | str, image) -> None:
+    """Answer ``"<address> <count>"`` lines with words from ``image.input``.
+
+    ``port`` may be a string (a ``ModbusProcess`` argument).
+    """
+
+    async def _handle(reader, writer):
+        while line := await reader.readline():
+            address, count = map(int, line.split())
+            words = image.input.read(address, count)
+            image.count_poll()
+            writer.write((" ".join(map(str, words)) + "\n").encode())
+            await writer.drain()
+        writer.close()
+
+    server = await asyncio.start_server(_handle, "127.0.0.1", int(port))
+    async with server:
+        await server.serve_forever()
+
+
+async def no_server(image) -> None:
+    """Return at once, like a server that cannot open its serial port."""
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def connect(port: int, timeout: float = 30.0) -> socket.socket:
+    """Connect, retrying until the server is up."""
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            return socket.create_connection(("127.0.0.1", port), timeout=5)
+        except OSError:
+            if time.monotonic() > deadline:
+                raise
+            time.sleep(0.05)
+
+
+def latencies(port: int, requests: int = 15, gap_s: float = 0.02) -> list[float]:
+    """Blocking client (own thread): poll TOTAL_POWER, one request at a time."""
+    with connect(port) as sock, sock.makefile("rwb") as f:
+        result = []
+        for _ in range(requests):
+            start = time.perf_counter()
+            f.write(b"53 2\n")
+            f.flush()
+            assert len(f.readline().split()) == 2
+            result.append(time.perf_counter() - start)
+            time.sleep(gap_s)
+        return result
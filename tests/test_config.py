@@ -240,6 +240,11 @@ class TestConfigSchema:
         result = comp.CONFIG_SCHEMA(valid)
         assert comp.DOMAIN in result
 
+    def test_zero_forecast_ttl_rejected(self, comp):
+        cfg = {**VALID_CONFIG["sdm630_simulator"], "forecast_ttl_seconds": 0}
+        with pytest.raises(vol.Invalid):
+            comp.COMPONENT_SCHEMA(cfg)
+
     def test_config_schema_allows_extra_keys(self, comp):
         valid = {
             comp.DOMAIN: {
@@ -276,7 +281,7 @@ VALID_CONFIG = {
 def _make_hass():
     hass = MagicMock()
     hass.data = {}
-    hass.async_create_task = MagicMock()
+    hass.async_create_task = MagicMock(side_effect=lambda coro: coro.close())  # platform load not run
     return hass
 
 
@@ -379,3 +384,139 @@ class TestAsyncSetup:
         entities = hass.data[comp.DOMAIN]["config"]["entities"]
         assert entities["soc"] == "sensor.battery_soc"
         assert entities["power_to_grid"] == "sensor.grid_export"
+
+
+class TestInputFiltersSchema:
+    def test_median_and_ewma_accepted(self, comp):
+        result = comp.INPUT_FILTERS_SCHEMA({
+            "pv_production": {"type": "median", "window": 3},
+            "power_to_user": {"type": "ewma", "alpha": 0.5},
+        })
+        assert result["pv_production"]["window"] == 3
+
+    def test_soc_role_rejected(self, comp):
+        with pytest.raises(vol.Invalid):
+            comp.INPUT_FILTERS_SCHEMA({"soc": {"type": "ewma"}})
+
+    def test_zero_alpha_rejected(self, comp):
+        with pytest.raises(vol.Invalid):
+            comp.INPUT_FILTERS_SCHEMA({"pv_production": {"type": "ewma", "alpha": 0}})
+
+    def test_window_param_not_valid_for_ewma(self, comp):
+        with pytest.raises(vol.Invalid):
+            comp.INPUT_FILTERS_SCHEMA({"pv_production": {"type": "ewma", "window": 3}})
+
+    @pytest.mark.asyncio
+    async def test_passed_through_by_async_setup(self, comp):
+        hass = _make_hass()
+        filters = {"pv_production": {"type": "median", "window": 5}}
+        cfg = {"sdm630_simulator": {**VALID_CONFIG["sdm630_simulator"], "input_filters": filters}}
+        await comp.async_setup(hass, cfg)
+        assert hass.data[comp.DOMAIN]["config"]["input_filters"] == filters
+
+
+class TestPhaseSynthesisSchema:
+    def test_phase_split_coerced_to_floats(self, comp):
+        assert comp.PHASE_SPLIT_SCHEMA([2, 1, 1]) == [2.0, 1.0, 1.0]
+
+    @pytest.mark.parametrize("split", [[1, 1], [1, 1, 1, 1], [0, 0, 0], [1, -1, 1]])
+    def test_invalid_phase_split_rejected(self, comp, split):
+        with pytest.raises(vol.Invalid):
+            comp.PHASE_SPLIT_SCHEMA(split)
+
+    @pytest.mark.parametrize("pf", [0, 1.2])
+    def test_power_factor_out_of_range_rejected(self, comp, pf):
+        cfg = {**VALID_CONFIG["sdm630_simulator"], "power_factor": pf}
+        with pytest.raises(vol.Invalid):
+            comp.COMPONENT_SCHEMA(cfg)
+
+    @pytest.mark.asyncio
+    async def test_defaults_applied_by_async_setup(self, comp):
+        hass = _make_hass()
+        await comp.async_setup(hass, VALID_CONFIG)
+        cfg = hass.data[comp.DOMAIN]["config"]
+        assert cfg["phase_split"] == [1.0, 1.0, 1.0]
+        assert cfg["power_factor"] == 1.0
+
+
+class TestPublishPoliciesSchema:
+    def test_partial_policy_accepted(self, comp):
+        assert comp.PUBLISH_POLICIES_SCHEMA({"raw_surplus": {"deadband_w": 100}}) == {
+            "raw_surplus": {"deadband_w": 100.0}
+        }
+
+    @pytest.mark.parametrize("policy", [
+        {"unknown_entity": {"deadband_w": 10}},
+        {"power": {"deadband_w": -1}},
+        {"power": {"heartbeat_s": -5}},
+    ])
+    def test_invalid_policy_rejected(self, comp, policy):
+        with pytest.raises(vol.Invalid):
+            comp.PUBLISH_POLICIES_SCHEMA(policy)
+
+    @pytest.mark.asyncio
+    async def test_merged_per_entity_by_async_setup(self, comp):
+        hass = _make_hass()
+        cfg = {"sdm630_simulator": {
+            **VALID_CONFIG["sdm630_simulator"],
+            "publish_policies": {"power": {"heartbeat_s": 60}},
+        }}
+        await comp.async_setup(hass, cfg)
+        policies = hass.data[comp.DOMAIN]["config"]["publish_policies"]
+        assert policies["power"] == {"deadband_w": 0.0, "heartbeat_s": 60}
+        assert policies["raw_surplus"] == comp.DEFAULTS["publish_policies"]["raw_surplus"]
+
+
+class TestMetricsPort:
+    @pytest.mark.parametrize("port", [-1, 65536])
+    def test_out_of_range_rejected(self, comp, port):
+        with pytest.raises(vol.Invalid):
+            comp.COMPONENT_SCHEMA({**VALID_CONFIG["sdm630_simulator"], "metrics_port": port})
+
+    @pytest.mark.asyncio
+    async def test_disabled_by_default(self, comp):
+        hass = _make_hass()
+        await comp.async_setup(hass, VALID_CONFIG)
+        assert hass.data[comp.DOMAIN]["config"]["metrics_port"] == 0
+
+
+class TestTickProfilingConfig:
+    def test_budget_below_one_ms_rejected(self, comp):
+        with pytest.raises(vol.Invalid):
+            comp.COMPONENT_SCHEMA({**VALID_CONFIG["sdm630_simulator"], "tick_budget_ms": 0})
+
+    @pytest.mark.asyncio
+    async def test_defaults_applied_by_async_setup(self, comp):
+        hass = _make_hass()
+        await comp.async_setup(hass, VALID_CONFIG)
+        cfg = hass.data[comp.DOMAIN]["config"]
+        assert (cfg["tick_profiling"], cfg["tick_budget_ms"]) == (False, 50)
+
+
+class TestWarmRestartConfig:
+    @pytest.mark.asyncio
+    async def test_default_max_age(self, comp):
+        hass = _make_hass()
+        await comp.async_setup(hass, VALID_CONFIG)
+        assert hass.data[comp.DOMAIN]["config"]["warm_restart_max_age_seconds"] == 300
+
+    def test_negative_rejected(self, comp):
+        with pytest.raises(vol.Invalid):
+            comp.COMPONENT_SCHEMA({
+                **VALID_CONFIG["sdm630_simulator"], "warm_restart_max_age_seconds": -1,
+            })
+
+
+class TestModbusServerModeConfig:
+    @pytest.mark.asyncio
+    async def test_default_is_event_loop(self, comp):
+        hass = _make_hass()
+        await comp.async_setup(hass, VALID_CONFIG)
+        assert hass.data[comp.DOMAIN]["config"]["modbus_server_mode"] == "loop"
+
+    def test_process_and_thread_accepted_unknown_rejected(self, comp):
+        base = VALID_CONFIG["sdm630_simulator"]
+        for mode in ("process", "thread"):
+            assert comp.COMPONENT_SCHEMA({**base, "modbus_server_mode": mode})
+        with pytest.raises(vol.Invalid):
+            comp.COMPONENT_SCHEMA({**base, "modbus_server_mode": "subprocess"})
@@ -0,0 +1,128 @@
+"""Unit tests for the decision trace — no HA runtime required.
+
+Run: python -m pytest tests/test_decision_trace.py -v
+"""
+import csv
+import importlib.util
+import io
+import json
+import os
+import sys
+import tracemalloc
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _load(name: str):
+    sys.modules.pop(name, None)
+    spec = importlib.util.spec_from_file_location(name, os.path.join(ROOT, f"{name}.py"))
+    mod = importlib.util.module_from_spec(spec)
+    sys.modules[name] = mod
+    spec.loader.exec_module(mod)
+    return mod
+
+
+@pytest.fixture(scope="module")
+def se():
+    return _load("surplus_engine")
+
+
+@pytest.fixture(scope="module")
+def dt(se):
+    """decision_trace, imported standalone against the surplus_engine above."""
+    return _load("decision_trace")
+
+
+class TestDecisionTrace:
+    INPUTS = (80.0, 1500.0, 6000.0, 1000.0, 0.0)
+
+    def _result(self, se, reported_kw=5.0, state="ACTIVE", reason="wallbox_included_in_load|ok"):
+        return se.EvaluationResult(
+            reported_kw=reported_kw, real_surplus_kw=5.25, buffer_used_kw=0.5,
+            soc_percent=80.0, soc_floor_active=50, charging_state=state,
+            reason=reason, forecast_available=True,
+        )
+
+    def test_record_roundtrip(self, se, dt):
+        trace = dt.DecisionTrace(4)
+        trace.append(1781524800.0, self.INPUTS, self._result(se))
+        (rec,) = trace.records()
+        assert rec == {
+            "timestamp": "2026-06-15T12:00:00+00:00",
+            "soc_percent": 80.0, "power_to_grid_w": 1500.0, "pv_production_w": 6000.0,
+            "power_to_user_w": 1000.0, "power_from_grid_w": 0.0,
+            "soc_floor": 50, "real_surplus_kw": 5.25, "buffer_used_kw": 0.5,
+            "reported_kw": 5.0, "charging_state": "ACTIVE",
+            "reason": "wallbox_included_in_load|ok", "forecast_available": True,
+        }
+
+    def test_record_is_45_bytes(self, dt):
+        assert dt._TRACE_RECORD.size == 45          # as documented in the README
+
+    def test_ring_keeps_newest_records_in_order(self, se, dt):
+        trace = dt.DecisionTrace(3)
+        for i in range(5):
+            trace.append(1781524800.0 + 15 * i, self.INPUTS, self._result(se, reported_kw=i))
+        assert len(trace) == 3
+        assert [r["reported_kw"] for r in trace.records()] == [2.0, 3.0, 4.0]
+        assert [r["reported_kw"] for r in trace.records(2)] == [3.0, 4.0]
+        assert trace.records(0) == []
+
+    def test_per_tick_numbers_share_one_reason_code(self, se, dt):
+        trace = dt.DecisionTrace(200)
+        for s in range(61, 250):
+            trace.append(0.0, self.INPUTS, self._result(
+                se, 0.0, "FAILSAFE", f"sensor.sph10000_soc stale for {s}s"))
+        assert trace.records(1)[0]["reason"] == "sensor.sph10000_soc stale for #s"
+        assert len(trace._reasons) == 1
+
+    def test_numbered_reason_folded_once(self, se, dt, monkeypatch):
+        trace = dt.DecisionTrace(8)
+        folds = []
+        pattern = dt._TRACE_NUMBER
+        monkeypatch.setattr(dt, "_TRACE_NUMBER", type("P", (), {
+            "sub": staticmethod(lambda r, s: folds.append(s) or pattern.sub(r, s)),
+        }))
+        for _ in range(3):
+            trace.append(0.0, self.INPUTS, self._result(se, reason="near_sunset(42min)"))
+        assert folds == ["near_sunset(42min)"]
+
+    def test_raw_reason_cache_is_bounded(self, se, dt, monkeypatch):
+        monkeypatch.setattr(dt, "_TRACE_MAX_RAW_REASONS", 4)
+        trace = dt.DecisionTrace(8)
+        for s in range(10):
+            trace.append(0.0, self.INPUTS, self._result(se, reason=f"stale for {s}s"))
+        assert len(trace._raw_codes) <= 4
+        assert set(trace._raw_codes.values()) == {0}
+
+    def test_reason_table_is_bounded(self, se, dt):
+        trace = dt.DecisionTrace(8)
+        for i in range(300):
+            trace.append(0.0, self.INPUTS, self._result(se, reason=f"reason_{i}"))
+        assert len(trace._reasons) == 255
+        assert trace.records(1)[0]["reason"] == "<other>"
+
+    def test_csv_and_json_export(self, se, dt):
+        trace = dt.DecisionTrace(4)
+        trace.append(1781524800.0, self.INPUTS, self._result(se))
+        rows = list(csv.DictReader(io.StringIO(trace.to_csv())))
+        assert rows[0]["charging_state"] == "ACTIVE"
+        assert tuple(rows[0]) == dt.TRACE_FIELDS
+        assert json.loads(trace.to_json()) == trace.records()
+
+    def test_append_does_not_allocate(self, se, dt):
+        trace = dt.DecisionTrace(256)
+        result = self._result(se)
+        for i in range(300):
+            trace.append(float(i), self.INPUTS, result)
+        tracemalloc.start()
+        try:
+            before, _ = tracemalloc.get_traced_memory()
+            for i in range(5000):
+                trace.append(float(i), self.INPUTS, result)
+            after, _ = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        assert after - before < 256
@@ -0,0 +1,261 @@
+"""Long-horizon tests on the headless driver (virtual clock, fake hass).
+
+Run: python -m pytest tests/test_headless.py -v
+"""
+import asyncio
+import sys
+import time
+import types
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from .headless import PKG, HeadlessDriver
+
+START = datetime(2026, 6, 15, 0, 0, tzinfo=timezone.utc)
+
+ENTITIES = {
+    "soc": "sensor.soc",
+    "power_to_grid": "sensor.export",
+    "pv_production": "sensor.pv",
+    "power_to_user": "sensor.load",
+}
+
+CONFIG = {
+    "entities": ENTITIES,
+    "evaluation_interval": 15,
+    "wallbox_threshold_kw": 4.2,
+    "hold_time_minutes": 10,
+    "stale_threshold_seconds": 60,
+    "battery_capacity_kwh": 10.0,
+    "max_discharge_kw": 10.0,
+    "time_strategy": [{"default": True, "soc_floor": 50}],
+    "seasonal_targets": {6: 50},
+}
+
+
+def _initial(pv: float = 0.0, soc: float = 80.0):
+    return [
+        (0, "sensor.soc", str(soc)),
+        (0, "sensor.export", "0"),
+        (0, "sensor.pv", str(pv)),
+        (0, "sensor.load", "1000"),
+    ]
+
+
+def _state_at(log, hour: float, minute: float = 0):
+    """Charging state of the first tick at/after the given time of day."""
+    target = START.replace(hour=int(hour), minute=int(minute))
+    return next((kw, state) for ts, kw, state in log if ts >= target)
+
+
+@pytest.fixture
+def memory_store(monkeypatch) -> dict:
+    """In-memory ``homeassistant.helpers.storage.Store``; returns the saved data by key."""
+    saved: dict = {}
+
+    class MemoryStore:
+        def __init__(self, hass, version, key) -> None:
+            self.key = key
+
+        async def async_load(self):
+            return saved.get(self.key)
+
+        def async_delay_save(self, data_func, delay) -> None:
+            saved[self.key] = data_func()   # flush immediately for the test
+
+    monkeypatch.setitem(sys.modules, "homeassistant.helpers.storage",
+                        types.SimpleNamespace(Store=MemoryStore))
+    return saved
+
+
+class TestHeadlessDriver:
+
+    def test_full_day_under_one_second(self) -> None:
+        """A day of 15-s ticks with a solar curve, dropout and stale entity."""
+        trace = _initial(soc=50)  # at the floor: no battery buffer, PV only
+        for minute in range(6 * 60, 20 * 60, 5):  # PV ramp 06:00–20:00 every 5 min
+            peak = 1 - abs(minute - 13 * 60) / (7 * 60)
+            trace.append((minute * 60, "sensor.pv", str(round(9000 * peak))))
+        trace += [
+            (11 * 3600, "sensor.pv", "unavailable"),
+            (11 * 3600 + 120, "sensor.pv", "8000"),
+            (15 * 3600, "sensor.load", None),        # entity vanishes → stale
+            (15 * 3600 + 600, "sensor.load", "1000"),
+        ]
+        driver = HeadlessDriver(CONFIG, START)
+        t0 = time.perf_counter()
+        log = driver.run(trace, duration_s=86400)
+        elapsed = time.perf_counter() - t0
+
+        assert len(log) == 86400 // 15
+        assert elapsed < 1.0, f"one virtual day took {elapsed:.2f}s"
+        assert _state_at(log, 3) == (0.0, "INACTIVE")
+        assert _state_at(log, 11, 1) == (0.0, "FAILSAFE")
+        assert _state_at(log, 12)[1] == "ACTIVE"
+        assert _state_at(log, 15, 2)[1] == "FAILSAFE"
+        assert _state_at(log, 15, 20)[1] == "ACTIVE"
+        assert _state_at(log, 23) == (0.0, "INACTIVE")
+
+    def test_unavailable_forces_failsafe_on_next_tick(self) -> None:
+        trace = _initial(pv=8000) + [(120, "sensor.pv", "unavailable")]
+        log = HeadlessDriver(CONFIG, START).run(trace, duration_s=300)
+        by_s = {int((ts - START).total_seconds()): state for ts, _kw, state in log}
+        assert by_s[105] == "ACTIVE"
+        assert by_s[120] == "FAILSAFE"        # event at 120 s is applied before that tick
+        assert log[-1][1] == 0.0
+
+    def test_staleness_uses_virtual_time(self) -> None:
+        """Entity removed from the state machine fails safe at its deadline.
+
+        SOC last reported at 0 s; the deadline timer fires just after 60 s,
+        finds it gone and evaluates at once — before the 75 s tick.
+        """
+        trace = _initial(pv=8000) + [(30, "sensor.soc", None)]
+        driver = HeadlessDriver(CONFIG, START)
+        log = driver.run(trace, duration_s=61)
+        assert log[-1][0] == START + timedelta(seconds=60)
+        assert log[-1][2] == "ACTIVE"
+        assert driver.engine.hysteresis_filter.state == "FAILSAFE"
+        assert driver.register_kw == 0.0
+
+    def test_unchanged_values_keep_entities_fresh(self) -> None:
+        """Integrations polling every 30 s re-report (state_reported) — never stale."""
+        trace = _initial(pv=8000)
+        log = HeadlessDriver(CONFIG, START).run(trace, duration_s=600)
+        assert {state for _ts, _kw, state in log} == {"ACTIVE"}
+
+    def test_frozen_integration_fails_safe(self) -> None:
+        """Entities stay available in HA but nothing is reported any more."""
+        log = HeadlessDriver(CONFIG, START, poll_s=None).run(_initial(pv=8000), duration_s=120)
+        by_s = {int((ts - START).total_seconds()): state for ts, _kw, state in log}
+        assert by_s[60] == "ACTIVE"
+        assert by_s[75] == "FAILSAFE"
+
+    def test_hold_expires_on_virtual_clock(self) -> None:
+        trace = _initial(pv=8000, soc=50) + [(300, "sensor.pv", "1000")]
+        log = HeadlessDriver(CONFIG, START).run(trace, duration_s=1800)
+        by_s = {int((ts - START).total_seconds()): (kw, st) for ts, kw, st in log}
+        assert by_s[300] == (pytest.approx(7.0), "ACTIVE")    # held
+        assert by_s[885] == (pytest.approx(7.0), "ACTIVE")    # 285 s + 10 min, inclusive
+        assert by_s[900] == (0.0, "INACTIVE")
+
+    def test_fast_reaction_timer_on_virtual_time(self) -> None:
+        config = {**CONFIG, "fast_reaction_ms": 500}
+        driver = HeadlessDriver(config, START)
+        driver.run(_initial(pv=8000) + [(100, "sensor.pv", "9000")], duration_s=120)
+        assert driver.sensor.fast_evaluations >= 1
+        assert driver.register_kw == pytest.approx(8.0)
+
+
+    def test_median_filter_suppresses_single_spike(self) -> None:
+        """One 9 kW PV reading in a 2 kW stream flips the line only when unfiltered;
+        a real step still activates one sample period later."""
+        trace = _initial(pv=2000, soc=50)
+        for offset in range(5, 900, 15):
+            pv = 8000 if offset >= 605 else 9000 if offset == 305 else 2000
+            trace.append((offset, "sensor.pv", str(pv)))
+
+        def first_active(config):
+            log = HeadlessDriver(config, START).run(trace, duration_s=900)
+            return next(int((ts - START).total_seconds()) for ts, _kw, st in log if st == "ACTIVE")
+
+        filtered = {**CONFIG, "input_filters": {"pv_production": {"type": "median", "window": 3}}}
+        assert first_active(CONFIG) == 315
+        assert first_active(filtered) == 630
+
+    def test_energy_counters_survive_restart(self, memory_store) -> None:
+        """An hour of 6 kW surplus exports 6 kWh; a restart resumes from .storage."""
+        saved = memory_store
+        trace = _initial(pv=7000, soc=50)        # 6 kW surplus, no battery buffer
+        driver = HeadlessDriver(CONFIG, START)
+        export = sys.modules[f"{PKG}.sdm630_input_registers"].TOTAL_EXPORT_KWH
+        registers = driver.mod.input_data_block.values
+        driver.run(trace, duration_s=3600 + 15)
+        assert registers[export] == pytest.approx(500.0 + 6.0, rel=1e-4)
+        after_first_run = registers[export]
+
+        restarted = HeadlessDriver(CONFIG, START.replace(hour=2))
+        restarted.run(trace, duration_s=15)
+        assert registers[export] == pytest.approx(after_first_run)
+        assert saved[f"{restarted.mod.DOMAIN}.energy"]["version"] == 1
+
+    @pytest.mark.parametrize("max_age, first_kw, first_state", [
+        (300, 6.0, "ACTIVE"),       # warm: charging continues through the restart
+        (0, 0.0, "FAILSAFE"),       # cold: no inputs yet → 0 kW until they return
+    ])
+    def test_warm_restart_keeps_charging(self, memory_store, max_age, first_kw,
+                                         first_state) -> None:
+        """A 2-min HA restart mid-session; the inputs come back 45 s after boot."""
+        config = {**CONFIG, "warm_restart_max_age_seconds": max_age}
+        trace = _initial(pv=7000, soc=50)           # 6 kW surplus
+        HeadlessDriver(config, START).run(trace, duration_s=30 * 60)
+
+        restarted = HeadlessDriver(config, START + timedelta(minutes=32))
+        registers = restarted.mod.input_data_block.values
+        registers.clear()                           # fresh process: empty register image
+        log = restarted.run([(45, e, v) for _t, e, v in trace], duration_s=5 * 60)
+        assert log[0][1:] == (first_kw, first_state)
+        assert log[-1][1:] == (6.0, "ACTIVE")
+        assert restarted.engine.hysteresis_filter.state == "ACTIVE"
+        if max_age:
+            assert all(kw == 6.0 for _ts, kw, _st in log)
+
+    def test_warm_restart_register_written_before_first_poll(self, memory_store) -> None:
+        trace = _initial(pv=7000, soc=50)
+        first = HeadlessDriver(CONFIG, START)
+        first.run(trace, duration_s=10 * 60)
+        saved = memory_store[f"{first.mod.DOMAIN}.warm_state"]
+        assert saved["engine"]["hysteresis"]["state"] == "ACTIVE"
+        assert set(saved["cache"]) == {"soc_percent", "power_to_grid_w",
+                                       "pv_production_w", "power_to_user_w"}
+
+        restarted = HeadlessDriver(CONFIG, START + timedelta(minutes=11))
+        mod = restarted.mod
+        mod.input_data_block.values.clear()
+        store, state = asyncio.run(mod._async_warm_start(restarted.hass, CONFIG, restarted.clock()))
+        assert state is not None and restarted.register_kw == 6.0
+
+        too_late = START + timedelta(minutes=10 + 6)   # older than the 300 s default
+        mod.input_data_block.values.clear()
+        assert asyncio.run(mod._async_warm_start(restarted.hass, CONFIG, too_late))[1] is None
+        assert restarted.register_kw is None
+
+    def test_phase_registers_follow_total_and_live_voltage(self) -> None:
+        """Synthesised phases sum to TOTAL_POWER; mapped registers keep their live value."""
+        regs = sys.modules[f"{PKG}.sdm630_input_registers"]
+        config = {
+            **CONFIG,
+            "phase_split": [2, 1, 1],
+            "register_mappings": {"sensor.l1_voltage": "PHASE_1_VOLTAGE",
+                                  "sensor.l3_power": "PHASE_3_POWER"},
+        }
+        driver = HeadlessDriver(config, START)
+        trace = _initial(pv=7000, soc=50) + [
+            (0, "sensor.l1_voltage", "200"),
+            (0, "sensor.l3_power", "123"),
+        ]
+        driver.run(trace, duration_s=30)
+        values = driver.mod.input_data_block.values
+        assert driver.register_kw == pytest.approx(6.0)
+        assert values[regs.PHASE_1_POWER] == pytest.approx(3.0)
+        assert values[regs.PHASE_2_POWER] == pytest.approx(1.5)
+        assert values[regs.PHASE_1_CURRENT] == pytest.approx(3000.0 / 200.0)
+        assert values[regs.PHASE_3_POWER] == 123.0
+
+    def test_demand_follows_holding_register_period(self) -> None:
+        """An hour at 6 kW fills the 60-min demand window; a client writing
+        15 to Demand Period re-sizes it on the next tick."""
+        regs = sys.modules[f"{PKG}.sdm630_input_registers"]
+        holding = sys.modules[f"{PKG}.sdm630_holding_registers"]
+        driver = HeadlessDriver(CONFIG, START)
+        trace = _initial(pv=7000, soc=50)
+        driver.run(trace, duration_s=3600 + 15)
+        values = driver.mod.input_data_block.values
+        assert values[regs.TOTAL_POWER_DEMAND] == pytest.approx(6.0)
+        assert values[regs.MAX_TOTAL_POWER_DEMAND] == pytest.approx(6.0)
+
+        driver.mod.holding_data_block.values[holding.DEMAND_PERIOD] = 15.0
+        driver.run(trace, duration_s=3600 + 30)
+        assert driver.sensor._meter.demand.period_s == 15 * 60
+        assert values[regs.TOTAL_POWER_DEMAND] == pytest.approx(6.0)
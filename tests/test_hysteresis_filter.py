@@ -223,3 +223,93 @@ class TestHAFreedom:
                 f"Real homeassistant package imported: {ha_mods}. "
                 "HysteresisFilter must remain HA-free."
             )
+
+
+# ---------------------------------------------------------------------------
+# Batch API — run_batch must replay update() exactly
+# ---------------------------------------------------------------------------
+
+class TestRunBatch:
+
+    @pytest.fixture
+    def np(self):
+        return pytest.importorskip("numpy")
+
+    def test_matches_scalar_update(self, np) -> None:
+        rng = np.random.default_rng(3)
+        n = 5000
+        kw = rng.choice([0.0, 2.0, THRESHOLD, 5.0, 7.5], n, p=[0.3, 0.3, 0.1, 0.2, 0.1])
+        offsets = np.cumsum(rng.integers(1, 120, n))
+        times = [_t(seconds=int(s)) for s in offsets]
+
+        scalar = HysteresisFilter(CFG)
+        expected_kw = [scalar.update(float(k), t) for k, t in zip(kw, times)]
+        batch = HysteresisFilter(CFG)
+        out_kw, codes = batch.run_batch(kw, times)
+
+        assert out_kw.tolist() == expected_kw
+        assert batch.state == scalar.state
+        assert batch._hold_until == scalar._hold_until
+        assert _mod.BATCH_STATES[codes[-1]] == scalar.state
+
+    def test_inclusive_hold_boundary(self, hf_active: HysteresisFilter, np) -> None:
+        ts = np.array(
+            [t.replace(tzinfo=None) for t in (_t(HOLD_MINUTES), _t(HOLD_MINUTES, seconds=1))],
+            dtype="datetime64[us]",
+        )
+        out_kw, codes = hf_active.run_batch([2.0, 2.0], ts)
+        assert out_kw.tolist() == [5.0, 0.0]
+        assert [_mod.BATCH_STATES[c] for c in codes] == ["ACTIVE", "INACTIVE"]
+        assert hf_active.state == "INACTIVE"
+
+    def test_failsafe_reports_zero(self, hf_failsafe: HysteresisFilter, np) -> None:
+        out_kw, codes = hf_failsafe.run_batch([5.0, 9.0], [_t(0), _t(1)])
+        assert out_kw.tolist() == [0.0, 0.0]
+        assert set(codes.tolist()) == {_mod.STATE_CODE_FAILSAFE}
+
+    def test_chunked_equals_single_run(self, np) -> None:
+        kw = np.tile([5.0, 2.0, 2.0, 0.0], 50)
+        ts = np.datetime64("2026-03-21T12:00:00", "us") + (
+            np.arange(len(kw)) * 240 * 1_000_000
+        ).astype("timedelta64[us]")
+        whole = HysteresisFilter(CFG).run_batch(kw, ts)[0]
+        chunked_filter = HysteresisFilter(CFG)
+        parts = [chunked_filter.run_batch(kw[i:i + 37], ts[i:i + 37])[0]
+                 for i in range(0, len(kw), 37)]
+        assert np.concatenate(parts).tolist() == whole.tolist()
+
+
+# ---------------------------------------------------------------------------
+# Warm restart — to_dict / restore
+# ---------------------------------------------------------------------------
+
+class TestWarmRestart:
+
+    def test_active_hold_round_trips(self, hf_active: HysteresisFilter) -> None:
+        restored = HysteresisFilter(CFG)
+        restored.restore(hf_active.to_dict())
+        assert restored.state == "ACTIVE"
+        assert restored.hold_until == hf_active.hold_until
+        assert restored.update(1.0, _t(minutes=5)) == hf_active.update(1.0, _t(minutes=5))
+
+    def test_failsafe_not_carried_over(self, hf_failsafe: HysteresisFilter) -> None:
+        restored = HysteresisFilter(CFG)
+        restored.restore(hf_failsafe.to_dict())
+        assert restored.state == "INACTIVE"
+
+    def test_malformed_snapshot_ignored(self, hf: HysteresisFilter) -> None:
+        hf.restore({"state": "ACTIVE", "hold_until": None, "last_reported_kw": 5.0})
+        assert hf.state == "INACTIVE" and hf.hold_until is None
+
+    def test_engine_restores_counters_and_checks_version(self) -> None:
+        engine = _mod.SurplusEngine(CFG)
+        engine.hysteresis_filter.update(5.0, T0)
+        engine.strategy_runs = 7
+        data = engine.to_dict()
+        restored = _mod.SurplusEngine(CFG)
+        restored.restore(data)
+        assert restored.strategy_runs == 7
+        assert restored.hysteresis_filter.state == "ACTIVE"
+        other = _mod.SurplusEngine(CFG)
+        other.restore({**data, "version": _mod.ENGINE_STATE_VERSION + 1})
+        assert other.hysteresis_filter.state == "INACTIVE" and other.strategy_runs == 0
@@ -0,0 +1,126 @@
+"""Boot cost of the platform: import and setup stay cheap.
+
+HA imports every configured platform while it boots, so sensor.py must not
+pull in pymodbus (or NumPy, sqlite3) or build the register image at import.
+The import check runs the headless loader in a fresh interpreter under
+``python -X importtime`` and parses the per-module report it writes to
+stderr.  The wall-clock budgets depend on the host and only run with
+``SDM630_BENCHMARK=1``.
+
+Run: python -m pytest tests/test_import_time.py -v
+"""
+import os
+import struct
+import subprocess
+import sys
+import time
+import types
+
+import pytest
+
+from .headless import PKG, _load_submodule
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+IMPORT_BUDGET_S = 0.25        # everything the component import adds
+IMAGE_BUDGET_S = 0.02         # both register images, built at setup
+# Heavy modules the platform import must leave to setup (or never load)
+DEFERRED_MODULES = ("pymodbus", "numpy", "sqlite3")
+
+benchmark = pytest.mark.skipif(
+    not os.environ.get("SDM630_BENCHMARK"), reason="timing budget; set SDM630_BENCHMARK=1",
+)
+
+_MARKER = "-- component import --"
+_SCRIPT = f"""
+import sys, time
+from tests.conftest import _install_ha_stubs
+from tests.headless import load_sensor_module
+_install_ha_stubs()
+sys.stderr.write({_MARKER!r} + "\\n")
+sys.stderr.flush()
+start = time.perf_counter()
+load_sensor_module()
+print(time.perf_counter() - start)
+"""
+
+
+def _importtime(script: str) -> tuple[float, list[tuple[str, int, int]]]:
+    """Run ``script`` under ``-X importtime``; return its stdout float and
+    ``(module, self_us, cumulative_us)`` for imports after the marker."""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", script],
+        cwd=ROOT, capture_output=True, text=True, check=True,
+    )
+    _, _, report = proc.stderr.partition(_MARKER)
+    rows = []
+    for line in report.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        rows.append((name.strip(), int(self_us), int(cumulative_us)))
+    return float(proc.stdout.strip()), rows
+
+
+def _tables(inputs, holding) -> list:
+    return [inputs.SDM630InputRegisters().get_all(), holding.SDM630HoldingRegisters().get_all()]
+
+
+class TestImportTime:
+
+    def test_platform_import_defers_heavy_modules(self) -> None:
+        _elapsed, rows = _importtime(_SCRIPT)
+        names = {name for name, _, _ in rows}
+        assert f"{PKG}.metrics" in names                        # report parsed
+        for heavy in DEFERRED_MODULES:
+            assert not any(n == heavy or n.startswith(f"{heavy}.") for n in names), heavy
+        assert f"{PKG}.modbus_server" not in names
+
+    @benchmark
+    def test_platform_import_stays_in_budget(self) -> None:
+        elapsed, rows = _importtime(_SCRIPT)
+        assert sum(self_us for _, self_us, _ in rows) / 1e6 < IMPORT_BUDGET_S
+        assert elapsed < IMPORT_BUDGET_S
+
+
+class TestSetupTime:
+
+    @pytest.fixture
+    def modules(self):
+        regs = _load_submodule("registers", "registers.py")
+        inputs = _load_submodule("sdm630_input_registers", "sdm630_input_registers.py")
+        holding = _load_submodule("sdm630_holding_registers", "sdm630_holding_registers.py")
+        return regs, inputs, holding
+
+    def test_register_image_is_one_pack_per_table(self, modules, monkeypatch) -> None:
+        regs, inputs, holding = modules
+        packs = []
+
+        def _pack(fmt, *values):
+            packs.append(fmt)
+            return struct.pack(fmt, *values)
+
+        monkeypatch.setattr(regs, "struct", types.SimpleNamespace(pack=_pack, unpack=struct.unpack))
+        for registers in _tables(inputs, holding):
+            packs.clear()
+            regs.register_image(registers)
+            assert packs == [f">{len(registers)}f"]
+
+    @benchmark
+    def test_register_image_stays_in_budget(self, modules) -> None:
+        regs, inputs, holding = modules
+        start = time.perf_counter()
+        for registers in _tables(inputs, holding):
+            regs.register_image(registers)
+        assert time.perf_counter() - start < IMAGE_BUDGET_S
+
+    def test_register_image_matches_per_register_encoding(self, modules) -> None:
+        regs, inputs, holding = modules
+        tables = _tables(inputs, holding)
+        images = [regs.register_image(t) for t in tables]
+
+        for registers, words in zip(tables, images):
+            assert len(words) == 2 * len(registers)
+            for r in registers:
+                hi, lo = struct.unpack(">HH", struct.pack(">f", r.get_value()))
+                assert (words[r.address], words[r.address + 1]) == (hi, lo)
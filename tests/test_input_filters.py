@@ -0,0 +1,139 @@
+"""Unit tests for the per-role input filters — no HA runtime required.
+
+Run: python -m pytest tests/test_input_filters.py -v
+"""
+import importlib.util
+import os
+import random
+import statistics
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+_MODULE_PATH = os.path.join(ROOT, "surplus_engine.py")
+_MODULE_NAME = "surplus_engine"
+
+sys.modules.pop(_MODULE_NAME, None)
+_spec = importlib.util.spec_from_file_location(_MODULE_NAME, _MODULE_PATH)
+_mod = importlib.util.module_from_spec(_spec)
+sys.modules[_MODULE_NAME] = _mod
+_spec.loader.exec_module(_mod)
+
+EwmaFilter = _mod.EwmaFilter
+WindowMeanFilter = _mod.WindowMeanFilter
+SlidingMedianFilter = _mod.SlidingMedianFilter
+build_input_filters = _mod.build_input_filters
+
+
+class TestEwmaFilter:
+
+    def test_first_sample_passes_through(self) -> None:
+        assert EwmaFilter(0.2).update(5000.0) == 5000.0
+
+    def test_weights_newest_sample_by_alpha(self) -> None:
+        f = EwmaFilter(0.25)
+        f.update(1000.0)
+        assert f.update(2000.0) == pytest.approx(1250.0)
+        assert f.value == pytest.approx(1250.0)
+
+    def test_reset_forgets_history(self) -> None:
+        f = EwmaFilter(0.1)
+        f.update(9000.0)
+        f.reset()
+        assert f.value is None
+        assert f.update(100.0) == 100.0
+
+    @pytest.mark.parametrize("alpha", [0.0, -0.1, 1.5])
+    def test_rejects_alpha_out_of_range(self, alpha) -> None:
+        with pytest.raises(ValueError):
+            EwmaFilter(alpha)
+
+
+class TestWindowMeanFilter:
+
+    def test_matches_mean_of_last_window(self) -> None:
+        rng = random.Random(7)
+        f = WindowMeanFilter(6)
+        history = []
+        for _ in range(2000):
+            sample = rng.uniform(-5000, 12000)
+            history.append(sample)
+            assert f.update(sample) == pytest.approx(statistics.fmean(history[-6:]))
+
+    def test_partial_window_averages_what_it_has(self) -> None:
+        f = WindowMeanFilter(4)
+        f.update(1000.0)
+        assert f.update(3000.0) == 2000.0
+
+    def test_reset_forgets_history(self) -> None:
+        f = WindowMeanFilter(3)
+        for v in (9000.0, 9000.0, 9000.0, 9000.0):
+            f.update(v)
+        f.reset()
+        assert f.value is None
+        assert f.update(300.0) == 300.0
+
+
+class TestSlidingMedianFilter:
+
+    @pytest.mark.parametrize("window", [1, 2, 3, 5, 8])
+    def test_matches_statistics_median(self, window) -> None:
+        """Random stream with many duplicates (0 W at night, repeated readings)."""
+        rng = random.Random(window)
+        f = SlidingMedianFilter(window)
+        history = []
+        for _ in range(5000):
+            sample = float(rng.choice([0, 0, 0, 1500, 2000, rng.randint(0, 9000)]))
+            history.append(sample)
+            assert f.update(sample) == statistics.median(history[-window:])
+
+    def test_rejects_single_spike(self) -> None:
+        f = SlidingMedianFilter(3)
+        outputs = [f.update(v) for v in (2000.0, 2000.0, 9000.0, 2000.0, 2000.0)]
+        assert max(outputs) == 2000.0
+
+    def test_follows_step_after_half_window(self) -> None:
+        f = SlidingMedianFilter(3)
+        f.update(2000.0)
+        f.update(2000.0)
+        assert f.update(8000.0) == 2000.0
+        assert f.update(8000.0) == 8000.0
+
+    def test_heaps_stay_bounded(self) -> None:
+        f = SlidingMedianFilter(4)
+        for i in range(10_000):
+            f.update(float(i % 97))
+        assert len(f._low) + len(f._high) <= 4 * 4 + 1
+
+    def test_reset_forgets_history(self) -> None:
+        f = SlidingMedianFilter(5)
+        for v in (9000.0, 9000.0, 9000.0):
+            f.update(v)
+        f.reset()
+        assert f.value is None
+        assert f.update(100.0) == 100.0
+
+
+class TestBuildInputFilters:
+
+    def test_builds_one_filter_per_role(self) -> None:
+        filters = build_input_filters({"input_filters": {
+            "pv_production": {"type": "median", "window": 5},
+            "power_to_user": {"type": "ewma", "alpha": 0.3},
+            "power_from_grid": {"type": "mean"},
+        }})
+        assert isinstance(filters["pv_production"], SlidingMedianFilter)
+        assert isinstance(filters["power_to_user"], EwmaFilter)
+        assert isinstance(filters["power_from_grid"], WindowMeanFilter)
+
+    def test_no_config_means_no_filters(self) -> None:
+        assert build_input_filters({}) == {}
+
+    def test_soc_cannot_be_filtered(self) -> None:
+        with pytest.raises(ValueError, match="soc"):
+            build_input_filters({"input_filters": {"soc": {"type": "ewma"}}})
+
+    def test_unknown_type_raises(self) -> None:
+        with pytest.raises(ValueError, match="kalman"):
+            build_input_filters({"input_filters": {"pv_production": {"type": "kalman"}}})
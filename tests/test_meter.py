@@ -0,0 +1,329 @@
+"""Unit tests for the meter model (energy counters) — no HA runtime required.
+
+Run: python -m pytest tests/test_meter.py -v
+"""
+import importlib.util
+import json
+import math
+import os
+import random
+import struct
+import subprocess
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _load(name: str):
+    sys.modules.pop(name, None)
+    spec = importlib.util.spec_from_file_location(name, os.path.join(ROOT, f"{name}.py"))
+    mod = importlib.util.module_from_spec(spec)
+    sys.modules[name] = mod
+    spec.loader.exec_module(mod)
+    return mod
+
+
+@pytest.fixture(scope="module")
+def mt():
+    """Load registers, input registers and meter standalone (imported by name)."""
+    _load("registers")
+    _load("sdm630_input_registers")
+    return _load("meter")
+
+
+@pytest.fixture(scope="module")
+def regs():
+    return sys.modules["sdm630_input_registers"]
+
+
+def _balanced(kw: float, kvar: float = 0.0):
+    s = (kw * kw + kvar * kvar) ** 0.5
+    return (kw,) * 3, (kvar,) * 3, (s,) * 3, (s * 1000 / 230,) * 3
+
+
+class TestEnergyAccumulator:
+
+    def test_integrates_previous_sample_over_interval(self, mt, regs) -> None:
+        acc = mt.EnergyAccumulator({})
+        acc.update(0.0, *_balanced(1.0))          # 3 kW import
+        acc.update(60.0, *_balanced(-2.0))        # held 60 s, then 6 kW export
+        acc.update(120.0, *_balanced(0.0))
+        v = acc.values()
+        assert v[regs.TOTAL_IMPORT_KWH] == pytest.approx(3.0 / 60)
+        assert v[regs.TOTAL_EXPORT_KWH] == pytest.approx(6.0 / 60)
+        assert v[regs.TOTAL_KWH] == pytest.approx(9.0 / 60)
+        assert v[regs.PHASE_2_IMPORT_KWH] == pytest.approx(1.0 / 60)
+        assert v[regs.PHASE_3_EXPORT_KWH] == pytest.approx(2.0 / 60)
+        assert v[regs.PHASE_1_TOTAL_KWH] == pytest.approx(3.0 / 60)
+        assert v[regs.TOTAL_VAH] == pytest.approx(9.0 / 60)
+
+    def test_reactive_and_amp_hours(self, mt, regs) -> None:
+        acc = mt.EnergyAccumulator({})
+        acc.update(0.0, *_balanced(3.0, 4.0))     # 5 kVA per phase
+        acc.update(3600.0 / 12, *_balanced(0.0))  # 5 minutes
+        v = acc.values()
+        assert v[regs.TOTAL_IMPORT_KVARH] == pytest.approx(12.0 / 12)
+        assert v[regs.PHASE_1_IMPORT_KVARH] == pytest.approx(4.0 / 12)
+        assert v[regs.TOTAL_VAH] == pytest.approx(15.0 / 12)
+        assert v[regs.TOTAL_AH] == pytest.approx(3 * 5000 / 230 / 12)
+
+    def test_long_gap_is_clamped(self, mt, regs) -> None:
+        acc = mt.EnergyAccumulator({}, max_gap_s=300.0)
+        acc.update(0.0, *_balanced(1.0))
+        acc.update(86400.0, *_balanced(1.0))
+        assert acc.values()[regs.TOTAL_IMPORT_KWH] == pytest.approx(3.0 * 300 / 3600)
+
+    def test_counters_start_from_initial_values(self, mt, regs) -> None:
+        acc = mt.EnergyAccumulator({regs.TOTAL_EXPORT_KWH: 500.0})
+        assert acc.values()[regs.TOTAL_EXPORT_KWH] == 500.0
+        assert acc.values()[regs.TOTAL_IMPORT_KWH] == 0.0
+
+    def test_float32_encoding_stays_monotonic(self, mt, regs) -> None:
+        """Tiny per-tick increments on a large counter never decrease on the wire."""
+        acc = mt.EnergyAccumulator({regs.TOTAL_EXPORT_KWH: 99_999.0})
+        last = -1.0
+        for i in range(2000):
+            acc.update(15.0 * i, *_balanced(-0.01))
+            wire = struct.unpack(">f", struct.pack(">f", acc.values()[regs.TOTAL_EXPORT_KWH]))[0]
+            assert wire >= last
+            last = wire
+        assert last > 99_999.0
+
+    def test_restore_round_trip(self, mt, regs) -> None:
+        acc = mt.EnergyAccumulator({regs.TOTAL_EXPORT_KWH: 500.0})
+        acc.update(0.0, *_balanced(-1.0))
+        acc.update(300.0, *_balanced(-1.0))
+        saved = acc.to_dict()
+
+        fresh = mt.EnergyAccumulator({regs.TOTAL_EXPORT_KWH: 500.0})
+        fresh.restore(saved)
+        assert fresh.values() == acc.values()
+
+    def test_restore_never_goes_below_initial(self, mt, regs) -> None:
+        acc = mt.EnergyAccumulator({regs.TOTAL_EXPORT_KWH: 500.0})
+        acc.restore({"version": 1, "counters": {str(regs.TOTAL_EXPORT_KWH): 12.0, "73": "bad"}})
+        assert acc.values()[regs.TOTAL_EXPORT_KWH] == 500.0
+
+    def test_restore_ignores_unknown_version(self, mt, regs) -> None:
+        acc = mt.EnergyAccumulator({})
+        acc.restore({"version": 99, "counters": {str(regs.TOTAL_EXPORT_KWH): 12.0}})
+        assert acc.values()[regs.TOTAL_EXPORT_KWH] == 0.0
+
+
+class TestMeterModel:
+
+    def test_reported_surplus_counts_as_export(self, mt, regs) -> None:
+        model = mt.MeterModel({})
+        start = model.update(0.0, 6.0)
+        end = model.update(300.0, 6.0)
+        assert end[regs.TOTAL_EXPORT_KWH] - start[regs.TOTAL_EXPORT_KWH] == pytest.approx(0.5)
+        assert end[regs.TOTAL_IMPORT_KWH] == start[regs.TOTAL_IMPORT_KWH]
+
+    def test_starts_from_register_defaults(self, mt, regs) -> None:
+        values = mt.MeterModel({}).update(0.0, 0.0)
+        assert values[regs.TOTAL_IMPORT_KWH] == 1000.0
+        assert set(values) == (
+            set(mt.ENERGY_REGISTERS) | set(mt.PHASE_REGISTERS)
+            | set(mt.DEMAND_REGISTERS) | set(mt.MAX_DEMAND_REGISTERS)
+        )
+
+    def test_demand_registers_follow_reported_total(self, mt, regs) -> None:
+        model = mt.MeterModel({"evaluation_interval": 15})
+        assert model.set_demand_period(10)
+        assert not model.set_demand_period(10)
+        for k in range(41):
+            values = model.update(15.0 * k, 6.0 if k < 20 else 0.0)
+        assert values[regs.TOTAL_POWER_DEMAND] == pytest.approx(3.0)
+        assert values[regs.MAX_TOTAL_POWER_DEMAND] == pytest.approx(3.0)
+        assert values[regs.PHASE_1_CURRENT_DEMAND] == pytest.approx(2000.0 / 237.2 / 2)
+
+    def test_demand_peak_survives_restart(self, mt, regs) -> None:
+        model = mt.MeterModel({"evaluation_interval": 15})
+        model.set_demand_period(10)
+        for k in range(41):
+            model.update(15.0 * k, 6.0 if k < 20 else 0.0)
+        saved = json.loads(json.dumps(model.to_dict()))
+
+        fresh = mt.MeterModel({"evaluation_interval": 15})
+        fresh.set_demand_period(10)
+        fresh.restore(saved)
+        values = fresh.update(1000.0, 0.0)
+        assert values[regs.MAX_TOTAL_POWER_DEMAND] == pytest.approx(3.0)
+        assert values[regs.TOTAL_EXPORT_KWH] == model.energy.values()[regs.TOTAL_EXPORT_KWH]
+
+    def test_restore_without_peaks_keeps_counters(self, mt, regs) -> None:
+        model = mt.MeterModel({})
+        assert json.dumps(model.to_dict())            # no peak before the first update
+        model.restore({"version": 1, "counters": {str(regs.TOTAL_EXPORT_KWH): 900.0}})
+        values = model.update(0.0, 0.0)
+        assert values[regs.TOTAL_EXPORT_KWH] == 900.0
+        assert values[regs.MAX_TOTAL_POWER_DEMAND] == 0.0
+
+    def test_energy_follows_phase_split_and_power_factor(self, mt, regs) -> None:
+        model = mt.MeterModel({"phase_split": [2, 1, 1], "power_factor": 0.8})
+        start = model.update(0.0, 4.0)
+        end = model.update(3600.0 / 12, 4.0)      # 5 min, gap clamp not reached
+
+        def delta(address):
+            return end[address] - start[address]
+
+        assert delta(regs.PHASE_1_EXPORT_KWH) == pytest.approx(2.0 / 12)
+        assert delta(regs.PHASE_2_EXPORT_KWH) == pytest.approx(1.0 / 12)
+        assert delta(regs.TOTAL_VAH) == pytest.approx(5.0 / 12)
+        assert delta(regs.TOTAL_EXPORT_KVARH) == pytest.approx(3.0 / 12)
+
+    def test_runs_without_numpy(self) -> None:
+        """The live sensor builds a MeterModel every setup; NumPy is not a requirement."""
+        script = (
+            "import sys; sys.modules['numpy'] = None\n"   # any import of it fails
+            "import meter; meter.MeterModel({}).update(0.0, 4.2)\n"
+        )
+        subprocess.run([sys.executable, "-c", script], cwd=ROOT, check=True)
+
+    def test_live_voltage_changes_currents(self, mt, regs) -> None:
+        model = mt.MeterModel({})
+        assert model.set_input(regs.PHASE_1_VOLTAGE, 200.0)
+        assert not model.set_input(regs.TOTAL_POWER, 1.0)
+        values = model.update(0.0, 6.0)
+        assert values[regs.PHASE_1_CURRENT] == pytest.approx(2000.0 / 200.0)
+
+
+class TestPhaseSynthesizer:
+
+    VOLTS = (230.0, 240.0, 220.0)
+
+    def _run(self, mt, total_kw, **kwargs):
+        return mt.PhaseSynthesizer(voltages=self.VOLTS, **kwargs).synthesize(total_kw)
+
+    @pytest.mark.parametrize("total_kw", [6.0, -3.3, 0.0])
+    @pytest.mark.parametrize("pf", [1.0, 0.9, 0.5])
+    def test_p_equals_v_i_pf_per_phase(self, mt, regs, total_kw, pf) -> None:
+        values, _ = self._run(mt, total_kw, phase_split=(3, 2, 1), power_factor=pf)
+        rows = zip(
+            (regs.PHASE_1_POWER, regs.PHASE_2_POWER, regs.PHASE_3_POWER),
+            (regs.PHASE_1_CURRENT, regs.PHASE_2_CURRENT, regs.PHASE_3_CURRENT),
+            (regs.PHASE_1_PF, regs.PHASE_2_PF, regs.PHASE_3_PF),
+            (regs.PHASE_1_VA, regs.PHASE_2_VA, regs.PHASE_3_VA),
+            (regs.PHASE_1_VAR, regs.PHASE_2_VAR, regs.PHASE_3_VAR),
+            self.VOLTS,
+        )
+        for p, i, pf_reg, va, var, v in rows:
+            assert values[p] * 1000 == pytest.approx(v * values[i] * values[pf_reg], abs=1e-9)
+            assert values[va] ** 2 == pytest.approx(values[p] ** 2 + values[var] ** 2, abs=1e-9)
+
+    def test_phases_sum_to_total_with_its_sign(self, mt, regs) -> None:
+        values, _ = self._run(mt, -4.5, phase_split=(1, 1, 1), power_factor=0.9)
+        phases = [values[a] for a in (regs.PHASE_1_POWER, regs.PHASE_2_POWER, regs.PHASE_3_POWER)]
+        assert sum(phases) == pytest.approx(-4.5)
+        assert all(p < 0 for p in phases)
+        assert values[regs.TOTAL_PF] == pytest.approx(-0.9)
+        assert values[regs.TOTAL_VA] == pytest.approx(5.0)
+
+    def test_phase_split_is_normalised(self, mt, regs) -> None:
+        values, _ = self._run(mt, 6.0, phase_split=(2, 0, 1))
+        assert values[regs.PHASE_1_POWER] == pytest.approx(4.0)
+        assert values[regs.PHASE_2_POWER] == 0.0
+        assert values[regs.PHASE_2_CURRENT] == 0.0
+        assert values[regs.PHASE_2_PF] == 1.0
+
+    def test_system_currents_and_voltages(self, mt, regs) -> None:
+        balanced, _ = mt.PhaseSynthesizer().synthesize(6.9)
+        assert balanced[regs.NEUTRAL_CURRENT] == pytest.approx(0.0, abs=1e-9)
+        assert balanced[regs.SUM_LINE_CURRENT] == pytest.approx(30.0)
+        assert balanced[regs.AVG_LL_VOLTAGE] == pytest.approx(230.0 * 3 ** 0.5)
+
+        single, _ = mt.PhaseSynthesizer(phase_split=(1, 0, 0)).synthesize(2.3)
+        assert single[regs.NEUTRAL_CURRENT] == pytest.approx(10.0)
+
+    @pytest.mark.parametrize("kwargs", [
+        {"phase_split": (1, 1)},
+        {"phase_split": (0, 0, 0)},
+        {"phase_split": (1, -1, 1)},
+        {"power_factor": 0.0},
+        {"power_factor": 1.1},
+    ])
+    def test_invalid_configuration_raises(self, mt, kwargs) -> None:
+        with pytest.raises(ValueError):
+            mt.PhaseSynthesizer(**kwargs)
+
+
+class TestDemandWindow:
+
+    def _feed(self, window, ticks) -> None:
+        for t, value in ticks:
+            window.update(t, (value,))
+
+    def test_full_window_averages_constant_input(self, mt) -> None:
+        w = mt.DemandWindow(1, 600, 15)
+        self._feed(w, [(15.0 * k, 4.0) for k in range(41)])
+        assert w.demand[0] == pytest.approx(4.0)
+        assert w.peak[0] == pytest.approx(4.0)
+
+    def test_partial_window_counts_missing_time_as_zero(self, mt) -> None:
+        w = mt.DemandWindow(1, 600, 15)
+        self._feed(w, [(15.0 * k, 4.0) for k in range(11)])
+        assert w.demand[0] == pytest.approx(4.0 * 150 / 600)
+
+    def test_peak_survives_a_falling_demand(self, mt) -> None:
+        w = mt.DemandWindow(1, 600, 15)
+        self._feed(w, [(15.0 * k, 4.0 if k < 40 else 0.0) for k in range(61)])
+        assert w.demand[0] == pytest.approx(2.0)
+        assert w.peak[0] == pytest.approx(4.0)
+
+    def test_irregular_ticks_weigh_by_duration(self, mt) -> None:
+        w = mt.DemandWindow(1, 600, 15)
+        self._feed(w, [(0.0, 1.0), (300.0, 3.0), (600.0, 3.0)])
+        assert w.demand[0] == pytest.approx(2.0)
+
+    def test_gap_longer_than_period_fills_window(self, mt) -> None:
+        w = mt.DemandWindow(1, 600, 15)
+        self._feed(w, [(0.0, 1.0), (15.0, 5.0), (86400.0, 0.0)])
+        assert w.demand[0] == pytest.approx(5.0)
+
+    def test_shrinking_keeps_most_recent_slots(self, mt) -> None:
+        w = mt.DemandWindow(1, 600, 15)
+        self._feed(w, [(15.0 * k, 1.0 if k < 20 else 5.0) for k in range(41)])
+        assert w.demand[0] == pytest.approx(3.0)
+        assert w.set_period(300)
+        assert w.demand[0] == pytest.approx(5.0)
+        assert w.set_period(600)                 # dropped slots do not come back
+        assert w.demand[0] == pytest.approx(2.5)
+
+    @pytest.mark.parametrize("period", [0, -60, float("nan")])
+    def test_invalid_period_ignored(self, mt, period) -> None:
+        w = mt.DemandWindow(1, 600, 15)
+        assert not w.set_period(period)
+        assert w.period_s == 600
+
+    def test_matches_brute_force_on_slot_grid(self, mt) -> None:
+        """Random irregular ticks against a direct integral over the window slots."""
+        rng = random.Random(3)
+        slot = 15.0
+        w = mt.DemandWindow(2, 300, slot)
+        history = []                      # (t, values) held until the next tick
+        t = 1_750_000_000.0
+        for _ in range(3000):
+            t += rng.choice([1.0, 7.5, 15.0, 15.0, 40.0, 600.0])
+            values = (rng.uniform(-6, 6), rng.uniform(0, 30))
+            w.update(t, values)
+            history.append((t, values))
+        n = len(w._slots)
+        last_slot = int(t // slot)
+        lo, hi = (last_slot - n + 1) * slot, t
+        expected = [0.0, 0.0]
+        for (t0, v), (t1, _) in zip(history, history[1:]):
+            a, b = max(t0, lo), min(t1, hi)
+            if b > a:
+                for c in range(2):
+                    expected[c] += v[c] * (b - a)
+        for c in range(2):
+            assert w.demand[c] == pytest.approx(expected[c] / (n * slot), rel=1e-9, abs=1e-9)
+
+    def test_running_sum_does_not_drift(self, mt) -> None:
+        w = mt.DemandWindow(1, 3600, 15)
+        rng = random.Random(5)
+        for k in range(20_000):
+            w.update(15.0 * k, (rng.uniform(0, 10_000),))
+        assert w._sum[0] == pytest.approx(math.fsum(row[0] for row in w._slots), rel=1e-12)
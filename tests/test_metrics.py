@@ -0,0 +1,210 @@
+"""Unit tests for the metrics registry and localhost exporter — no HA runtime required.
+
+Run: python -m pytest tests/test_metrics.py -v
+"""
+import asyncio
+import importlib.util
+import math
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+_MODULE_PATH = os.path.join(ROOT, "metrics.py")
+_MODULE_NAME = "metrics"
+
+sys.modules.pop(_MODULE_NAME, None)
+_spec = importlib.util.spec_from_file_location(_MODULE_NAME, _MODULE_PATH)
+_mod = importlib.util.module_from_spec(_spec)
+sys.modules[_MODULE_NAME] = _mod
+_spec.loader.exec_module(_mod)
+
+Counter = _mod.Counter
+Histogram = _mod.Histogram
+CallbackGauge = _mod.CallbackGauge
+CallbackCounter = _mod.CallbackCounter
+MetricsRegistry = _mod.MetricsRegistry
+
+
+class TestCounter:
+
+    def test_labelled_series_render(self) -> None:
+        reg = MetricsRegistry()
+        c = reg.register(Counter("reads_total", "Reads.", ("table", "address")))
+        c.inc(("input", 52))
+        c.inc(("input", 52))
+        c.inc(("holding", 10), n=3)
+        lines = reg.render().splitlines()
+        assert lines[:2] == ["# HELP reads_total Reads.", "# TYPE reads_total counter"]
+        assert 'reads_total{table="input",address="52"} 2' in lines
+        assert 'reads_total{table="holding",address="10"} 3' in lines
+
+    def test_label_values_escaped(self) -> None:
+        reg = MetricsRegistry()
+        reg.register(Counter("c_total", "C.", ("reason",))).inc(('a "b"\\',))
+        assert 'c_total{reason="a \\"b\\"\\\\"} 1' in reg.render()
+
+
+class TestHistogram:
+
+    def test_buckets_are_cumulative_and_upper_inclusive(self) -> None:
+        h = Histogram("lat_seconds", "Latency.", (0.01, 0.1))
+        for v in (0.005, 0.01, 0.05, 2.0):
+            h.observe(v)
+        samples = {(name, labels): v for name, labels, v in h.samples()}
+        assert samples[("lat_seconds_bucket", '{le="0.01"}')] == 2
+        assert samples[("lat_seconds_bucket", '{le="0.1"}')] == 3
+        assert samples[("lat_seconds_bucket", '{le="+Inf"}')] == 4
+        assert samples[("lat_seconds_count", "")] == 4
+        assert samples[("lat_seconds_sum", "")] == pytest.approx(2.065)
+
+    def test_labelled_series_and_quantile(self) -> None:
+        h = Histogram("phase_seconds", "Phase.", (0.001, 0.01), ("phase",))
+        for _ in range(9):
+            h.observe(0.0005, ("calculation",))
+        h.observe(0.5, ("calculation",))
+        assert h.count(("calculation",)) == 10
+        assert h.count(("forecast",)) == 0
+        assert h.quantile(0.5, ("calculation",)) == 0.001
+        assert h.quantile(1.0, ("calculation",)) == math.inf
+        assert h.quantile(0.5, ("forecast",)) is None
+
+
+class TestCallbacks:
+
+    def test_gauge_read_at_render_time(self) -> None:
+        reg = MetricsRegistry()
+        box = {"v": None}
+        reg.register(CallbackGauge("ratio", "Ratio.", lambda: box["v"]))
+        assert not any(l.startswith("ratio") for l in reg.render().splitlines())  # omitted
+        box["v"] = 0.75
+        assert "ratio 0.75" in reg.render().splitlines()
+
+    def test_labelled_callback_counter(self) -> None:
+        reg = MetricsRegistry()
+        reg.register(CallbackCounter(
+            "skipped_total", "Skipped.", lambda: {("power",): 4, ("raw",): 0}, ("entity",),
+        ))
+        text = reg.render()
+        assert "# TYPE skipped_total counter" in text
+        assert 'skipped_total{entity="power"} 4' in text
+
+    def test_failing_collector_does_not_break_scrape(self) -> None:
+        reg = MetricsRegistry()
+        reg.register(CallbackGauge("broken", "Broken.", lambda: 1 / 0))
+        reg.register(Counter("ok_total", "Ok.")).inc()
+        text = reg.render()
+        assert "broken" not in text and "ok_total 1" in text
+
+    def test_register_replaces_and_unregister_removes(self) -> None:
+        reg = MetricsRegistry()
+        reg.register(CallbackGauge("g", "G.", lambda: 1))
+        reg.register(CallbackGauge("g", "G.", lambda: 2))
+        assert reg.render().count("# TYPE g gauge") == 1 and "g 2" in reg.render()
+        reg.unregister("g")
+        assert "g" not in reg
+
+
+class TestHotPath:
+
+    def test_phase_hook_observes_seconds(self) -> None:
+        _mod.EVALUATION_PHASE_SECONDS.reset()
+        _mod.observe_phase_ns("calculation", 250_000)
+        assert _mod.EVALUATION_PHASE_SECONDS.count(("calculation",)) == 1
+        assert _mod.EVALUATION_PHASE_SECONDS.total(("calculation",)) == pytest.approx(0.00025)
+
+
+class TestTickProfiler:
+
+    def test_laps_and_engine_records_per_tick(self, monkeypatch) -> None:
+        clock = iter([0, 1_000_000, 3_000_000, 4_000_000, 9_000_000])
+        monkeypatch.setattr(_mod.time, "perf_counter_ns", lambda: next(clock))
+        sink = []
+        prof = _mod.TickProfiler(5, sink=lambda p, ns: sink.append((p, ns)))
+        prof.start()                                   # t = 0 ms
+        prof.mark("staleness")                         # 1 ms
+        prof.record("calculation", 1_500_000)          # reported by the engine hook
+        prof.skip()                                    # t = 3 ms
+        prof.mark("writes")                            # 1 ms
+        assert prof.finish() is True                   # 9 ms > 5 ms budget
+        assert sink == [("staleness", 1_000_000), ("calculation", 1_500_000),
+                        ("writes", 1_000_000)]
+        assert prof.breakdown() == "staleness=1.00ms calculation=1.50ms writes=1.00ms"
+        assert (prof.last_ns, prof.over_budget, prof.ticks) == (9_000_000, 1, 1)
+
+    def test_summary_and_reset_between_ticks(self) -> None:
+        prof = _mod.TickProfiler(50)
+        for ns in (200_000, 400_000):
+            prof.start()
+            prof.record("range", ns)
+            assert prof.finish() is False
+        assert prof.summary() == {
+            "range": {"count": 2, "mean_ms": 0.3, "p95_ms": 0.5, "max_ms": 0.4},
+        }
+        assert prof.breakdown() == "range=0.40ms"      # last tick only
+
+
+class TestHttpEndpoint:
+
+    async def _request(self, port: int, raw: bytes) -> bytes:
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        writer.write(raw)
+        await writer.drain()
+        data = await reader.read()
+        writer.close()
+        return data
+
+    def _serve(self, *requests: bytes) -> list[bytes]:
+        reg = MetricsRegistry()
+        reg.register(Counter("hits_total", "Hits.")).inc(n=7)
+
+        async def _run():
+            server = await _mod.start_metrics_server(0, registry=reg)
+            port = server.sockets[0].getsockname()[1]
+            try:
+                return [await self._request(port, r) for r in requests]
+            finally:
+                server.close()
+                await server.wait_closed()
+
+        return asyncio.run(_run())
+
+    def test_get_metrics(self) -> None:
+        (resp,) = self._serve(b"GET /metrics HTTP/1.1\r\nHost: localhost\r\n\r\n")
+        head, body = resp.split(b"\r\n\r\n", 1)
+        assert head.startswith(b"HTTP/1.0 200 OK")
+        assert b"Content-Type: text/plain; version=0.0.4" in head
+        assert f"Content-Length: {len(body)}".encode() in head
+        assert b"hits_total 7" in body
+
+    def test_unknown_path_and_method(self) -> None:
+        not_found, not_allowed = self._serve(
+            b"GET / HTTP/1.1\r\n\r\n", b"POST /metrics HTTP/1.1\r\n\r\n",
+        )
+        assert not_found.startswith(b"HTTP/1.0 404")
+        assert not_allowed.startswith(b"HTTP/1.0 405")
+
+    def test_binds_localhost_only(self) -> None:
+        async def _run():
+            server = await _mod.start_metrics_server(0)
+            try:
+                return {s.getsockname()[0] for s in server.sockets}
+            finally:
+                server.close()
+                await server.wait_closed()
+
+        assert asyncio.run(_run()) == {"127.0.0.1"}
+
+    def test_busy_port_is_logged_not_raised(self, caplog) -> None:
+        async def _run():
+            blocker = await asyncio.start_server(lambda r, w: None, "127.0.0.1", 0)
+            port = blocker.sockets[0].getsockname()[1]
+            try:
+                await _mod.serve_metrics(port)
+            finally:
+                blocker.close()
+                await blocker.wait_closed()
+
+        asyncio.run(_run())
+        assert "metrics endpoint not started" in caplog.text
@@ -0,0 +1,209 @@
+"""Tests for the shared-memory register image and the Modbus server process.
+
+No HA runtime and no serial port required; the stall benchmark starts a real
+server process serving a line protocol (tests/stall_probe.py).
+
+Run: python -m pytest tests/test_modbus_process.py -v
+"""
+import asyncio
+import importlib.util
+import os
+import logging
+import statistics
+import struct
+import subprocess
+import sys
+import threading
+import time
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TESTS = os.path.join(ROOT, "tests")
+
+
+def _load(name: str):
+    sys.modules.pop(name, None)
+    spec = importlib.util.spec_from_file_location(name, os.path.join(ROOT, f"{name}.py"))
+    mod = importlib.util.module_from_spec(spec)
+    sys.modules[name] = mod
+    spec.loader.exec_module(mod)
+    return mod
+
+
+@pytest.fixture(scope="module")
+def mp():
+    """Load the register modules + modbus_process standalone (imported by name)."""
+    for name in ("registers", "sdm630_input_registers", "sdm630_holding_registers"):
+        _load(name)
+    return _load("modbus_process")
+
+
+@pytest.fixture
+def image(mp):
+    img = mp.SharedRegisterImage()
+    yield img
+    img.close()
+    img.unlink()
+
+
+def _words(value: float) -> list[int]:
+    return list(struct.unpack(">HH", struct.pack(">f", value)))
+
+
+class TestSeqlockTable:
+
+    def test_write_is_one_generation_step(self, image) -> None:
+        assert image.input.generation == 0
+        image.input.write({10: 1, 11: 2})
+        assert image.input.generation == 2
+        assert image.input.read(10, 2) == [1, 2]
+        assert image.holding.generation == 0          # tables are independent
+
+    def test_attached_image_sees_writes(self, mp, image) -> None:
+        other = mp.SharedRegisterImage(image.name)
+        try:
+            image.input.write({52: 7})
+            other.count_poll()
+            assert other.input.read(52, 1) == [7]
+            assert image.polls == 1
+        finally:
+            other.close()
+
+    def test_concurrent_reads_never_mix_updates(self, image) -> None:
+        stop = threading.Event()
+
+        def _writer():
+            k = 0
+            while not stop.is_set():
+                k = (k + 1) & 0xFFFF
+                image.input.write({a: k for a in range(64)})
+
+        thread = threading.Thread(target=_writer)
+        thread.start()
+        try:
+            for _ in range(20000):
+                assert len(set(image.input.read(0, 64))) == 1
+        finally:
+            stop.set()
+            thread.join()
+
+    def test_abandoned_write_does_not_hang_reader(self, mp, image, monkeypatch) -> None:
+        monkeypatch.setattr(mp, "_READ_TIMEOUT_S", 0.01)
+        image.input.write({0: 5})
+        image._header[0] += 1                         # writer died mid-write
+        assert image.input.read(0, 1) == [5]
+
+    def test_next_writer_recovers_abandoned_write(self, image) -> None:
+        image._header[0] += 1                         # writer died mid-write
+        image.input.write({0: 6})                     # restarted writer
+        assert image.input.generation == 4
+        assert image.input.read(0, 1) == [6]
+
+
+class TestSharedImageBlock:
+
+    def test_defaults_and_float_roundtrip(self, mp) -> None:
+        proc = mp.ModbusProcess()
+        try:
+            inputs, holding = proc.input_data_block, proc.holding_data_block
+            assert holding.get_float(3) == 60.0                     # DEMAND_PERIOD default
+            assert inputs.get_float(53) == 300.0                    # TOTAL_POWER default
+            inputs.set_floats({53: 4.2, 1: 231.0, 9999: 1.0})       # unknown ignored
+            assert proc.image.input.read(53, 2) == _words(4.2)
+            assert inputs.get_float(1) == 231.0
+            assert proc.image.input.generation == 4                 # defaults + one batch
+        finally:
+            proc.stop()
+
+    def test_polls_dispatched_once_per_check(self, mp) -> None:
+        proc = mp.ModbusProcess()
+        calls = []
+        proc.input_data_block.set_poll_callback(lambda: calls.append(1))
+        try:
+            proc.dispatch_polls()
+            for _ in range(5):
+                proc.image.count_poll()
+            proc.dispatch_polls()
+            proc.dispatch_polls()
+            assert calls == [1]
+        finally:
+            proc.stop()
+
+
+class TestServerProcess:
+
+    def test_server_imports_standalone_without_home_assistant(self) -> None:
+        """The server process imports what ``python modbus_process.py`` imports."""
+        proc = subprocess.run(
+            [sys.executable, "-c",
+             "import sys, modbus_process, modbus_server; print(' '.join(sys.modules))"],
+            cwd=ROOT, capture_output=True, text=True, check=True,
+        )
+        loaded = {name.split(".")[0] for name in proc.stdout.split()}
+        assert "pymodbus" in loaded
+        assert not loaded & {"homeassistant", "voluptuous", "custom_components", "sdm630_simulator"}
+
+    def test_exit_is_logged_and_process_restarted(self, mp, monkeypatch, caplog) -> None:
+        monkeypatch.setenv("PYTHONPATH", TESTS)
+        monkeypatch.setattr(mp, "_RESTART_DELAYS_S", (0,))
+        proc = mp.ModbusProcess("stall_probe:no_server")
+        try:
+            proc.start()
+            proc._process.wait(timeout=30)
+            assert not proc.restart_due()                 # exit not noticed yet
+            with caplog.at_level(logging.WARNING):
+                proc.dispatch_polls()
+            assert "server process exited (code 0)" in caplog.text
+            assert proc.restart_due()
+            assert not proc.restart_due()                 # one restart per exit
+            proc.start()
+            assert proc.alive or proc._process.wait(timeout=30) == 0
+        finally:
+            proc.stop()
+
+
+class TestLoopStallBenchmark:
+    """Response latency of the server process vs. a server on a stalled loop."""
+
+    STALL_S = 0.1
+
+    def test_process_latency_independent_of_loop_stalls(self, mp, monkeypatch) -> None:
+        monkeypatch.syspath_prepend(TESTS)
+        monkeypatch.setenv("PYTHONPATH", TESTS)       # the server process imports it by name
+        import stall_probe
+
+        child_port, loop_port = stall_probe.free_port(), stall_probe.free_port()
+        proc = mp.ModbusProcess("stall_probe:serve_tcp", (str(child_port),))
+        proc.start()
+        try:
+            stall_probe.connect(child_port).close()     # child is up
+
+            async def _stalled_loop():
+                in_loop = asyncio.create_task(stall_probe.serve_tcp(loop_port, proc.image))
+                clients = asyncio.gather(
+                    asyncio.to_thread(stall_probe.latencies, child_port),
+                    asyncio.to_thread(stall_probe.latencies, loop_port),
+                )
+                kw = 0.0
+                while not clients.done():
+                    time.sleep(self.STALL_S)           # a blocking call in "HA"
+                    kw += 0.1
+                    proc.input_data_block.set_float(53, kw)
+                    await asyncio.sleep(0.005)
+                in_loop.cancel()
+                return await clients
+
+            child, loop = asyncio.run(_stalled_loop())
+        finally:
+            proc.stop()
+
+        for label, samples in (("server process", child), ("stalled loop", loop)):
+            print(f"{label}: median {statistics.median(samples) * 1e3:.2f} ms, "
+                  f"max {max(samples) * 1e3:.2f} ms")
+        # The stalls are real: the in-loop server answers late ...
+        assert statistics.median(loop) > self.STALL_S / 5
+        assert max(loop) > self.STALL_S / 2
+        # ... while the server process does not notice them.
+        assert statistics.median(child) < 0.01
+        assert max(child) < self.STALL_S / 2
@@ -0,0 +1,78 @@
+"""Tests for the RS485 echo patch in modbus_server — no HA runtime, no serial port.
+
+The module is loaded standalone, as the server process imports it; pymodbus
+must be installed, its ``ModbusProtocol`` is replaced by a stand-in.
+
+Run: python -m pytest tests/test_modbus_server.py -v
+"""
+import importlib.util
+import os
+import sys
+import types
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _load(name: str):
+    sys.modules.pop(name, None)
+    spec = importlib.util.spec_from_file_location(name, os.path.join(ROOT, f"{name}.py"))
+    mod = importlib.util.module_from_spec(spec)
+    sys.modules[name] = mod
+    spec.loader.exec_module(mod)
+    return mod
+
+
+@pytest.fixture
+def ms(monkeypatch):
+    """Fresh modbus_server (and metrics) with a stand-in ModbusProtocol."""
+    transport = types.ModuleType("pymodbus.transport")
+    transport.ModbusProtocol = type(
+        "ModbusProtocol", (),
+        {"send": lambda self, data, addr=None: None,
+         "datagram_received": lambda self, data, addr: None},
+    )
+    monkeypatch.setitem(sys.modules, "pymodbus.transport", transport)
+    for name in ("registers", "sdm630_input_registers", "sdm630_holding_registers",
+                 "metrics", "modbus_thread"):
+        _load(name)
+    mod = _load("modbus_server")
+    mod.apply_echo_patch()
+    return mod
+
+
+def _protocol():
+    proto = sys.modules["pymodbus.transport"].ModbusProtocol()
+    proto.is_server = True
+    return proto
+
+
+class TestEchoPatch:
+
+    def test_echo_bytes_and_response_latency(self, ms, monkeypatch) -> None:
+        clock = iter([100.000, 100.004, 100.012, 100.020])
+        monkeypatch.setattr(ms.time, "monotonic", lambda: next(clock))
+        proto = _protocol()
+        proto.datagram_received(b"\x02\x04\x00\x34", None)   # request, fragment 1
+        proto.datagram_received(b"\x00\x02\x30\xf0", None)   # fragment 2
+        proto.send(b"\x02\x04\x04\x00\x00\x00\x00\x00\x00")
+        proto.datagram_received(b"\x02\x04\x04", None)       # echo inside the window
+        assert ms.MODBUS_RESPONSE_SECONDS.count() == 1
+        assert ms.MODBUS_RESPONSE_SECONDS.total() == pytest.approx(0.012)
+        assert ms.ECHO_BYTES_SUPPRESSED.get() == 3
+
+    def test_unanswered_request_not_carried_over(self, ms, monkeypatch) -> None:
+        clock = iter([100.0, 101.0, 101.005])
+        monkeypatch.setattr(ms.time, "monotonic", lambda: next(clock))
+        proto = _protocol()
+        proto.datagram_received(b"\x03\x04", None)            # other unit, no reply
+        proto.datagram_received(b"\x02\x04", None)
+        proto.send(b"\x02\x04")
+        assert ms.MODBUS_RESPONSE_SECONDS.total() == pytest.approx(0.005)
+
+    def test_patch_is_idempotent(self, ms) -> None:
+        protocol = sys.modules["pymodbus.transport"].ModbusProtocol
+        ms.apply_echo_patch()
+        assert protocol.send is ms._patched_send
+        assert ms._orig_send is not ms._patched_send
@@ -0,0 +1,158 @@
+"""Tests for the Modbus I/O thread: snapshot handoff, poll forwarding, stalls.
+
+No HA runtime and no serial port required; the stall benchmark serves a
+line protocol from the I/O thread (tests/stall_probe.py).
+
+Run: python -m pytest tests/test_modbus_thread.py -v
+"""
+import asyncio
+import importlib.util
+import os
+import statistics
+import sys
+import threading
+import time
+import types
+
+import pytest
+
+from . import stall_probe
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _load(name: str):
+    sys.modules.pop(name, None)
+    spec = importlib.util.spec_from_file_location(name, os.path.join(ROOT, f"{name}.py"))
+    mod = importlib.util.module_from_spec(spec)
+    sys.modules[name] = mod
+    spec.loader.exec_module(mod)
+    return mod
+
+
+@pytest.fixture(scope="module")
+def mt():
+    return _load("modbus_thread")
+
+
+def _busy(seconds: float) -> None:
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        pass
+
+
+class TestSnapshotTable:
+
+    def test_write_publishes_a_new_snapshot(self, mt) -> None:
+        table = mt.SnapshotTable({52: 1, 53: 2})
+        before = table._words
+        table.write({53: 9})
+        assert table.read(52, 2) == [1, 9]
+        assert before == {52: 1, 53: 2}                # old snapshot untouched
+
+    def test_concurrent_reads_never_mix_updates(self, mt) -> None:
+        table = mt.SnapshotTable({a: 0 for a in range(64)})
+        stop = threading.Event()
+
+        def _writer():
+            k = 0
+            while not stop.is_set():
+                k = (k + 1) & 0xFFFF
+                table.write({a: k for a in range(64)})
+
+        thread = threading.Thread(target=_writer)
+        thread.start()
+        try:
+            for _ in range(20000):
+                assert len(set(table.read(0, 64))) == 1
+        finally:
+            stop.set()
+            thread.join()
+
+
+class TestPollForwarder:
+
+    def test_burst_from_other_thread_runs_callback_once(self, mt) -> None:
+        async def _run():
+            loop = asyncio.get_running_loop()
+            calls = []
+            forward = mt.PollForwarder(loop, lambda: calls.append(threading.get_ident()))
+            burst = threading.Thread(target=lambda: [forward() for _ in range(50)])
+            burst.start()
+            burst.join()
+            await asyncio.sleep(0.01)
+            assert calls == [threading.get_ident()]     # once, on the loop's thread
+            await asyncio.to_thread(forward)            # after the run: next call
+            await asyncio.sleep(0.01)
+            assert len(calls) == 2
+
+        asyncio.run(_run())
+
+
+class TestModbusThread:
+
+    def test_runs_coroutine_on_own_loop_and_stops(self, mt) -> None:
+        io = mt.ModbusThread()
+
+        async def _where():
+            return threading.current_thread().name, asyncio.get_running_loop()
+
+        name, loop = io.start(_where()).result(timeout=5)
+        assert (name, loop) == ("sdm630-modbus", io.loop)
+        io.stop()
+        assert not io._thread.is_alive() and io.loop.is_closed()
+
+    def test_stop_cancels_server(self, mt) -> None:
+        io = mt.ModbusThread()
+        future = io.start(asyncio.sleep(3600))
+        io.stop()
+        assert future.cancelled()
+
+
+class TestLoopStallBenchmark:
+    """Response latency of the I/O thread vs. a server on a stalled loop."""
+
+    STALL_S = 0.1
+
+    @pytest.mark.parametrize("stall", [time.sleep, _busy], ids=["blocking", "cpu"])
+    def test_thread_latency_independent_of_loop_stalls(self, mt, stall) -> None:
+        io = mt.ModbusThread()
+        table = mt.SnapshotTable({53: 0, 54: 0})
+        thread_port, loop_port = stall_probe.free_port(), stall_probe.free_port()
+
+        async def _stalled_loop():
+            polls = []
+            image = types.SimpleNamespace(
+                input=table,
+                count_poll=mt.PollForwarder(asyncio.get_running_loop(), lambda: polls.append(1)),
+            )
+            io.start(stall_probe.serve_tcp(thread_port, image))
+            in_loop = asyncio.create_task(stall_probe.serve_tcp(
+                loop_port, types.SimpleNamespace(input=table, count_poll=lambda: None),
+            ))
+            clients = asyncio.gather(
+                asyncio.to_thread(stall_probe.latencies, thread_port),
+                asyncio.to_thread(stall_probe.latencies, loop_port),
+            )
+            word = 0
+            while not clients.done():
+                stall(self.STALL_S)                    # a slow call in "HA"
+                word += 1
+                table.write({53: word, 54: word})
+                await asyncio.sleep(0.005)
+            in_loop.cancel()
+            return (*await clients, polls)
+
+        try:
+            thread, loop, polls = asyncio.run(_stalled_loop())
+        finally:
+            io.stop()
+
+        for label, samples in (("I/O thread", thread), ("stalled loop", loop)):
+            print(f"{stall.__name__}: {label}: median {statistics.median(samples) * 1e3:.2f} ms, "
+                  f"max {max(samples) * 1e3:.2f} ms")
+        assert statistics.median(loop) > self.STALL_S / 5
+        assert max(loop) > self.STALL_S / 2
+        assert statistics.median(thread) < 0.01
+        assert max(thread) < self.STALL_S / 2
+        assert 0 < len(polls) < len(thread)            # forwarded, coalesced per loop run
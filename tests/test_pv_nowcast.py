@@ -0,0 +1,155 @@
+"""Unit tests for the PV nowcast — no HA runtime required.
+
+Run: python -m pytest tests/test_pv_nowcast.py -v
+"""
+import importlib.util
+import os
+import sys
+import tracemalloc
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+_MODULE_PATH = os.path.join(ROOT, "surplus_engine.py")
+_MODULE_NAME = "surplus_engine"
+
+sys.modules.pop(_MODULE_NAME, None)
+_spec = importlib.util.spec_from_file_location(_MODULE_NAME, _MODULE_PATH)
+_mod = importlib.util.module_from_spec(_spec)
+sys.modules[_MODULE_NAME] = _mod
+_spec.loader.exec_module(_mod)
+
+PvNowcaster = _mod.PvNowcaster
+SurplusEngine = _mod.SurplusEngine
+SensorSnapshot = _mod.SensorSnapshot
+
+T0 = datetime(2026, 6, 15, 12, 0, tzinfo=timezone.utc)
+EPOCH0 = T0.timestamp()
+
+CONFIG = {
+    "evaluation_interval": 15,
+    "wallbox_threshold_kw": 4.2,
+    "hold_time_minutes": 1,
+    "battery_capacity_kwh": 10.0,
+    "max_discharge_kw": 10.0,
+    "time_strategy": [{"default": True, "soc_floor": 50}],
+    "seasonal_targets": {6: 50},
+}
+
+
+def _snapshot(seconds: float, pv_w: float) -> SensorSnapshot:
+    return SensorSnapshot(
+        soc_percent=50.0,  # at the floor: no battery buffer
+        power_to_grid_w=0.0,
+        pv_production_w=pv_w,
+        power_to_user_w=1000.0,
+        timestamp=T0 + timedelta(seconds=seconds),
+        sunset_time=None,
+        sunrise_time=None,
+    )
+
+
+class TestPvNowcaster:
+
+    def test_needs_three_samples(self) -> None:
+        nc = PvNowcaster(600, 7.5)
+        nc.update(EPOCH0, 5000.0)
+        nc.update(EPOCH0 + 15, 5100.0)
+        assert nc.slope_w_per_s() is None
+        assert nc.predict(EPOCH0 + 300) is None
+
+    def test_linear_ramp_is_fitted_exactly(self) -> None:
+        nc = PvNowcaster(600, 7.5)
+        for i in range(20):
+            nc.update(EPOCH0 + 15 * i, 8000.0 - 2.0 * 15 * i)  # −2 W/s
+        assert nc.slope_w_per_s() == pytest.approx(-2.0)
+        last = EPOCH0 + 15 * 19
+        assert nc.predict(last + 300) == pytest.approx(8000.0 - 2.0 * (15 * 19 + 300))
+
+    def test_prediction_never_negative(self) -> None:
+        nc = PvNowcaster(600, 7.5)
+        for i in range(10):
+            nc.update(EPOCH0 + 15 * i, 1000.0 - 100.0 * i)
+        assert nc.predict(EPOCH0 + 3600) == 0.0
+
+    def test_old_samples_leave_the_window(self) -> None:
+        nc = PvNowcaster(300, 7.5)
+        for i in range(40):                       # 10 min falling
+            nc.update(EPOCH0 + 15 * i, 9000.0 - 10.0 * 15 * i)
+        for i in range(40, 80):                   # then 10 min flat
+            nc.update(EPOCH0 + 15 * i, 3000.0)
+        assert nc.slope_w_per_s() == pytest.approx(0.0, abs=1e-9)
+        assert nc.samples == 21                   # 300 s window, 15 s apart, inclusive
+
+    def test_closely_spaced_samples_are_ignored(self) -> None:
+        nc = PvNowcaster(600, 7.5)
+        nc.update(EPOCH0, 5000.0)
+        nc.update(EPOCH0 + 1, 9000.0)             # event-driven re-evaluation
+        nc.update(EPOCH0 + 15, 5000.0)
+        assert nc.samples == 2
+
+    def test_long_run_matches_direct_fit(self) -> None:
+        """Incremental sums stay accurate over many ring wraps at epoch scale."""
+        np = pytest.importorskip("numpy")
+        nc = PvNowcaster(600, 7.5)
+        ts, ys = [], []
+        for i in range(5000):
+            t = EPOCH0 + 15 * i
+            y = 4000.0 + 3000.0 * ((i * 7919) % 101) / 101.0
+            nc.update(t, y)
+            ts.append(t)
+            ys.append(y)
+        window = np.array(ts[-41:]) - ts[-41]
+        slope, intercept = np.polyfit(window, np.array(ys[-41:]), 1)
+        assert nc.slope_w_per_s() == pytest.approx(slope, rel=1e-9, abs=1e-9)
+        assert nc.predict(ts[-1] + 120) == pytest.approx(
+            max(0.0, intercept + slope * (window[-1] + 120)), rel=1e-9
+        )
+
+    def test_update_does_not_grow_memory(self) -> None:
+        nc = PvNowcaster(600, 7.5)
+        for i in range(200):
+            nc.update(EPOCH0 + 15 * i, 5000.0)
+        tracemalloc.start()
+        try:
+            before, _ = tracemalloc.get_traced_memory()
+            for i in range(200, 5200):
+                nc.update(EPOCH0 + 15 * i, 5000.0 + i % 50)
+                nc.predict(EPOCH0 + 15 * i + 300)
+            after, _ = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        assert after - before < 1024
+
+
+class TestEngineNowcast:
+
+    def _run(self, config, pv_series):
+        engine = SurplusEngine(config)
+        return [engine.evaluate_tactical(_snapshot(15 * i, pv)) for i, pv in enumerate(pv_series)]
+
+    def test_trend_reported_without_changing_result(self) -> None:
+        pv = [8000.0 - 150.0 * i for i in range(10)]    # −10 W/s
+        plain = self._run({**CONFIG, "nowcast_window_minutes": 0}, pv)
+        logged = self._run(CONFIG, pv)
+        assert plain[-1].pv_trend_w_per_min is None
+        assert logged[-1].pv_trend_w_per_min == pytest.approx(-600.0)
+        assert [r.reported_kw for r in logged] == [r.reported_kw for r in plain]
+
+    def test_falling_trend_stops_charging_before_the_drop(self) -> None:
+        pv = [8000.0 - 150.0 * i for i in range(24)]    # 7 kW surplus falling 0.6 kW/min
+        horizon = self._run({**CONFIG, "nowcast_horizon_minutes": 3}, pv)
+        plain = self._run(CONFIG, pv)
+        assert plain[4].real_surplus_kw == pytest.approx(6.4)   # 7.4 kW PV at 60 s
+        assert horizon[4].real_surplus_kw == pytest.approx(6.4 - 1.8)
+        assert horizon[4].pv_nowcast_w == pytest.approx(7400.0 - 1800.0)
+        below = [next(i for i, r in enumerate(rs) if r.real_surplus_kw < 4.2)
+                 for rs in (plain, horizon)]
+        assert below == [19, 7]                         # 3 min (12 ticks) earlier
+
+    def test_rising_trend_never_raises_surplus(self) -> None:
+        pv = [2000.0 + 150.0 * i for i in range(12)]
+        horizon = self._run({**CONFIG, "nowcast_horizon_minutes": 3}, pv)
+        plain = self._run(CONFIG, pv)
+        assert [r.real_surplus_kw for r in horizon] == [r.real_surplus_kw for r in plain]
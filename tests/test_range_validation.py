@@ -13,6 +13,7 @@ Covers all Acceptance Criteria:
 from __future__ import annotations
 
 import importlib.util
+import math
 import os
 import sys
 import types
@@ -21,6 +22,8 @@ from unittest.mock import MagicMock
 
 import pytest
 
+from .conftest import load_decision_trace, modbus_server_stub
+
 ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 _SENSOR_PATH = os.path.join(ROOT, "sensor.py")
 _SE_PATH = os.path.join(ROOT, "surplus_engine.py")
@@ -43,6 +46,17 @@ def _load_surplus_engine():
     return mod
 
 
+def _load_metrics():
+    """Load metrics.py fresh (stdlib only) so counters start at zero."""
+    key = "_test_metrics"
+    sys.modules.pop(key, None)
+    spec = importlib.util.spec_from_file_location(key, os.path.join(ROOT, "metrics.py"))
+    mod = importlib.util.module_from_spec(spec)
+    sys.modules[key] = mod
+    spec.loader.exec_module(mod)
+    return mod
+
+
 def _load_init_module():
     """Load __init__.py to get the real DEFAULTS dict."""
     key = "_test_range_init"
@@ -143,23 +157,21 @@ def sensor_ctx():
     ha_util_dt.utcnow = MagicMock(return_value=_NOW)
     ha_util.dt = ha_util_dt
 
-    pymodbus        = types.ModuleType("pymodbus")
-    pymodbus_server = types.ModuleType("pymodbus.server")
-    pymodbus_server.StartAsyncSerialServer = MagicMock()
-    pymodbus_framer = types.ModuleType("pymodbus.framer")
-    pymodbus_framer.FramerType = MagicMock()
-
     PKG = "sdm630_simulator"
     mock_idb = MagicMock()
 
-    pkg_modbus              = types.ModuleType(f"{PKG}.modbus_server")
-    pkg_modbus.context      = MagicMock()
-    pkg_modbus.identity     = MagicMock()
-    pkg_modbus.input_data_block = mock_idb
+    pkg_modbus              = modbus_server_stub(PKG, mock_idb)
 
     pkg_regs             = types.ModuleType(f"{PKG}.sdm630_input_registers")
     pkg_regs.TOTAL_POWER = 0x0035
 
+    pkg_holding = types.ModuleType(f"{PKG}.sdm630_holding_registers")
+    pkg_holding.DEMAND_PERIOD = 3
+
+    pkg_meter = types.ModuleType(f"{PKG}.meter")
+    pkg_meter.MeterModel = MagicMock()
+    pkg_meter.ENERGY_STATE_VERSION = 1
+
     pkg_se = types.ModuleType(f"{PKG}.surplus_engine")
     for attr in dir(se):
         if not attr.startswith("__"):
@@ -174,22 +186,25 @@ def sensor_ctx():
         "homeassistant.helpers.event":      ha_event,
         "homeassistant.util":               ha_util,
         "homeassistant.util.dt":            ha_util_dt,
-        "pymodbus":                         pymodbus,
-        "pymodbus.server":                  pymodbus_server,
-        "pymodbus.framer":                  pymodbus_framer,
         f"{PKG}.modbus_server":             pkg_modbus,
         f"{PKG}.sdm630_input_registers":    pkg_regs,
+        f"{PKG}.meter":                     pkg_meter,
+        f"{PKG}.sdm630_holding_registers":  pkg_holding,
         f"{PKG}.surplus_engine":            pkg_se,
+        f"{PKG}.metrics":                   _load_metrics(),
     }
 
     saved = {k: sys.modules.get(k) for k in new_modules}
     for k, v in new_modules.items():
         sys.modules[k] = v
+    saved[f"{PKG}.decision_trace"] = sys.modules.get(f"{PKG}.decision_trace")
+    load_decision_trace(PKG)                 # imports the surplus_engine stub above
 
     # Provide pkg root with CONF_ENTITIES and DEFAULTS
     if PKG not in sys.modules:
         pkg_root = types.ModuleType(PKG)
         pkg_root.CONF_ENTITIES = "entities"
+        pkg_root.CONF_REGISTER_MAPPINGS = "register_mappings"
         pkg_root.DEFAULTS = init.DEFAULTS
         pkg_root.DOMAIN = "sdm630_simulator"
         sys.modules[PKG] = pkg_root
@@ -197,6 +212,8 @@ def sensor_ctx():
     else:
         if not hasattr(sys.modules[PKG], "CONF_ENTITIES"):
             sys.modules[PKG].CONF_ENTITIES = "entities"
+        if not hasattr(sys.modules[PKG], "CONF_REGISTER_MAPPINGS"):
+            sys.modules[PKG].CONF_REGISTER_MAPPINGS = "register_mappings"
         if not hasattr(sys.modules[PKG], "DEFAULTS"):
             sys.modules[PKG].DEFAULTS = init.DEFAULTS
         if not hasattr(sys.modules[PKG], "DOMAIN"):
@@ -211,6 +228,7 @@ def sensor_ctx():
     sensor_mod.__package__ = PKG
     sys.modules[f"{PKG}.sensor"] = sensor_mod
     spec.loader.exec_module(sensor_mod)
+    sensor_mod._load_modbus_server()         # binds the data blocks, as setup does
 
     yield sensor_mod, se, init
 
@@ -249,7 +267,7 @@ def _make_sensor(mod, cfg):
     s = mod.SDM630SimSensor("Test Sensor", hass_mock, cfg)
     s.async_on_remove      = MagicMock()
     s.async_write_ha_state = MagicMock()
-    s._invalidation_reasons = {}
+    s._monotonic = lambda: s._utcnow().timestamp()  # cache stamps follow the mocked clock
     entities_cfg = cfg.get("entities", {})
     s._entity_to_cache_key = {
         eid: mod.ENTITY_ROLE_TO_CACHE_KEY[role]
@@ -274,6 +292,25 @@ def _valid_cache(soc=60.0, grid=0.0, pv=2000.0, user=1500.0):
     }
 
 
+def _fill_cache(s, entries):
+    """Write ``{cache_key: (value, stamp, valid)}`` into the sensor's slot cache.
+
+    ``stamp`` is a datetime on the mocked wall clock (``_make_sensor`` runs the
+    cache's monotonic time base off the same clock) or None for a valid
+    reading without a stamp (startup grace).
+    """
+    cache = s._sensor_cache
+    slots = sys.modules[type(s).__module__].CACHE_SLOT
+    for key, (value, ts, valid) in entries.items():
+        stamp = math.nan if ts is None else ts.timestamp()
+        if valid:
+            cache.set(slots[key], value, stamp)
+        else:
+            cache.values[slots[key]] = value
+            cache.invalidate(slots[key], stamp, "")
+
+
+
 # ===========================================================================
 # AC1 — SOC out of range → FAILSAFE
 # ===========================================================================
@@ -283,7 +320,7 @@ class TestAC1SocOutOfRange:
         """SOC=105 → _validate_cache returns reason with entity_id and range."""
         mod, _, _ = sensor_ctx
         s = _make_sensor(mod, default_config)
-        s._sensor_cache = _valid_cache(soc=105.0)
+        _fill_cache(s, _valid_cache(soc=105.0))
         result = s._validate_cache()
         assert result is not None
         assert "sensor.battery_soc" in result
@@ -293,7 +330,7 @@ class TestAC1SocOutOfRange:
         """Reason string includes the actual invalid value."""
         mod, _, _ = sensor_ctx
         s = _make_sensor(mod, default_config)
-        s._sensor_cache = _valid_cache(soc=105.0)
+        _fill_cache(s, _valid_cache(soc=105.0))
         result = s._validate_cache()
         assert "105.0" in result
 
@@ -301,7 +338,7 @@ class TestAC1SocOutOfRange:
         """SOC=-1 → out of range [0, 100]."""
         mod, _, _ = sensor_ctx
         s = _make_sensor(mod, default_config)
-        s._sensor_cache = _valid_cache(soc=-1.0)
+        _fill_cache(s, _valid_cache(soc=-1.0))
         result = s._validate_cache()
         assert result is not None
         assert "out of range [0, 100]" in result
@@ -316,7 +353,7 @@ class TestAC2PowerSensorOutOfRange:
         """pv_production=35000 W → FAILSAFE with entity_id and range."""
         mod, _, _ = sensor_ctx
         s = _make_sensor(mod, default_config)
-        s._sensor_cache = _valid_cache(pv=35000.0)
+        _fill_cache(s, _valid_cache(pv=35000.0))
         result = s._validate_cache()
         assert result is not None
         assert "sensor.pv_power" in result
@@ -326,7 +363,7 @@ class TestAC2PowerSensorOutOfRange:
         """power_to_grid=-35000 W → FAILSAFE."""
         mod, _, _ = sensor_ctx
         s = _make_sensor(mod, default_config)
-        s._sensor_cache = _valid_cache(grid=-35000.0)
+        _fill_cache(s, _valid_cache(grid=-35000.0))
         result = s._validate_cache()
         assert result is not None
         assert "sensor.power_to_grid" in result
@@ -335,7 +372,7 @@ class TestAC2PowerSensorOutOfRange:
         """power_to_user=-35000 W → FAILSAFE with entity_id."""
         mod, _, _ = sensor_ctx
         s = _make_sensor(mod, default_config)
-        s._sensor_cache = _valid_cache(user=-35000.0)
+        _fill_cache(s, _valid_cache(user=-35000.0))
         result = s._validate_cache()
         assert result is not None
         # entity_id for power_to_user maps to the role name in _cache_key_to_entity
@@ -352,14 +389,14 @@ class TestAC3InRangeNoFailsafe:
         """All cache values within ranges → None (no failure)."""
         mod, _, _ = sensor_ctx
         s = _make_sensor(mod, default_config)
-        s._sensor_cache = _valid_cache()
+        _fill_cache(s, _valid_cache())
         assert s._validate_cache() is None
 
     def test_pv_production_at_30000_returns_none(self, sensor_ctx, default_config):
         """pv_production=30000 (at upper bound) → valid."""
         mod, _, _ = sensor_ctx
         s = _make_sensor(mod, default_config)
-        s._sensor_cache = _valid_cache(pv=30000.0)
+        _fill_cache(s, _valid_cache(pv=30000.0))
         assert s._validate_cache() is None
 
     def test_power_to_grid_negative_in_range_returns_none(
@@ -368,7 +405,7 @@ class TestAC3InRangeNoFailsafe:
         """power_to_grid=-30000 (lower bound) → valid."""
         mod, _, _ = sensor_ctx
         s = _make_sensor(mod, default_config)
-        s._sensor_cache = _valid_cache(grid=-30000.0)
+        _fill_cache(s, _valid_cache(grid=-30000.0))
         assert s._validate_cache() is None
 
 
@@ -391,7 +428,7 @@ class TestAC4DefaultRangesApplied:
             # no sensor_ranges key — must fall back to DEFAULTS
         }
         s = _make_sensor(mod, cfg)
-        s._sensor_cache = _valid_cache(soc=105.0)
+        _fill_cache(s, _valid_cache(soc=105.0))
         result = s._validate_cache()
         assert result is not None
         assert "out of range [0, 100]" in result
@@ -409,7 +446,7 @@ class TestAC4DefaultRangesApplied:
             },
         }
         s = _make_sensor(mod, cfg)
-        s._sensor_cache = _valid_cache()
+        _fill_cache(s, _valid_cache())
         assert s._validate_cache() is None
 
 
@@ -435,7 +472,7 @@ class TestAC5CustomRanges:
             },
         }
         s = _make_sensor(mod, cfg)
-        s._sensor_cache = _valid_cache(pv=25000.0)
+        _fill_cache(s, _valid_cache(pv=25000.0))
         result = s._validate_cache()
         assert result is not None
         assert "[-20000, 20000]" in result
@@ -457,7 +494,7 @@ class TestAC5CustomRanges:
             },
         }
         s = _make_sensor(mod, cfg)
-        s._sensor_cache = _valid_cache(soc=5.0)
+        _fill_cache(s, _valid_cache(soc=5.0))
         result = s._validate_cache()
         assert result is not None
         assert "[10, 100]" in result
@@ -476,12 +513,12 @@ class TestAC6RecoveryPath:
         s = _make_sensor(mod, default_config)
 
         # First: out of range
-        s._sensor_cache = _valid_cache(soc=105.0)
+        _fill_cache(s, _valid_cache(soc=105.0))
         result_fail = s._validate_cache()
         assert result_fail is not None
 
         # Recovery: valid state arrives
-        s._sensor_cache = _valid_cache(soc=75.0)
+        _fill_cache(s, _valid_cache(soc=75.0))
         result_ok = s._validate_cache()
         assert result_ok is None
 
@@ -496,12 +533,12 @@ class TestAC7InvalidEntriesSkipped:
         mod, _, _ = sensor_ctx
         s = _make_sensor(mod, default_config)
         # SOC is invalid (valid=False) AND out-of-range — should be skipped
-        s._sensor_cache = {
+        _fill_cache(s, {
             "soc_percent":     (105.0, _NOW, False),  # invalid AND out-of-range
             "power_to_grid_w": (0.0,   _NOW, True),
             "pv_production_w": (2000.0, _NOW, True),
             "power_to_user_w": (1500.0, _NOW, True),
-        }
+        })
         assert s._validate_cache() is None
 
     def test_none_entry_skipped(self, sensor_ctx, default_config):
@@ -509,11 +546,11 @@ class TestAC7InvalidEntriesSkipped:
         mod, _, _ = sensor_ctx
         s = _make_sensor(mod, default_config)
         # Only three entries (SOC missing entirely)
-        s._sensor_cache = {
+        _fill_cache(s, {
             "power_to_grid_w": (0.0,   _NOW, True),
             "pv_production_w": (2000.0, _NOW, True),
             "power_to_user_w": (1500.0, _NOW, True),
-        }
+        })
         assert s._validate_cache() is None
 
     def test_mixed_valid_false_and_out_of_range_power(
@@ -522,12 +559,12 @@ class TestAC7InvalidEntriesSkipped:
         """SOC valid=False (skipped) but pv_production out-of-range (valid=True) → fail."""
         mod, _, _ = sensor_ctx
         s = _make_sensor(mod, default_config)
-        s._sensor_cache = {
+        _fill_cache(s, {
             "soc_percent":     (105.0,  _NOW, False),  # skip
             "power_to_grid_w": (0.0,    _NOW, True),
             "pv_production_w": (35000.0, _NOW, True),  # fail
             "power_to_user_w": (1500.0,  _NOW, True),
-        }
+        })
         result = s._validate_cache()
         assert result is not None
         assert "[-30000, 30000]" in result
@@ -542,21 +579,21 @@ class TestAC8BoundaryValues:
         """SOC=0 (lower bound) → no FAILSAFE (inclusive)."""
         mod, _, _ = sensor_ctx
         s = _make_sensor(mod, default_config)
-        s._sensor_cache = _valid_cache(soc=0.0)
+        _fill_cache(s, _valid_cache(soc=0.0))
         assert s._validate_cache() is None
 
     def test_soc_exactly_100_is_valid(self, sensor_ctx, default_config):
         """SOC=100 (upper bound) → no FAILSAFE (inclusive)."""
         mod, _, _ = sensor_ctx
         s = _make_sensor(mod, default_config)
-        s._sensor_cache = _valid_cache(soc=100.0)
+        _fill_cache(s, _valid_cache(soc=100.0))
         assert s._validate_cache() is None
 
     def test_soc_100_01_fails(self, sensor_ctx, default_config):
         """SOC=100.01 (just above upper bound) → FAILSAFE triggered."""
         mod, _, _ = sensor_ctx
         s = _make_sensor(mod, default_config)
-        s._sensor_cache = _valid_cache(soc=100.01)
+        _fill_cache(s, _valid_cache(soc=100.01))
         result = s._validate_cache()
         assert result is not None
         assert "out of range [0, 100]" in result
@@ -565,14 +602,14 @@ class TestAC8BoundaryValues:
         """pv_production=-30000 (lower bound) → valid (inclusive)."""
         mod, _, _ = sensor_ctx
         s = _make_sensor(mod, default_config)
-        s._sensor_cache = _valid_cache(pv=-30000.0)
+        _fill_cache(s, _valid_cache(pv=-30000.0))
         assert s._validate_cache() is None
 
     def test_power_exactly_at_upper_bound_valid(self, sensor_ctx, default_config):
         """pv_production=30000 (upper bound) → valid (inclusive)."""
         mod, _, _ = sensor_ctx
         s = _make_sensor(mod, default_config)
-        s._sensor_cache = _valid_cache(pv=30000.0)
+        _fill_cache(s, _valid_cache(pv=30000.0))
         assert s._validate_cache() is None
 
 
@@ -0,0 +1,281 @@
+"""Tests for the recorder replay subsystem — no HA runtime required.
+
+Builds a minimal recorder database (HA 2023.4+ schema subset) in tmp_path.
+
+Run: python -m pytest tests/test_replay.py -v
+"""
+import importlib.util
+import io
+import json
+import os
+import sqlite3
+import sys
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _load(name: str):
+    sys.modules.pop(name, None)
+    spec = importlib.util.spec_from_file_location(name, os.path.join(ROOT, f"{name}.py"))
+    mod = importlib.util.module_from_spec(spec)
+    sys.modules[name] = mod
+    spec.loader.exec_module(mod)
+    return mod
+
+
+@pytest.fixture(scope="module")
+def rp():
+    """Load surplus_engine + replay standalone (replay imports surplus_engine by name)."""
+    _load("surplus_engine")
+    return _load("replay")
+
+
+# ---------------------------------------------------------------------------
+# Helpers
+# ---------------------------------------------------------------------------
+
+T0 = datetime(2026, 6, 15, 10, 0, tzinfo=timezone.utc)
+
+ENTITIES = {
+    "soc": "sensor.soc",
+    "power_to_grid": "sensor.export",
+    "pv_production": "sensor.pv",
+    "power_to_user": "sensor.load",
+}
+
+CONFIG = {
+    "entities": ENTITIES,
+    "evaluation_interval": 15,
+    "wallbox_threshold_kw": 4.2,
+    "hold_time_minutes": 10,
+    "battery_capacity_kwh": 10.0,
+    "max_discharge_kw": 10.0,
+    "time_strategy": [{"default": True, "soc_floor": 50}],
+    "sensor_ranges": {"soc": (0, 100), "power_w": (-30000, 30000)},
+}
+
+
+class RecorderDB:
+    """Writes states in the recorder layout (states / states_meta / state_attributes)."""
+
+    def __init__(self, path) -> None:
+        self.path = str(path)
+        self.conn = sqlite3.connect(self.path)
+        self.conn.executescript(
+            """
+            CREATE TABLE states_meta (metadata_id INTEGER PRIMARY KEY, entity_id TEXT);
+            CREATE TABLE state_attributes (attributes_id INTEGER PRIMARY KEY, shared_attrs TEXT);
+            CREATE TABLE states (
+                state_id INTEGER PRIMARY KEY, state TEXT, last_updated_ts REAL,
+                metadata_id INTEGER, attributes_id INTEGER
+            );
+            CREATE INDEX ix_states_metadata_id_last_updated_ts
+                ON states (metadata_id, last_updated_ts);
+            """
+        )
+        self._meta: dict[str, int] = {}
+
+    def add(self, minutes: float, entity_id: str, state: str, attrs: dict | None = None) -> None:
+        if entity_id not in self._meta:
+            cur = self.conn.execute("INSERT INTO states_meta (entity_id) VALUES (?)", (entity_id,))
+            self._meta[entity_id] = cur.lastrowid
+        attributes_id = None
+        if attrs is not None:
+            cur = self.conn.execute(
+                "INSERT INTO state_attributes (shared_attrs) VALUES (?)", (json.dumps(attrs),)
+            )
+            attributes_id = cur.lastrowid
+        ts = (T0 + timedelta(minutes=minutes)).timestamp()
+        self.conn.execute(
+            "INSERT INTO states (state, last_updated_ts, metadata_id, attributes_id) "
+            "VALUES (?, ?, ?, ?)",
+            (state, ts, self._meta[entity_id], attributes_id),
+        )
+
+    def add_all(self, minutes: float, soc: float, pv: float, load: float) -> None:
+        self.add(minutes, "sensor.soc", str(soc))
+        self.add(minutes, "sensor.export", "0")
+        self.add(minutes, "sensor.pv", str(pv))
+        self.add(minutes, "sensor.load", str(load))
+
+    def close(self) -> str:
+        self.conn.commit()
+        self.conn.close()
+        return self.path
+
+
+@pytest.fixture
+def db(tmp_path) -> RecorderDB:
+    return RecorderDB(tmp_path / "home-assistant_v2.db")
+
+
+# ---------------------------------------------------------------------------
+# Chunked recorder streaming
+# ---------------------------------------------------------------------------
+
+class TestIterRecorderStates:
+
+    def test_chunks_preserve_order_and_completeness(self, rp, db) -> None:
+        for i in range(20):
+            db.add(i, "sensor.pv", str(i))
+            db.add(i, "sensor.load", str(100 + i))  # same timestamp → tie broken by state_id
+        db.add(5, "sensor.other", "ignored")
+        path = db.close()
+
+        rows = list(rp.iter_recorder_states(path, ["sensor.pv", "sensor.load"], chunk_size=3))
+        assert len(rows) == 40
+        assert [r.timestamp for r in rows] == sorted(r.timestamp for r in rows)
+        assert [r.state for r in rows[:4]] == ["0", "100", "1", "101"]
+
+    def test_window_seeds_last_state_before_start(self, rp, db) -> None:
+        db.add(0, "sensor.soc", "80")
+        db.add(1, "sensor.soc", "81")
+        db.add(30, "sensor.soc", "90")
+        db.add(90, "sensor.soc", "95")
+        path = db.close()
+
+        rows = list(rp.iter_recorder_states(
+            path, ["sensor.soc"], T0 + timedelta(minutes=10), T0 + timedelta(minutes=60),
+        ))
+        assert [r.state for r in rows] == ["81", "90"]
+
+    def test_attributes_only_for_requested_entities(self, rp, db) -> None:
+        db.add(0, "sun.sun", "above_horizon", {"next_setting": "2026-06-15T19:30:00+00:00"})
+        db.add(0, "sensor.pv", "100", {"unit_of_measurement": "W"})
+        path = db.close()
+
+        rows = list(rp.iter_recorder_states(
+            path, ["sun.sun", "sensor.pv"], attribute_entities=["sun.sun"],
+        ))
+        attrs = {r.entity_id: r.attributes for r in rows}
+        assert attrs["sun.sun"]["next_setting"].startswith("2026-06-15T19:30")
+        assert attrs["sensor.pv"] is None
+
+    def test_unknown_entities_yield_nothing(self, rp, db) -> None:
+        db.add(0, "sensor.pv", "1")
+        path = db.close()
+        assert list(rp.iter_recorder_states(path, ["sensor.missing"])) == []
+
+
+# ---------------------------------------------------------------------------
+# Replay driver
+# ---------------------------------------------------------------------------
+
+class TestReplay:
+
+    def test_virtual_clock_ticks_every_interval(self, rp, db) -> None:
+        db.add_all(0, soc=80, pv=8000, load=1000)
+        db.add_all(10, soc=80, pv=8000, load=1000)
+        table = rp.Replay(CONFIG).run(db.close())
+        assert len(table) == 41  # 0 … 600 s inclusive, every 15 s
+        assert table.timestamp[1] - table.timestamp[0] == 15.0
+
+    def test_reports_active_inactive_and_hold(self, rp, db) -> None:
+        db.add_all(0, soc=80, pv=8000, load=1000)   # 7 kW surplus → ACTIVE
+        db.add(20, "sensor.pv", "1000")            # surplus gone, buffer covers 4.2 kW
+        db.add(20, "sensor.soc", "50")             # at floor → no buffer
+        db.add(45, "sensor.pv", "1000")
+        table = rp.Replay(CONFIG).run(db.close())
+        rows = list(table.rows())
+
+        assert rows[0][3] == "ACTIVE"
+        assert rows[0][1] == pytest.approx(7.0)
+        at = {round((r[0] - T0).total_seconds() / 60, 2): r for r in rows}
+        assert at[25][3] == "ACTIVE" and at[25][1] == pytest.approx(7.0)  # hold
+        assert at[31][3] == "INACTIVE" and at[31][1] == 0.0
+        assert at[31][4] == "hysteresis_hold_or_inactive"
+
+    def test_buffer_used_column(self, rp, db) -> None:
+        db.add_all(0, soc=90, pv=4000, load=1000)  # 3 kW real, 1.2 kW from battery
+        table = rp.Replay(CONFIG).run(db.close())
+        _ts, kw, buffer_kw, state, _reason = next(table.rows())
+        assert state == "ACTIVE"
+        assert kw == pytest.approx(4.2)
+        assert buffer_kw == pytest.approx(1.2)
+
+    def test_unavailable_input_forces_failsafe_then_recovers(self, rp, db) -> None:
+        db.add_all(0, soc=80, pv=8000, load=1000)
+        db.add(2, "sensor.pv", "unavailable")
+        db.add(4, "sensor.pv", "8000")
+        db.add(6, "sensor.pv", "8000")
+        table = rp.Replay(CONFIG).run(db.close())
+        by_min = {round((r[0] - T0).total_seconds() / 60, 2): r for r in table.rows()}
+
+        assert by_min[3][3] == "FAILSAFE"
+        assert by_min[3][4] == "sensor.pv = unavailable"
+        assert by_min[4][3] == "ACTIVE"
+
+    def test_out_of_range_forces_failsafe(self, rp, db) -> None:
+        db.add_all(0, soc=180, pv=8000, load=1000)
+        table = rp.Replay(CONFIG).run(db.close())
+        _ts, kw, _buf, state, reason = next(table.rows())
+        assert (kw, state) == (0.0, "FAILSAFE")
+        assert "out of range" in reason
+
+    def test_missing_input_is_failsafe(self, rp, db) -> None:
+        db.add(0, "sensor.soc", "80")
+        table = rp.Replay(CONFIG).run(db.close())
+        assert next(table.rows())[4] == "sensor.export: no data received"
+
+    def test_sunset_from_sun_entity_drives_cutoff(self, rp, db) -> None:
+        sunset = (T0 + timedelta(minutes=30)).isoformat()
+        db.add(0, "sun.sun", "above_horizon", {"next_setting": sunset})
+        db.add_all(0, soc=80, pv=8000, load=1000)
+        config = {**CONFIG, "sunset_cutoff_minutes": 60}
+        table = rp.Replay(config).run(db.close())
+        assert next(table.rows())[3] == "INACTIVE"
+
+    def test_forecast_solar_feeds_strategy(self, rp, db) -> None:
+        config = {
+            **CONFIG,
+            "entities": {**ENTITIES, "forecast_solar": "sensor.solar_remaining"},
+            "seasonal_targets": {6: 90},
+        }
+        db.add(0, "sensor.solar_remaining", "0.5")  # low → floor raised to seasonal 90
+        db.add_all(0, soc=85, pv=4000, load=1000)   # 3 kW real; no headroom above 90
+        table = rp.Replay(config).run(db.close())
+        _ts, kw, buffer_kw, state, _reason = next(table.rows())
+        assert state == "INACTIVE"
+        assert buffer_kw == 0.0
+
+    def test_reasons_are_interned(self, rp, db) -> None:
+        for m in range(0, 60, 5):
+            db.add_all(m, soc=80, pv=8000, load=1000)
+        table = rp.Replay(CONFIG).run(db.close())
+        assert len(table) > 200
+        assert len(table.reasons) == 1
+
+    def test_csv_export(self, rp, db) -> None:
+        db.add_all(0, soc=80, pv=8000, load=1000)
+        table = rp.Replay(CONFIG).run(db.close())
+        buf = io.StringIO()
+        table.write_csv(buf)
+        header, first = buf.getvalue().splitlines()[:2]
+        assert header == "timestamp,reported_kw,buffer_used_kw,state,reason"
+        assert first.startswith(T0.isoformat() + ",7.000,0.000,ACTIVE,")
+
+    def test_day_of_ticks_is_fast(self, rp, db) -> None:
+        import time
+
+        for m in range(0, 24 * 60, 1):
+            db.add_all(m, soc=80, pv=8000 if 360 < m < 1200 else 0, load=1000)
+        path = db.close()
+        t0 = time.perf_counter()
+        table = rp.Replay(CONFIG).run(path, chunk_size=500)
+        elapsed = time.perf_counter() - t0
+        assert len(table) == 24 * 60 * 4 - 3
+        assert elapsed < 2.0, f"one day replay took {elapsed:.2f}s"
+
+    def test_input_filters_applied_to_recorded_states(self, rp, db) -> None:
+        db.add_all(0, soc=50, pv=2000, load=1000)
+        db.add(0.5, "sensor.pv", "2000")
+        db.add(1, "sensor.pv", "9000")   # single spike
+        db.add(2, "sensor.pv", "2000")
+        config = {**CONFIG, "input_filters": {"pv_production": {"type": "median", "window": 3}}}
+        raw = {r[3] for r in rp.Replay(CONFIG).run(db.close()).rows()}
+        filtered = {r[3] for r in rp.Replay(config).run(db.path).rows()}
+        assert "ACTIVE" in raw
+        assert filtered == {"INACTIVE"}
@@ -11,15 +11,22 @@ Covers all Acceptance Criteria:
 from __future__ import annotations
 
 import asyncio
+import gc
 import importlib.util
+import json
+import math
 import logging
 import os
 import sys
 import types
+import time
 from datetime import datetime, timezone, timedelta
 from unittest.mock import AsyncMock, MagicMock, patch, call
 
 import pytest
+import voluptuous as vol
+
+from .conftest import load_decision_trace, modbus_server_stub
 
 ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 _SENSOR_PATH = os.path.join(ROOT, "sensor.py")
@@ -41,6 +48,17 @@ def _load_surplus_engine():
     return mod
 
 
+def _load_metrics():
+    """Load metrics.py fresh (stdlib only) so counters start at zero."""
+    key = "_test_metrics"
+    sys.modules.pop(key, None)
+    spec = importlib.util.spec_from_file_location(key, os.path.join(ROOT, "metrics.py"))
+    mod = importlib.util.module_from_spec(spec)
+    sys.modules[key] = mod
+    spec.loader.exec_module(mod)
+    return mod
+
+
 # ---------------------------------------------------------------------------
 # Main fixture — loads sensor.py with all stubs installed
 # ---------------------------------------------------------------------------
@@ -110,6 +128,7 @@ def sensor_ctx():
     ha_const.CONF_NAME          = "name"
     ha_const.STATE_UNAVAILABLE  = "unavailable"
     ha_const.STATE_UNKNOWN      = "unknown"
+    ha_const.EVENT_HOMEASSISTANT_STOP = "homeassistant_stop"
 
     ha_core          = types.ModuleType("homeassistant.core")
     ha_core.callback = lambda f: f          # pass-through decorator
@@ -133,13 +152,6 @@ def sensor_ctx():
     ha_util_dt.utcnow = mock_utcnow
     ha_util.dt = ha_util_dt
 
-    # ── pymodbus stubs ────────────────────────────────────────────────────
-    pymodbus            = types.ModuleType("pymodbus")
-    pymodbus_server     = types.ModuleType("pymodbus.server")
-    pymodbus_server.StartAsyncSerialServer = AsyncMock()
-    pymodbus_framer     = types.ModuleType("pymodbus.framer")
-    pymodbus_framer.FramerType = MagicMock()
-
     # ── component stubs ───────────────────────────────────────────────────
     PKG = "sdm630_simulator"
     TOTAL_POWER = 0x0035
@@ -147,14 +159,18 @@ def sensor_ctx():
     mock_idb = MagicMock()
     mock_idb.set_float = MagicMock()
 
-    pkg_modbus          = types.ModuleType(f"{PKG}.modbus_server")
-    pkg_modbus.context  = MagicMock()
-    pkg_modbus.identity = MagicMock()
-    pkg_modbus.input_data_block = mock_idb
+    pkg_modbus          = modbus_server_stub(PKG, mock_idb)
 
     pkg_regs            = types.ModuleType(f"{PKG}.sdm630_input_registers")
     pkg_regs.TOTAL_POWER = TOTAL_POWER
 
+    pkg_holding = types.ModuleType(f"{PKG}.sdm630_holding_registers")
+    pkg_holding.DEMAND_PERIOD = 3
+
+    pkg_meter = types.ModuleType(f"{PKG}.meter")
+    pkg_meter.MeterModel = MagicMock()
+    pkg_meter.ENERGY_STATE_VERSION = 1
+
     # surplus_engine: re-export all public names from the real module
     pkg_se = types.ModuleType(f"{PKG}.surplus_engine")
     for attr in dir(se):
@@ -171,21 +187,24 @@ def sensor_ctx():
         "homeassistant.helpers.event":               ha_event,
         "homeassistant.util":                        ha_util,
         "homeassistant.util.dt":                     ha_util_dt,
-        "pymodbus":                                  pymodbus,
-        "pymodbus.server":                           pymodbus_server,
-        "pymodbus.framer":                           pymodbus_framer,
         f"{PKG}.modbus_server":                      pkg_modbus,
         f"{PKG}.sdm630_input_registers":             pkg_regs,
+        f"{PKG}.meter":                              pkg_meter,
+        f"{PKG}.sdm630_holding_registers":           pkg_holding,
         f"{PKG}.surplus_engine":                     pkg_se,
+        f"{PKG}.metrics":                            _load_metrics(),
     }
 
     saved = {k: sys.modules.get(k) for k in new_modules}
     for k, v in new_modules.items():
         sys.modules[k] = v
+    saved[f"{PKG}.decision_trace"] = sys.modules.get(f"{PKG}.decision_trace")
+    load_decision_trace(PKG)                 # imports the surplus_engine stub above
 
     if PKG not in sys.modules:
         pkg_root = types.ModuleType(PKG)
         pkg_root.CONF_ENTITIES = "entities"
+        pkg_root.CONF_REGISTER_MAPPINGS = "register_mappings"
         pkg_root.DEFAULTS = {
             "sensor_ranges": {"soc": (0, 100), "power_w": (-30000, 30000)},
         }
@@ -195,6 +214,8 @@ def sensor_ctx():
     else:
         if not hasattr(sys.modules[PKG], "CONF_ENTITIES"):
             sys.modules[PKG].CONF_ENTITIES = "entities"
+        if not hasattr(sys.modules[PKG], "CONF_REGISTER_MAPPINGS"):
+            sys.modules[PKG].CONF_REGISTER_MAPPINGS = "register_mappings"
         if not hasattr(sys.modules[PKG], "DEFAULTS"):
             sys.modules[PKG].DEFAULTS = {
                 "sensor_ranges": {"soc": (0, 100), "power_w": (-30000, 30000)},
@@ -212,6 +233,7 @@ def sensor_ctx():
     sensor_mod.__package__ = PKG
     sys.modules[f"{PKG}.sensor"] = sensor_mod
     spec.loader.exec_module(sensor_mod)
+    sensor_mod._load_modbus_server()         # binds the data blocks, as setup does
 
     mocks = {
         "track_state":    mock_track_state,
@@ -264,9 +286,9 @@ def _make_sensor(mod, hass, cfg):
         if role in mod.ENTITY_ROLE_TO_CACHE_KEY
     }
     s._cache_key_to_entity = {v: k for k, v in s._entity_to_cache_key.items()}
-    s._invalidation_reasons = {}
+    s._monotonic = lambda: s._utcnow().timestamp()  # cache stamps follow the mocked clock
     # Default: hass.states.get returns None (entities not registered in tests)
-    # so that _refresh_cache_timestamps gracefully skips all entities.
+    # so that the staleness liveness check finds no entity alive.
     if isinstance(hass.states.get, MagicMock):
         hass.states.get.return_value = None
     return s
@@ -284,6 +306,34 @@ def _make_valid_cache(now=None):
     }
 
 
+def _fill_cache(s, entries):
+    """Write ``{cache_key: (value, stamp, valid)}`` into the sensor's slot cache.
+
+    ``stamp`` is a datetime on the mocked wall clock (``_make_sensor`` runs the
+    cache's monotonic time base off the same clock) or None for a valid
+    reading without a stamp (startup grace).
+    """
+    cache = s._sensor_cache
+    slots = sys.modules[type(s).__module__].CACHE_SLOT
+    for key, (value, ts, valid) in entries.items():
+        stamp = math.nan if ts is None else ts.timestamp()
+        if valid:
+            cache.set(slots[key], value, stamp)
+        else:
+            cache.values[slots[key]] = value
+            cache.invalidate(slots[key], stamp, "")
+
+
+def _cache_entry(s, key):
+    """``(value, stamp, valid)`` for one slot, or None if it never got data."""
+    cache = s._sensor_cache
+    slot = sys.modules[type(s).__module__].CACHE_SLOT[key]
+    if not cache.has_data(slot):
+        return None
+    stamp = cache.stamps[slot]
+    return cache.values[slot], None if math.isnan(stamp) else stamp, bool(cache.valid[slot])
+
+
 # ===========================================================================
 # AC1 — Constructor: stores config, initializes cache/engine/first_tick
 # ===========================================================================
@@ -295,10 +345,10 @@ class TestSensorInit:
         s = mod.SDM630SimSensor("Test", mock_hass, sample_config)
         assert s._config is sample_config
 
-    def test_sensor_cache_empty_dict(self, sensor_ctx, sample_config):
+    def test_sensor_cache_starts_empty(self, sensor_ctx, sample_config):
         mod, _ = sensor_ctx
         s = mod.SDM630SimSensor("Test", MagicMock(), sample_config)
-        assert s._sensor_cache == {}
+        assert all(_cache_entry(s, key) is None for key in mod.CACHE_KEYS)
 
     def test_engine_initially_none(self, sensor_ctx, sample_config):
         mod, _ = sensor_ctx
@@ -366,6 +416,27 @@ class TestAsyncAddedToHass:
         assert "weather.local" not in entity_ids
         assert "sensor.forecast_solar" not in entity_ids
 
+    def test_state_report_subscription_when_available(
+        self, sensor_ctx, sample_config, monkeypatch
+    ):
+        mod, _mocks = sensor_ctx
+        track_report = MagicMock(return_value=MagicMock(name="unsub_report"))
+        monkeypatch.setattr(mod, "async_track_state_report_event", track_report)
+        s = _make_sensor(mod, MagicMock(), sample_config)
+        asyncio.run(s.async_added_to_hass())
+        assert track_report.call_args[0][1] == list(sample_config["entities"].values())
+        assert track_report.call_args[0][2] == s._handle_state_report
+        assert s._state_reports is True
+        remove_calls = [c[0][0] for c in s.async_on_remove.call_args_list]
+        assert track_report.return_value in remove_calls
+
+    def test_no_state_report_subscription_on_older_ha(self, sensor_ctx, sample_config):
+        mod, _mocks = sensor_ctx
+        assert mod.async_track_state_report_event is None   # stub lacks the helper
+        s = _make_sensor(mod, MagicMock(), sample_config)
+        asyncio.run(s.async_added_to_hass())
+        assert s._state_reports is False
+
     def test_time_interval_subscription_registered(self, sensor_ctx, sample_config):
         mod, mocks = sensor_ctx
         mocks["track_time"].reset_mock()
@@ -421,7 +492,7 @@ class TestHandleStateChange:
         s = _make_sensor(mod, MagicMock(), sample_config)
         event = _make_event("sensor.battery_soc", "75.5")
         s._handle_state_change(event)
-        entry = s._sensor_cache.get("soc_percent")
+        entry = _cache_entry(s, "soc_percent")
         assert entry is not None
         assert entry[0] == pytest.approx(75.5)
         assert entry[2] is True
@@ -431,7 +502,7 @@ class TestHandleStateChange:
         s = _make_sensor(mod, MagicMock(), sample_config)
         event = _make_event("sensor.power_to_grid", "1200.0")
         s._handle_state_change(event)
-        entry = s._sensor_cache.get("power_to_grid_w")
+        entry = _cache_entry(s, "power_to_grid_w")
         assert entry is not None
         assert entry[0] == pytest.approx(1200.0)
         assert entry[2] is True
@@ -441,10 +512,10 @@ class TestHandleStateChange:
         mod, mocks = sensor_ctx
         s = _make_sensor(mod, MagicMock(), sample_config)
         _prior = datetime(2026, 6, 15, 11, 0, 0, tzinfo=timezone.utc)
-        s._sensor_cache["soc_percent"] = (50.0, _prior, True)
+        _fill_cache(s, {"soc_percent": (50.0, _prior, True)})
         event = _make_event("sensor.battery_soc", "unavailable")
         s._handle_state_change(event)
-        entry = s._sensor_cache.get("soc_percent")
+        entry = _cache_entry(s, "soc_percent")
         assert entry is not None
         assert entry[0] == pytest.approx(50.0)  # prior value preserved
         assert entry[2] is False                 # is_valid = False
@@ -454,10 +525,10 @@ class TestHandleStateChange:
         mod, mocks = sensor_ctx
         s = _make_sensor(mod, MagicMock(), sample_config)
         _prior = datetime(2026, 6, 15, 11, 0, 0, tzinfo=timezone.utc)
-        s._sensor_cache["soc_percent"] = (60.0, _prior, True)
+        _fill_cache(s, {"soc_percent": (60.0, _prior, True)})
         event = _make_event("sensor.battery_soc", "unknown")
         s._handle_state_change(event)
-        entry = s._sensor_cache.get("soc_percent")
+        entry = _cache_entry(s, "soc_percent")
         assert entry is not None
         assert entry[0] == pytest.approx(60.0)  # prior value preserved
         assert entry[2] is False                 # is_valid = False
@@ -468,7 +539,7 @@ class TestHandleStateChange:
         event = MagicMock()
         event.data = {"new_state": None}
         s._handle_state_change(event)           # must not raise
-        assert s._sensor_cache == {}
+        assert all(_cache_entry(s, key) is None for key in mod.CACHE_KEYS)
 
     def test_invalid_numeric_string_marks_cache_invalid(self, sensor_ctx, sample_config):
         """ValueError stores (last_val, now, False) — key IS present."""
@@ -476,7 +547,7 @@ class TestHandleStateChange:
         s = _make_sensor(mod, MagicMock(), sample_config)
         event = _make_event("sensor.battery_soc", "not-a-number")
         s._handle_state_change(event)
-        entry = s._sensor_cache.get("soc_percent")
+        entry = _cache_entry(s, "soc_percent")
         assert entry is not None          # key IS present (with is_valid=False)
         assert entry[0] == pytest.approx(0.0)  # default fallback value
         assert entry[2] is False
@@ -493,7 +564,7 @@ class TestHandleStateChange:
         s = _make_sensor(mod, MagicMock(), sample_config)
         event = _make_event("sensor.pv_power", "3500.0")
         s._handle_state_change(event)
-        entry = s._sensor_cache.get("pv_production_w")
+        entry = _cache_entry(s, "pv_production_w")
         assert entry is not None
         assert entry[0] == pytest.approx(3500.0)
         assert entry[2] is True
@@ -503,7 +574,7 @@ class TestHandleStateChange:
         s = _make_sensor(mod, MagicMock(), sample_config)
         event = _make_event("sensor.power_to_user", "900.0")
         s._handle_state_change(event)
-        entry = s._sensor_cache.get("power_to_user_w")
+        entry = _cache_entry(s, "power_to_user_w")
         assert entry is not None
         assert entry[0] == pytest.approx(900.0)
         assert entry[2] is True
@@ -533,7 +604,7 @@ class TestEvaluationTick:
             reason="test", forecast_available=False,
         ))
         s._engine = mock_engine
-        s._sensor_cache.update(_make_valid_cache())
+        _fill_cache(s, _make_valid_cache())
         self._run_tick(s)
         mock_engine.evaluate_cycle.assert_called_once()
 
@@ -543,11 +614,6 @@ class TestEvaluationTick:
         s = _make_sensor(mod, MagicMock(), sample_config)
         asyncio.run(s.async_added_to_hass())
 
-        s._sensor_cache["soc_percent"]     = 80.0
-        s._sensor_cache["power_to_grid_w"] = 1500.0
-        s._sensor_cache["pv_production_w"] = 4000.0
-        s._sensor_cache["power_to_user_w"] = 2000.0
-
         captured = {}
 
         async def _capture(snap, hass=None):
@@ -559,10 +625,12 @@ class TestEvaluationTick:
             )
 
         _t = datetime(2026, 6, 15, 12, 0, 0, tzinfo=timezone.utc)
-        s._sensor_cache["soc_percent"]     = (80.0,   _t, True)
-        s._sensor_cache["power_to_grid_w"] = (1500.0, _t, True)
-        s._sensor_cache["pv_production_w"] = (4000.0, _t, True)
-        s._sensor_cache["power_to_user_w"] = (2000.0, _t, True)
+        _fill_cache(s, {
+            "soc_percent":     (80.0,   _t, True),
+            "power_to_grid_w": (1500.0, _t, True),
+            "pv_production_w": (4000.0, _t, True),
+            "power_to_user_w": (2000.0, _t, True),
+        })
 
         s._engine = MagicMock()
         s._engine.evaluate_cycle = _capture
@@ -594,7 +662,7 @@ class TestEvaluationTick:
         s._engine = MagicMock()
         s._engine.evaluate_cycle = _capture
         _t = datetime(2026, 6, 15, 12, 0, 0, tzinfo=timezone.utc)
-        s._sensor_cache.update({
+        _fill_cache(s, {
             "soc_percent":     (0.0, _t, True),
             "power_to_grid_w": (0.0, _t, True),
             "pv_production_w": (0.0, _t, True),
@@ -618,7 +686,7 @@ class TestEvaluationTick:
             soc_percent=75.0, soc_floor_active=50, charging_state="ACTIVE",
             reason="test", forecast_available=False,
         ))
-        s._sensor_cache.update(_make_valid_cache())
+        _fill_cache(s, _make_valid_cache())
         self._run_tick(s)
         mocks["input_data_block"].set_float.assert_called_once_with(
             mocks["TOTAL_POWER"], pytest.approx(2.5)
@@ -636,7 +704,7 @@ class TestEvaluationTick:
             soc_percent=70.0, soc_floor_active=50, charging_state="ACTIVE",
             reason="test", forecast_available=False,
         ))
-        s._sensor_cache.update(_make_valid_cache())
+        _fill_cache(s, _make_valid_cache())
         self._run_tick(s)
         assert s._attr_native_value == pytest.approx(3.7)
 
@@ -658,6 +726,99 @@ class TestEvaluationTick:
         s.async_write_ha_state.assert_called_once()
 
 
+# ===========================================================================
+# Publish policies — change-only / deadband / heartbeat state writes
+# ===========================================================================
+
+class TestPublishPolicies:
+    POLICIES = {
+        "power":            {"deadband_w": 0.0,  "heartbeat_s": 300},
+        "raw_surplus":      {"deadband_w": 50.0, "heartbeat_s": 300},
+        "reported_surplus": {"deadband_w": 0.0,  "heartbeat_s": 300},
+    }
+
+    def _result(self, se, reported_kw, raw_kw):
+        return se.EvaluationResult(
+            reported_kw=reported_kw, real_surplus_kw=raw_kw, buffer_used_kw=0.0,
+            soc_percent=70.0, soc_floor_active=50, charging_state="ACTIVE",
+            reason="test", forecast_available=False,
+        )
+
+    def _sensor(self, mod, sample_config, policies=POLICIES):
+        s = _make_sensor(mod, MagicMock(), {**sample_config, "publish_policies": policies})
+        s._raw_surplus_sensor = MagicMock()
+        s._reported_surplus_sensor = MagicMock()
+        s._clock_s = 0.0
+        s._monotonic = lambda: s._clock_s
+        return s
+
+    def test_policy_deadband_and_heartbeat(self, sensor_ctx):
+        mod, _ = sensor_ctx
+        policy = mod.PublishPolicy(deadband_w=50.0, heartbeat_s=300)
+        decisions = [policy.should_publish(w, t) for w, t in [
+            (1000.0, 0), (1040.0, 15), (1051.0, 30), (1051.0, 45), (1051.0, 330),
+        ]]
+        assert decisions == [True, False, True, False, True]
+        assert (policy.published, policy.skipped) == (3, 2)
+
+    def test_unconfigured_entity_publishes_every_time(self, sensor_ctx):
+        mod, _ = sensor_ctx
+        policy = mod.build_publish_policies({})["power"]
+        assert all(policy.should_publish(1.0, t) for t in range(5))
+
+    def test_zero_heartbeat_is_deadband_only(self, sensor_ctx):
+        mod, _ = sensor_ctx
+        policy = mod.PublishPolicy(deadband_w=50.0, heartbeat_s=0)
+        decisions = [policy.should_publish(w, t) for w, t in [
+            (0.0, 0), (40.0, 15), (40.0, 86400), (51.0, 86415),
+        ]]
+        assert decisions == [True, False, False, True]   # first value always published
+
+    def test_unchanged_result_written_once(self, sensor_ctx, sample_config):
+        mod, mocks = sensor_ctx
+        se = mocks["se"]
+        s = self._sensor(mod, sample_config)
+        for tick in range(4):
+            s._clock_s = 15.0 * tick
+            s._write_result(self._result(se, 5.0, 5.0))
+        s.async_write_ha_state.assert_called_once()
+        s._raw_surplus_sensor.update_value.assert_called_once()
+        s._reported_surplus_sensor.update_value.assert_called_once()
+        assert mocks["input_data_block"].set_float.call_count == 4   # Modbus every tick
+
+    def test_raw_surplus_deadband(self, sensor_ctx, sample_config):
+        mod, mocks = sensor_ctx
+        se = mocks["se"]
+        s = self._sensor(mod, sample_config)
+        for tick, raw_kw in enumerate([5.0, 5.03, 4.96, 5.1]):
+            s._clock_s = 15.0 * tick
+            s._write_result(self._result(se, 5.0, raw_kw))
+        values = [c.args[0] for c in s._raw_surplus_sensor.update_value.call_args_list]
+        assert values == [pytest.approx(5000.0), pytest.approx(5100.0)]
+
+    def test_heartbeat_republishes_unchanged_value(self, sensor_ctx, sample_config):
+        mod, mocks = sensor_ctx
+        se = mocks["se"]
+        s = self._sensor(mod, sample_config)
+        for t in (0.0, 299.0, 300.0):
+            s._clock_s = t
+            s._write_result(self._result(se, 5.0, 5.0))
+        assert s.async_write_ha_state.call_count == 2
+
+    def test_counters_exposed(self, sensor_ctx, sample_config):
+        mod, mocks = sensor_ctx
+        se = mocks["se"]
+        s = self._sensor(mod, sample_config)
+        s._engine = MagicMock()
+        s._engine.forecast_stats = {}
+        for tick, reported_kw in enumerate([5.0, 5.0, 6.0]):
+            s._clock_s = 15.0 * tick
+            s._write_result(self._result(se, reported_kw, 5.0))
+        attrs = s.extra_state_attributes
+        assert attrs["published_states"] == {"power": 2, "raw_surplus": 1, "reported_surplus": 2}
+        assert attrs["skipped_states"] == {"power": 1, "raw_surplus": 2, "reported_surplus": 1}
+
+
 # ===========================================================================
 # AC4 — sun.sun solar boundary times
 # ===========================================================================
@@ -700,7 +861,7 @@ class TestSunSolarBoundaryTimes:
 
         s._engine = MagicMock()
         s._engine.evaluate_cycle = _capture
-        s._sensor_cache.update(_make_valid_cache())
+        _fill_cache(s, _make_valid_cache())
         now = datetime(2026, 6, 15, 12, 0, 0, tzinfo=timezone.utc)
         asyncio.run(s._evaluation_tick(now))
 
@@ -733,7 +894,7 @@ class TestSunSolarBoundaryTimes:
 
         s._engine = MagicMock()
         s._engine.evaluate_cycle = _capture
-        s._sensor_cache.update(_make_valid_cache())
+        _fill_cache(s, _make_valid_cache())
         asyncio.run(s._evaluation_tick(
             datetime(2026, 6, 15, 12, 0, 0, tzinfo=timezone.utc)
         ))
@@ -763,7 +924,7 @@ class TestSunSolarBoundaryTimes:
 
         s._engine = MagicMock()
         s._engine.evaluate_cycle = _capture
-        s._sensor_cache.update(_make_valid_cache())
+        _fill_cache(s, _make_valid_cache())
         asyncio.run(s._evaluation_tick(
             datetime(2026, 6, 15, 12, 0, 0, tzinfo=timezone.utc)
         ))
@@ -797,7 +958,7 @@ class TestSunSolarBoundaryTimes:
 
         s._engine = MagicMock()
         s._engine.evaluate_cycle = _capture
-        s._sensor_cache.update(_make_valid_cache())
+        _fill_cache(s, _make_valid_cache())
         asyncio.run(s._evaluation_tick(
             datetime(2026, 6, 15, 12, 0, 0, tzinfo=timezone.utc)
         ))
@@ -887,7 +1048,7 @@ class TestSetupPlatform:
         mod, mocks = sensor_ctx
         mock_hass = MagicMock()
         mock_hass.loop = MagicMock()
-        mock_hass.loop.create_task = MagicMock()
+        mock_hass.loop.create_task = MagicMock(side_effect=lambda coro: coro.close())
         # Simulate how __init__.py stores the config in hass.data
         mock_hass.data = {mod.DOMAIN: {"config": sample_config}}
         added_entities = []
@@ -905,6 +1066,287 @@ class TestSetupPlatform:
         assert isinstance(added_entities[3], mod.SDM630WallboxLastPollSensor)
         assert isinstance(added_entities[4], mod.SDM630WallboxPollWarningSensor)
 
+    def test_process_mode_spawns_server_and_forwards_polls(
+        self, sensor_ctx, sample_config, monkeypatch
+    ):
+        """modbus_server_mode: process — no in-loop server; polls, restart and shutdown wired up."""
+        mod, mocks = sensor_ctx
+        proc = MagicMock()
+        stub = types.ModuleType(f"{mod.__package__}.modbus_process")
+        stub.ModbusProcess = MagicMock(return_value=proc)
+        monkeypatch.setitem(sys.modules, stub.__name__, stub)
+        hass = MagicMock()
+        hass.data = {mod.DOMAIN: {"config": {**sample_config, "modbus_server_mode": "process"}}}
+
+        async def _executor(func, *args):
+            return func(*args)
+
+        hass.async_add_executor_job = _executor
+        echo_patch = sys.modules[f"{mod.__package__}.modbus_server"].apply_echo_patch
+        echo_patch.reset_mock()                     # the fixture loaded loop mode
+        added = []
+        asyncio.run(mod.async_setup_platform(hass, {}, added.extend))
+
+        stub.ModbusProcess.assert_called_once_with()
+        echo_patch.assert_not_called()              # the server process applies it
+        proc.start.assert_called_once_with()
+        hass.loop.create_task.assert_not_called()
+        assert mod.input_data_block is proc.input_data_block
+        proc.input_data_block.set_poll_callback.assert_called_once_with(added[3].on_poll)
+        _, check, interval = mocks["track_time"].call_args.args
+        assert interval == mod.POLL_DISPATCH_INTERVAL
+
+        hass.async_add_executor_job = MagicMock()
+        proc.restart_due.return_value = False
+        check(None)
+        proc.dispatch_polls.assert_called_once_with()
+        hass.async_add_executor_job.assert_not_called()
+        proc.restart_due.return_value = True                         # child exited
+        check(None)
+        hass.async_add_executor_job.assert_called_once_with(proc.start)
+        hass.async_add_executor_job = _executor
+
+        event, stop = hass.bus.async_listen_once.call_args.args
+        assert event == "homeassistant_stop"
+        asyncio.run(stop(None))
+        mocks["track_time"].return_value.assert_called_once_with()   # poll forwarding cancelled
+        proc.stop.assert_called_once_with()
+
+    def test_thread_mode_serves_on_io_thread(self, sensor_ctx, sample_config, monkeypatch):
+        """modbus_server_mode: thread — server coroutine goes to the I/O thread's loop."""
+        mod, _ = sensor_ctx
+        server = MagicMock()
+        monkeypatch.setattr(
+            sys.modules[f"{mod.__package__}.modbus_server"], "build_snapshot_server",
+            lambda: server, raising=False,
+        )
+        io = MagicMock()
+        io.start.side_effect = lambda coro: coro.close()  # the fake thread never runs it
+        stub = types.ModuleType(f"{mod.__package__}.modbus_thread")
+        stub.ModbusThread = MagicMock(return_value=io)
+        stub.PollForwarder = MagicMock(side_effect=lambda loop, cb: ("forwarded", loop, cb))
+        monkeypatch.setitem(sys.modules, stub.__name__, stub)
+        hass = MagicMock()
+        hass.data = {mod.DOMAIN: {"config": {**sample_config, "modbus_server_mode": "thread"}}}
+
+        async def _executor(func, *args):
+            return func(*args)
+
+        hass.async_add_executor_job = _executor
+        added = []
+        asyncio.run(mod.async_setup_platform(hass, {}, added.extend))
+
+        hass.loop.create_task.assert_not_called()
+        io.start.assert_called_once()
+        sys.modules[f"{mod.__package__}.modbus_server"].start_modbus_server.assert_called_once_with(
+            server
+        )
+        assert mod.input_data_block is server.input_data_block
+        server.input_data_block.set_poll_callback.assert_called_once_with(
+            ("forwarded", hass.loop, added[3].on_poll)
+        )
+        event, stop = hass.bus.async_listen_once.call_args.args
+        assert event == "homeassistant_stop"
+        asyncio.run(stop(None))
+        io.stop.assert_called_once_with()
+
+
+# ===========================================================================
+# Decision trace — recorded per write, exported by service
+# ===========================================================================
+
+class TestDecisionTraceService:
+    def _setup(self, mod, sample_config, tmp_path):
+        hass = MagicMock()
+        hass.data = {mod.DOMAIN: {"config": sample_config}}
+        hass.config.path = lambda name: str(tmp_path / name)
+
+        async def _executor(func, *args):
+            return func(*args)
+
+        hass.async_add_executor_job = _executor
+        added = []
+        asyncio.run(mod.async_setup_platform(hass, {}, added.extend))
+        hass.loop.create_task.call_args[0][0].close()  # discard un-awaited server coroutine
+        domain, service, handler = hass.services.async_register.call_args[0]
+        assert (domain, service) == (mod.DOMAIN, mod.SERVICE_EXPORT_DECISION_TRACE)
+        assert hass.services.async_register.call_args.kwargs["schema"] is mod.EXPORT_DECISION_TRACE_SCHEMA
+        return added[0], handler
+
+    def _result(self, se, reported_kw):
+        return se.EvaluationResult(
+            reported_kw=reported_kw, real_surplus_kw=reported_kw, buffer_used_kw=0.0,
+            soc_percent=70.0, soc_floor_active=50, charging_state="ACTIVE",
+            reason="test", forecast_available=False,
+        )
+
+    def test_write_result_appends_record(self, sensor_ctx, sample_config):
+        mod, mocks = sensor_ctx
+        s = _make_sensor(mod, MagicMock(), sample_config)
+        _fill_cache(s, _make_valid_cache())
+        s._write_result(self._result(mocks["se"], 4.5))
+        (rec,) = s.decision_trace.records()
+        assert rec["reported_kw"] == 4.5 and rec["soc_percent"] == 50.0
+
+    def test_export_csv(self, sensor_ctx, sample_config, tmp_path):
+        mod, mocks = sensor_ctx
+        sensor, handler = self._setup(mod, sample_config, tmp_path)
+        for kw in (1.0, 2.0, 3.0):
+            sensor._write_result(self._result(mocks["se"], kw))
+        call = MagicMock(data={"count": 2})
+        response = asyncio.run(handler(call))
+        assert response["records"] == 2
+        lines = (tmp_path / f"{mod.DOMAIN}_decision_trace.csv").read_text().splitlines()
+        assert len(lines) == 3 and lines[0].startswith("timestamp,")
+
+    def test_export_json_to_named_file_in_config_dir(self, sensor_ctx, sample_config, tmp_path):
+        mod, mocks = sensor_ctx
+        sensor, handler = self._setup(mod, sample_config, tmp_path)
+        sensor._write_result(self._result(mocks["se"], 1.0))
+        call = MagicMock(data={"format": "json", "filename": "../incident.json"})
+        response = asyncio.run(handler(call))
+        assert response["path"] == str(tmp_path / "incident.json")
+        assert json.loads((tmp_path / "incident.json").read_text())[0]["reported_kw"] == 1.0
+
+    @pytest.mark.parametrize("data", [{"format": "xml"}, {"count": 0}, {"filename": ""}])
+    def test_invalid_call_rejected_by_schema(self, sensor_ctx, data):
+        mod, _ = sensor_ctx
+        with pytest.raises(vol.Invalid):
+            mod.EXPORT_DECISION_TRACE_SCHEMA(data)
+
+    def test_schema_defaults(self, sensor_ctx):
+        mod, _ = sensor_ctx
+        assert mod.EXPORT_DECISION_TRACE_SCHEMA({"count": "240"}) == {"count": 240, "format": "csv"}
+
+
+# ===========================================================================
+# Metrics — hot-path counters and scrape-time collectors
+# ===========================================================================
+
+class TestMetrics:
+    def test_failsafe_entries_counted_once_per_entry(self, sensor_ctx, sample_config):
+        mod, _ = sensor_ctx
+        s = _make_sensor(mod, MagicMock(), sample_config)
+        asyncio.run(s.async_added_to_hass())
+        now = datetime(2026, 6, 15, 12, 0, 0, tzinfo=timezone.utc)
+        for _ in range(3):                                     # no data: unavailable
+            asyncio.run(s._evaluation_tick(now))
+        _fill_cache(s, {**_make_valid_cache(), "soc_percent": (150.0, now, True)})
+        asyncio.run(s._evaluation_tick(now))                   # reason changes, still FAILSAFE
+        assert mod.FAILSAFE_ENTRIES.values == {("unavailable",): 1}
+        _fill_cache(s, _make_valid_cache())
+        asyncio.run(s._evaluation_tick(now))                   # recovered
+        assert s._failsafe_reason_logged is None
+        _fill_cache(s, {**_make_valid_cache(), "soc_percent": (150.0, now, True)})
+        asyncio.run(s._evaluation_tick(now))
+        assert mod.FAILSAFE_ENTRIES.values == {("unavailable",): 1, ("out_of_range",): 1}
+
+    def test_disabled_by_default(self, sensor_ctx, sample_config):
+        mod, _ = sensor_ctx
+        s = _make_sensor(mod, MagicMock(), sample_config)
+        asyncio.run(s.async_added_to_hass())
+        assert s._profiler is None and s._engine.on_phase is None
+        assert "sdm630_state_writes_skipped_total" not in mod.METRICS
+
+    def test_enabled_times_phases_and_collects_at_scrape(self, sensor_ctx, sample_config):
+        mod, _ = sensor_ctx
+        cfg = {**sample_config, "metrics_port": 9630,
+               "publish_policies": {"power": {"heartbeat_s": 300}}}
+        s = _make_sensor(mod, MagicMock(), cfg)
+        asyncio.run(s.async_added_to_hass())
+        assert s._profiler.sink is mod.observe_phase_ns
+        now = datetime(2026, 6, 15, 12, 0, 0, tzinfo=timezone.utc)
+        _fill_cache(s, _make_valid_cache(now))
+        asyncio.run(s._evaluation_tick(now))
+        asyncio.run(s._evaluation_tick(now + timedelta(seconds=15)))
+        text = mod.METRICS.render()
+        for phase in ("staleness", "forecast", "calculation", "hysteresis", "writes"):
+            assert f'sdm630_evaluation_phase_seconds_count{{phase="{phase}"}} 2' in text
+        assert 'sdm630_state_writes_skipped_total{entity="power"} 1' in text
+
+        (unregister,) = [
+            c.args[0] for c in s.async_on_remove.call_args_list
+            if getattr(c.args[0], "__name__", "") == "_unregister"
+        ]
+        unregister()
+        assert "sdm630_state_writes_skipped_total" not in mod.METRICS
+
+    def test_setup_platform_starts_endpoint_only_when_configured(
+        self, sensor_ctx, sample_config
+    ):
+        mod, _ = sensor_ctx
+        for port, tasks in ((0, 1), (9630, 2)):
+            hass = MagicMock()
+            hass.data = {mod.DOMAIN: {"config": {**sample_config, "metrics_port": port}}}
+            asyncio.run(mod.async_setup_platform(hass, {}, lambda entities: None))
+            coros = [c.args[0] for c in hass.loop.create_task.call_args_list]
+            assert len(coros) == tasks
+            for coro in coros:
+                coro.close()
+
+
+# ===========================================================================
+# Tick profiling — per-phase timing, attributes, budget warning
+# ===========================================================================
+
+class TestTickProfiling:
+    NOW = datetime(2026, 6, 15, 12, 0, 0, tzinfo=timezone.utc)
+
+    def _sensor(self, mod, sample_config, **cfg):
+        s = _make_sensor(mod, MagicMock(), {**sample_config, **cfg})
+        asyncio.run(s.async_added_to_hass())
+        _fill_cache(s, _make_valid_cache(self.NOW))
+        return s
+
+    def test_off_by_default(self, sensor_ctx, sample_config):
+        mod, _ = sensor_ctx
+        s = self._sensor(mod, sample_config)
+        asyncio.run(s._evaluation_tick(self.NOW))
+        assert "tick_profile" not in s.extra_state_attributes
+
+    def test_every_phase_of_a_normal_tick_is_timed(self, sensor_ctx, sample_config):
+        mod, _ = sensor_ctx
+        s = self._sensor(mod, sample_config, tick_profiling=True)
+        asyncio.run(s._evaluation_tick(self.NOW))
+        asyncio.run(s._evaluation_tick(self.NOW + timedelta(seconds=15)))
+        attrs = s.extra_state_attributes
+        assert list(attrs["tick_profile"]) == [
+            "staleness", "validity", "range", "sun", "snapshot",
+            "forecast", "calculation", "hysteresis", "writes",
+        ]
+        assert all(p["count"] == 2 for p in attrs["tick_profile"].values())
+        assert attrs["tick_max_ms"] >= attrs["tick_last_ms"] > 0
+        assert attrs["tick_over_budget"] == 0
+
+    def test_failsafe_tick_times_only_the_phases_it_runs(self, sensor_ctx, sample_config):
+        mod, _ = sensor_ctx
+        s = self._sensor(mod, sample_config, tick_profiling=True)
+        _fill_cache(s, {**_make_valid_cache(self.NOW), "soc_percent": (150.0, self.NOW, True)})
+        asyncio.run(s._evaluation_tick(self.NOW))
+        assert list(s.extra_state_attributes["tick_profile"]) == [
+            "staleness", "validity", "range", "writes",
+        ]
+
+    def test_warning_when_over_budget(self, sensor_ctx, sample_config):
+        mod, _ = sensor_ctx
+        s = self._sensor(mod, sample_config, tick_profiling=True, tick_budget_ms=5)
+        real_read_sun = s._read_sun_times
+
+        def _slow_sun():
+            time.sleep(0.01)
+            return real_read_sun()
+
+        s._read_sun_times = _slow_sun
+        with patch.object(mod._LOGGER, "warning") as mock_warn:
+            asyncio.run(s._evaluation_tick(self.NOW))
+        (call_args,) = mock_warn.call_args_list
+        assert call_args.args[0].startswith("SDM630 evaluation tick took")
+        assert "sun=" in call_args.args[3]
+        assert s.extra_state_attributes["tick_over_budget"] == 1
+        with patch.object(mod._LOGGER, "warning") as mock_warn:
+            asyncio.run(s._evaluation_tick(self.NOW + timedelta(seconds=15)))
+        mock_warn.assert_not_called()                         # strategy cached: sun not re-read
+
 
 # ===========================================================================
 # Story 1.4 — Structured Decision Logging
@@ -998,7 +1440,7 @@ class TestDebugDecisionLog:
         asyncio.run(s.async_added_to_hass())
         s._engine = MagicMock()
         s._engine.evaluate_cycle = AsyncMock(return_value=result)
-        s._sensor_cache.update(_make_valid_cache())
+        _fill_cache(s, _make_valid_cache())
 
         with patch.object(mod._LOGGER, "debug") as mock_debug:
             asyncio.run(s._evaluation_tick(
@@ -1071,7 +1513,7 @@ class TestFailsafeWarningLog:
         asyncio.run(s.async_added_to_hass())
         s._engine = MagicMock()
         s._engine.evaluate_cycle = AsyncMock(return_value=result)
-        s._sensor_cache.update(_make_valid_cache())
+        _fill_cache(s, _make_valid_cache())
 
         with patch.object(mod._LOGGER, "warning") as mock_warn:
             asyncio.run(s._evaluation_tick(
@@ -1093,7 +1535,7 @@ class TestFailsafeWarningLog:
         asyncio.run(s.async_added_to_hass())
         s._engine = MagicMock()
         s._engine.evaluate_cycle = AsyncMock(return_value=result)
-        s._sensor_cache.update(_make_valid_cache())
+        _fill_cache(s, _make_valid_cache())
 
         with patch.object(mod._LOGGER, "warning") as mock_warn:
             asyncio.run(s._evaluation_tick(
@@ -1113,7 +1555,7 @@ class TestFailsafeWarningLog:
         asyncio.run(s.async_added_to_hass())
         s._engine = MagicMock()
         s._engine.evaluate_cycle = AsyncMock(return_value=result)
-        s._sensor_cache.update(_make_valid_cache())
+        _fill_cache(s, _make_valid_cache())
 
         with patch.object(mod._LOGGER, "warning") as mock_warn:
             asyncio.run(s._evaluation_tick(
@@ -1197,14 +1639,14 @@ class TestStartupLogFormat:
 
 
 class TestCacheFormatUpgrade:
-    """AC6 — Cache format is a 3-tuple (float, timestamp, is_valid)."""
+    """AC6 — Each cache slot holds (value, stamp, is_valid)."""
 
     def test_valid_state_stores_tuple(self, sensor_ctx, sample_config):
         mod, _ = sensor_ctx
         s = _make_sensor(mod, MagicMock(), sample_config)
         event = _make_event("sensor.battery_soc", "82.0")
         s._handle_state_change(event)
-        entry = s._sensor_cache["soc_percent"]
+        entry = _cache_entry(s, "soc_percent")
         assert isinstance(entry, tuple) and len(entry) == 3
         assert entry[0] == pytest.approx(82.0)
         assert entry[2] is True
@@ -1213,10 +1655,10 @@ class TestCacheFormatUpgrade:
         mod, _ = sensor_ctx
         s = _make_sensor(mod, MagicMock(), sample_config)
         _prior = datetime(2026, 6, 15, 10, 0, 0, tzinfo=timezone.utc)
-        s._sensor_cache["soc_percent"] = (70.0, _prior, True)
+        _fill_cache(s, {"soc_percent": (70.0, _prior, True)})
         event = _make_event("sensor.battery_soc", "unavailable")
         s._handle_state_change(event)
-        entry = s._sensor_cache["soc_percent"]
+        entry = _cache_entry(s, "soc_percent")
         assert entry[0] == pytest.approx(70.0)   # prior value preserved
         assert entry[2] is False
 
@@ -1224,10 +1666,10 @@ class TestCacheFormatUpgrade:
         mod, _ = sensor_ctx
         s = _make_sensor(mod, MagicMock(), sample_config)
         _prior = datetime(2026, 6, 15, 10, 0, 0, tzinfo=timezone.utc)
-        s._sensor_cache["soc_percent"] = (65.0, _prior, True)
+        _fill_cache(s, {"soc_percent": (65.0, _prior, True)})
         event = _make_event("sensor.battery_soc", "unknown")
         s._handle_state_change(event)
-        entry = s._sensor_cache["soc_percent"]
+        entry = _cache_entry(s, "soc_percent")
         assert entry[0] == pytest.approx(65.0)
         assert entry[2] is False
 
@@ -1236,7 +1678,7 @@ class TestCacheFormatUpgrade:
         s = _make_sensor(mod, MagicMock(), sample_config)
         event = _make_event("sensor.battery_soc", "n/a")
         s._handle_state_change(event)
-        entry = s._sensor_cache.get("soc_percent")
+        entry = _cache_entry(s, "soc_percent")
         assert entry is not None
         assert entry[2] is False
 
@@ -1246,7 +1688,7 @@ class TestCacheFormatUpgrade:
         # no prior cache entry
         event = _make_event("sensor.battery_soc", "unavailable")
         s._handle_state_change(event)
-        entry = s._sensor_cache["soc_percent"]
+        entry = _cache_entry(s, "soc_percent")
         assert entry[0] == pytest.approx(0.0)
         assert entry[2] is False
 
@@ -1261,7 +1703,7 @@ class TestCacheFormatUpgrade:
         s = _make_sensor(mod, MagicMock(), sample_config)
         event = _make_event("sensor.battery_soc", "unavailable")
         s._handle_state_change(event)
-        assert s._invalidation_reasons.get("soc_percent") == " = unavailable"
+        assert s._sensor_cache.reasons[mod.CACHE_SLOT["soc_percent"]] == " = unavailable"
 
     def test_unknown_sets_invalidation_reason_unknown(self, sensor_ctx, sample_config):
         """AC3: STATE_UNKNOWN must produce '= unknown' in reason, not '= unavailable'."""
@@ -1269,7 +1711,7 @@ class TestCacheFormatUpgrade:
         s = _make_sensor(mod, MagicMock(), sample_config)
         event = _make_event("sensor.battery_soc", "unknown")
         s._handle_state_change(event)
-        assert s._invalidation_reasons.get("soc_percent") == " = unknown"
+        assert s._sensor_cache.reasons[mod.CACHE_SLOT["soc_percent"]] == " = unknown"
 
     # AC4 — non-numeric reason suffix
     def test_value_error_sets_invalidation_reason_non_numeric(self, sensor_ctx, sample_config):
@@ -1278,20 +1720,21 @@ class TestCacheFormatUpgrade:
         s = _make_sensor(mod, MagicMock(), sample_config)
         event = _make_event("sensor.battery_soc", "error")
         s._handle_state_change(event)
-        assert s._invalidation_reasons.get("soc_percent") == ": non-numeric value"
+        assert s._sensor_cache.reasons[mod.CACHE_SLOT["soc_percent"]] == ": non-numeric value"
 
     def test_valid_state_clears_invalidation_reason(self, sensor_ctx, sample_config):
-        """Recovery: valid state removes the invalidation reason entry."""
+        """Recovery: valid state clears the invalidation reason."""
         mod, _ = sensor_ctx
         s = _make_sensor(mod, MagicMock(), sample_config)
+        slot = mod.CACHE_SLOT["soc_percent"]
         # First: mark invalid
         event_bad = _make_event("sensor.battery_soc", "unavailable")
         s._handle_state_change(event_bad)
-        assert "soc_percent" in s._invalidation_reasons
+        assert s._sensor_cache.reasons[slot]
         # Then: valid state
         event_good = _make_event("sensor.battery_soc", "80.0")
         s._handle_state_change(event_good)
-        assert "soc_percent" not in s._invalidation_reasons
+        assert s._sensor_cache.reasons[slot] == ""
 
 
 class TestCheckCacheValidity:
@@ -1300,7 +1743,7 @@ class TestCheckCacheValidity:
     def test_all_valid_returns_true(self, sensor_ctx, sample_config):
         mod, _ = sensor_ctx
         s = _make_sensor(mod, MagicMock(), sample_config)
-        s._sensor_cache.update(_make_valid_cache())
+        _fill_cache(s, _make_valid_cache())
         valid, reason = s._check_cache_validity()
         assert valid is True
         assert reason == ""
@@ -1309,8 +1752,9 @@ class TestCheckCacheValidity:
         mod, _ = sensor_ctx
         s = _make_sensor(mod, MagicMock(), sample_config)
         # only soc is missing
-        s._sensor_cache.update(_make_valid_cache())
-        del s._sensor_cache["soc_percent"]
+        cache = _make_valid_cache()
+        del cache["soc_percent"]
+        _fill_cache(s, cache)
         valid, reason = s._check_cache_validity()
         assert valid is False
         assert "sensor.battery_soc" in reason  # entity_id from config
@@ -1318,9 +1762,9 @@ class TestCheckCacheValidity:
     def test_invalid_entry_returns_false_with_entity_id(self, sensor_ctx, sample_config):
         mod, _ = sensor_ctx
         s = _make_sensor(mod, MagicMock(), sample_config)
-        s._sensor_cache.update(_make_valid_cache())
+        _fill_cache(s, _make_valid_cache())
         _now = datetime(2026, 6, 15, 12, 0, 0, tzinfo=timezone.utc)
-        s._sensor_cache["power_to_grid_w"] = (0.0, _now, False)
+        _fill_cache(s, {"power_to_grid_w": (0.0, _now, False)})
         valid, reason = s._check_cache_validity()
         assert valid is False
         assert "sensor.power_to_grid" in reason
@@ -1331,10 +1775,12 @@ class TestCheckCacheValidity:
         s = _make_sensor(mod, MagicMock(), sample_config)
         _now = datetime(2026, 6, 15, 12, 0, 0, tzinfo=timezone.utc)
         # Two invalid entries — only first (soc) should be reported
-        s._sensor_cache["soc_percent"]     = (0.0, _now, False)
-        s._sensor_cache["power_to_grid_w"] = (0.0, _now, False)
-        s._sensor_cache["pv_production_w"] = (0.0, _now, True)
-        s._sensor_cache["power_to_user_w"] = (0.0, _now, True)
+        _fill_cache(s, {
+            "soc_percent":     (0.0, _now, False),
+            "power_to_grid_w": (0.0, _now, False),
+            "pv_production_w": (0.0, _now, True),
+            "power_to_user_w": (0.0, _now, True),
+        })
         valid, reason = s._check_cache_validity()
         assert valid is False
         assert "sensor.battery_soc" in reason
@@ -1344,10 +1790,10 @@ class TestCheckCacheValidity:
         """AC3: reason from _check_cache_validity must say '= unknown' for STATE_UNKNOWN."""
         mod, _ = sensor_ctx
         s = _make_sensor(mod, MagicMock(), sample_config)
-        s._sensor_cache.update(_make_valid_cache())
+        _fill_cache(s, _make_valid_cache())
         _now = datetime(2026, 6, 15, 12, 0, 0, tzinfo=timezone.utc)
-        s._sensor_cache["soc_percent"] = (50.0, _now, False)
-        s._invalidation_reasons["soc_percent"] = " = unknown"
+        _fill_cache(s, {"soc_percent": (50.0, _now, False)})
+        s._sensor_cache.reasons[mod.CACHE_SLOT["soc_percent"]] = " = unknown"
         valid, reason = s._check_cache_validity()
         assert valid is False
         assert "= unknown" in reason
@@ -1358,7 +1804,7 @@ class TestCheckCacheValidity:
         """AC4: full path — handle_state_change ValueError → check_cache_validity reason."""
         mod, _ = sensor_ctx
         s = _make_sensor(mod, MagicMock(), sample_config)
-        s._sensor_cache.update(_make_valid_cache())
+        _fill_cache(s, _make_valid_cache())
         event = _make_event("sensor.battery_soc", "n/a")
         s._handle_state_change(event)
         valid, reason = s._check_cache_validity()
@@ -1468,7 +1914,7 @@ class TestFailSafeEvaluationTick:
         assert s._failsafe_reason_logged is not None
 
         # Fix cache → all valid
-        s._sensor_cache.update(_make_valid_cache(now))
+        _fill_cache(s, _make_valid_cache(now))
 
         with patch.object(mod._LOGGER, "info") as mock_info:
             asyncio.run(s._evaluation_tick(now))  # second tick: recovery
@@ -1494,7 +1940,7 @@ class TestFailSafeEvaluationTick:
         now = datetime(2026, 6, 15, 12, 0, 0, tzinfo=timezone.utc)
         asyncio.run(s._evaluation_tick(now))      # FAILSAFE
         assert s._failsafe_reason_logged is not None
-        s._sensor_cache.update(_make_valid_cache(now))
+        _fill_cache(s, _make_valid_cache(now))
         asyncio.run(s._evaluation_tick(now))      # recovery
         assert s._failsafe_reason_logged is None
 
@@ -1517,6 +1963,224 @@ class TestFailSafeEvaluationTick:
         asyncio.run(s._evaluation_tick(now))      # FAILSAFE
         mock_engine.evaluate_cycle.assert_not_called()
 
-        s._sensor_cache.update(_make_valid_cache(now))
+        _fill_cache(s, _make_valid_cache(now))
         asyncio.run(s._evaluation_tick(now))      # recovery + normal evaluation
         mock_engine.evaluate_cycle.assert_called_once()
+
+
+# ===========================================================================
+# Event-driven fast-reaction path (fast_reaction_ms)
+# ===========================================================================
+
+class _LoopHass:
+    """Fake hass backed by a real asyncio loop — used for latency measurement."""
+
+    def __init__(self, loop):
+        self.loop = loop
+        self.states = MagicMock()
+        self.states.get.return_value = None
+
+
+def _fast_cache(now):
+    """Valid cache: SOC 80 %, 6 kW PV, 1 kW house load → ACTIVE at 12:00."""
+    return {
+        "soc_percent":     (80.0,   now, True),
+        "power_to_grid_w": (0.0,    now, True),
+        "pv_production_w": (6000.0, now, True),
+        "power_to_user_w": (1000.0, now, True),
+    }
+
+
+class TestFastReaction:
+    NOW = datetime(2026, 6, 15, 12, 0, 0, tzinfo=timezone.utc)
+
+    def _cfg(self, sample_config, ms):
+        return dict(sample_config, fast_reaction_ms=ms)
+
+    def test_disabled_by_default_no_timer(self, sensor_ctx, sample_config):
+        mod, _ = sensor_ctx
+        hass = MagicMock()
+        s = _make_sensor(mod, hass, sample_config)
+        s._handle_state_change(_make_event("sensor.pv_power", "100.0"))
+        hass.loop.call_later.assert_not_called()
+
+    def test_power_change_arms_timer_once(self, sensor_ctx, sample_config):
+        mod, _ = sensor_ctx
+        hass = MagicMock()
+        s = _make_sensor(mod, hass, self._cfg(sample_config, 500))
+        s._handle_state_change(_make_event("sensor.pv_power", "100.0"))
+        s._handle_state_change(_make_event("sensor.power_to_user", "900.0"))
+        hass.loop.call_later.assert_called_once()
+        assert hass.loop.call_later.call_args[0][0] == pytest.approx(0.5)
+
+    def test_soc_change_does_not_arm_timer(self, sensor_ctx, sample_config):
+        mod, _ = sensor_ctx
+        hass = MagicMock()
+        s = _make_sensor(mod, hass, self._cfg(sample_config, 500))
+        s._handle_state_change(_make_event("sensor.battery_soc", "70.0"))
+        hass.loop.call_later.assert_not_called()
+
+    def test_skipped_before_first_periodic_tick(self, sensor_ctx, sample_config):
+        mod, mocks = sensor_ctx
+        s = _make_sensor(mod, MagicMock(), self._cfg(sample_config, 500))
+        asyncio.run(s.async_added_to_hass())
+        _fill_cache(s, _fast_cache(self.NOW))
+        s._fast_evaluation()
+        mocks["input_data_block"].set_float.assert_not_called()
+
+    def test_drop_in_pv_released_without_periodic_tick(self, sensor_ctx, sample_config):
+        """Hysteresis is applied: a PV drop inside the hold keeps last value."""
+        mod, mocks = sensor_ctx
+        s = _make_sensor(mod, MagicMock(), self._cfg(sample_config, 500))
+        asyncio.run(s.async_added_to_hass())
+        _fill_cache(s, _fast_cache(self.NOW))
+        asyncio.run(s._evaluation_tick(self.NOW))
+        assert s._engine.hysteresis_filter.state == "ACTIVE"
+        mocks["input_data_block"].set_float.reset_mock()
+
+        _fill_cache(s, {"pv_production_w": (7000.0, self.NOW, True)})
+        s._fast_evaluation()
+        mocks["input_data_block"].set_float.assert_called_once()
+        assert s.fast_evaluations == 1
+
+    def test_invalid_cache_falls_back_to_full_tick(self, sensor_ctx, sample_config):
+        mod, _ = sensor_ctx
+        hass = MagicMock()
+        s = _make_sensor(mod, hass, self._cfg(sample_config, 500))
+        asyncio.run(s.async_added_to_hass())
+        s._first_tick = False
+        _fill_cache(s, _fast_cache(self.NOW))
+        _fill_cache(s, {"pv_production_w": (0.0, self.NOW, False)})
+        s._fast_evaluation()
+        hass.loop.create_task.assert_called_once()
+        hass.loop.create_task.call_args[0][0].close()  # discard un-awaited coroutine
+
+    def test_state_change_to_register_latency_within_budget(self, sensor_ctx, sample_config):
+        """Benchmark: state_changed → TOTAL_POWER write stays within the budget."""
+        mod, mocks = sensor_ctx
+        budget_ms = 20
+        samples: list[float] = []
+
+        async def _bench():
+            hass = _LoopHass(asyncio.get_running_loop())
+            s = _make_sensor(mod, hass, self._cfg(sample_config, budget_ms))
+            await s.async_added_to_hass()
+            _fill_cache(s, _fast_cache(self.NOW))
+            await s._evaluation_tick(self.NOW)
+
+            written = asyncio.Event()
+            gc.collect()  # earlier tests' garbage is not this benchmark's latency
+            mocks["input_data_block"].set_float.side_effect = (
+                lambda *_a: written.set()
+            )
+            for i in range(20):
+                written.clear()
+                t0 = time.perf_counter()
+                # Burst of three updates must coalesce into one evaluation
+                s._handle_state_change(_make_event("sensor.pv_power", str(5000 + i)))
+                s._handle_state_change(_make_event("sensor.power_to_user", "1100.0"))
+                s._handle_state_change(_make_event("sensor.pv_power", str(5100 + i)))
+                await asyncio.wait_for(written.wait(), timeout=1.0)
+                samples.append((time.perf_counter() - t0) * 1000.0)
+            return s
+
+        s = asyncio.run(_bench())
+        mocks["input_data_block"].set_float.side_effect = None
+        assert s.fast_evaluations == 20
+        assert max(samples) < budget_ms + 50, f"latencies ms: {samples}"
+        assert s.extra_state_attributes["fast_max_latency_ms"] >= budget_ms * 0.9
+
+
+# ===========================================================================
+# Adaptive evaluation interval and night idle mode
+# ===========================================================================
+
+class TestAdaptiveInterval:
+    NOW = datetime(2026, 6, 15, 12, 0, 0, tzinfo=timezone.utc)
+
+    def _sensor(self, mod, sample_config, hass=None):
+        cfg = dict(sample_config, adaptive_interval=True,
+                   adaptive_slow_interval_seconds=60,
+                   adaptive_night_interval_seconds=600)
+        cfg["entities"] = dict(cfg["entities"], power_from_grid="sensor.grid_import")
+        s = _make_sensor(mod, hass or MagicMock(), cfg)
+        asyncio.run(s.async_added_to_hass())
+        return s
+
+    def test_disabled_by_default(self, sensor_ctx, sample_config):
+        mod, _ = sensor_ctx
+        s = _make_sensor(mod, MagicMock(), sample_config)
+        assert s._scheduler is None
+
+    def test_slow_mode_skips_evaluation_but_not_staleness(self, sensor_ctx, sample_config):
+        mod, mocks = sensor_ctx
+        s = self._sensor(mod, sample_config)
+        _fill_cache(s, _make_valid_cache(self.NOW))  # 0 W surplus → far → slow
+        asyncio.run(s._evaluation_tick(self.NOW))
+        assert s._adaptive_mode == "slow"
+
+        s._engine.evaluate_cycle = AsyncMock(return_value=_make_result(mocks["se"]))
+        with patch.object(s, "_check_staleness", wraps=s._check_staleness) as stale:
+            asyncio.run(s._evaluation_tick(self.NOW + timedelta(seconds=15)))
+            stale.assert_called_once()
+        s._engine.evaluate_cycle.assert_not_called()
+        assert s.adaptive_skipped_ticks == 1
+
+        asyncio.run(s._evaluation_tick(self.NOW + timedelta(seconds=60)))
+        s._engine.evaluate_cycle.assert_called_once()
+
+    def test_failsafe_still_written_while_waiting(self, sensor_ctx, sample_config):
+        mod, mocks = sensor_ctx
+        s = self._sensor(mod, sample_config)
+        _fill_cache(s, _make_valid_cache(self.NOW))
+        asyncio.run(s._evaluation_tick(self.NOW))
+        _fill_cache(s, {"soc_percent": (50.0, self.NOW, False)})
+        mocks["input_data_block"].set_float.reset_mock()
+        asyncio.run(s._evaluation_tick(self.NOW + timedelta(seconds=15)))
+        assert s._failsafe_reason_logged is not None
+        mocks["input_data_block"].set_float.assert_called_once()
+
+    def test_night_idle_pauses_forecast_and_state_writes(self, sensor_ctx, sample_config):
+        mod, mocks = sensor_ctx
+        s = self._sensor(mod, sample_config)
+        _fill_cache(s, _make_valid_cache(self.NOW))
+        # Night: next rising (parse_datetime mock) before next setting
+        s._read_sun_times = MagicMock(return_value=(
+            self.NOW + timedelta(hours=20), self.NOW + timedelta(hours=8),
+        ))
+        calls = []
+        real_eval = s._engine.evaluate_cycle
+
+        async def _capture(snap, hass=None):
+            calls.append(hass)
+            return await real_eval(snap, hass=None)
+
+        s._engine.evaluate_cycle = _capture
+        asyncio.run(s._evaluation_tick(self.NOW))
+        assert s._adaptive_mode == "night"
+        assert s.async_write_ha_state.call_count == 1   # entering night publishes once
+
+        mocks["input_data_block"].set_float.reset_mock()
+        asyncio.run(s._evaluation_tick(self.NOW + timedelta(seconds=600)))
+        assert calls[-1] is None                        # no forecast fetch at night
+        assert s.async_write_ha_state.call_count == 1   # no further state writes
+        mocks["input_data_block"].set_float.assert_called_once()  # register still updated
+
+    def test_grid_import_spike_wakes_engine(self, sensor_ctx, sample_config):
+        mod, _ = sensor_ctx
+        hass = MagicMock()
+        s = self._sensor(mod, sample_config, hass)
+        _fill_cache(s, _make_valid_cache(self.NOW))
+        asyncio.run(s._evaluation_tick(self.NOW))
+        assert s._next_eval_due is not None
+
+        s._handle_state_change(_make_event("sensor.grid_import", "100.0"))
+        hass.loop.create_task.assert_not_called()       # below wake threshold
+
+        s._handle_state_change(_make_event("sensor.grid_import", "2500.0"))
+        hass.loop.create_task.assert_called_once()
+        hass.loop.create_task.call_args[0][0].close()
+        assert s._next_eval_due is None
+
+        s._handle_state_change(_make_event("sensor.grid_import", "2600.0"))
+        hass.loop.create_task.assert_called_once()      # already due — no duplicate
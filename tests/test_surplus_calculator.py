@@ -1120,3 +1120,116 @@ class TestAC_GridImport:
         assert result.charging_state == "INACTIVE"
         assert result.charging_state != "FAILSAFE"
 
+
+
+# ---------------------------------------------------------------------------
+# Batch API — calculate_surplus_batch must match calculate_surplus row by row
+# ---------------------------------------------------------------------------
+
+class TestCalculateSurplusBatch:
+
+    @pytest.fixture
+    def np(self):
+        return pytest.importorskip("numpy")
+
+    @pytest.fixture
+    def batch_config(self, base_config):
+        base_config["max_inverter_output_kw"] = 6.0
+        base_config["sunset_cutoff_minutes"] = 45
+        return base_config
+
+    def _random_rows(self, np, n, seed=7):
+        rng = np.random.default_rng(seed)
+        start = np.datetime64("2026-01-01T00:00:00", "us")
+        ts = start + (rng.integers(0, 365 * 86400, n) * 1_000_000).astype("timedelta64[us]")
+        day = ts.astype("datetime64[D]")
+        sunset = day + np.timedelta64(17, "h") + (rng.integers(0, 240, n)).astype("timedelta64[m]")
+        sunrise = day + np.timedelta64(6, "h")
+        return {
+            "timestamps": ts,
+            "soc_percent": rng.uniform(40, 100, n).round(1),
+            "pv_production_w": rng.uniform(0, 12000, n).round(),
+            "power_to_user_w": rng.uniform(0, 4000, n).round(),
+            "power_from_grid_w": rng.uniform(0, 800, n).round(),
+            "sunset_times": np.where(rng.random(n) < 0.1, np.datetime64("NaT"), sunset),
+            "sunrise_times": sunrise,
+            "forecast_available": rng.random(n) < 0.7,
+            "cloud_coverage_avg": rng.choice([5.0, 50.0, 90.0, float("nan")], n),
+            "solar_forecast_kwh_remaining": rng.choice([0.5, 5.0, float("nan")], n),
+        }
+
+    def _scalar(self, se, calc, cols, i):
+        def dt(v):
+            return None if v != v else v.astype(datetime).replace(tzinfo=timezone.utc)
+        solar = float(cols["solar_forecast_kwh_remaining"][i])
+        snap = se.SensorSnapshot(
+            soc_percent=float(cols["soc_percent"][i]),
+            power_to_grid_w=0.0,
+            pv_production_w=float(cols["pv_production_w"][i]),
+            power_to_user_w=float(cols["power_to_user_w"][i]),
+            power_from_grid_w=float(cols["power_from_grid_w"][i]),
+            timestamp=dt(cols["timestamps"][i]),
+            sunset_time=dt(cols["sunset_times"][i]),
+            sunrise_time=dt(cols["sunrise_times"][i]),
+            forecast=se.ForecastData(
+                forecast_available=bool(cols["forecast_available"][i]),
+                cloud_coverage_avg=float(cols["cloud_coverage_avg"][i]),
+                solar_forecast_kwh_remaining=None if solar != solar else solar,
+            ),
+        )
+        return calc.calculate_surplus(snap)
+
+    def test_matches_scalar_exactly(self, se, np, batch_config):
+        calc = se.SurplusCalculator(batch_config)
+        cols = self._random_rows(np, 3000)
+        batch = calc.calculate_surplus_batch(**cols)
+        for i in range(len(cols["timestamps"])):
+            r = self._scalar(se, calc, cols, i)
+            state = se.BATCH_STATES[batch.charging_state[i]]
+            assert state == r.charging_state, i
+            assert batch.reported_kw[i] == r.reported_kw, i
+            assert batch.buffer_used_kw[i] == r.buffer_used_kw, i
+            assert batch.buffer_used_kw[i] <= batch.buffer_kw_max[i], i
+            assert batch.real_surplus_kw[i] == r.real_surplus_kw, i
+            assert batch.soc_floor_active[i] == r.soc_floor_active, i
+
+    def test_hard_floor_inverter_cap_and_sunset_cutoff(self, se, np, batch_config):
+        calc = se.SurplusCalculator(batch_config)
+        noon = np.datetime64("2026-06-15T12:00:00", "us")
+        sunset = np.array([noon + np.timedelta64(6, "h")] * 2 + [noon + np.timedelta64(45, "m")])
+        batch = calc.calculate_surplus_batch(
+            np.array([noon] * 3),
+            soc_percent=[49.9, 90.0, 90.0],
+            pv_production_w=[9000.0, 12000.0, 9000.0],
+            power_to_user_w=[0.0, 0.0, 0.0],
+            sunset_times=sunset,
+        )
+        assert [se.BATCH_STATES[c] for c in batch.charging_state] == [
+            "FAILSAFE", "ACTIVE", "INACTIVE",
+        ]
+        assert batch.reported_kw.tolist() == [0.0, 6.0, 0.0]
+        assert batch.soc_floor_active[0] == se.SOC_HARD_FLOOR
+        assert batch.buffer_kw_max[0] == 0.0
+
+    def test_accepts_epoch_seconds(self, se, np, base_config):
+        calc = se.SurplusCalculator(base_config)
+        ts = np.datetime64("2026-03-15T12:30:00", "us")
+        a = calc.calculate_surplus_batch(np.array([ts]), [80.0], [5000.0], [1200.0])
+        b = calc.calculate_surplus_batch(
+            np.array([ts.astype("datetime64[s]").astype(np.int64)], dtype=float),
+            [80.0], [5000.0], [1200.0],
+        )
+        assert a.reported_kw.tolist() == b.reported_kw.tolist()
+        assert a.soc_floor_active.tolist() == b.soc_floor_active.tolist()
+
+    def test_year_of_15s_data_is_fast(self, se, np, base_config):
+        import time
+
+        n = 365 * 86400 // 15
+        cols = self._random_rows(np, n)
+        calc = se.SurplusCalculator(base_config)
+        t0 = time.perf_counter()
+        batch = calc.calculate_surplus_batch(**cols)
+        elapsed = time.perf_counter() - t0
+        assert len(batch.reported_kw) == n
+        assert elapsed < 5.0, f"batch took {elapsed:.2f}s for {n} rows"
@@ -18,8 +18,9 @@ import inspect
 import logging
 import os
 import sys
-from dataclasses import fields
-from datetime import datetime
+import time
+from dataclasses import MISSING, fields
+from datetime import datetime, timedelta
 
 import pytest
 
@@ -145,8 +146,11 @@ class TestEvaluationResult:
         import dataclasses
         assert dataclasses.is_dataclass(se.EvaluationResult)
 
-    def test_has_exactly_eight_fields(self, se):
-        assert len(fields(se.EvaluationResult)) == 8
+    def test_has_eight_required_fields_plus_nowcast(self, se):
+        flds = fields(se.EvaluationResult)
+        required = [f.name for f in flds if f.default is MISSING]
+        assert len(required) == 8
+        assert [f.name for f in flds[8:]] == ["pv_nowcast_w", "pv_trend_w_per_min"]
 
     @pytest.mark.parametrize("field_name,expected_type", EXPECTED_FIELDS.items())
     def test_field_type(self, se, field_name, expected_type):
@@ -176,7 +180,7 @@ class TestEvaluationResult:
         assert result.forecast_available is True
 
     def test_no_defaults_all_fields_required(self, se):
-        """All 8 fields must be required (no defaults) — strict dataclass."""
+        """All 8 core fields must be required (no defaults) — strict dataclass."""
         with pytest.raises(TypeError):
             se.EvaluationResult()  # must fail — missing fields
 
@@ -614,6 +618,174 @@ class TestForecastConsumerGetForecast:
         assert engine._forecast_consumer.config is cfg
 
 
+class SlowHassServices:
+    """hass.services stub whose weather call takes ``delay`` seconds."""
+    def __init__(self, response, delay):
+        self._response = response
+        self._delay = delay
+        self.calls = 0
+
+    async def async_call(self, domain, service, data, *, blocking, return_response):
+        self.calls += 1
+        await asyncio.sleep(self._delay)
+        return self._response
+
+
+class TestForecastConsumerCache:
+    """TTL cache with stale-while-revalidate for ForecastConsumer."""
+
+    CFG = {"entities": {"weather": "weather.test"}, "forecast_ttl_seconds": 600}
+
+    @staticmethod
+    def _hass(cloud=30, delay=0.0):
+        entries = [{"cloud_coverage": cloud}]
+        hass = MockHass()
+        hass.services = SlowHassServices({"weather.test": {"forecast": entries}}, delay)
+        return hass
+
+    def test_first_read_is_miss_and_returns_defaults_immediately(self, se):
+        fc = se.ForecastConsumer(config=dict(self.CFG))
+        hass = self._hass()
+
+        async def _run():
+            data = fc.get_cached_forecast(hass)
+            await fc._refresh_task
+            return data
+
+        data = asyncio.run(_run())
+        assert data.forecast_available is False
+        assert fc.misses == 1
+        assert fc.refreshes == 1
+
+    def test_injected_monotonic_clock_drives_ttl(self, se):
+        now = [1000.0]
+        fc = se.ForecastConsumer(config=dict(self.CFG), monotonic=lambda: now[0])
+        hass = self._hass(cloud=30)
+
+        async def _run():
+            fc.get_cached_forecast(hass)
+            await fc._refresh_task
+            now[0] += 600                       # exactly TTL → still fresh
+            fc.get_cached_forecast(hass)
+            now[0] += 1                         # past TTL → miss + refresh
+            fc.get_cached_forecast(hass)
+            await fc._refresh_task
+
+        asyncio.run(_run())
+        assert (fc.hits, fc.misses, fc.refreshes) == (1, 2, 2)
+
+    def test_fresh_cache_is_hit_without_service_call(self, se):
+        fc = se.ForecastConsumer(config=dict(self.CFG))
+        hass = self._hass(cloud=30)
+
+        async def _run():
+            fc.get_cached_forecast(hass)
+            await fc._refresh_task
+            return fc.get_cached_forecast(hass)
+
+        data = asyncio.run(_run())
+        assert data.forecast_available is True
+        assert data.cloud_coverage_avg == 30.0
+        assert fc.hits == 1
+        assert hass.services.calls == 1
+
+    def test_stale_cache_served_while_revalidating(self, se):
+        fc = se.ForecastConsumer(config=dict(self.CFG))
+        hass = self._hass(cloud=30)
+
+        async def _run():
+            fc.get_cached_forecast(hass)
+            await fc._refresh_task
+            fc._fetched_at -= 601  # expire TTL
+            hass.services._response = {"weather.test": {"forecast": [{"cloud_coverage": 90}]}}
+            stale = fc.get_cached_forecast(hass)
+            await fc._refresh_task
+            return stale, fc.get_cached_forecast(hass)
+
+        stale, fresh = asyncio.run(_run())
+        assert stale.cloud_coverage_avg == 30.0
+        assert fresh.cloud_coverage_avg == 90.0
+        assert fc.refreshes == 2
+
+    def test_ttl_below_tick_interval_still_serves_forecast(self, se):
+        now = [1000.0]
+        cfg = {**self.CFG, "forecast_ttl_seconds": 0, "evaluation_interval": 15}
+        fc = se.ForecastConsumer(config=cfg, monotonic=lambda: now[0])
+        hass = self._hass(cloud=30)
+
+        async def _run():
+            fc.get_cached_forecast(hass)
+            await fc._refresh_task
+            now[0] += 15                        # next tick: stale, refreshed, still served
+            data = fc.get_cached_forecast(hass)
+            await fc._refresh_task
+            return data
+
+        data = asyncio.run(_run())
+        assert data.forecast_available is True
+        assert fc.refreshes == 2
+
+    def test_only_one_refresh_in_flight(self, se):
+        fc = se.ForecastConsumer(config=dict(self.CFG))
+        hass = self._hass(delay=0.05)
+
+        async def _run():
+            for _ in range(5):
+                fc.get_cached_forecast(hass)
+            await fc._refresh_task
+
+        asyncio.run(_run())
+        assert hass.services.calls == 1
+        assert fc.misses == 5
+
+    def test_refresh_timeout_keeps_cache_and_counts_failure(self, se, caplog):
+        cfg = dict(self.CFG, forecast_timeout_seconds=0.01)
+        fc = se.ForecastConsumer(config=cfg)
+        hass = self._hass(delay=1.0)
+
+        async def _run():
+            fc.get_cached_forecast(hass)
+            await fc._refresh_task
+
+        with caplog.at_level(logging.WARNING):
+            asyncio.run(_run())
+        assert fc.refresh_failures == 1
+        assert fc.refreshes == 0
+        assert fc._cached is None
+        assert any("Forecast refresh failed" in r.message for r in caplog.records)
+
+    def test_data_beyond_max_stale_age_not_served(self, se):
+        fc = se.ForecastConsumer(config=dict(self.CFG))
+        fc._cached = se.ForecastData(forecast_available=True, cloud_coverage_avg=10.0)
+        fc._fetched_at = se.time.monotonic() - 600 * se._FORECAST_MAX_STALE_FACTOR - 1
+        fc._retry_at = float("inf")  # suppress background refresh
+        data = fc.get_cached_forecast(self._hass())
+        assert data.forecast_available is False
+
+    def test_stats_expose_counters(self, se):
+        fc = se.ForecastConsumer(config=dict(self.CFG))
+        assert set(fc.stats) >= {
+            "forecast_cache_hits", "forecast_cache_misses",
+            "forecast_refreshes", "forecast_last_refresh_ms",
+        }
+
+    def test_evaluate_cycle_does_not_wait_for_weather_service(self, se, snapshot):
+        """evaluate_cycle must return long before a slow weather call completes."""
+        engine = se.SurplusEngine(config=dict(self.CFG))
+        hass = self._hass(delay=5.0)
+
+        async def _run():
+            result = await asyncio.wait_for(
+                engine.evaluate_cycle(snapshot, hass=hass), timeout=0.5
+            )
+            engine._forecast_consumer._refresh_task.cancel()
+            return result
+
+        result = asyncio.run(_run())
+        assert result.forecast_available is False
+        assert engine.forecast_stats["forecast_cache_misses"] == 1
+
+
 class TestSurplusEngineDefault:
     def test_evaluate_cycle_returns_evaluation_result(self, se, snapshot):
         engine = se.SurplusEngine(config={})
@@ -667,3 +839,244 @@ class TestSurplusEngineDefault:
         engine = se.SurplusEngine(config={})
         result = asyncio.run(engine.evaluate_cycle(snapshot))
         assert result.forecast_available is False
+
+
+# ===========================================================================
+# Two-tier evaluation: cached strategic stage + fast tactical stage
+# ===========================================================================
+
+class TestTwoTierEvaluation:
+    CFG = {
+        "wallbox_threshold_kw": 4.2,
+        "hold_time_minutes": 10,
+        "battery_capacity_kwh": 10.0,
+        "time_strategy": [{"default": True, "soc_floor": 70}],
+        "seasonal_targets": {m: 70 for m in range(1, 13)},
+        "strategy_interval_seconds": 60,
+    }
+
+    @staticmethod
+    def _snap(se, ts, pv=6000.0, forecast=None):
+        return se.SensorSnapshot(
+            soc_percent=80.0, power_to_grid_w=0.0, pv_production_w=pv,
+            power_to_user_w=1000.0, timestamp=ts,
+            sunset_time=None, sunrise_time=None, forecast=forecast,
+        )
+
+    def test_strategy_cached_within_interval(self, se, now):
+        engine = se.SurplusEngine(config=dict(self.CFG))
+        for i in range(30):
+            engine.evaluate_fast(self._snap(se, now + timedelta(seconds=i)))
+        assert engine.strategy_runs == 1
+
+    def test_strategy_rerun_after_interval(self, se, now):
+        engine = se.SurplusEngine(config=dict(self.CFG))
+        engine.evaluate_fast(self._snap(se, now))
+        engine.evaluate_fast(self._snap(se, now + timedelta(seconds=60)))
+        assert engine.strategy_runs == 2
+
+    def test_strategy_rerun_on_forecast_change(self, se, now):
+        engine = se.SurplusEngine(config=dict(self.CFG))
+        engine.evaluate_fast(self._snap(se, now))
+        fd = se.ForecastData(forecast_available=True, cloud_coverage_avg=10.0)
+        result = engine.evaluate_fast(self._snap(se, now, forecast=fd))
+        assert engine.strategy_runs == 2
+        assert result.forecast_available is True
+
+    def test_equal_forecast_value_does_not_rerun(self, se, now):
+        engine = se.SurplusEngine(config=dict(self.CFG))
+        engine.evaluate_fast(self._snap(se, now, forecast=se.ForecastData()))
+        engine.evaluate_fast(self._snap(se, now, forecast=se.ForecastData()))
+        assert engine.strategy_runs == 1
+
+    def test_invalidate_strategy_forces_rerun(self, se, now):
+        engine = se.SurplusEngine(config=dict(self.CFG))
+        engine.evaluate_fast(self._snap(se, now))
+        engine.invalidate_strategy()
+        assert engine.strategy_due(now)
+        engine.evaluate_fast(self._snap(se, now))
+        assert engine.strategy_runs == 2
+
+    @pytest.mark.parametrize("pv", [0.0, 3000.0, 5200.0, 9000.0, 20000.0])
+    def test_tactical_matches_full_calculation(self, se, now, pv):
+        calc = se.SurplusCalculator(dict(self.CFG))
+        snap = self._snap(se, now, pv=pv)
+        strategy = calc.compute_strategy(snap)
+        assert calc.calculate_tactical(snap, strategy) == calc.calculate_surplus(snap)
+
+    def test_hard_floor_bypasses_strategy(self, se, now):
+        engine = se.SurplusEngine(config=dict(self.CFG))
+        snap = self._snap(se, now)
+        snap.soc_percent = 40.0
+        result = engine.evaluate_fast(snap)
+        assert result.soc_floor_active == se.SOC_HARD_FLOOR
+        assert engine.strategy_runs == 0
+
+    def test_fast_stage_cost_allows_high_rate(self, se, now):
+        """10 000 tactical evaluations (≈ 3 h at 1 Hz) stay well below a second."""
+        engine = se.SurplusEngine(config=dict(self.CFG))
+        snap = self._snap(se, now)
+        engine.evaluate_fast(snap)
+        started = time.perf_counter()
+        for i in range(10_000):
+            snap.pv_production_w = 3000.0 + (i % 50) * 100.0
+            engine.evaluate_fast(snap)
+        elapsed = time.perf_counter() - started
+        assert engine.strategy_runs == 1
+        assert elapsed < 1.0, f"10k fast evaluations took {elapsed:.3f}s"
+
+    def test_phase_hook_times_cycle_without_changing_result(self, se, now):
+        timed = se.SurplusEngine(config=dict(self.CFG))
+        plain = se.SurplusEngine(config=dict(self.CFG))
+        phases = []
+        timed.on_phase = lambda phase, ns: phases.append((phase, ns))
+        for i in range(3):
+            ts = now + timedelta(seconds=15 * i)
+            assert (asyncio.run(timed.evaluate_cycle(self._snap(se, ts)))
+                    == asyncio.run(plain.evaluate_cycle(self._snap(se, ts))))
+        assert [p for p, _ in phases] == ["forecast", "calculation", "hysteresis"] * 3
+        assert all(isinstance(ns, int) and ns >= 0 for _, ns in phases)
+
+
+# ===========================================================================
+# Allocation budget — slotted objects, interned reasons, reused snapshot
+# ===========================================================================
+
+class TestAllocationBudget:
+    CFG = {
+        **TestTwoTierEvaluation.CFG,
+        "sunset_cutoff_minutes": 30,
+        "nowcast_horizon_minutes": 3,
+    }
+
+    @pytest.mark.parametrize("name", ["SensorSnapshot", "EvaluationResult", "ForecastData"])
+    def test_per_tick_objects_are_slotted(self, se, now, name):
+        assert "__slots__" in vars(getattr(se, name))
+
+    def test_reason_codes_compare_as_text(self, se):
+        assert se.Reason.HARD_FLOOR == "SOC below hard floor"
+        assert f"{se.Reason.FAILSAFE_ACTIVE}" == "failsafe_active"
+
+    def test_strategy_reasons_are_interned(self, se, now):
+        calc = se.SurplusCalculator(dict(self.CFG))
+        snap = TestTwoTierEvaluation._snap(se, now)
+        first, second = calc.compute_strategy(snap), calc.compute_strategy(snap)
+        assert first.reason_active is second.reason_active
+        assert first.reason_inactive is second.reason_inactive
+
+    def test_sunset_reason_formatted_once_per_minute(self, se, now):
+        calc = se.SurplusCalculator(dict(self.CFG))
+        snap = TestTwoTierEvaluation._snap(se, now)
+        snap.sunset_time = now + timedelta(minutes=20, seconds=50)
+        strategy = calc.compute_strategy(snap)
+        first = calc.calculate_tactical(snap, strategy).reason
+        snap.timestamp = now + timedelta(seconds=30)
+        assert calc.calculate_tactical(snap, strategy).reason is first
+        snap.timestamp = now + timedelta(seconds=60)
+        assert calc.calculate_tactical(snap, strategy).reason.startswith("near_sunset(19min)")
+
+    def test_snapshot_reset_clears_cycle_outputs(self, se, now):
+        snap = TestTwoTierEvaluation._snap(se, now, forecast=se.ForecastData())
+        snap.pv_nowcast_w = 1000.0
+        assert snap.reset(60.0, 0.0, 500.0, 300.0, 0.0, now, None, None) is snap
+        assert snap.forecast is None and snap.pv_nowcast_w is None
+        assert snap.soc_percent == 60.0
+
+    def test_tick_allocation_budget(self, se, now):
+        """Steady-state tick: one slotted result plus its floats, nothing else kept."""
+        import tracemalloc
+
+        engine = se.SurplusEngine(config=dict(self.CFG))
+        snap = TestTwoTierEvaluation._snap(se, now)
+        stamps = [now + timedelta(seconds=15 * i) for i in range(2200)]
+        for ts in stamps[:200]:
+            snap.reset(80.0, 0.0, 6000.0, 1000.0, 0.0, ts, None, None)
+            engine.evaluate_fast(snap)
+
+        kept = [None] * (len(stamps) - 200)
+        tracemalloc.start()
+        try:
+            base, _ = tracemalloc.get_traced_memory()
+            worst_peak = 0
+            for i, ts in enumerate(stamps[200:]):
+                snap.reset(80.0, 0.0, 6000.0 - i % 40, 1000.0, 0.0, ts, None, None)
+                before, _ = tracemalloc.get_traced_memory()
+                tracemalloc.reset_peak()
+                kept[i] = engine.evaluate_fast(snap)
+                worst_peak = max(worst_peak, tracemalloc.get_traced_memory()[1] - before)
+            retained, _ = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        per_tick = (retained - base) / len(kept)
+        assert per_tick < 256, f"{per_tick:.0f} B retained per tick"
+        assert worst_peak < 1024, f"{worst_peak} B peak in one tick"
+
+
+# ===========================================================================
+# AdaptiveScheduler — evaluation rate and night idle
+# ===========================================================================
+
+class TestAdaptiveScheduler:
+    CFG = {
+        "evaluation_interval": 15,
+        "adaptive_slow_interval_seconds": 60,
+        "adaptive_night_interval_seconds": 600,
+        "adaptive_band_kw": 1.0,
+        "wallbox_threshold_kw": 4.2,
+    }
+
+    @staticmethod
+    def _result(se, surplus_kw, state="INACTIVE"):
+        return se.EvaluationResult(
+            reported_kw=0.0, real_surplus_kw=surplus_kw, buffer_used_kw=0.0,
+            soc_percent=80.0, soc_floor_active=70, charging_state=state,
+            reason="test", forecast_available=False,
+        )
+
+    @staticmethod
+    def _snap(se, now, night=False):
+        sunset = now + timedelta(hours=6)
+        sunrise = now + (timedelta(hours=2) if night else timedelta(hours=18))
+        return se.SensorSnapshot(
+            soc_percent=80.0, power_to_grid_w=0.0, pv_production_w=0.0,
+            power_to_user_w=0.0, timestamp=now,
+            sunset_time=sunset, sunrise_time=sunrise,
+        )
+
+    def test_near_threshold_is_fast(self, se, now):
+        sched = se.AdaptiveScheduler(self.CFG)
+        assert sched.next_interval(self._result(se, 3.5), self._snap(se, now), None) == (15, "fast")
+
+    def test_far_from_threshold_is_slow(self, se, now):
+        sched = se.AdaptiveScheduler(self.CFG)
+        assert sched.next_interval(self._result(se, 0.5), self._snap(se, now), None) == (60, "slow")
+
+    def test_hold_about_to_expire_is_fast(self, se, now):
+        sched = se.AdaptiveScheduler(self.CFG)
+        result = self._result(se, 0.5, state="ACTIVE")
+        hold_until = now + timedelta(seconds=45)
+        assert sched.next_interval(result, self._snap(se, now), hold_until)[1] == "fast"
+        hold_until = now + timedelta(minutes=8)
+        assert sched.next_interval(result, self._snap(se, now), hold_until)[1] == "slow"
+
+    def test_night_inactive_is_night(self, se, now):
+        sched = se.AdaptiveScheduler(self.CFG)
+        snap = self._snap(se, now, night=True)
+        assert se.AdaptiveScheduler.is_night(snap)
+        assert sched.next_interval(self._result(se, -0.3), snap, None) == (600, "night")
+
+    def test_night_active_keeps_normal_rate(self, se, now):
+        sched = se.AdaptiveScheduler(self.CFG)
+        snap = self._snap(se, now, night=True)
+        result = self._result(se, -0.3, state="ACTIVE")
+        assert sched.next_interval(result, snap, now + timedelta(minutes=10))[1] == "slow"
+
+    def test_failsafe_is_fast(self, se, now):
+        sched = se.AdaptiveScheduler(self.CFG)
+        snap = self._snap(se, now, night=True)
+        assert sched.next_interval(self._result(se, 0.0, "FAILSAFE"), snap, None)[1] == "fast"
+
+    def test_missing_sun_times_never_night(self, se, now):
+        snap = self._snap(se, now)
+        snap.sunrise_time = None
+        assert not se.AdaptiveScheduler.is_night(snap)
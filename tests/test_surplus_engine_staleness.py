@@ -11,15 +11,18 @@ Covers all Acceptance Criteria:
 from __future__ import annotations
 
 import importlib.util
+import math
 import logging
 import os
 import sys
 import types
 from datetime import datetime, timezone, timedelta
-from unittest.mock import AsyncMock, MagicMock
+from unittest.mock import MagicMock
 
 import pytest
 
+from .conftest import load_decision_trace, modbus_server_stub
+
 ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 _SENSOR_PATH = os.path.join(ROOT, "sensor.py")
 _SE_PATH = os.path.join(ROOT, "surplus_engine.py")
@@ -42,6 +45,17 @@ def _load_surplus_engine():
     return mod
 
 
+def _load_metrics():
+    """Load metrics.py fresh (stdlib only) so counters start at zero."""
+    key = "_test_metrics"
+    sys.modules.pop(key, None)
+    spec = importlib.util.spec_from_file_location(key, os.path.join(ROOT, "metrics.py"))
+    mod = importlib.util.module_from_spec(spec)
+    sys.modules[key] = mod
+    spec.loader.exec_module(mod)
+    return mod
+
+
 # ---------------------------------------------------------------------------
 # Fixture — loads sensor.py with all stubs (mirrors test_sensor.py)
 # ---------------------------------------------------------------------------
@@ -129,23 +143,21 @@ def sensor_ctx():
     ha_util_dt.utcnow = mock_utcnow
     ha_util.dt = ha_util_dt
 
-    pymodbus        = types.ModuleType("pymodbus")
-    pymodbus_server = types.ModuleType("pymodbus.server")
-    pymodbus_server.StartAsyncSerialServer = AsyncMock()
-    pymodbus_framer = types.ModuleType("pymodbus.framer")
-    pymodbus_framer.FramerType = MagicMock()
-
     PKG = "sdm630_simulator"
     mock_idb = MagicMock()
 
-    pkg_modbus              = types.ModuleType(f"{PKG}.modbus_server")
-    pkg_modbus.context      = MagicMock()
-    pkg_modbus.identity     = MagicMock()
-    pkg_modbus.input_data_block = mock_idb
+    pkg_modbus              = modbus_server_stub(PKG, mock_idb)
 
     pkg_regs             = types.ModuleType(f"{PKG}.sdm630_input_registers")
     pkg_regs.TOTAL_POWER = 0x0035
 
+    pkg_holding = types.ModuleType(f"{PKG}.sdm630_holding_registers")
+    pkg_holding.DEMAND_PERIOD = 3
+
+    pkg_meter = types.ModuleType(f"{PKG}.meter")
+    pkg_meter.MeterModel = MagicMock()
+    pkg_meter.ENERGY_STATE_VERSION = 1
+
     pkg_se = types.ModuleType(f"{PKG}.surplus_engine")
     for attr in dir(se):
         if not attr.startswith("__"):
@@ -160,21 +172,24 @@ def sensor_ctx():
         "homeassistant.helpers.event":      ha_event,
         "homeassistant.util":               ha_util,
         "homeassistant.util.dt":            ha_util_dt,
-        "pymodbus":                         pymodbus,
-        "pymodbus.server":                  pymodbus_server,
-        "pymodbus.framer":                  pymodbus_framer,
         f"{PKG}.modbus_server":             pkg_modbus,
         f"{PKG}.sdm630_input_registers":    pkg_regs,
+        f"{PKG}.meter":                     pkg_meter,
+        f"{PKG}.sdm630_holding_registers":  pkg_holding,
         f"{PKG}.surplus_engine":            pkg_se,
+        f"{PKG}.metrics":                   _load_metrics(),
     }
 
     saved = {k: sys.modules.get(k) for k in new_modules}
     for k, v in new_modules.items():
         sys.modules[k] = v
+    saved[f"{PKG}.decision_trace"] = sys.modules.get(f"{PKG}.decision_trace")
+    load_decision_trace(PKG)                 # imports the surplus_engine stub above
 
     if PKG not in sys.modules:
         pkg_root = types.ModuleType(PKG)
         pkg_root.CONF_ENTITIES = "entities"
+        pkg_root.CONF_REGISTER_MAPPINGS = "register_mappings"
         pkg_root.DEFAULTS = {
             "sensor_ranges": {"soc": (0, 100), "power_w": (-30000, 30000)},
         }
@@ -184,6 +199,8 @@ def sensor_ctx():
     else:
         if not hasattr(sys.modules[PKG], "CONF_ENTITIES"):
             sys.modules[PKG].CONF_ENTITIES = "entities"
+        if not hasattr(sys.modules[PKG], "CONF_REGISTER_MAPPINGS"):
+            sys.modules[PKG].CONF_REGISTER_MAPPINGS = "register_mappings"
         if not hasattr(sys.modules[PKG], "DEFAULTS"):
             sys.modules[PKG].DEFAULTS = {
                 "sensor_ranges": {"soc": (0, 100), "power_w": (-30000, 30000)},
@@ -200,6 +217,7 @@ def sensor_ctx():
     sensor_mod.__package__ = PKG
     sys.modules[f"{PKG}.sensor"] = sensor_mod
     spec.loader.exec_module(sensor_mod)
+    sensor_mod._load_modbus_server()         # binds the data blocks, as setup does
 
     yield sensor_mod, mock_utcnow, se
 
@@ -233,7 +251,7 @@ def _make_sensor(mod, cfg):
     s = mod.SDM630SimSensor("Test Sensor", hass_mock, cfg)
     s.async_on_remove    = MagicMock()
     s.async_write_ha_state = MagicMock()
-    s._invalidation_reasons = {}
+    s._monotonic = lambda: s._utcnow().timestamp()  # cache stamps follow the mocked clock
     # Wire reverse-lookup maps (normally built in async_added_to_hass)
     entities_cfg = cfg.get("entities", {})
     s._entity_to_cache_key = {
@@ -250,6 +268,34 @@ def _make_sensor(mod, cfg):
     return s
 
 
+def _fill_cache(s, entries):
+    """Write ``{cache_key: (value, stamp, valid)}`` into the sensor's slot cache.
+
+    ``stamp`` is a datetime on the mocked wall clock (``_make_sensor`` runs the
+    cache's monotonic time base off the same clock) or None for a valid
+    reading without a stamp (startup grace).
+    """
+    cache = s._sensor_cache
+    slots = sys.modules[type(s).__module__].CACHE_SLOT
+    for key, (value, ts, valid) in entries.items():
+        stamp = math.nan if ts is None else ts.timestamp()
+        if valid:
+            cache.set(slots[key], value, stamp)
+        else:
+            cache.values[slots[key]] = value
+            cache.invalidate(slots[key], stamp, "")
+
+
+def _cache_entry(s, key):
+    """``(value, stamp, valid)`` for one slot, or None if it never got data."""
+    cache = s._sensor_cache
+    slot = sys.modules[type(s).__module__].CACHE_SLOT[key]
+    if not cache.has_data(slot):
+        return None
+    stamp = cache.stamps[slot]
+    return cache.values[slot], None if math.isnan(stamp) else stamp, bool(cache.valid[slot])
+
+
 # ===========================================================================
 # AC1 — Stale critical sensor triggers FAILSAFE
 # ===========================================================================
@@ -261,12 +307,12 @@ class TestAC1StaleSensorTriggersFailsafe:
         mock_utcnow.return_value = _NOW
         s = _make_sensor(mod, sample_config)
         stale_ts = _NOW - timedelta(seconds=61)
-        s._sensor_cache = {
+        _fill_cache(s, {
             "soc_percent":     (50.0, stale_ts, True),
             "power_to_grid_w": (0.0,  _NOW,     True),
             "pv_production_w": (1000.0, _NOW,   True),
             "power_to_user_w": (500.0,  _NOW,   True),
-        }
+        })
         result = s._check_staleness()
         assert result  # non-empty reason string
         assert "sensor.battery_soc" in result
@@ -280,12 +326,12 @@ class TestAC1StaleSensorTriggersFailsafe:
         mock_utcnow.return_value = _NOW
         s = _make_sensor(mod, sample_config)
         stale_ts = _NOW - timedelta(seconds=61)
-        s._sensor_cache = {
+        _fill_cache(s, {
             "soc_percent":     (50.0, stale_ts, True),
             "power_to_grid_w": (0.0,  _NOW,     True),
             "pv_production_w": (1000.0, _NOW,   True),
             "power_to_user_w": (500.0,  _NOW,   True),
-        }
+        })
         s._check_staleness()
         reason = s._engine.hysteresis_filter.force_failsafe.call_args[0][0]
         assert "sensor.battery_soc" in reason
@@ -297,12 +343,12 @@ class TestAC1StaleSensorTriggersFailsafe:
         mock_utcnow.return_value = _NOW
         s = _make_sensor(mod, sample_config)
         stale_ts = _NOW - timedelta(seconds=90)
-        s._sensor_cache = {
+        _fill_cache(s, {
             "soc_percent":     (50.0, stale_ts, True),
             "power_to_grid_w": (0.0,  _NOW,     True),
             "pv_production_w": (1000.0, _NOW,   True),
             "power_to_user_w": (500.0,  _NOW,   True),
-        }
+        })
         with caplog.at_level(logging.WARNING):
             s._check_staleness()
         assert any(
@@ -317,12 +363,12 @@ class TestAC1StaleSensorTriggersFailsafe:
         mock_utcnow.return_value = _NOW
         s = _make_sensor(mod, sample_config)
         stale_ts = _NOW - timedelta(seconds=65)
-        s._sensor_cache = {
+        _fill_cache(s, {
             "soc_percent":     (50.0, _NOW,     True),
             "power_to_grid_w": (0.0,  _NOW,     True),
             "pv_production_w": (1000.0, stale_ts, True),
             "power_to_user_w": (500.0,  _NOW,   True),
-        }
+        })
         assert s._check_staleness()  # non-empty reason string
         s._engine.hysteresis_filter.force_failsafe.assert_called_once()
 
@@ -332,12 +378,12 @@ class TestAC1StaleSensorTriggersFailsafe:
         mock_utcnow.return_value = _NOW
         s = _make_sensor(mod, sample_config)
         stale_ts = _NOW - timedelta(seconds=100)
-        s._sensor_cache = {
+        _fill_cache(s, {
             "soc_percent":     (50.0, _NOW,      True),
             "power_to_grid_w": (0.0,  _NOW,      True),
             "pv_production_w": (1000.0, _NOW,    True),
             "power_to_user_w": (500.0,  stale_ts, True),
-        }
+        })
         assert s._check_staleness()  # non-empty reason string
 
 
@@ -352,12 +398,12 @@ class TestAC2RecoveryOnFreshTimestamp:
         mock_utcnow.return_value = _NOW
         s = _make_sensor(mod, sample_config)
         # All sensors have a fresh timestamp (just updated)
-        s._sensor_cache = {
+        _fill_cache(s, {
             "soc_percent":     (50.0, _NOW, True),
             "power_to_grid_w": (0.0,  _NOW, True),
             "pv_production_w": (1000.0, _NOW, True),
             "power_to_user_w": (500.0,  _NOW, True),
-        }
+        })
         assert not s._check_staleness()  # empty string = no staleness
         s._engine.hysteresis_filter.force_failsafe.assert_not_called()
 
@@ -368,14 +414,16 @@ class TestAC2RecoveryOnFreshTimestamp:
         mock_utcnow.return_value = _NOW
         s = _make_sensor(mod, sample_config)
         stale_ts = _NOW - timedelta(seconds=61)
-        s._sensor_cache["soc_percent"] = (50.0, stale_ts, True)
-        s._sensor_cache["power_to_grid_w"] = (0.0, _NOW, True)
-        s._sensor_cache["pv_production_w"] = (1000.0, _NOW, True)
-        s._sensor_cache["power_to_user_w"] = (500.0, _NOW, True)
+        _fill_cache(s, {
+            "soc_percent":     (50.0, stale_ts, True),
+            "power_to_grid_w": (0.0, _NOW, True),
+            "pv_production_w": (1000.0, _NOW, True),
+            "power_to_user_w": (500.0, _NOW, True),
+        })
         assert s._check_staleness()  # non-empty = stale
 
         # Sensor recovers: new state emitted, last_changed refreshed
-        s._sensor_cache["soc_percent"] = (52.0, _NOW, True)
+        _fill_cache(s, {"soc_percent": (52.0, _NOW, True)})
         s._engine.hysteresis_filter.force_failsafe.reset_mock()
         assert not s._check_staleness()  # empty = no staleness
         s._engine.hysteresis_filter.force_failsafe.assert_not_called()
@@ -392,12 +440,12 @@ class TestAC3ExactThresholdNotStale:
         mock_utcnow.return_value = _NOW
         s = _make_sensor(mod, sample_config)
         exactly_at_threshold = _NOW - timedelta(seconds=60)
-        s._sensor_cache = {
+        _fill_cache(s, {
             "soc_percent":     (50.0, exactly_at_threshold, True),
             "power_to_grid_w": (0.0,  _NOW, True),
             "pv_production_w": (1000.0, _NOW, True),
             "power_to_user_w": (500.0,  _NOW, True),
-        }
+        })
         assert not s._check_staleness()  # empty string = no staleness
         s._engine.hysteresis_filter.force_failsafe.assert_not_called()
 
@@ -409,12 +457,12 @@ class TestAC3ExactThresholdNotStale:
         mock_utcnow.return_value = _NOW
         s = _make_sensor(mod, sample_config)
         ts = _NOW - timedelta(seconds=59)
-        s._sensor_cache = {
+        _fill_cache(s, {
             "soc_percent":     (50.0, ts,   True),
             "power_to_grid_w": (0.0,  _NOW, True),
             "pv_production_w": (1000.0, _NOW, True),
             "power_to_user_w": (500.0,  _NOW, True),
-        }
+        })
         assert not s._check_staleness()  # empty string = no staleness
 
     def test_elapsed_one_second_above_threshold_is_stale(
@@ -425,12 +473,12 @@ class TestAC3ExactThresholdNotStale:
         mock_utcnow.return_value = _NOW
         s = _make_sensor(mod, sample_config)
         ts = _NOW - timedelta(seconds=61)
-        s._sensor_cache = {
+        _fill_cache(s, {
             "soc_percent":     (50.0, ts,   True),
             "power_to_grid_w": (0.0,  _NOW, True),
             "pv_production_w": (1000.0, _NOW, True),
             "power_to_user_w": (500.0,  _NOW, True),
-        }
+        })
         assert s._check_staleness()  # non-empty = stale
 
 
@@ -444,12 +492,12 @@ class TestAC4StartupGrace:
         mod, mock_utcnow, _ = sensor_ctx
         mock_utcnow.return_value = _NOW
         s = _make_sensor(mod, sample_config)
-        s._sensor_cache = {
+        _fill_cache(s, {
             "soc_percent":     (0.0, None, True),  # None timestamp — startup grace
             "power_to_grid_w": (0.0, _NOW, True),
             "pv_production_w": (0.0, _NOW, True),
             "power_to_user_w": (0.0, _NOW, True),
-        }
+        })
         assert not s._check_staleness()  # empty = no staleness
         s._engine.hysteresis_filter.force_failsafe.assert_not_called()
 
@@ -458,7 +506,7 @@ class TestAC4StartupGrace:
         mod, mock_utcnow, _ = sensor_ctx
         mock_utcnow.return_value = _NOW
         s = _make_sensor(mod, sample_config)
-        s._sensor_cache = {}  # nothing yet
+        _fill_cache(s, {})  # nothing yet
         assert not s._check_staleness()  # empty = no staleness
         s._engine.hysteresis_filter.force_failsafe.assert_not_called()
 
@@ -470,9 +518,9 @@ class TestAC4StartupGrace:
         mock_utcnow.return_value = _NOW
         s = _make_sensor(mod, sample_config)
         # Only power_to_grid received data; critical keys absent → all skipped
-        s._sensor_cache = {
+        _fill_cache(s, {
             "power_to_grid_w": (0.0, _NOW, True),
-        }
+        })
         assert not s._check_staleness()  # empty = no staleness
 
     def test_all_none_timestamps_returns_false(self, sensor_ctx, sample_config):
@@ -480,12 +528,12 @@ class TestAC4StartupGrace:
         mod, mock_utcnow, _ = sensor_ctx
         mock_utcnow.return_value = _NOW
         s = _make_sensor(mod, sample_config)
-        s._sensor_cache = {
+        _fill_cache(s, {
             "soc_percent":     (0.0, None, True),
             "power_to_grid_w": (0.0, None, True),
             "pv_production_w": (0.0, None, True),
             "power_to_user_w": (0.0, None, True),
-        }
+        })
         assert not s._check_staleness()  # empty = no staleness
 
 
@@ -502,12 +550,12 @@ class TestAC5OnlyCriticalSensorsChecked:
         mock_utcnow.return_value = _NOW
         s = _make_sensor(mod, sample_config)
         stale_ts = _NOW - timedelta(seconds=61)
-        s._sensor_cache = {
+        _fill_cache(s, {
             "soc_percent":     (50.0, _NOW,     True),
             "power_to_grid_w": (0.0,  stale_ts, True),  # stale but non-critical
             "pv_production_w": (1000.0, _NOW,   True),
             "power_to_user_w": (500.0,  _NOW,   True),
-        }
+        })
         assert not s._check_staleness()  # empty = no staleness
         s._engine.hysteresis_filter.force_failsafe.assert_not_called()
 
@@ -530,11 +578,11 @@ class TestAC5OnlyCriticalSensorsChecked:
         s = _make_sensor(mod, cfg)
         stale_ts = _NOW - timedelta(seconds=61)
         # Only SOC is stale — still should trigger (it IS in the map)
-        s._sensor_cache = {
+        _fill_cache(s, {
             "soc_percent":     (50.0, stale_ts, True),
             "power_to_grid_w": (0.0,  _NOW,     True),
             "pv_production_w": (1000.0, _NOW,   True),
-        }
+        })
         # Should not raise KeyError — power_to_user not in cache_key_to_entity
         result = s._check_staleness()
         assert result  # non-empty = SOC IS critical and IS stale
@@ -543,25 +591,94 @@ class TestAC5OnlyCriticalSensorsChecked:
     def test_battery_discharge_absence_raises_no_error(
         self, sensor_ctx, sample_config
     ):
-        """CACHE_KEY_BATTERY_DISCHARGE not in critical keys — no KeyError."""
-        mod, mock_utcnow, _ = sensor_ctx
+        """CACHE_KEY_BATTERY_DISCHARGE has no cache slot — it is never checked."""
+        mod, mock_utcnow, se = sensor_ctx
         mock_utcnow.return_value = _NOW
         s = _make_sensor(mod, sample_config)
         stale_ts = _NOW - timedelta(seconds=61)
-        # SOC stale; battery_discharge key not in _cache_key_to_entity
-        s._sensor_cache = {
+        assert se.CACHE_KEY_BATTERY_DISCHARGE not in mod.CACHE_SLOT
+        _fill_cache(s, {
             "soc_percent":      (50.0,   stale_ts, True),
             "power_to_grid_w":  (0.0,    _NOW,     True),
             "pv_production_w":  (1000.0, _NOW,     True),
             "power_to_user_w":  (500.0,  _NOW,     True),
-            "battery_discharge_w": (200.0, stale_ts, True),  # stale but not critical
-        }
-        # Must not raise — battery_discharge silently ignored
+        })
         result = s._check_staleness()
         assert result  # non-empty = SOC triggered it
         assert "sensor.battery_soc" in result  # SOC, not battery_discharge
 
 
+# ===========================================================================
+# SensorCache — fixed slots, monotonic stamps, staleness deadlines
+# ===========================================================================
+
+class TestSensorCache:
+    def test_empty_slots_are_never_stale_but_invalid(self):
+        se = _load_surplus_engine()
+        slots = tuple(range(len(se.CACHE_KEYS)))
+        cache = se.SensorCache(slots, 60)
+        assert cache.next_deadline == math.inf
+        assert cache.expire(1e9) == []
+        assert cache.first_stale(slots) == -1
+        assert cache.first_invalid(slots) == 0
+        assert not cache.has_data(0)
+
+    def test_stale_is_strictly_above_threshold(self):
+        se = _load_surplus_engine()
+        cache = se.SensorCache((0, 1), 60)
+        cache.set(1, 5.0, 1000.0)
+        assert cache.next_deadline == 1060.0
+        assert cache.expire(1060.0) == []
+        assert cache.expire(1060.5) == [1]
+        assert cache.stale_count == 1 and cache.first_stale((0, 1)) == 1
+        assert cache.next_deadline == math.inf   # disarmed until the next write
+
+    def test_unwatched_slots_are_never_armed(self):
+        se = _load_surplus_engine()
+        cache = se.SensorCache((0,), 60)
+        cache.set(1, 5.0, 0.0)
+        assert cache.next_deadline == math.inf
+
+    def test_refreshed_slot_is_rearmed_lazily(self):
+        se = _load_surplus_engine()
+        cache = se.SensorCache((0, 1), 60)
+        cache.set(0, 1.0, 0.0)
+        for t in range(10, 100, 10):
+            cache.set(0, 1.0, float(t))        # writes do not touch the heap
+        assert len(cache._deadlines) == 1 and cache.next_deadline == 60.0
+        assert cache.expire(61.0) == []
+        assert cache.next_deadline == 150.0
+
+    def test_write_clears_stale_flag(self):
+        se = _load_surplus_engine()
+        cache = se.SensorCache((0, 2), 60)
+        cache.set(2, 1.0, 0.0)
+        cache.set(0, 1.0, 0.0)
+        assert sorted(cache.expire(100.0)) == [0, 2] and cache.stale_count == 2
+        assert cache.first_stale((2, 0)) == 2
+        cache.set(2, 2.0, 100.0)
+        assert cache.stale_count == 1 and cache.first_stale((2, 0)) == 0
+        assert cache.next_deadline == 160.0
+
+    def test_invalidate_keeps_value_and_reason(self):
+        cache = _load_surplus_engine().SensorCache()
+        cache.set(0, 80.0, 10.0)
+        cache.invalidate(0, 20.0, " = unknown")
+        assert cache.values[0] == 80.0
+        assert cache.has_data(0) and not cache.valid[0]
+        assert cache.reasons[0] == " = unknown"
+        cache.set(0, 81.0, 30.0)
+        assert cache.valid[0] and cache.reasons[0] == ""
+
+    def test_touch_skips_invalid_slots(self):
+        cache = _load_surplus_engine().SensorCache()
+        cache.set(0, 1.0, 10.0)
+        cache.invalidate(1, 10.0, " = unavailable")
+        cache.touch(0, 50.0)
+        cache.touch(1, 50.0)
+        assert list(cache.stamps[:2]) == [50.0, 10.0]
+
+
 # ===========================================================================
 # AC6 — SurplusCalculator has zero new homeassistant imports
 # ===========================================================================
@@ -619,172 +736,193 @@ class TestAC6SurplusCalculatorHAFree:
 
 
 # ===========================================================================
-# AC7 — Timestamp refresh from HA state registry
+# AC7 — Staleness deadlines; HA state registry consulted only at expiry
 # ===========================================================================
 
-def _make_ha_state(value, last_updated):
-    """Create a mock HA state object with .state and .last_updated."""
+def _make_ha_state(value, last_updated, last_reported=None):
+    """Create a mock HA state object with .state, .last_updated and .last_reported."""
     st = MagicMock()
     st.state = str(value)
     st.last_updated = last_updated
+    st.last_reported = last_reported
     return st
 
 
-class TestTimestampRefreshFromHAState:
-    """Verify _refresh_cache_timestamps prevents false staleness reports."""
+def _make_event(entity_id: str, state_str: str):
+    """Create a minimal HA state-change event mock."""
+    event = MagicMock()
+    event.data = {"new_state": _make_ha_state(state_str, _NOW)}
+    event.data["new_state"].entity_id = entity_id
+    return event
+
 
-    def test_refresh_updates_stale_cache_timestamp(self, sensor_ctx, sample_config):
-        """Cached timestamp is old, HA entity available → timestamp reset to now."""
+def _ha_states(soc_state):
+    """``hass.states.get`` side effect: SOC as given, the rest available."""
+    return MagicMock(side_effect=lambda eid: {
+        "sensor.battery_soc":    soc_state,
+        "sensor.power_to_grid":  _make_ha_state(0.0, _NOW),
+        "sensor.pv_power":       _make_ha_state(5000.0, _NOW),
+        "sensor.power_to_user":  _make_ha_state(500.0, _NOW),
+    }.get(eid))
+
+
+class TestStalenessDeadlines:
+    """Deadlines replace the per-tick refresh from the HA state registry."""
+
+    def _fill(self, s, soc_ts, soc_valid=True, others_ts=_NOW):
+        _fill_cache(s, {
+            "soc_percent":     (83.0,   soc_ts,    soc_valid),
+            "power_to_grid_w": (0.0,    others_ts, True),
+            "pv_production_w": (5000.0, others_ts, True),
+            "power_to_user_w": (500.0,  others_ts, True),
+        })
+
+    def test_healthy_tick_does_not_query_state_machine(self, sensor_ctx, sample_config):
         mod, mock_utcnow, _ = sensor_ctx
         mock_utcnow.return_value = _NOW
         s = _make_sensor(mod, sample_config)
+        self._fill(s, _NOW - timedelta(seconds=30))
+        s.hass.states.get.reset_mock()
+
+        assert s._check_staleness() == ""
+        s.hass.states.get.assert_not_called()
 
+    def test_alive_entity_is_rearmed_at_expiry(self, sensor_ctx, sample_config):
+        """No state_reported, no last_reported: HA entity available → stamp reset to now."""
+        mod, mock_utcnow, _ = sensor_ctx
+        mock_utcnow.return_value = _NOW
+        s = _make_sensor(mod, sample_config)
         stale_ts = _NOW - timedelta(seconds=120)
-        s._sensor_cache = {
-            "soc_percent":     (83.0, stale_ts, True),
-            "power_to_grid_w": (0.0,  _NOW,     True),
-            "pv_production_w": (5000.0, _NOW,   True),
-            "power_to_user_w": (500.0,  _NOW,   True),
-        }
+        self._fill(s, stale_ts)
+        s.hass.states.get = _ha_states(_make_ha_state(83.0, stale_ts))
 
-        # Mock HA state registry — SOC entity is available
-        s.hass.states.get = MagicMock(side_effect=lambda eid: {
-            "sensor.battery_soc":    _make_ha_state(83.0, stale_ts),
-            "sensor.power_to_grid":  _make_ha_state(0.0, _NOW),
-            "sensor.pv_power":       _make_ha_state(5000.0, _NOW),
-            "sensor.power_to_user":  _make_ha_state(500.0, _NOW),
-        }.get(eid))
+        assert s._check_staleness() == ""
+        s._engine.hysteresis_filter.force_failsafe.assert_not_called()
+        # Reset to now (_NOW), not state.last_updated
+        assert _cache_entry(s, "soc_percent")[1] == _NOW.timestamp()
+        s.hass.states.get.assert_called_once_with("sensor.battery_soc")
+        assert s._sensor_cache.next_deadline == _NOW.timestamp() + 60
 
-        s._refresh_cache_timestamps()
+    def test_unavailable_entity_goes_stale(self, sensor_ctx, sample_config):
+        mod, mock_utcnow, _ = sensor_ctx
+        mock_utcnow.return_value = _NOW
+        s = _make_sensor(mod, sample_config)
+        stale_ts = _NOW - timedelta(seconds=61)
+        self._fill(s, stale_ts)
+        s.hass.states.get = _ha_states(_make_ha_state("unavailable", _NOW))
 
-        # SOC timestamp should be reset to utcnow (_NOW), not state.last_updated
-        assert s._sensor_cache["soc_percent"][1] == _NOW
+        assert "sensor.battery_soc stale for 61s" in s._check_staleness()
+        assert _cache_entry(s, "soc_percent")[1] == stale_ts.timestamp()
 
-    def test_refresh_prevents_false_staleness(self, sensor_ctx, sample_config):
-        """After refresh, a sensor that was falsely stale passes staleness check."""
+    def test_invalid_cache_entry_is_not_refreshed(self, sensor_ctx, sample_config):
         mod, mock_utcnow, _ = sensor_ctx
         mock_utcnow.return_value = _NOW
         s = _make_sensor(mod, sample_config)
+        stale_ts = _NOW - timedelta(seconds=90)
+        self._fill(s, stale_ts, soc_valid=False)
+        s.hass.states.get = _ha_states(_make_ha_state(83.0, _NOW))
 
-        stale_ts = _NOW - timedelta(seconds=120)
-        s._sensor_cache = {
-            "soc_percent":     (83.0, stale_ts, True),
-            "power_to_grid_w": (0.0,  _NOW,     True),
-            "pv_production_w": (5000.0, _NOW,   True),
-            "power_to_user_w": (500.0,  _NOW,   True),
-        }
-
-        # Before refresh: staleness detected
-        result_before = s._check_staleness()
-        assert result_before  # stale
+        assert s._check_staleness()
+        assert _cache_entry(s, "soc_percent")[1] == stale_ts.timestamp()
 
-        # Mock HA state registry — entity available (even with stale last_updated)
-        s._engine.hysteresis_filter.force_failsafe.reset_mock()
-        s.hass.states.get = MagicMock(side_effect=lambda eid: {
-            "sensor.battery_soc":    _make_ha_state(83.0, stale_ts),
-            "sensor.power_to_grid":  _make_ha_state(0.0, _NOW),
-            "sensor.pv_power":       _make_ha_state(5000.0, _NOW),
-            "sensor.power_to_user":  _make_ha_state(500.0, _NOW),
-        }.get(eid))
-
-        s._refresh_cache_timestamps()
-        result_after = s._check_staleness()
-        assert not result_after  # no longer stale — entity is alive in HA
-
-    def test_refresh_skips_unavailable_entities(self, sensor_ctx, sample_config):
-        """Unavailable HA state does not overwrite cache timestamp."""
+    def test_stale_until_next_state_change(self, sensor_ctx, sample_config):
         mod, mock_utcnow, _ = sensor_ctx
         mock_utcnow.return_value = _NOW
         s = _make_sensor(mod, sample_config)
+        self._fill(s, _NOW - timedelta(seconds=120))
+        assert s._check_staleness()
 
-        original_ts = _NOW - timedelta(seconds=30)
-        s._sensor_cache = {
-            "soc_percent":     (83.0, original_ts, True),
-            "power_to_grid_w": (0.0,  _NOW,        True),
-            "pv_production_w": (5000.0, _NOW,      True),
-            "power_to_user_w": (500.0,  _NOW,      True),
-        }
+        s._handle_state_change(_make_event("sensor.battery_soc", "84"))
+        assert s._check_staleness() == ""
 
-        unavail_state = MagicMock()
-        unavail_state.state = "unavailable"
-        unavail_state.last_updated = _NOW
+    def test_missing_cache_entries_are_never_armed(self, sensor_ctx, sample_config):
+        """Entities not yet in cache (startup) have no deadline."""
+        mod, mock_utcnow, _ = sensor_ctx
+        mock_utcnow.return_value = _NOW
+        s = _make_sensor(mod, sample_config)
+        _fill_cache(s, {})
 
-        s.hass.states.get = MagicMock(side_effect=lambda eid: {
-            "sensor.battery_soc":    unavail_state,
-            "sensor.power_to_grid":  _make_ha_state(0.0, _NOW),
-            "sensor.pv_power":       _make_ha_state(5000.0, _NOW),
-            "sensor.power_to_user":  _make_ha_state(500.0, _NOW),
-        }.get(eid))
+        assert s._sensor_cache.next_deadline == math.inf
+        assert s._check_staleness() == ""
+        s.hass.loop.call_at.assert_not_called()
 
-        s._refresh_cache_timestamps()
+    def test_single_timer_armed_at_earliest_deadline(self, sensor_ctx, sample_config):
+        mod, mock_utcnow, _ = sensor_ctx
+        mock_utcnow.return_value = _NOW
+        s = _make_sensor(mod, sample_config)
+        s._handle_state_change(_make_event("sensor.battery_soc", "80"))
+        s._handle_state_change(_make_event("sensor.pv_power", "5000"))
 
-        # SOC timestamp should remain unchanged (unavailable → skipped)
-        assert s._sensor_cache["soc_percent"][1] == original_ts
+        s.hass.loop.call_at.assert_called_once_with(
+            _NOW.timestamp() + 60 + mod.STALE_DEADLINE_SLACK_S, s._stale_deadline
+        )
 
-    def test_refresh_skips_invalid_cache_entries(self, sensor_ctx, sample_config):
-        """Cache entries marked invalid (is_valid=False) are not refreshed."""
+    def test_deadline_callback_schedules_failsafe_tick(self, sensor_ctx, sample_config):
         mod, mock_utcnow, _ = sensor_ctx
-        mock_utcnow.return_value = _NOW
+        mock_utcnow.return_value = _NOW - timedelta(seconds=61)
         s = _make_sensor(mod, sample_config)
+        s._handle_state_change(_make_event("sensor.battery_soc", "80"))
+        s._evaluation_tick = MagicMock()
+        mock_utcnow.return_value = _NOW
 
-        original_ts = _NOW - timedelta(seconds=30)
-        s._sensor_cache = {
-            "soc_percent":     (83.0, original_ts, False),  # invalid
-            "power_to_grid_w": (0.0,  _NOW,        True),
-            "pv_production_w": (5000.0, _NOW,      True),
-            "power_to_user_w": (500.0,  _NOW,      True),
-        }
+        s._stale_deadline()
 
-        s.hass.states.get = MagicMock(side_effect=lambda eid: {
-            "sensor.battery_soc":    _make_ha_state(83.0, _NOW),
-            "sensor.power_to_grid":  _make_ha_state(0.0, _NOW),
-            "sensor.pv_power":       _make_ha_state(5000.0, _NOW),
-            "sensor.power_to_user":  _make_ha_state(500.0, _NOW),
-        }.get(eid))
+        s.hass.loop.create_task.assert_called_once()
+        assert s._sensor_cache.stale_count == 1
 
-        s._refresh_cache_timestamps()
 
-        # SOC timestamp should remain unchanged (is_valid=False → skipped)
-        assert s._sensor_cache["soc_percent"][1] == original_ts
+class TestStateReportedLiveness:
+    """Liveness from state_reported events; last_reported as fallback."""
 
-    def test_refresh_handles_all_entities(self, sensor_ctx, sample_config):
-        """All tracked entities get their timestamps refreshed, not just critical ones."""
+    def test_report_refreshes_last_seen(self, sensor_ctx, sample_config):
         mod, mock_utcnow, _ = sensor_ctx
         mock_utcnow.return_value = _NOW
         s = _make_sensor(mod, sample_config)
+        _fill_cache(s, {"soc_percent": (83.0, _NOW - timedelta(seconds=50), True)})
 
-        stale_ts = _NOW - timedelta(seconds=120)
-        s._sensor_cache = {
-            "soc_percent":     (83.0, stale_ts, True),
-            "power_to_grid_w": (0.0,  stale_ts, True),  # also stale
-            "pv_production_w": (5000.0, stale_ts, True),
-            "power_to_user_w": (500.0,  stale_ts, True),
-        }
+        s._handle_state_report(_make_event("sensor.battery_soc", "83.0"))
 
-        # All entities available in HA (even with stale last_updated)
-        s.hass.states.get = MagicMock(side_effect=lambda eid: {
-            "sensor.battery_soc":    _make_ha_state(83.0, stale_ts),
-            "sensor.power_to_grid":  _make_ha_state(0.0, stale_ts),
-            "sensor.pv_power":       _make_ha_state(5000.0, stale_ts),
-            "sensor.power_to_user":  _make_ha_state(500.0, stale_ts),
-        }.get(eid))
+        assert _cache_entry(s, "soc_percent") == (83.0, _NOW.timestamp(), True)
 
-        s._refresh_cache_timestamps()
+    def test_report_for_untracked_entity_is_ignored(self, sensor_ctx, sample_config):
+        mod, mock_utcnow, _ = sensor_ctx
+        mock_utcnow.return_value = _NOW
+        s = _make_sensor(mod, sample_config)
+        s._handle_state_report(_make_event("sensor.other", "1"))
+        assert all(_cache_entry(s, key) is None for key in mod.CACHE_KEYS)
 
-        # All timestamps reset to utcnow (_NOW), not state.last_updated
-        for key in ("soc_percent", "power_to_grid_w", "pv_production_w", "power_to_user_w"):
-            assert s._sensor_cache[key][1] == _NOW, f"{key} timestamp not refreshed to now"
+    def test_silent_entity_is_stale_without_state_machine_lookup(
+        self, sensor_ctx, sample_config
+    ):
+        """A frozen integration keeps its entity "available" — still stale."""
+        mod, mock_utcnow, _ = sensor_ctx
+        mock_utcnow.return_value = _NOW
+        s = _make_sensor(mod, sample_config)
+        s._state_reports = True
+        _fill_cache(s, {"soc_percent": (83.0, _NOW - timedelta(seconds=61), True)})
+        s.hass.states.get = _ha_states(_make_ha_state(83.0, _NOW))
+
+        assert "sensor.battery_soc stale for 61s" in s._check_staleness()
+        s.hass.states.get.assert_not_called()
 
-    def test_refresh_skips_missing_cache_entries(self, sensor_ctx, sample_config):
-        """Entities not yet in cache (startup) are gracefully skipped."""
+    def test_last_reported_gives_true_last_seen(self, sensor_ctx, sample_config):
         mod, mock_utcnow, _ = sensor_ctx
         mock_utcnow.return_value = _NOW
         s = _make_sensor(mod, sample_config)
-        s._sensor_cache = {}  # empty cache at startup
+        reported = _NOW - timedelta(seconds=20)
+        _fill_cache(s, {"soc_percent": (83.0, _NOW - timedelta(seconds=90), True)})
+        s.hass.states.get = _ha_states(_make_ha_state(83.0, _NOW - timedelta(hours=1), reported))
+
+        assert s._check_staleness() == ""
+        assert _cache_entry(s, "soc_percent")[1] == reported.timestamp()
+
+    def test_old_last_reported_is_stale(self, sensor_ctx, sample_config):
+        mod, mock_utcnow, _ = sensor_ctx
+        mock_utcnow.return_value = _NOW
+        s = _make_sensor(mod, sample_config)
+        stale_ts = _NOW - timedelta(seconds=90)
+        _fill_cache(s, {"soc_percent": (83.0, stale_ts, True)})
+        s.hass.states.get = _ha_states(_make_ha_state(83.0, stale_ts, stale_ts))
 
-        s.hass.states.get = MagicMock(side_effect=lambda eid:
-            _make_ha_state(0.0, _NOW))
+        assert "sensor.battery_soc stale for 90s" in s._check_staleness()
 
-        # Should not raise
-        s._refresh_cache_timestamps()
-        assert s._sensor_cache == {}
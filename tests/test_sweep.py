@@ -0,0 +1,164 @@
+"""Tests for the parameter sweep — no HA runtime required.
+
+Run: python -m pytest tests/test_sweep.py -v
+"""
+import importlib.util
+import os
+import sys
+from datetime import timedelta
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+from .test_replay import CONFIG, T0, RecorderDB  # noqa: E402
+
+
+def _load(name: str):
+    sys.modules.pop(name, None)
+    spec = importlib.util.spec_from_file_location(name, os.path.join(ROOT, f"{name}.py"))
+    mod = importlib.util.module_from_spec(spec)
+    sys.modules[name] = mod
+    spec.loader.exec_module(mod)
+    return mod
+
+
+@pytest.fixture(scope="module")
+def sw():
+    """Load surplus_engine, replay and sweep standalone (imported by name)."""
+    _load("surplus_engine")
+    _load("replay")
+    return _load("sweep")
+
+
+def _ticks(n: int):
+    return np.datetime64("2026-06-15T10:00:00", "us") + (
+        np.arange(n) * 15_000_000
+    ).astype("timedelta64[us]")
+
+
+@pytest.fixture
+def recorded(tmp_path):
+    """Two hours of varying PV with a sensor dropout in the middle."""
+    db = RecorderDB(tmp_path / "home-assistant_v2.db")
+    for m in range(0, 120, 3):
+        pv = 9000 if (m // 15) % 2 == 0 else 2500
+        db.add_all(m, soc=60 + (m % 30), pv=pv, load=900)
+    db.add(50, "sensor.pv", "unavailable")
+    db.add(52, "sensor.pv", "9000")
+    return db.close()
+
+
+class TestExpandGrid:
+
+    def test_cartesian_product(self, sw) -> None:
+        configs = sw.expand_grid({"wallbox_threshold_kw": [4.0, 4.2], "hold_time_minutes": [5, 10, 15]})
+        assert len(configs) == 6
+        assert {"wallbox_threshold_kw": 4.2, "hold_time_minutes": 15} in configs
+
+    def test_rejects_unknown_keys(self, sw) -> None:
+        with pytest.raises(ValueError, match="evaluation_interval"):
+            sw.expand_grid({"evaluation_interval": [5]})
+
+
+class TestEvaluateConfig:
+
+    def test_matches_replayed_engine(self, sw, recorded) -> None:
+        """Batch sweep metrics equal those derived from a scalar engine replay."""
+        rp = sys.modules["replay"]
+        table = rp.Replay(CONFIG).run(recorded)
+        inputs = sw.SweepInputs.from_recorder(recorded, CONFIG)
+        result = sw.evaluate_config(CONFIG, {}, inputs)
+
+        hours = CONFIG["evaluation_interval"] / 3600
+        states = list(table.state)
+        active = [s == 1 for s in states]
+        starts = sum(1 for i, a in enumerate(active) if a and (i == 0 or not active[i - 1]))
+        assert len(inputs) == len(table)
+        assert result.charge_energy_kwh == pytest.approx(sum(table.reported_kw) * hours)
+        assert result.charge_cycles == starts
+        assert 2 in states  # dropout produced FAILSAFE ticks
+
+    def test_energy_split_is_consistent(self, sw, recorded) -> None:
+        inputs = sw.SweepInputs.from_recorder(recorded, CONFIG)
+        r = sw.evaluate_config(CONFIG, {"hold_time_minutes": 20}, inputs)
+        assert r.charge_energy_kwh > 0
+        assert r.battery_energy_kwh > 0  # 2.5 kW PV phases need the buffer
+        assert r.battery_energy_kwh + r.grid_import_kwh <= r.charge_energy_kwh + 1e-9
+
+    def test_longer_hold_means_fewer_cycles(self, sw) -> None:
+        """PV alternating 9 kW / 2 kW every 5 min with no battery headroom."""
+        pv = np.where((np.arange(240) // 20) % 2 == 0, 9000.0, 2000.0)
+        inputs = sw.SweepInputs.from_columns(
+            15, timestamps=_ticks(240), soc_percent=np.full(240, 50.0),
+            pv_production_w=pv, power_to_user_w=np.zeros(240),
+        )
+        short, long_ = (sw.evaluate_config(CONFIG, {"hold_time_minutes": h}, inputs) for h in (1, 30))
+        assert short.charge_cycles == 6
+        assert long_.charge_cycles == 1
+        assert long_.grid_import_kwh > short.grid_import_kwh
+
+    def test_from_columns(self, sw) -> None:
+        ts = _ticks(240)
+        inputs = sw.SweepInputs.from_columns(
+            15, timestamps=ts, soc_percent=np.full(240, 80.0),
+            pv_production_w=np.full(240, 8000.0), power_to_user_w=np.full(240, 1000.0),
+        )
+        r = sw.evaluate_config(CONFIG, {}, inputs)
+        assert r.charge_energy_kwh == pytest.approx(7.0 * 1.0)  # 7 kW for one hour
+        assert r.battery_energy_kwh == 0.0
+        assert r.charge_cycles == 1
+
+    def test_battery_limited_by_calculator_buffer(self, sw) -> None:
+        """PV drops 6 kW → 2 kW; the 10-min hold draws at most max_discharge_kw."""
+        pv = np.where(np.arange(240) < 120, 6000.0, 2000.0)
+        inputs = sw.SweepInputs.from_columns(
+            15, timestamps=_ticks(240), soc_percent=np.full(240, 90.0),
+            pv_production_w=pv, power_to_user_w=np.zeros(240),
+        )
+        r = sw.evaluate_config(CONFIG, {"max_discharge_kw": 1.0}, inputs)
+        assert r.battery_energy_kwh == pytest.approx(1.0 * 10 / 60)
+        assert r.grid_import_kwh > 0
+
+
+class TestRunSweep:
+
+    def test_pool_matches_in_process(self, sw, recorded) -> None:
+        inputs = sw.SweepInputs.from_recorder(recorded, CONFIG)
+        grid = {
+            "wallbox_threshold_kw": [3.5, 4.2],
+            "hold_time_minutes": [5, 15],
+            "sunset_cutoff_minutes": [0, 30],
+            "time_strategy": [CONFIG["time_strategy"], [{"default": True, "soc_floor": 80}]],
+        }
+        serial = sw.run_sweep(CONFIG, inputs, grid, max_workers=1)
+        pooled = sw.run_sweep(CONFIG, inputs, grid, max_workers=2)
+        assert len(pooled) == 16
+        assert pooled == serial
+
+    def test_shared_block_is_released(self, sw, recorded) -> None:
+        inputs = sw.SweepInputs.from_recorder(recorded, CONFIG)
+        created = []
+        real = sw.shared_memory.SharedMemory
+
+        def _spy(*args, **kwargs):
+            shm = real(*args, **kwargs)
+            if kwargs.get("create"):
+                created.append(shm.name)
+            return shm
+
+        sw.shared_memory.SharedMemory = _spy
+        try:
+            sw.run_sweep(CONFIG, inputs, [{}, {"hold_time_minutes": 5}], max_workers=2)
+        finally:
+            sw.shared_memory.SharedMemory = real
+        assert created
+        with pytest.raises(FileNotFoundError):
+            real(name=created[0])
+
+    def test_sweep_window_is_offset_from_t0(self, sw, recorded) -> None:
+        inputs = sw.SweepInputs.from_recorder(recorded, CONFIG, start=T0 + timedelta(minutes=60))
+        first_us = inputs.column("timestamps")[0]
+        assert first_us == (T0 + timedelta(minutes=60)).timestamp() * 1e6